@@ -24,6 +24,40 @@ ibmpowervm_opts = [
     cfg.IntOpt('pypowervm_job_request_timeout',
                default=1800,
                help='Default timeout in seconds for PowerVM Job requests.'),
+    cfg.IntOpt('pypowervm_job_max_running',
+               default=0,
+               help='Maximum number of PowerVM Jobs to run concurrently '
+                    'against one REST server.  Further Jobs are queued.  0 '
+                    'means no limit.'),
+    cfg.IntOpt('pypowervm_job_max_per_host',
+               default=0,
+               help='Maximum number of PowerVM Jobs to run concurrently '
+                    'against one managed system.  0 means no limit.'),
+    cfg.IntOpt('pypowervm_job_max_per_vios',
+               default=0,
+               help='Maximum number of PowerVM Jobs to run concurrently '
+                    'against one Virtual I/O Server.  0 means no limit.'),
+    cfg.IntOpt('pypowervm_upload_max_per_vios',
+               default=3,
+               help='Maximum number of image uploads to run concurrently '
+                    'to one Virtual I/O Server through one REST server.  '
+                    'Further uploads are queued.  0 means no limit.'),
+    cfg.IntOpt('pypowervm_upload_max_per_server',
+               default=0,
+               help='Maximum number of image uploads to run concurrently '
+                    'through one REST server, across all of its Virtual I/O '
+                    'Servers.  0 means no limit.'),
+    cfg.StrOpt('pypowervm_upload_ordering',
+               default='priority', choices=['priority', 'fifo'],
+               help='Order in which queued image uploads are started: '
+                    '"priority" starts the highest UploadPriority first, '
+                    'then the oldest; "fifo" starts the oldest first.'),
+    cfg.IntOpt('pypowervm_lu_clone_max_per_tier',
+               default=8,
+               help='Maximum number of linked clone LUs to create '
+                    'concurrently on one Shared Storage Pool Tier through '
+                    'one REST server, via crt_lu_linked_clones.  0 means no '
+                    'limit.'),
 ]
 
 CONF = cfg.CONF
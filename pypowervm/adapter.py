@@ -13,6 +13,7 @@
 #    under the License.
 """Low-level communication with the PowerVM REST API."""
 import abc
+import collections
 import copy
 import errno
 import hashlib
@@ -35,8 +36,11 @@ except ImportError:
 
 from oslo_log import log as logging
 import requests
+import requests.adapters as rqadp
 import requests.exceptions as rqex
 import six
+from six.moves import http_cookiejar
+from six.moves import queue
 import six.moves.urllib.parse as urllib
 import weakref
 
@@ -62,11 +66,70 @@ etree.register_namespace('web', c.WEB_NS)
 etree.register_namespace('uom', c.UOM_NS)
 
 
+class _ConnStats(object):
+    """Thread-safe counters describing HTTP connection usage of a Session."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict(requests=0, new_conns=0, handshakes=0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def snapshot(self):
+        """Point-in-time copy of the counters.
+
+        :return: Dict with the following keys:
+                 requests: Number of HTTP requests sent.
+                 new_conns: Number of requests which could not be satisfied by
+                            a pooled connection (pool misses).
+                 reused: Number of requests satisfied by an already-open
+                         pooled connection (pool hits).
+                 handshakes: Number of TCP (and, for https, TLS) connection
+                             establishments.
+        """
+        with self._lock:
+            ret = dict(self._counts)
+        ret['reused'] = max(ret['requests'] - ret['new_conns'], 0)
+        return ret
+
+
+class _PooledHTTPAdapter(rqadp.HTTPAdapter):
+    """requests transport adapter which records pool hits and handshakes."""
+    def __init__(self, stats, **kwargs):
+        self._stats = stats
+        super(_PooledHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(_PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        stats = self._stats
+        new_pool = self.poolmanager._new_pool
+
+        def _counted_pool(*pargs, **pkwargs):
+            pool = new_pool(*pargs, **pkwargs)
+            new_conn = pool._new_conn
+
+            def _counted_conn():
+                stats.incr('new_conns')
+                conn = new_conn()
+                connect = conn.connect
+
+                def _counted_connect():
+                    stats.incr('handshakes')
+                    return connect()
+                conn.connect = _counted_connect
+                return conn
+            pool._new_conn = _counted_conn
+            return pool
+        self.poolmanager._new_pool = _counted_pool
+
+
 class Session(object):
     """Responsible for PowerVM API session management."""
     def __init__(self, host='localhost', username=None, password=None,
                  auditmemento=None, protocol=None, port=None, timeout=1200,
-                 certpath='/etc/ssl/certs/', certext='.crt', conn_tries=1):
+                 certpath='/etc/ssl/certs/', certext='.crt', conn_tries=1,
+                 conn_pool_size=None):
         """Persistent authenticated session with the REST API server.
 
         Two authentication modes are supported: password- and file-based.
@@ -102,6 +165,14 @@ class Session(object):
                            means we only try once.  We sleep for two seconds
                            (subject to change in future versions) between
                            retries.
+        :param conn_pool_size: If specified, HTTP connections to the REST
+                               server are kept alive and reused across
+                               requests, with at most this many idle
+                               connections retained in the pool.  Size it to
+                               the number of threads expected to use this
+                               Session concurrently.  If None (the default),
+                               each request opens (and closes) its own
+                               connection.
         :return: A logged-on session suitable for passing to the Adapter
                  constructor.
         """
@@ -158,6 +229,11 @@ class Session(object):
         self._relogin_unsafe = False
         self._eventlistener = None
 
+        # Persistent HTTP connection pool.  Created lazily by _http_session.
+        self.conn_pool_size = conn_pool_size
+        self._http = None
+        self._conn_stats = _ConnStats()
+
         # Will be set by _logon()
         self._sessToken = None
         self.mc_type = None
@@ -196,6 +272,7 @@ class Session(object):
                 self._eventlistener.shutdown()
         finally:
             self._logoff()
+            self.reset_connections()
 
     def get_event_listener(self):
         if not self.has_event_listener:
@@ -207,6 +284,54 @@ class Session(object):
     def has_event_listener(self):
         return self._eventlistener is not None
 
+    @property
+    def conn_stats(self):
+        """Connection usage counters for this Session.
+
+        See _ConnStats.snapshot for the format.  When connection pooling is
+        disabled (conn_pool_size is None), every request is a pool miss.
+        """
+        return self._conn_stats.snapshot()
+
+    def _http_session(self):
+        """Get the requests.Session through which to send a request.
+
+        :return: A tuple of (requests.Session, pooled).  If pooled is False,
+                 the requests.Session is single-use, and must be closed by the
+                 caller when the request completes.
+        """
+        if self.conn_pool_size is None:
+            self._conn_stats.incr('new_conns')
+            self._conn_stats.incr('handshakes')
+            return requests.Session(), False
+        with self._lock:
+            if self._http is None:
+                http = requests.Session()
+                # Each request carries its own X-API-Session token, and we
+                # don't want server cookies leaking between requests.
+                http.cookies.set_policy(
+                    http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+                adapter = _PooledHTTPAdapter(
+                    self._conn_stats, pool_connections=1,
+                    pool_maxsize=self.conn_pool_size)
+                http.mount('http://', adapter)
+                http.mount('https://', adapter)
+                self._http = http
+            return self._http, True
+
+    def reset_connections(self):
+        """Close all pooled HTTP connections to the REST server.
+
+        Subsequent requests will establish new connections.  This is done
+        automatically after a re-login.  It is a no-op if connection pooling
+        is disabled.
+        """
+        with self._lock:
+            http, self._http = self._http, None
+        if http is not None:
+            LOG.debug('Closing pooled connections to %s', self.host)
+            http.close()
+
     @staticmethod
     def _chunkreader(filehandle, chunksize):
         if hasattr(filehandle, 'read'):
@@ -247,8 +372,7 @@ class Session(object):
         if headers is None:
             headers = {}
 
-        session = requests.Session()
-        session.verify = verify
+        session, pooled = self._http_session()
 
         url = self.dest + path
 
@@ -288,17 +412,24 @@ class Session(object):
                 headers['X-API-Session'] = self._sessToken
                 sess_token_try = self._sessToken
 
+        rq_kwargs = dict(headers=headers, timeout=timeout)
+        if pooled:
+            # The pooled session is shared, so verify must be per-request.
+            rq_kwargs['verify'] = verify
+        else:
+            session.verify = verify
+        self._conn_stats.incr('requests')
         try:
             if isupload:
                 response = session.request(
                     method, url, data=self._chunkreader(filehandle, chunksize),
-                    headers=headers, timeout=timeout)
+                    **rq_kwargs)
             elif isdownload:
                 response = session.request(method, url, stream=True,
-                                           headers=headers, timeout=timeout)
+                                           **rq_kwargs)
             else:
                 response = session.request(method, url, data=body,
-                                           headers=headers, timeout=timeout)
+                                           **rq_kwargs)
         except rqex.SSLError as e:
             # TODO(IBM) Get better responses here...this isn't good.
             msg = '%s for %s %s: %s' % (e.__class__.__name__, method, url, e)
@@ -320,7 +451,8 @@ class Session(object):
                               {'class': e.__class__.__name__, 'method': method,
                                'url': url, 'excp': str(e)})
         finally:
-            session.close()
+            if not pooled:
+                session.close()
 
         # remove X-API-Session header so it won't get printed
         if not login:
@@ -341,6 +473,9 @@ class Session(object):
             return Response(method, path, response.status_code,
                             response.reason, response.headers,
                             reqheaders=headers, reqbody=body)
+        elif isdownload:
+            # Don't pull the (streamed) content into memory just to log it.
+            LOG.trace('response body: <file contents>')
         else:
             LOG.trace('response body:\n%s',
                       response.text if not sensitive else "<sensitive>")
@@ -363,6 +498,9 @@ class Session(object):
                         LOG.info(_('Attempting re-login %s'), self.host)
                         try:
                             self._logon()
+                            # Don't reuse connections established under the
+                            # stale session token.
+                            self.reset_connections()
                         except pvmex.Error as e:
                             if e.response:
                                 if (e.response.status ==
@@ -388,11 +526,17 @@ class Session(object):
                                 body=response.text)
                             raise
 
-                    # Retry the original request
+                    # Retry the original request.  (A download can be retried
+                    # into the same filehandle, since nothing was written to
+                    # it; an upload's source has already been consumed.)
+                    dl_kwargs = (dict(filehandle=filehandle,
+                                      chunksize=chunksize)
+                                 if isdownload else {})
                     try:
                         return self.request(method, path, headers, body,
                                             sensitive=sensitive, verify=verify,
-                                            timeout=timeout, relogin=False)
+                                            timeout=timeout, relogin=False,
+                                            **dl_kwargs)
                     except pvmex.HttpUnauth as e:
                         # This is a special case... normally on a 401 we
                         # would retry login, but we won't here because
@@ -422,13 +566,10 @@ class Session(object):
             return resp
         else:
             if isdownload:
-                errtext = ''
-                for chunk in response.iter_content(chunksize):
-                    errtext += chunk
                 resp = Response(method, path, response.status_code,
                                 response.reason, response.headers,
                                 reqheaders=headers, reqbody=body,
-                                body=errtext)
+                                body=response.text)
             raise self._get_httperror(resp)
 
     @staticmethod
@@ -578,24 +719,219 @@ class Session(object):
             self._relogin_unsafe = True
 
 
+# Default upper bound on the total size of response bodies held by an Adapter's
+# read cache.
+_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Maximum number of parsed Entries buffered ahead of the consumer by
+# Adapter.read_iter.
+_STREAM_QUEUE_SIZE = 16
+
+# Default maximum number of event batches queued for each event handler.  When
+# a handler falls this far behind, its backlog is replaced by MISSING_EVENTS.
+_EVENT_QUEUE_SIZE = 1000
+
+# Number of recent events retained by the event listener for replay.
+_EVENT_REPLAY_SIZE = 1000
+
+# Event types which pertain to all URIs, so are not subject to filtering.
+_GLOBAL_EVENT_TYPES = frozenset(['NEW_CLIENT', 'CACHE_CLEARED',
+                                 'MISSING_EVENTS'])
+
+
+class _CachedResponse(object):
+    """The essentials of a cached GET Response."""
+    def __init__(self, resp, stamp):
+        self.reqmethod = resp.reqmethod
+        self.reqpath = resp.reqpath
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = dict(resp.headers)
+        self.reqheaders = dict(resp.reqheaders)
+        self.body = resp.body
+        self.stamp = stamp
+        # Base path, lowercased, for matching against event URIs
+        self.base = util.dice_href(resp.reqpath, include_query=False,
+                                   include_fragment=False).lower()
+
+    @property
+    def etag(self):
+        return self.headers.get('etag', None)
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    def response(self, adapter):
+        """Produce a new (independently mutable) Response from this data."""
+        resp = Response(self.reqmethod, self.reqpath, self.status,
+                        self.reason, dict(self.headers),
+                        reqheaders=dict(self.reqheaders), body=self.body)
+        resp.adapter = adapter
+        resp._unmarshal_atom()
+        return resp
+
+
+class _ReadCache(object):
+    """Thread-safe, size-bounded LRU cache of GET Responses, keyed by path.
+
+    Entries are invalidated by path (see invalidate) - typically as a result of
+    events from the REST server, or of writes through the owning Adapter.
+    """
+    # Path segments denoting resources which are not (reliably) the subject of
+    # REST events, and therefore can't be cached.
+    _UNCACHEABLE = {'jobs', 'do', 'search', 'quick', 'event'}
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # {path: _CachedResponse}, least recently used first
+        self._data = collections.OrderedDict()
+        self._size = 0
+        # Incremented on every invalidation.  A read which was in flight while
+        # an invalidation happened must not populate the cache, lest it store
+        # data which was stale before it arrived.
+        self.generation = 0
+
+    @classmethod
+    def cacheable(cls, path):
+        """Whether a GET of the specified path may be cached."""
+        base = util.dice_href(path, include_query=False,
+                              include_fragment=False)
+        if not base.startswith(c.API_BASE_PATH + 'uom/'):
+            return False
+        if base.endswith('.json'):
+            return False
+        segs = base[len(c.API_BASE_PATH):].lower().split('/')
+        return not cls._UNCACHEABLE.intersection(segs)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size(self):
+        """Total size, in bytes, of the cached response bodies."""
+        return self._size
+
+    def get(self, path):
+        """Retrieve the _CachedResponse for a path, or None if not cached."""
+        with self._lock:
+            cached = self._data.get(path)
+            if cached is not None:
+                self._move_to_end(path)
+            return cached
+
+    def put(self, path, resp, generation):
+        """Cache a Response.
+
+        :param path: The path under which to cache the Response.
+        :param resp: The Response to cache.
+        :param generation: The value of self.generation before the request
+                           was sent.  If an invalidation happened since, the
+                           Response is not cached.
+        """
+        cached = _CachedResponse(resp, time.time())
+        if cached.size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._pop(path)
+            self._data[path] = cached
+            self._size += cached.size
+            while self._size > self.max_bytes:
+                self._pop(next(iter(self._data)))
+
+    def touch(self, path, generation):
+        """Mark cached data for a path as just now revalidated."""
+        with self._lock:
+            cached = self._data.get(path)
+            if cached is not None and generation == self.generation:
+                cached.stamp = time.time()
+
+    def invalidate(self, href):
+        """Remove cached data affected by a change to the specified resource.
+
+        This removes the resource itself (by any parentage, with any extended
+        attribute groups) and any feed of its type.
+
+        :param href: Path or full URI of the added/changed/deleted resource.
+        """
+        base = util.dice_href(href, include_query=False,
+                              include_fragment=False).lower()
+        segs = base.rsplit('/', 2)
+        if util.is_instance_path(base):
+            entry_sfx = '/' + '/'.join(segs[-2:])
+            feed_sfx = '/' + segs[-2]
+        else:
+            entry_sfx = None
+            feed_sfx = '/' + segs[-1]
+        with self._lock:
+            self.generation += 1
+            for path in [path for path, cached in self._data.items()
+                         if cached.base.endswith(feed_sfx) or
+                         (entry_sfx and cached.base.endswith(entry_sfx))]:
+                self._pop(path)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+            self._size = 0
+
+    def _move_to_end(self, path):
+        # OrderedDict.move_to_end is not available in py2
+        self._data[path] = self._data.pop(path)
+
+    def _pop(self, path):
+        cached = self._data.pop(path, None)
+        if cached is not None:
+            self._size -= cached.size
+
+
 class Adapter(object):
     """REST API Adapter for PowerVM remote management."""
-    def __init__(self, session=None, use_cache=False, helpers=None):
+    def __init__(self, session=None, use_cache=False, helpers=None,
+                 cache_max_bytes=_CACHE_MAX_BYTES):
         """Create a new Adapter instance, connected to a Session.
 
         :param session: (Optional) A Session instance.  If not specified, a
                         new, local, file-authentication-based Session will be
                         created and used.
-        :param use_cache: Do not use.  Caching not supported.
+        :param use_cache: If True, GETs of uom entries and feeds are cached in
+                          memory, keyed by path (including extended attribute
+                          groups).  Cached data is invalidated by the Session's
+                          event listener, and may be revalidated against the
+                          server's etag - see the 'age' param of read().
         :param helpers: A list of decorator methods in which to wrap the HTTP
                         request call.  See the pypowervm.helpers package for
                         examples.
+        :param cache_max_bytes: When use_cache is True, the maximum total size
+                                of the cached response bodies.  The least
+                                recently used data is evicted beyond this
+                                limit.
         """
-        if use_cache:
-            raise pvmex.CacheNotSupportedException()
-
         self.session = session if session else Session()
         self._helpers = self._standardize_helper_list(helpers)
+        self._cache = None
+        self._cache_handler = None
+        if use_cache:
+            self._cache = _ReadCache(cache_max_bytes)
+            listener = self.session.get_event_listener()
+            self._cache_handler = _CacheEventHandler(self._cache, listener)
+            listener.subscribe(self._cache_handler)
+
+    def close(self):
+        """Release the Adapter's read cache and its event subscription.
+
+        The Adapter may still be used, without the cache.  (An Adapter that
+        is garbage collected without being closed has its subscription
+        removed on the next event poll.)
+        """
+        handler, self._cache_handler = self._cache_handler, None
+        self._cache = None
+        if handler is not None:
+            handler.unsubscribe()
 
     @staticmethod
     def _standardize_helper_list(helpers):
@@ -697,6 +1033,8 @@ class Adapter(object):
         resp = self._request('PUT', path, helpers=helpers, headers=headers,
                              body=element.toxmlstring(), timeout=timeout,
                              auditmemento=auditmemento, sensitive=sensitive)
+        if self._cache is not None:
+            self._cache.invalidate(path)
         resp._unmarshal_atom()
         return resp
 
@@ -723,12 +1061,19 @@ class Adapter(object):
                             in .../do/Something).
         :param detail: Requested detail level of the response.  Obsolete.
         :param service: REST service type, one of pypowervm.const.SERVICE_BY_NS
-        :param etag: Not used (caching disabled).
+        :param etag: If specified, the server returns HTTP 304 (No Change) if
+                     the resource's etag still matches.  The cache is bypassed
+                     for such requests.
         :param timeout: Timeout in seconds for the HTTP request.
         :param auditmemento: X-Audit-Memento header registered in the REST
                              server logs for debug purposes, allowing this
                              request to be identified therein.
-        :param age: Not used (caching disabled).
+        :param age: Only used if the Adapter was created with use_cache=True.
+                    Maximum age, in seconds, of cached data acceptable to the
+                    caller.  Cached data older than this is revalidated with
+                    the server via If-None-Match.  If -1 (the default), cached
+                    data is used until invalidated by an event.  If 0, cached
+                    data is always revalidated.
         :param xag: List of extended attribute group enum values.  If
                     unspecified or None, 'None' will be appended.  If the empty
                     list (xag=[]), no extended attribute query parameter will
@@ -752,6 +1097,87 @@ class Adapter(object):
                                  auditmemento=auditmemento, age=age,
                                  sensitive=sensitive, helpers=helpers)
 
+    def read_iter(self, root_type, root_id=None, child_type=None,
+                  child_id=None, suffix_type=None, suffix_parm=None,
+                  detail=None, service='uom', timeout=-1, auditmemento=None,
+                  xag=None, sensitive=False, helpers=None, add_qp=None,
+                  chunksize=65536):
+        """Retrieve a feed (or entry), incrementally parsing it as it arrives.
+
+        Unlike read(), the response body is never held in memory in its
+        entirety, either as text or as a parsed tree.  Each Entry is produced
+        as soon as it has been received, and released from the parse tree
+        before the next one is parsed.  The download is paused while the
+        consumer falls behind.
+
+        Parameters are as for read().  The cache is not used.
+
+        :param chunksize: Number of bytes to read from the network at a time.
+        :return: A generator of pypowervm.entities.Entry.  For a feed, one per
+                 <entry>; for a single entry, just the one.  (This can be
+                 passed to EntryWrapper.wrap.)  An empty feed produces
+                 nothing.  HttpError and its subclasses are raised from the
+                 generator.
+        """
+        self._validate('read', root_type, root_id, child_type, child_id,
+                       suffix_type, suffix_parm, detail)
+        path = self.build_path(service, root_type, root_id, child_type,
+                               child_id, suffix_type, suffix_parm, detail,
+                               xag=xag, add_qp=add_qp)
+        return self.read_by_path_iter(path, timeout=timeout,
+                                      auditmemento=auditmemento,
+                                      sensitive=sensitive, helpers=helpers,
+                                      chunksize=chunksize)
+
+    def read_by_path_iter(self, path, timeout=-1, auditmemento=None,
+                          sensitive=False, helpers=None, chunksize=65536):
+        """Streaming read() where the URI path is already known.
+
+        See read_iter.
+        """
+        path = util.dice_href(path)
+        if not re.search(r'%s(\w+)/(\w+)' % c.API_BASE_PATH, path):
+            raise ValueError(_('path=%s not a PowerVM API reference') % path)
+        entq = queue.Queue(maxsize=_STREAM_QUEUE_SIZE)
+        done = object()
+        sink = _AtomEntrySink(self, path, entq)
+
+        def _fetch():
+            try:
+                self._request('GET', path, helpers=helpers,
+                              headers={'Accept': 'application/atom+xml'},
+                              timeout=timeout, auditmemento=auditmemento,
+                              sensitive=sensitive, filehandle=sink,
+                              chunksize=chunksize)
+                sink.close()
+                result = done
+            except Exception as e:
+                result = e
+            try:
+                sink.put(result)
+            except pvmex.Error:
+                # The consumer is gone; nobody to tell.
+                pass
+
+        fetcher = threading.Thread(target=_fetch)
+        fetcher.daemon = True
+        fetcher.start()
+
+        def _consume():
+            try:
+                while True:
+                    item = entq.get()
+                    if item is done:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                # Unblock (and stop) the download if the consumer quits early
+                sink.aborted = True
+
+        return _consume()
+
     def read_job(self, job_id, etag=None, timeout=-1, auditmemento=None,
                  sensitive=False, helpers=None):
         return self.read('jobs', job_id, etag=etag, timeout=timeout,
@@ -786,6 +1212,9 @@ class Adapter(object):
         """Retrieve an existing resource where URI path is already known."""
 
         path = util.dice_href(path)
+        if self._cache is not None and not etag and _ReadCache.cacheable(path):
+            return self._cached_read_by_path(path, timeout, auditmemento, age,
+                                             sensitive, helpers)
         resp = self._read_by_path(path, etag, timeout, auditmemento,
                                   sensitive, helpers=helpers)
         if 'atom' in resp.reqheaders['Accept']:
@@ -793,6 +1222,28 @@ class Adapter(object):
 
         return resp
 
+    def _cached_read_by_path(self, path, timeout, auditmemento, age,
+                             sensitive, helpers):
+        """Read through the cache, revalidating stale data via etag."""
+        cache = self._cache
+        gen = cache.generation
+        cached = cache.get(path)
+        etag = None
+        if cached is not None:
+            if age < 0 or time.time() - cached.stamp < age:
+                return cached.response(self)
+            etag = cached.etag
+        resp = self._read_by_path(path, etag, timeout, auditmemento,
+                                  sensitive, helpers=helpers)
+        if cached is not None and resp.status == c.HTTPStatus.NO_CHANGE:
+            cache.touch(path, gen)
+            return cached.response(self)
+        if 'atom' in resp.reqheaders['Accept']:
+            resp._unmarshal_atom()
+        if resp.status == c.HTTPStatus.OK and resp.atom is not None:
+            cache.put(path, resp, gen)
+        return resp
+
     def _read_by_path(self, path, etag, timeout, auditmemento, sensitive,
                       helpers=None):
         m = re.search(r'%s(\w+)/(\w+)' % c.API_BASE_PATH, path)
@@ -852,6 +1303,8 @@ class Adapter(object):
         resp = self._request(
             'POST', path, helpers=helpers, headers=headers, body=body,
             timeout=timeout, auditmemento=auditmemento, sensitive=sensitive)
+        if self._cache is not None:
+            self._cache.invalidate(path)
 
         resp._unmarshal_atom()
         return resp
@@ -893,8 +1346,11 @@ class Adapter(object):
         headers = {}
         if etag:
             headers['If-Match'] = etag
-        return self._request('DELETE', path, helpers=helpers, headers=headers,
+        resp = self._request('DELETE', path, helpers=helpers, headers=headers,
                              timeout=timeout, auditmemento=auditmemento)
+        if self._cache is not None:
+            self._cache.invalidate(path)
+        return resp
 
     def upload_file(self, filedescr, filehandle, chunksize=65536,
                     timeout=-1, auditmemento=None, replacing=False,
@@ -1171,6 +1627,60 @@ class Response(object):
                                   self)
 
 
+class _AtomEntrySink(object):
+    """Writable file-like which parses an Atom feed/entry incrementally.
+
+    Each complete <entry> is unmarshalled to an Entry and put on a queue.
+    """
+    _ENTRY_TAG = str(etree.QName(c.ATOM_NS, 'entry'))
+
+    def __init__(self, adapter, path, entq):
+        self._parser = etree.XMLPullParser(events=('end',),
+                                           tag=self._ENTRY_TAG,
+                                           strip_cdata=False)
+        # Stand-in Response, providing the adapter for the Entries
+        self._resp = Response('GET', path, 200, 'OK', {})
+        self._resp.adapter = adapter
+        self._entq = entq
+        self._fed = False
+        self.aborted = False
+
+    def put(self, item):
+        """Queue an item, waiting for space unless the consumer has quit."""
+        while not self.aborted:
+            try:
+                self._entq.put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+        raise pvmex.Error(_('Streaming read of %s abandoned.') %
+                          self._resp.reqpath)
+
+    def _drain(self):
+        for _evt, elem in self._parser.read_events():
+            self.put(ent.Entry.unmarshal_atom_entry(elem, self._resp))
+            # Release the processed entry from the document being built.
+            parent = elem.getparent()
+            if parent is not None:
+                parent.remove(elem)
+
+    def write(self, chunk):
+        self._fed = True
+        self._parser.feed(chunk)
+        self._drain()
+
+    def close(self):
+        if not self._fed:
+            # No content (e.g. HTTP 204 for an empty feed)
+            return
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError as e:
+            raise pvmex.AtomError(_('Error parsing XML response from '
+                                    'PowerVM: %s') % e, self._resp)
+        self._drain()
+
+
 @six.add_metaclass(abc.ABCMeta)
 class EventListener(object):
 
@@ -1200,6 +1710,11 @@ class _EventListener(EventListener):
         This class should not be instantiated directly.  Instead construct
         a Session and use get_event_listener() to create it.
 
+        Each subscribed handler is fed from its own bounded queue by its own
+        thread, so a slow handler does not hold up event intake or the other
+        handlers.  The most recent events are retained, so a new subscriber
+        can replay those it missed.
+
         :param session: The Session this listener is to use.
         :param timeout: How long to wait for any events to be returned.
                         -1 = wait indefinitely.
@@ -1213,6 +1728,9 @@ class _EventListener(EventListener):
         self.timeout = timeout if timeout != -1 else session.timeout
         self._lock = threading.RLock()
         self.handlers = []
+        self._subscriptions = []
+        # Recent (raw_event, event_wrapper) pairs, for replay.
+        self._recent = collections.deque(maxlen=_EVENT_REPLAY_SIZE)
         self._pthread = None
         self.host = session.host
         self.adp = None
@@ -1234,7 +1752,30 @@ class _EventListener(EventListener):
         # No errors initializing, so dispatch what we recieved.
         self._dispatch_events(events, raw_events, evtwraps)
 
-    def subscribe(self, handler):
+    def subscribe(self, handler, uri_prefixes=None, event_types=None,
+                  replay_from=None, queue_size=_EVENT_QUEUE_SIZE):
+        """Subscribe an EventHandler to receive events.
+
+        :param handler: EventHandler, RawEventHandler or WrapperEventHandler.
+        :param uri_prefixes: If specified, only events whose URI (EventData)
+                             starts with one of these strings are delivered.
+                             A prefix may be a full URI or just its path, e.g.
+                             '/rest/api/uom/LogicalPartition'.
+        :param event_types: If specified, only events of these EventTypes are
+                            delivered.
+        :param replay_from: If specified, the EventID of the last event the
+                            handler has seen.  Retained events after that one
+                            are delivered before any new events.  If that event
+                            is no longer retained, all retained events are
+                            delivered, preceded by MISSING_EVENTS.
+        :param queue_size: The maximum number of event batches to queue for the
+                           handler.  If it falls further behind, its backlog
+                           is replaced by MISSING_EVENTS.
+        Events pertaining to all URIs (NEW_CLIENT, CACHE_CLEARED,
+        MISSING_EVENTS) are always delivered, regardless of the filters.  A
+        handler with no filters receives every batch of events polled, even if
+        empty.
+        """
         if not isinstance(handler, _EventHandler):
             raise ValueError('Handler must be an EventHandler')
         if self.adp is None:
@@ -1242,7 +1783,13 @@ class _EventListener(EventListener):
         with self._lock:
             if handler in self.handlers:
                 raise ValueError(_('This handler is already subscribed'))
+            sub = _EventSubscription(self.adp, handler, uri_prefixes,
+                                     event_types, queue_size)
+            if replay_from is not None:
+                # Under the lock, so no event is either missed or repeated.
+                sub.put(self._replay_batch(replay_from))
             self.handlers.append(handler)
+            self._subscriptions.append(sub)
             if not self._pthread:
                 self._pthread = _EventPollThread(self)
                 self._pthread.start()
@@ -1253,18 +1800,93 @@ class _EventListener(EventListener):
         with self._lock:
             if handler not in self.handlers:
                 raise ValueError(_('Handler not found in subscriber list'))
-            self.handlers.remove(handler)
+            idx = self.handlers.index(handler)
+            del self.handlers[idx]
+            sub = self._subscriptions.pop(idx)
             if not self.handlers:
                 self._pthread.stop()
                 self._pthread = None
+        # Events already queued for the handler are still delivered.  Stopping
+        # doesn't block, so a handler may unsubscribe itself from process().
+        sub.stop()
 
     def shutdown(self):
         LOG.info(_('Shutting down EventListener for %s'), self.host)
         with self._lock:
-            for handler in self.handlers:
+            for handler in list(self.handlers):
                 self.unsubscribe(handler)
         LOG.info(_('EventListener shutdown complete for %s'), self.host)
 
+    def flush(self, timeout=None):
+        """Wait for all the handlers to process the events queued for them.
+
+        :param timeout: Maximum number of seconds to wait.  None (the default)
+                        waits indefinitely.
+        :return: True if all the queues were drained; False if timed out.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            subs = list(self._subscriptions)
+        for sub in subs:
+            remaining = None if deadline is None else deadline - time.time()
+            if not sub.wait_idle(remaining):
+                return False
+        return True
+
+    def stats(self):
+        """Delivery metrics for each subscribed handler.
+
+        :return: Dict of {handler: stats}, where stats is a dict of:
+                 depth: The number of event batches currently queued.
+                 max_depth: The largest number ever queued.
+                 delivered: The number of batches delivered.
+                 dropped: The number of batches discarded because the handler
+                          fell too far behind.
+                 lag: Seconds between the receipt of the last batch delivered
+                      and the handler beginning to process it.
+                 max_lag: The largest lag seen.
+        """
+        with self._lock:
+            return {sub.handler: sub.stats()
+                    for sub in self._subscriptions}
+
+    def recent_events(self, after_id=None):
+        """The retained recent raw events, optionally after a given EventID.
+
+        :param after_id: If specified, only events after the one with this
+                         EventID are returned.  If that event is no longer
+                         retained, None is returned.
+        :return: List of raw event dicts (see RawEventHandler.process), oldest
+                 first; or None.
+        """
+        with self._lock:
+            pairs = self._recent_after(after_id)
+        return None if pairs is None else [raw for raw, wrap in pairs]
+
+    def _recent_after(self, after_id):
+        """(raw, wrap) pairs after the specified EventID; None if not found."""
+        recent = list(self._recent)
+        if after_id is None:
+            return recent
+        for idx in range(len(recent) - 1, -1, -1):
+            if recent[idx][0].get('EventID') == after_id:
+                return recent[idx + 1:]
+        return None
+
+    def _replay_batch(self, after_id):
+        pairs = self._recent_after(after_id)
+        raw_events, wrap_events = [], []
+        if pairs is None:
+            # The handler has missed events which are no longer retained.
+            missing = _EventBatch.missing(self.adp)
+            raw_events.extend(missing.raw_events)
+            wrap_events.extend(missing.wrap_events)
+            pairs = list(self._recent)
+        raw_events.extend(raw for raw, wrap in pairs)
+        wrap_events.extend(wrap for raw, wrap in pairs)
+        return _EventBatch(_events_from_raw(raw_events), raw_events,
+                           wrap_events)
+
     def getevents(self):
         all_events = self._get_events()
         # Legacy method returned just the events.
@@ -1310,23 +1932,7 @@ class _EventListener(EventListener):
         """
         etype = entry.element.findtext('EventType')
         href = entry.element.findtext('EventData')
-        if etype == 'NEW_CLIENT':
-            events['general'] = 'init'
-        elif etype in ['CACHE_CLEARED', 'MISSING_EVENTS']:
-            # Clears all prior events
-            keys = [k for k in events]
-            for k in keys:
-                del events[k]
-            events['general'] = 'invalidate'
-        elif etype == 'ADD_URI':
-            events[href] = 'add'
-        elif etype == 'DELETE_URI':
-            events[href] = 'delete'
-        elif etype in ['MODIFY_URI', 'INVALID_URI', 'HIDDEN_URI']:
-            if href not in events:
-                events[href] = 'invalidate'
-        elif etype not in ['VISIBLE_URI', 'CUSTOM_CLIENT_EVENT']:
-            LOG.error(_('Unexpected EventType=%s'), etype)
+        _update_events(events, etype, href)
 
         # Now format the event for the raw handlers
         eid = entry.element.findtext('EventID')
@@ -1335,7 +1941,9 @@ class _EventListener(EventListener):
                            'EventID': eid, 'EventDetail': edetail})
 
     def _dispatch_events(self, events, raw_events, wrap_events):
-        """Invoke appropriate EventHandler 'process' callback.
+        """Queue events for each subscribed EventHandler.
+
+        Each handler's 'process' callback is invoked by its own thread.
 
         :param events: Events dict of the format {<uri>: <action>} - see
                        docstring for EventHandler.process.
@@ -1344,21 +1952,217 @@ class _EventListener(EventListener):
                             'EventID': <id>, 'EventDetail': <detail>}
         :param wrap_events: List of pypowervm.wrappers.event.Event wrappers.
         """
-        def call_handler(handler):
+        batch = _EventBatch(events, raw_events, wrap_events)
+        with self._lock:
+            # Retain for replay.  raw_events and wrap_events correspond 1:1
+            # when they come from _get_events.
+            aligned = len(raw_events) == len(wrap_events)
+            for idx, raw in enumerate(raw_events):
+                self._recent.append((raw, wrap_events[idx] if aligned
+                                     else None))
+            for sub in self._subscriptions:
+                sub.put(batch)
+
+
+def _update_events(events, etype, href):
+    """Fold one event into an events dict (see EventHandler.process)."""
+    if etype == 'NEW_CLIENT':
+        events['general'] = 'init'
+    elif etype in ['CACHE_CLEARED', 'MISSING_EVENTS']:
+        # Clears all prior events
+        keys = [k for k in events]
+        for k in keys:
+            del events[k]
+        events['general'] = 'invalidate'
+    elif etype == 'ADD_URI':
+        events[href] = 'add'
+    elif etype == 'DELETE_URI':
+        events[href] = 'delete'
+    elif etype in ['MODIFY_URI', 'INVALID_URI', 'HIDDEN_URI']:
+        if href not in events:
+            events[href] = 'invalidate'
+    elif etype not in ['VISIBLE_URI', 'CUSTOM_CLIENT_EVENT']:
+        LOG.error(_('Unexpected EventType=%s'), etype)
+
+
+def _events_from_raw(raw_events):
+    """Produce an events dict (see EventHandler.process) from raw events."""
+    events = {}
+    for raw in raw_events:
+        _update_events(events, raw['EventType'], raw['EventData'])
+    return events
+
+
+class _EventBatch(object):
+    """The events from one poll of the event feed, in all three formats."""
+    def __init__(self, events, raw_events, wrap_events, received=None):
+        self.events = events
+        self.raw_events = raw_events
+        self.wrap_events = wrap_events
+        self.received = time.time() if received is None else received
+
+    @classmethod
+    def missing(cls, adapter, received=None):
+        """A batch consisting of a single MISSING_EVENTS event."""
+        # Do this here to avoid circular imports
+        import pypowervm.wrappers.event as event_wrap
+        raw = {'EventType': event_wrap.EventType.MISSING_EVENTS,
+               'EventData': None, 'EventID': None, 'EventDetail': None}
+        wrap = event_wrap.Event.bld(adapter, None, None)
+        wrap.set_parm_value(event_wrap._E_TYPE, raw['EventType'])
+        return cls({'general': 'invalidate'}, [raw], [wrap],
+                   received=received)
+
+
+class _EventSubscription(object):
+    """A subscribed EventHandler, with its filters, queue and thread."""
+    def __init__(self, adapter, handler, uri_prefixes, event_types,
+                 queue_size):
+        self.handler = handler
+        self._adp = adapter
+        self._uri_prefixes = tuple(uri_prefixes) if uri_prefixes else None
+        self._event_types = frozenset(event_types) if event_types else None
+        self._queue = queue.Queue(maxsize=queue_size)
+        # Set by stop(): the thread exits once the queue is empty.
+        self._stopping = threading.Event()
+        # Batches queued but not yet processed.
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._delivered = 0
+        self._dropped = 0
+        self._max_depth = 0
+        self._lag = 0.0
+        self._max_lag = 0.0
+        self._thread = threading.Thread(
+            target=self._run, name='EventHandler-%s' % type(handler).__name__)
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def filtered(self):
+        return self._uri_prefixes is not None or self._event_types is not None
+
+    def _match(self, etype, href):
+        if etype in _GLOBAL_EVENT_TYPES:
+            return True
+        if self._event_types is not None and etype not in self._event_types:
+            return False
+        if self._uri_prefixes is not None:
+            return bool(href) and (
+                href.startswith(self._uri_prefixes) or
+                urllib.urlsplit(href).path.startswith(self._uri_prefixes))
+        return True
+
+    def _filter(self, batch):
+        """The subset of the batch this handler wants, or None if empty."""
+        keep = [idx for idx, raw in enumerate(batch.raw_events)
+                if self._match(raw['EventType'], raw['EventData'])]
+        if not keep:
+            return None
+        raw_events = [batch.raw_events[idx] for idx in keep]
+        if len(batch.wrap_events) == len(batch.raw_events):
+            wrap_events = [batch.wrap_events[idx] for idx in keep]
+        else:
+            wrap_events = [wrap for wrap in batch.wrap_events
+                           if self._match(wrap.etype, wrap.data)]
+        return _EventBatch(_events_from_raw(raw_events), raw_events,
+                           wrap_events, received=batch.received)
+
+    def put(self, batch):
+        if self.filtered:
+            batch = self._filter(batch)
+            if batch is None:
+                return
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            self._overflow(batch)
+        self._max_depth = max(self._max_depth, self._queue.qsize())
+
+    def _overflow(self, batch):
+        """Replace the backlog (and batch) with a single MISSING_EVENTS."""
+        dropped = 1
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        LOG.warning(_('Event handler %(handler)s fell behind; discarded '
+                      '%(count)d event batches.'),
+                    {'handler': self.handler, 'count': dropped})
+        with self._idle:
+            self._dropped += dropped
+            self._pending -= dropped - 1
+        self._queue.put_nowait(_EventBatch.missing(self._adp,
+                                                   received=batch.received))
+
+    def stop(self):
+        """Stop the thread, once it has processed the queued events.
+
+        Does not block, even if the handler is behind (or is the caller).
+        """
+        self._stopping.set()
+        try:
+            # Wake the thread, if it is waiting on an empty queue.  If the
+            # queue is full, it isn't: it sees _stopping once it has drained.
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def wait_idle(self, timeout=None):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while self._pending:
+                if deadline is None:
+                    self._idle.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._idle:
+            return {'depth': self._queue.qsize(),
+                    'max_depth': self._max_depth,
+                    'delivered': self._delivered, 'dropped': self._dropped,
+                    'lag': self._lag, 'max_lag': self._max_lag}
+
+    def _next(self):
+        """The next batch to process, or None if stopped and drained."""
+        if not self._stopping.is_set():
+            return self._queue.get()
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._next()
+            if batch is None:
+                return
+            lag = time.time() - batch.received
             try:
-                if isinstance(handler, WrapperEventHandler):
-                    handler.process(wrap_events)
-                elif isinstance(handler, RawEventHandler):
-                    handler.process(raw_events)
+                if isinstance(self.handler, WrapperEventHandler):
+                    self.handler.process(batch.wrap_events)
+                elif isinstance(self.handler, RawEventHandler):
+                    self.handler.process(batch.raw_events)
                 else:
-                    handler.process(events)
+                    self.handler.process(batch.events)
             except Exception:
                 LOG.exception(_('Error while processing PowerVM events'))
-
-        # Notify subscribers
-        with self._lock:
-            for hndlr in self.handlers:
-                call_handler(hndlr)
+            finally:
+                with self._idle:
+                    self._delivered += 1
+                    self._lag = lag
+                    self._max_lag = max(self._max_lag, lag)
+                    self._pending -= 1
+                    self._idle.notify_all()
 
 
 @six.add_metaclass(abc.ABCMeta)
@@ -1460,6 +2264,33 @@ class WrapperEventHandler(_EventHandler):
         pass
 
 
+class _CacheEventHandler(EventHandler):
+    """Invalidates an Adapter's read cache based on REST server events."""
+    def __init__(self, cache, listener):
+        # Weak, so the event listener doesn't keep the cache alive.
+        self._cache = weakref.ref(cache)
+        self._listener = listener
+
+    def unsubscribe(self):
+        try:
+            self._listener.unsubscribe(self)
+        except ValueError:
+            # Already unsubscribed, e.g. by the listener's shutdown.
+            pass
+
+    def process(self, events):
+        cache = self._cache()
+        if cache is None:
+            # The Adapter is gone: so is the need for this subscription.
+            self.unsubscribe()
+            return
+        if events.get('general') in ('init', 'invalidate'):
+            cache.clear()
+        for href in events:
+            if href != 'general':
+                cache.invalidate(href)
+
+
 class _EventPollThread(threading.Thread):
     def __init__(self, eventlistener):
         threading.Thread.__init__(self)
@@ -0,0 +1,387 @@
+# Copyright 2017 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Non-blocking (future-based) counterparts of Session and Adapter.
+
+Every AsyncAdapter method returns immediately with a future for the result of
+the corresponding Adapter method.  The HTTP requests themselves run on a
+bounded pool of worker threads owned by the AsyncSession, so the number of
+threads does not grow with the number of in-flight operations.  Jobs are
+polled by timer rather than by a sleeping thread, so any number of Jobs may be
+awaited at once.
+
+By default, the returned futures are concurrent.futures.Future.  If the
+AsyncAdapter is created with an asyncio event loop, they are asyncio futures
+bound to that loop, and may be awaited directly:
+
+    asess = AsyncSession(Session(...))
+    aadp = AsyncAdapter(asess, loop=asyncio.get_event_loop())
+    resp = await aadp.read('ManagedSystem')
+"""
+
+from concurrent import futures
+import heapq
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from pypowervm import adapter as adp
+from pypowervm.i18n import _
+from pypowervm.utils import transaction as tx
+from pypowervm.wrappers import job as pvm_job
+
+LOG = logging.getLogger(__name__)
+
+CONF = cfg.CONF
+
+# Default number of concurrent HTTP requests per AsyncSession, if the Session
+# has no connection pool size to go by.
+_DFLT_MAX_WORKERS = 10
+
+
+class _Timer(threading.Thread):
+    """A single thread running any number of delayed calls."""
+    def __init__(self):
+        super(_Timer, self).__init__(name='pypowervm-async-timer')
+        self.daemon = True
+        self._cond = threading.Condition()
+        # Heap of (when, seq, func, cancel)
+        self._heap = []
+        self._seq = 0
+        self._stopped = False
+
+    def call_later(self, delay, func, cancel=None):
+        """Invoke func() (on the timer thread) after delay seconds.
+
+        func must not block - typically it submits work to an executor.
+
+        :param cancel: Optional callable, invoked instead of func if the timer
+                       is stopped first.
+        :raise RuntimeError: If the timer has been stopped.
+        """
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(_('Cannot schedule a delayed call after '
+                                     'shutdown.'))
+            self._seq += 1
+            heapq.heappush(self._heap,
+                           (time.time() + delay, self._seq, func, cancel))
+            self._cond.notify()
+
+    def stop(self):
+        """Stop the timer.  Pending calls are cancelled."""
+        with self._cond:
+            self._stopped = True
+            pending, self._heap = self._heap, []
+            self._cond.notify()
+        for cancel in [entry[3] for entry in pending if entry[3]]:
+            try:
+                cancel()
+            except Exception:
+                LOG.exception(_('Error cancelling delayed call %s'), cancel)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (
+                        not self._heap or self._heap[0][0] > time.time()):
+                    self._cond.wait(self._heap[0][0] - time.time()
+                                    if self._heap else None)
+                if self._stopped:
+                    return
+                func = heapq.heappop(self._heap)[2]
+            try:
+                func()
+            except Exception:
+                LOG.exception(_('Error in delayed call %s'), func)
+
+
+class AsyncSession(object):
+    """Runs the requests of a Session on a bounded pool of worker threads."""
+    def __init__(self, session=None, max_workers=None):
+        """Create an AsyncSession.
+
+        :param session: The (logged-on) pypowervm.adapter.Session through which
+                        to send requests.  If not specified, a new, local,
+                        file-authentication-based Session will be created.
+        :param max_workers: Maximum number of concurrent HTTP requests.  If
+                            not specified, the Session's conn_pool_size is
+                            used, if set; otherwise a default of 10.
+        """
+        self.session = session if session else adp.Session()
+        if max_workers is None:
+            max_workers = self.session.conn_pool_size or _DFLT_MAX_WORKERS
+        self.max_workers = max_workers
+        self._executor = tx.ContextThreadPoolExecutor(max_workers)
+        self._timer = _Timer()
+        self._timer.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread.
+
+        :return: A concurrent.futures.Future for the result of func.
+        """
+        return self._executor.submit(func, *args, **kwargs)
+
+    def call_later(self, delay, func, *args, **kwargs):
+        """Submit func(*args, **kwargs) to the workers after delay seconds.
+
+        :return: A concurrent.futures.Future for the result of func.
+        """
+        fut = futures.Future()
+
+        def _submit():
+            try:
+                _chain(self.submit(func, *args, **kwargs), fut)
+            except Exception as e:
+                # E.g. the executor was shut down.
+                fut.set_exception(e)
+
+        def _cancel():
+            fut.set_exception(RuntimeError(_('The AsyncSession was shut '
+                                             'down.')))
+        self._timer.call_later(delay, _submit, cancel=_cancel)
+        return fut
+
+    def request(self, method, path, **kwargs):
+        """Non-blocking Session.request.  Returns a future."""
+        return self.submit(self.session.request, method, path, **kwargs)
+
+    def shutdown(self, wait=True):
+        """Stop accepting new work; optionally wait for in-flight requests.
+
+        Pending Job polls are abandoned: their futures fail with RuntimeError.
+        """
+        self._timer.stop()
+        self._executor.shutdown(wait=wait)
+
+
+def _chain(source, target):
+    """Complete the target future with the outcome of the source future."""
+    def _done(src):
+        exc = src.exception()
+        if exc is not None:
+            target.set_exception(exc)
+        else:
+            target.set_result(src.result())
+    source.add_done_callback(_done)
+
+
+class AsyncAdapter(object):
+    """Future-returning counterpart of pypowervm.adapter.Adapter.
+
+    Paths are built and validated, and responses unmarshalled, exactly as by
+    Adapter (which does the work on the AsyncSession's worker threads).
+    """
+    def __init__(self, async_session=None, helpers=None, use_cache=False,
+                 loop=None):
+        """Create an AsyncAdapter.
+
+        :param async_session: The AsyncSession through which to send requests.
+                              If not specified, one is created around a new,
+                              local, file-authentication-based Session.
+        :param helpers: See pypowervm.adapter.Adapter.
+        :param use_cache: See pypowervm.adapter.Adapter.
+        :param loop: Optional asyncio event loop.  If specified, methods return
+                     asyncio futures bound to this loop.  Otherwise, they
+                     return concurrent.futures.Future.
+        """
+        self.async_session = (async_session if async_session
+                              else AsyncSession())
+        self.adapter = adp.Adapter(self.async_session.session,
+                                   use_cache=use_cache, helpers=helpers)
+        self.loop = loop
+
+    @property
+    def session(self):
+        return self.async_session.session
+
+    @property
+    def traits(self):
+        return self.adapter.traits
+
+    def _future(self, fut):
+        if self.loop is None:
+            return fut
+        import asyncio
+        return asyncio.wrap_future(fut, loop=self.loop)
+
+    def _submit(self, func, *args, **kwargs):
+        return self._future(self.async_session.submit(func, *args, **kwargs))
+
+    def create(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.create.  Returns a future."""
+        return self._submit(self.adapter.create, *args, **kwargs)
+
+    def create_by_path(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.create_by_path.  Returns a future."""
+        return self._submit(self.adapter.create_by_path, *args, **kwargs)
+
+    def create_job(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.create_job.  Returns a future."""
+        return self._submit(self.adapter.create_job, *args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.read.  Returns a future."""
+        return self._submit(self.adapter.read, *args, **kwargs)
+
+    def read_by_href(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.read_by_href.  Returns a future."""
+        return self._submit(self.adapter.read_by_href, *args, **kwargs)
+
+    def read_by_path(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.read_by_path.  Returns a future."""
+        return self._submit(self.adapter.read_by_path, *args, **kwargs)
+
+    def read_job(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.read_job.  Returns a future."""
+        return self._submit(self.adapter.read_job, *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.update.  Returns a future."""
+        return self._submit(self.adapter.update, *args, **kwargs)
+
+    def update_by_path(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.update_by_path.  Returns a future."""
+        return self._submit(self.adapter.update_by_path, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.delete.  Returns a future."""
+        return self._submit(self.adapter.delete, *args, **kwargs)
+
+    def delete_by_href(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.delete_by_href.  Returns a future."""
+        return self._submit(self.adapter.delete_by_href, *args, **kwargs)
+
+    def delete_by_path(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.delete_by_path.  Returns a future."""
+        return self._submit(self.adapter.delete_by_path, *args, **kwargs)
+
+    def upload_file(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.upload_file.  Returns a future."""
+        return self._submit(self.adapter.upload_file, *args, **kwargs)
+
+    def download_file(self, *args, **kwargs):
+        """See pypowervm.adapter.Adapter.download_file.  Returns a future."""
+        return self._submit(self.adapter.download_file, *args, **kwargs)
+
+    def poll_job(self, job, statuses=(pvm_job.JobStatus.RUNNING,
+                                      pvm_job.JobStatus.NOT_ACTIVE),
+                 timeout=0, sensitive=False, interval=1):
+        """Non-blocking Job.poll_while_status.
+
+        No thread is held while waiting between polls.
+
+        :param job: The pypowervm.wrappers.job.Job to poll.  Its entry is
+                    refreshed in place.
+        :param statuses: Iterable of JobStatus enum values.  Polling continues
+                         as long as the Job's status is in this list, or until
+                         the timeout is reached (whichever comes first).
+        :param timeout: Maximum number of seconds to keep checking job status.
+                        If zero, poll indefinitely.
+        :param sensitive: If True, mask the Job payload in the logs.
+        :param interval: Number of seconds between polls.
+        :return: A future whose result is True if the timeout was reached
+                 before the Job left the specified set of states; False
+                 otherwise.
+        """
+        return self._future(self._poll_job(job, statuses, timeout, sensitive,
+                                           interval))
+
+    def _poll_job(self, job, statuses, timeout, sensitive, interval):
+        ret = futures.Future()
+        start_time = time.time()
+
+        def _check():
+            if job.job_status not in statuses:
+                ret.set_result(False)
+            elif timeout and time.time() - start_time > timeout:
+                ret.set_result(True)
+            else:
+                self.async_session.call_later(
+                    interval, _poll).add_done_callback(_polled)
+
+        def _poll():
+            job.entry = job.adapter.read_job(job.job_id,
+                                             sensitive=sensitive).entry
+            _check()
+
+        def _polled(fut):
+            exc = fut.exception()
+            if exc is not None:
+                ret.set_exception(exc)
+
+        try:
+            _check()
+        except Exception as e:
+            ret.set_exception(e)
+        return ret
+
+    def run_job(self, job, uuid, job_parms=None,
+                timeout=CONF.pypowervm_job_request_timeout, sensitive=False,
+                interval=1):
+        """Non-blocking Job.run_job (synchronous mode).
+
+        Submits the Job, waits for it to complete, and deletes it - without
+        holding a thread while waiting.
+
+        :param job: The pypowervm.wrappers.job.Job (JobRequest) to run.
+        :param uuid: uuid of the target
+        :param job_parms: list of JobParameters to add
+        :param timeout: maximum number of seconds for job to complete
+        :param sensitive: If True, mask the Job payload in the logs.
+        :param interval: Number of seconds between polls.
+        :return: A future whose result is the completed Job wrapper.  Its
+                 exception is JobRequestFailed if the Job did not complete
+                 successfully, or JobRequestTimedOut if it timed out.
+        """
+        ret = futures.Future()
+
+        def _create():
+            job._submit(uuid, job_parms=job_parms, sensitive=sensitive)
+
+        def _polled(fut):
+            try:
+                timed_out = fut.result()
+                finish = self.async_session.submit(_finish, timed_out)
+            except Exception as e:
+                ret.set_exception(e)
+                return
+            finish.add_done_callback(lambda f: _set_exc(f.exception()))
+
+        def _finish(timed_out):
+            if timed_out:
+                job._cancel_timed_out(timeout)
+            job._finish()
+            ret.set_result(job)
+
+        def _set_exc(exc):
+            if exc is not None:
+                ret.set_exception(exc)
+
+        def _created(fut):
+            exc = fut.exception()
+            if exc is not None:
+                ret.set_exception(exc)
+                return
+            self._poll_job(
+                job, (pvm_job.JobStatus.RUNNING, pvm_job.JobStatus.NOT_ACTIVE),
+                timeout, sensitive, interval).add_done_callback(_polled)
+
+        self.async_session.submit(_create).add_done_callback(_created)
+        return self._future(ret)
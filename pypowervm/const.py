@@ -90,6 +90,7 @@ SERVICE_BY_NS = {
 
 class HTTPStatus(object):
     """Small subset of HTTP status codes as used by PowerVM."""
+    OK = 200
     OK_NO_CONTENT = 204
     NO_CHANGE = 304
     UNAUTHORIZED = 401
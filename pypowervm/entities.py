@@ -18,13 +18,119 @@
 
 import collections
 import copy
+import itertools
 import re
+import weakref
 
 from lxml import etree
+import six
+
+try:
+    from collections import abc as collections_abc
+except ImportError:
+    collections_abc = collections
 
 from pypowervm import const
 from pypowervm import util
 
+_ATOM_CONTENT = str(etree.QName(const.ATOM_NS, 'content'))
+_ATOM_ENTRY = str(etree.QName(const.ATOM_NS, 'entry'))
+_ATOM_ID = str(etree.QName(const.ATOM_NS, 'id'))
+_ATOM_LINK = str(etree.QName(const.ATOM_NS, 'link'))
+
+# Path segments matching this are not namespace-qualified by _qualifypath.
+_UNQUALIFIED_SEG_RE = re.compile(r'[\.\*\[\{]')
+# Memo of {(path, ns): qualified path}.  The paths are, with very few
+# exceptions, constants in the wrapper modules, so this stays small; the cap
+# guards against unbounded growth from dynamically-built paths.
+_QPATH_CACHE = {}
+_QPATH_CACHE_MAX = 4096
+
+# {id(etree.Element): _ChangeLog} for the root element of each live Entry.
+# The _ChangeLog holds its root, so the id can't be reused while it's here.
+_CHANGE_LOGS = weakref.WeakValueDictionary()
+
+
+class _ChangeLog(object):
+    """Mutations to an Entry's XML since it was last in sync with the server.
+
+    Mutations are recorded by the entities.Element methods which modify the
+    tree (and so by the Wrapper and ElementList methods built on them).  Edits
+    made directly to the underlying etree.Element are not seen.
+    """
+    # Number of changes described individually in the summary.
+    _MAX_SUMMARY = 20
+
+    def __init__(self, root):
+        self.root = root
+        self.count = 0
+        self.summary = []
+
+    @classmethod
+    def for_root(cls, root):
+        """Get (creating if necessary) the _ChangeLog for a root element."""
+        log = _CHANGE_LOGS.get(id(root))
+        if log is None or log.root is not root:
+            log = cls(root)
+            _CHANGE_LOGS[id(root)] = log
+        return log
+
+    def record(self, action, tag):
+        self.count += 1
+        if len(self.summary) < self._MAX_SUMMARY:
+            self.summary.append('%s %s' % (action, etree.QName(tag).localname))
+
+    def reset(self):
+        self.count = 0
+        self.summary = []
+
+    def changes(self):
+        if self.count > len(self.summary):
+            return self.summary + ['(%d more)' %
+                                   (self.count - len(self.summary))]
+        return list(self.summary)
+
+
+def _record_change(elem, action, tag=None):
+    """Record a change to elem in the _ChangeLog of the Entry it belongs to.
+
+    :param elem: The etree.Element which was (or is about to be) changed.
+    :param action: Verb describing the change, for the summary.
+    :param tag: The tag to describe in the summary.  Defaults to elem's.
+    """
+    for node in itertools.chain((elem,), elem.iterancestors()):
+        log = _CHANGE_LOGS.get(id(node))
+        if log is not None and log.root is node:
+            log.record(action, elem.tag if tag is None else tag)
+            return
+
+
+def _same_xml(one, two):
+    """Whether two etree.Elements have identical tags, text, attribs, children.
+
+    Unlike Element._element_equality, attributes and child order count.
+    """
+    if one is two:
+        return True
+    if one.tag != two.tag or len(one) != len(two):
+        return False
+    if (one.text or '') != (two.text or ''):
+        return False
+    if dict(one.attrib) != dict(two.attrib):
+        return False
+    return all(_same_xml(ch1, ch2) for ch1, ch2 in zip(one, two))
+
+
+def _adopt(parent, subelement, action='add'):
+    """Record the changes of adding subelement under parent.
+
+    lxml *moves* an element which already has a parent, so the change is
+    recorded against both the old and the new trees.
+    """
+    if subelement.getparent() is not None:
+        _record_change(subelement, 'move')
+    _record_change(parent, action, tag=subelement.tag)
+
 
 class Atom(object):
     def __init__(self, properties):
@@ -91,22 +197,172 @@ class Feed(Atom):
                     break
         return entries
 
+    def find_entry(self, uuid):
+        """Find the Entry with the specified UUID (case-insensitive).
+
+        For unmarshalled feeds, this is a dict lookup (after a one-time scan of
+        the entries' IDs) which does not unmarshal any other Entry.
+
+        :param uuid: The UUID of the Entry to find.
+        :return: The Entry with the specified UUID, or None if not found.
+        """
+        if isinstance(self.entries, LazyEntryList):
+            return self.entries.find_by_uuid(uuid)
+        uuid = uuid.lower()
+        for entry in self.entries:
+            if entry.uuid is not None and entry.uuid.lower() == uuid:
+                return entry
+        return None
+
+    def find_entry_by_href(self, href):
+        """Find the Entry whose SELF link is the specified href.
+
+        Like find_entry, this does not unmarshal other entries.
+
+        :param href: The SELF link (full URI) of the Entry to find.
+        :return: The Entry with the specified SELF link, or None if not found.
+        """
+        if isinstance(self.entries, LazyEntryList):
+            return self.entries.find_by_href(href)
+        for entry in self.entries:
+            if entry.self_link == href:
+                return entry
+        return None
+
     @classmethod
     def unmarshal_atom_feed(cls, feedelem, resp):
         """Factory method producing a Feed object from a parsed ElementTree
 
+        The feed's <entry>s are not unmarshalled until they are accessed - see
+        LazyEntryList.
+
         :param feedelem: Parsed ElementTree object representing an atom feed.
         :param resp: The Response from which this Feed was parsed.
         :return: a new Feed object representing the feedelem parameter.
         """
         ret = cls({}, [])
+        entryelems = []
         for child in list(feedelem):
-            if child.tag == str(etree.QName(const.ATOM_NS, 'entry')):
-                # NB: The use of ret.self_link here relies on <entry>s being
-                # AFTER the self link in the <feed>.  (They are in fact last.)
-                ret.entries.append(Entry.unmarshal_atom_entry(child, resp))
+            if child.tag == _ATOM_ENTRY:
+                entryelems.append(child)
             elif not list(child):
                 cls._process_props(child, ret.properties)
+        ret.entries = LazyEntryList(entryelems, resp.adapter)
+        return ret
+
+
+class LazyEntryList(collections_abc.MutableSequence):
+    """List of Entry, unmarshalled from atom <entry> elements on first access.
+
+    Supports the usual list operations.  Each Entry is unmarshalled the first
+    time it is retrieved (by index, iteration, or find_by_*), and the same
+    Entry is returned thereafter.  Entries may also be added directly.
+    """
+    def __init__(self, entryelems, adapter):
+        """Create a LazyEntryList.
+
+        :param entryelems: List of etree.Element representing atom <entry>s.
+        :param adapter: pypowervm.adapter.Adapter for the unmarshalled Entries.
+        """
+        # Each item is either an unmarshalled Entry, or its <entry> element.
+        self._items = list(entryelems)
+        self._adapter = adapter
+        # {lowercased UUID: index} and {SELF href: index}, built on demand
+        self._uuid_index = None
+        self._href_index = None
+
+    def _entry(self, idx):
+        item = self._items[idx]
+        if not isinstance(item, Entry):
+            item = Entry.unmarshal_element(item, self._adapter)
+            self._items[idx] = item
+        return item
+
+    @staticmethod
+    def _item_uuid(item):
+        if isinstance(item, Entry):
+            return item.uuid
+        return item.findtext(_ATOM_ID)
+
+    @staticmethod
+    def _item_href(item):
+        if isinstance(item, Entry):
+            return item.self_link
+        for link in item.iterchildren(_ATOM_LINK):
+            rel = link.get('rel')
+            if rel and rel.upper() == 'SELF':
+                return link.get('href')
+        return None
+
+    def _reindex(self):
+        self._uuid_index = None
+        self._href_index = None
+
+    def find_by_uuid(self, uuid):
+        """Find (and unmarshal) the Entry with the specified UUID, or None."""
+        if self._uuid_index is None:
+            index = {}
+            for i, item in enumerate(self._items):
+                item_uuid = self._item_uuid(item)
+                if item_uuid is not None:
+                    # First occurrence wins, as with a linear search.
+                    index.setdefault(item_uuid.strip().lower(), i)
+            self._uuid_index = index
+        idx = self._uuid_index.get(uuid.lower())
+        return None if idx is None else self._entry(idx)
+
+    def find_by_href(self, href):
+        """Find (and unmarshal) the Entry with the specified SELF link."""
+        if self._href_index is None:
+            index = {}
+            for i, item in enumerate(self._items):
+                item_href = self._item_href(item)
+                if item_href is not None:
+                    index.setdefault(item_href, i)
+            self._href_index = index
+        idx = self._href_index.get(href)
+        return None if idx is None else self._entry(idx)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self._entry(i) for i in range(*idx.indices(len(self)))]
+        return self._entry(idx)
+
+    def __setitem__(self, idx, value):
+        self._items[idx] = value
+        self._reindex()
+
+    def __delitem__(self, idx):
+        del self._items[idx]
+        self._reindex()
+
+    def insert(self, idx, value):
+        self._items.insert(idx, value)
+        self._reindex()
+
+    def __iter__(self):
+        for i in six.moves.range(len(self._items)):
+            yield self._entry(i)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, LazyEntryList)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __deepcopy__(self, memo=None):
+        """Deep (except for adapter) copy, unmarshalling all the entries."""
+        ret = self.__class__([], self._adapter)
+        ret._items = [copy.deepcopy(entry, memo=memo) for entry in self]
         return ret
 
 
@@ -124,12 +380,45 @@ class Entry(Atom):
         """
         super(Entry, self).__init__(properties)
         self.element = Element.wrapelement(element, adapter)
+        if element is None:
+            self._changes = _ChangeLog(None)
+            self._changes.record('create', 'entry')
+        else:
+            self._changes = _ChangeLog.for_root(element)
+            # Until proven otherwise (see mark_clean), this is a new object,
+            # not in sync with the server.
+            self._changes.record('create', element.tag)
 
     def __deepcopy__(self, memo=None):
         """Produce a deep (except for adapter) copy of this Entry."""
-        return self.__class__(copy.deepcopy(self.properties, memo=memo),
-                              copy.deepcopy(self.element, memo=memo).element,
-                              self.adapter)
+        ret = self.__class__(copy.deepcopy(self.properties, memo=memo),
+                             copy.deepcopy(self.element, memo=memo).element,
+                             self.adapter)
+        ret._changes.count = self._changes.count
+        ret._changes.summary = list(self._changes.summary)
+        return ret
+
+    @property
+    def dirty(self):
+        """Whether the XML has been changed since it was last in sync.
+
+        An Entry is in sync with the server when it is unmarshalled from a
+        response.  One created any other way is dirty from the start.
+        """
+        return self._changes.count > 0
+
+    @property
+    def changes(self):
+        """List of strings summarizing the changes made to the XML.
+
+        E.g. ['set PartitionName', 'add VirtualSCSIMapping'].  Empty if the
+        Entry is not dirty.
+        """
+        return self._changes.changes()
+
+    def mark_clean(self):
+        """Consider the XML in sync with the server, discarding the changes."""
+        self._changes.reset()
 
     @property
     def etag(self):
@@ -147,15 +436,28 @@ class Entry(Atom):
         :param resp: The Response containing (the feed containing) the entry.
         :return: a new Entry object representing the entryelem parameter.
         """
+        return cls.unmarshal_element(entryelem, resp.adapter)
+
+    @classmethod
+    def unmarshal_element(cls, entryelem, adapter):
+        """Produce an Entry from a parsed atom entry, given its adapter.
+
+        :param entryelem: Parsed ElementTree object representing an atom entry.
+        :param adapter: pypowervm.adapter.Adapter through which the entry was
+                        fetched.
+        :return: a new Entry object representing the entryelem parameter.
+        """
         entryprops = {}
         element = None
         for child in list(entryelem):
-            if child.tag == str(etree.QName(const.ATOM_NS, 'content')):
+            if child.tag == _ATOM_CONTENT:
                 # PowerVM API only has one element per entry
                 element = child[0]
             elif not list(child):
                 cls._process_props(child, entryprops)
-        return cls(entryprops, element, resp.adapter)
+        entry = cls(entryprops, element, adapter)
+        entry.mark_clean()
+        return entry
 
 
 class Element(object):
@@ -189,9 +491,11 @@ class Element(object):
     def __setitem__(self, index, value):
         if not isinstance(value, Element):
             raise ValueError('Value must be of type Element')
+        _adopt(self.element, value.element)
         self.element[index] = value.element
 
     def __delitem__(self, index):
+        _record_change(self.element, 'remove', tag=self.element[index].tag)
         del self.element[index]
 
     def __eq__(self, other):
@@ -250,10 +554,10 @@ class Element(object):
     def wrapelement(cls, element, adapter):
         if element is None:
             return None
-        # create with minimum inputs
-        e = cls('element', adapter)
-        # assign element over the one __init__ creates
+        # Bypass __init__, which would build a throwaway etree.Element.
+        e = cls.__new__(cls)
         e.element = element
+        e.adapter = adapter
         return e
 
     def toxmlstring(self, pretty=False):
@@ -272,6 +576,7 @@ class Element(object):
 
     @tag.setter
     def tag(self, tag):
+        _record_change(self.element, 'retag')
         ns = self.namespace
         if ns:
             self.element.tag = etree.QName(ns, tag).text
@@ -280,11 +585,15 @@ class Element(object):
 
     @property
     def namespace(self):
-        ns = etree.QName(self.element.tag).namespace
-        return '' if ns is None else ns
+        tag = self.element.tag
+        # Clark notation ('{ns}tag') - cheaper than parsing into a QName.
+        if tag[:1] == '{':
+            return tag[1:tag.index('}')]
+        return ''
 
     @namespace.setter
     def namespace(self, ns):
+        _record_change(self.element, 'retag')
         self.element.tag = etree.QName(ns, self.tag).text
 
     @property
@@ -293,6 +602,8 @@ class Element(object):
 
     @text.setter
     def text(self, text):
+        if text != self.element.text:
+            _record_change(self.element, 'set')
         self.element.text = text
 
     @property
@@ -301,6 +612,7 @@ class Element(object):
 
     @attrib.setter
     def attrib(self, attrib):
+        _record_change(self.element, 'set attributes of')
         self.element.attrib = attrib
 
     def get(self, key, default=None):
@@ -326,6 +638,8 @@ class Element(object):
 
     def set(self, key, value):
         """Set the attribute key on the element to value."""
+        if self.element.get(key) != value:
+            _record_change(self.element, 'set %s of' % key)
         self.element.set(key, value)
 
     def append(self, subelement):
@@ -340,6 +654,7 @@ class Element(object):
         # bullet here: http://lxml.de/compatibility.html) - but this breaks the
         # world.  Figure out why, and fix it.
         # self.element.append(copy.deepcopy(subelement.element))
+        _adopt(self.element, subelement.element)
         self.element.append(subelement.element)
 
     def inject(self, subelement, ordering_list=(), replace=True):
@@ -378,6 +693,7 @@ class Element(object):
             if replace:
                 self.replace(subfound[-1], subelement)
             else:
+                _adopt(self.element, subelement.element)
                 subfound[-1].element.addnext(subelement.element)
             return
 
@@ -396,6 +712,7 @@ class Element(object):
         for child in children:
             if lname(child.tag) not in pres:
                 # Found the insertion point
+                _adopt(self.element, subelement.element)
                 child.addprevious(subelement.element)
                 return
         # If we got here, all existing children need to precede subelement.
@@ -440,11 +757,28 @@ class Element(object):
         text = self.element.findtext(qpath, default)
         return text if text else default
 
+    def findrawtext(self, match, missing=None):
+        """Finds the raw text of the first subelement matching match.
+
+        This is a fast path for reading property values: unlike find, it does
+        not wrap the matching subelement; unlike findtext, it distinguishes a
+        matching subelement with no text (None) from no match at all.
+
+        :param match: May be a tag name or path.
+        :param missing: The value to return if no element was found.
+        :return: The (unstripped) text of the first matching element, which
+                 may be None; or missing if no element was found.
+        """
+        qpath = Element._qualifypath(match, self.namespace)
+        e = self.element.find(qpath)
+        return missing if e is None else e.text
+
     def insert(self, index, subelement):
         """Inserts subelement at the given position in this element.
 
         :raises TypeError: if subelement is not an etree.Element.
         """
+        _adopt(self.element, subelement.element)
         self.element.insert(index, subelement.element)
 
     def iter(self, tag=None):
@@ -476,6 +810,12 @@ class Element(object):
 
     def replace(self, existing, new_element):
         """Replaces the existing child Element with the new one."""
+        if not _same_xml(existing.element, new_element.element):
+            _adopt(self.element, new_element.element, action='replace')
+        elif new_element.element is not existing.element:
+            if new_element.element.getparent() is not None:
+                # Identical, but moved out of another tree
+                _record_change(new_element.element, 'move')
         self.element.replace(existing.element,
                              new_element.element)
 
@@ -485,17 +825,27 @@ class Element(object):
         Unlike the find* methods this method compares elements based on the
         instance identity, not on tag value or contents.
         """
+        if subelement.element.getparent() is self.element:
+            _record_change(self.element, 'remove', tag=subelement.element.tag)
         self.element.remove(subelement.element)
 
     @staticmethod
     def _qualifypath(path, ns):
         if not ns:
             return path
+        try:
+            return _QPATH_CACHE[(path, ns)]
+        except KeyError:
+            pass
         parts = path.split('/')
         for i in range(len(parts)):
-            if parts[i] and not re.match(r'[\.\*\[\{]', parts[i]):
+            if parts[i] and not _UNQUALIFIED_SEG_RE.match(parts[i]):
                 parts[i] = str(etree.QName(ns, parts[i]))
-        return '/'.join(parts)
+        qpath = '/'.join(parts)
+        if len(_QPATH_CACHE) >= _QPATH_CACHE_MAX:
+            _QPATH_CACHE.clear()
+        _QPATH_CACHE[(path, ns)] = qpath
+        return qpath
 
 
 class ElementList(object):
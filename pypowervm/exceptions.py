@@ -427,3 +427,14 @@ class ISCSIDiscoveryFailed(AbstractMsgFmtError):
 class ISCSILogoutFailed(AbstractMsgFmtError):
     msg_fmt = _("ISCSI Logout failed for VIOS %(vios_uuid)s. "
                 "Return code: %(status)s")
+
+
+class RequestThrottled(AbstractMsgFmtError):
+    msg_fmt = _("Request to %(target)s not sent: it has been too busy to "
+                "accept requests.  Retry in %(seconds)d seconds.")
+
+
+class UploadChecksumMismatch(AbstractMsgFmtError):
+    msg_fmt = _("The SHA256 checksum of the data uploaded to file "
+                "%(file_name)s, %(actual)s, does not match the expected "
+                "checksum %(expected)s.")
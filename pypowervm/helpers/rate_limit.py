@@ -0,0 +1,362 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""This Adapter helper adapts request concurrency to busy servers and VIOSes.
+
+Requests are limited per REST server, per managed system and per VIOS (as
+identified by the request path).  Each limit grows slowly while requests
+succeed, and is cut in half when the target reports that it is busy ('VIOS
+busy', or 503 Service Unavailable) - so requests queue in the caller instead
+of piling onto an overloaded target.  If a target stays busy, its circuit
+opens: requests to it wait (or, with fail_fast, raise RequestThrottled) until
+a single probe request succeeds.
+
+The state is shared by all the Adapters using the same RateLimiter - by
+default, the whole process.  Request paths are relative to the REST server, so
+the REST server is identified by the Session the helper wraps: place the helper
+last, directly wrapping Session.request - and so after vios_busy_retry_helper,
+so each retry passes through it - e.g.:
+
+    adapter = adpt.Adapter(session, helpers=[
+        log_helper.log_helper, vios_busy.vios_busy_retry_helper,
+        rate_limit.rate_limit_helper])
+
+Otherwise, specify the server, e.g.
+functools.partial(rate_limit.rate_limit_helper, server=session.dest).
+"""
+
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+import six
+from six.moves import urllib
+
+import pypowervm.const as c
+import pypowervm.exceptions as pvmex
+from pypowervm.i18n import _
+import pypowervm.wrappers.entry_wrapper as ew
+import pypowervm.wrappers.http_error as he
+
+LOG = logging.getLogger(__name__)
+
+# Request outcomes
+_OK = 'ok'
+_BUSY = 'busy'
+_ERROR = 'error'
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Targets, in the order their limits are acquired (most specific first).
+_TARGET_TYPES = ('VirtualIOServer', 'ManagedSystem')
+
+
+def _is_busy(exc):
+    """Whether a request exception means its target is too busy."""
+    resp = exc.response
+    if resp is None:
+        return False
+    if resp.status == c.HTTPStatus.SERVICE_UNAVAILABLE:
+        return True
+    if not (resp.body and resp.entry):
+        return False
+    wrap = ew.EntryWrapper.wrap(resp.entry)
+    if not isinstance(wrap, he.HttpError):
+        return False
+    # As in vios_busy: service unavailable on child objects can mean the VIOS
+    # is busy.
+    unavail = wrap.status == c.HTTPStatus.SERVICE_UNAVAILABLE
+    return unavail or wrap.is_vios_busy()
+
+
+class _Gate(object):
+    """Concurrency limit, circuit breaker and statistics for one target."""
+    def __init__(self, name, limiter):
+        self.name = name
+        self._lmt = limiter
+        self.limit = float(limiter.initial_limit)
+        self.inflight = 0
+        self.queued = 0
+        self.state = CLOSED
+        self._open_until = 0
+        self._open_time = limiter.open_time
+        self._consecutive_busy = 0
+        self._last_decrease = 0
+        # (time, latency, outcome) of the requests within the window
+        self._window = collections.deque()
+        self._cond = threading.Condition()
+
+    def _allowed(self, now):
+        if self.state == OPEN:
+            if now < self._open_until:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            # Just one probe request.
+            return self.inflight == 0
+        return self.inflight < int(self.limit)
+
+    def acquire(self, fail_fast):
+        with self._cond:
+            self.queued += 1
+            try:
+                while True:
+                    now = time.time()
+                    if self._allowed(now):
+                        self.inflight += 1
+                        return
+                    if self.state != OPEN:
+                        self._cond.wait()
+                    elif fail_fast:
+                        raise pvmex.RequestThrottled(
+                            target=self.name,
+                            seconds=self._open_until - now)
+                    else:
+                        self._cond.wait(self._open_until - now)
+            finally:
+                self.queued -= 1
+
+    def release(self, outcome, latency):
+        """Free a request's slot, and adapt to its outcome.
+
+        :param outcome: _OK, _BUSY or _ERROR; or None if the request was not
+                        sent.
+        :param latency: Seconds the request took.
+        """
+        with self._cond:
+            self.inflight -= 1
+            now = time.time()
+            if outcome is not None:
+                self._record(now, latency, outcome)
+            if outcome == _BUSY:
+                self._consecutive_busy += 1
+                self._decrease(now)
+                if self.state == HALF_OPEN:
+                    # The probe failed.
+                    self._trip(now)
+                elif self.state == CLOSED:
+                    if self._consecutive_busy >= self._lmt.trip_threshold:
+                        self._trip(now)
+            elif outcome is not None:
+                self._consecutive_busy = 0
+                if self.state == HALF_OPEN:
+                    LOG.info(_("Resuming requests to %s."), self.name)
+                    self.state = CLOSED
+                    self._open_time = self._lmt.open_time
+                target = self._lmt.latency_target
+                if outcome == _OK:
+                    if target is not None and latency > target:
+                        self._decrease(now)
+                    else:
+                        # Additive increase: by one per limit's worth of
+                        # successful requests.
+                        self.limit = min(self._lmt.max_limit,
+                                         self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _decrease(self, now):
+        # Multiplicative decrease, at most once per interval, so a burst of
+        # concurrent failures counts as one.
+        if now - self._last_decrease >= self._lmt.decrease_interval:
+            self.limit = max(self._lmt.min_limit,
+                             self.limit * self._lmt.decrease_factor)
+            self._last_decrease = now
+
+    def _trip(self, now):
+        if self.state == HALF_OPEN:
+            # Still busy: back off further.
+            self._open_time = min(self._open_time * 2,
+                                  self._lmt.max_open_time)
+        self.state = OPEN
+        self._open_until = now + self._open_time
+        LOG.warning(_("%(target)s is busy.  Suspending requests to it for "
+                      "%(seconds)d seconds."),
+                    {'target': self.name, 'seconds': self._open_time})
+
+    def _record(self, now, latency, outcome):
+        self._window.append((now, latency, outcome))
+        self._trim(now)
+
+    def _trim(self, now):
+        while self._window and self._window[0][0] < now - self._lmt.window:
+            self._window.popleft()
+
+    def stats(self):
+        with self._cond:
+            self._trim(time.time())
+            lats = [lat for _t, lat, _o in self._window]
+            outcomes = collections.Counter(out for _t, _l, out in self._window)
+            return {'limit': int(self.limit), 'inflight': self.inflight,
+                    'queued': self.queued, 'state': self.state,
+                    'requests': len(self._window),
+                    'errors': outcomes[_ERROR], 'busy': outcomes[_BUSY],
+                    'latency_avg': sum(lats) / len(lats) if lats else 0.0,
+                    'latency_max': max(lats) if lats else 0.0}
+
+
+class RateLimiter(object):
+    """Adaptive concurrency limits and circuit breakers, per target.
+
+    The targets are the REST server, and the managed system and VIOS (if any)
+    in each request path.
+    """
+    def __init__(self, initial_limit=10, min_limit=1, max_limit=64,
+                 decrease_factor=0.5, decrease_interval=1.0, trip_threshold=5,
+                 open_time=5, max_open_time=60, latency_target=None,
+                 window=60, fail_fast=False):
+        """Create a RateLimiter.
+
+        :param initial_limit: Initial number of concurrent requests allowed
+                              per target.
+        :param min_limit: The limit is never reduced below this.
+        :param max_limit: The limit is never increased above this.
+        :param decrease_factor: Factor by which the limit is reduced when the
+                                target is busy.
+        :param decrease_interval: Minimum seconds between reductions.
+        :param trip_threshold: Number of consecutive busy responses after
+                               which the circuit opens.
+        :param open_time: Seconds the circuit stays open before a probe
+                          request is allowed.  Doubled (up to max_open_time)
+                          each time the probe finds the target still busy.
+        :param max_open_time: Maximum seconds the circuit stays open.
+        :param latency_target: If not None, successful requests taking longer
+                               than this many seconds reduce the limit.
+        :param window: Seconds of requests over which stats are reported.
+        :param fail_fast: If True, requests to a target whose circuit is open
+                          raise RequestThrottled.  If False, they wait.
+        """
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.decrease_interval = decrease_interval
+        self.trip_threshold = trip_threshold
+        self.open_time = open_time
+        self.max_open_time = max_open_time
+        self.latency_target = latency_target
+        self.window = window
+        self.fail_fast = fail_fast
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    def _gate(self, key):
+        with self._lock:
+            gate = self._gates.get(key)
+            if gate is None:
+                kind, ident = key
+                name = (_('REST server %s') % (ident or 'localhost')
+                        if kind == 'server' else '%s %s' % key)
+                gate = self._gates[key] = _Gate(name, self)
+            return gate
+
+    def gates(self, path, server=None):
+        """The _Gates for a request path, most specific first.
+
+        :param path: The request path.
+        :param server: The REST server to which the path is relative, e.g. the
+                       Session's dest.  If None, the host in the path (if any)
+                       is used.
+        """
+        parsed = urllib.parse.urlparse(path)
+        segs = parsed.path.split('/')
+        keys = []
+        for kind in _TARGET_TYPES:
+            if kind in segs:
+                idx = segs.index(kind) + 1
+                if idx < len(segs) and segs[idx]:
+                    keys.append((kind, segs[idx].lower()))
+        keys.append(('server', server or parsed.netloc))
+        return [self._gate(key) for key in keys]
+
+    def stats(self):
+        """Statistics per target.
+
+        :return: {(kind, id): dict} where kind is 'server' (id is the REST
+                 server's Session dest, or the host in the path, or '' if
+                 neither is known), 'ManagedSystem' or
+                 'VirtualIOServer' (id is the UUID); and the dict has:
+            limit: The current concurrency limit.
+            inflight: Number of requests being sent.
+            queued: Number of requests waiting to be sent.
+            state: Circuit state: CLOSED, OPEN or HALF_OPEN.
+            requests, errors, busy: Number of requests, and of those which
+                                    failed, and failed because the target was
+                                    busy, within the window.
+            latency_avg, latency_max: Seconds requests took, within the
+                                      window.
+        """
+        with self._lock:
+            gates = dict(self._gates)
+        return {key: gate.stats() for key, gate in gates.items()}
+
+
+DEFAULT_LIMITER = RateLimiter()
+
+
+def _session_dest(func):
+    """The dest of the Session whose request method func is, else None."""
+    dest = getattr(getattr(func, '__self__', None), 'dest', None)
+    return dest if isinstance(dest, six.string_types) else None
+
+
+def rate_limit_helper(func, limiter=None, server=None):
+    """This helper limits and adapts concurrent requests per target.
+
+    :param func: The Adapter request method to call
+    :param limiter: The RateLimiter whose state to use.  Defaults to
+                    DEFAULT_LIMITER, shared by the whole process.
+    :param server: Identifies the REST server, e.g. the Session's dest.  Not
+                   needed if func is the Session's request method.
+    """
+    if limiter is None:
+        limiter = DEFAULT_LIMITER
+    if server is None:
+        server = _session_dest(func)
+
+    def wrapper(method, path, **kwds):
+        gates = limiter.gates(path, server=server)
+        acquired = []
+        try:
+            for gate in gates:
+                gate.acquire(limiter.fail_fast)
+                acquired.append(gate)
+        except Exception:
+            for gate in acquired:
+                gate.release(None, 0)
+            raise
+
+        start = time.time()
+        outcome = _ERROR
+        try:
+            resp = func(method, path, **kwds)
+            outcome = _OK
+            return resp
+        except pvmex.Error as e:
+            if _is_busy(e):
+                outcome = _BUSY
+            raise
+        finally:
+            latency = time.time() - start
+            # Busy is charged to the most specific target only.
+            acquired[0].release(outcome, latency)
+            for gate in acquired[1:]:
+                gate.release(_ERROR if outcome == _BUSY else outcome, latency)
+
+    return wrapper
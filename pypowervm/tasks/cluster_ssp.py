@@ -16,11 +16,16 @@
 
 """Tasks around Cluster/SharedStoragePool."""
 
+import collections
+from concurrent import futures
 from oslo_log import log as logging
-from random import randint
+import random
+import threading
 import time
 import uuid
+import weakref
 
+import pypowervm.adapter as adpt
 import pypowervm.const as c
 from pypowervm.i18n import _
 import pypowervm.tasks.storage as tsk_stg
@@ -35,6 +40,14 @@ IMGTYP = stor.LUType.IMAGE
 MKRSZ = 0.001
 SLEEP_U_MIN = 30
 SLEEP_U_MAX = 60
+# Upper bounds of the backoff between checks of an in-progress upload, when
+# polling; and when waiting for LogicalUnit events (as a backstop).
+SLEEP_U_BACKOFF_MAX = 180
+SLEEP_U_EVENTS_MAX = 600
+
+# {(tier uuid, LU name): Future} of the uploads being done in this process.
+_UPLOADS = {}
+_UPLOADS_LOCK = threading.Lock()
 
 
 def crt_cluster_ssp(clust_name, ssp_name, repos_pv, first_node, data_pv_list):
@@ -76,6 +89,107 @@ def crt_cluster_ssp(clust_name, ssp_name, repos_pv, first_node, data_pv_list):
     return jwrap
 
 
+class _LUEventHandler(adpt.EventHandler):
+    """Wakes the waiters of an _LUEvents on LogicalUnit deletion events."""
+    def __init__(self, lu_events):
+        # Weak, so the event listener doesn't keep the _LUEvents alive.
+        self._lu_events = weakref.ref(lu_events)
+
+    def process(self, events):
+        lu_events = self._lu_events()
+        if lu_events is None:
+            return
+        # Events may have been missed on init/invalidate.
+        if events.get('general') in ('init', 'invalidate'):
+            lu_events.notify()
+            return
+        # An upload finishes (or fails) by deleting its marker LU.
+        lu_uuids = set(u.get_req_path_uuid(href)
+                       for href, action in events.items()
+                       if action == 'delete' and '/LogicalUnit/' in href)
+        lu_uuids.discard(None)
+        if lu_uuids:
+            lu_events.notify(lu_uuids)
+
+
+class _LUEvents(object):
+    """Signals LogicalUnit deletions reported by a Session's event listener.
+
+    Obtain the _LUEvents for an Adapter via _LUEvents.get.  It is enabled only
+    if the Session has an event listener; otherwise waiters must poll.
+    """
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+    # Number of notifications remembered for waiters.  A waiter which falls
+    # further behind than this assumes the LUs it waits on may be gone.
+    _HISTORY = 1000
+
+    def __init__(self, session):
+        self._cond = threading.Condition()
+        self.generation = 0
+        # (generation, set of deleted LU UUIDs, or None if unknown)
+        self._deleted = collections.deque(maxlen=self._HISTORY)
+        self.enabled = False
+        try:
+            if session.has_event_listener is True:
+                session.get_event_listener().subscribe(_LUEventHandler(self))
+                self.enabled = True
+        except Exception as e:
+            LOG.warning(_("Unable to wait for image LU uploads via events; "
+                          "falling back to polling.  Error: %s"), e)
+
+    @classmethod
+    def get(cls, adapter):
+        """Get the _LUEvents for the Session of the specified Adapter."""
+        with cls._instances_lock:
+            lu_events = cls._instances.get(adapter.session)
+            if lu_events is None or not lu_events.enabled:
+                lu_events = cls(adapter.session)
+                cls._instances[adapter.session] = lu_events
+            return lu_events
+
+    def notify(self, lu_uuids=None):
+        """Signal the deletion of LogicalUnits.
+
+        :param lu_uuids: Set of the (lowercase) UUIDs of the deleted LUs.  If
+                         None, any LU may have been deleted.
+        """
+        with self._cond:
+            self.generation += 1
+            self._deleted.append((self.generation, lu_uuids))
+            self._cond.notify_all()
+
+    def _any_deleted(self, generation, lu_uuids):
+        """Whether any of lu_uuids was deleted after generation (locked)."""
+        if self.generation == generation:
+            return False
+        if self._deleted[0][0] > generation + 1:
+            # Notifications were forgotten; they may have been for our LUs.
+            return True
+        return any(deleted is None or deleted & lu_uuids
+                   for gen, deleted in self._deleted if gen > generation)
+
+    def wait(self, generation, lu_uuids, timeout):
+        """Wait for the deletion of any of the specified LUs.
+
+        :param generation: The value of the generation attribute before the
+                           state being waited on was last checked.
+        :param lu_uuids: Iterable of the UUIDs of the LUs whose deletion is
+                         awaited.
+        :param timeout: Maximum number of seconds to wait.
+        :return: True if notified; False if the timeout expired.
+        """
+        lu_uuids = set(lu_uuid.lower() for lu_uuid in lu_uuids if lu_uuid)
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._any_deleted(generation, lu_uuids):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+
 def _find_lus(tier, luname):
     """Finds image LUs whose name contains the specified luname.
 
@@ -117,20 +231,17 @@ def _upload_in_progress(lus, luname, first):
     return False
 
 
-def _upload_conflict(tier, luname, mkr_luname):
+def _upload_conflict(lus, luname, mkr_luname):
     """Detect an upload conflict with another host (our thread should bail).
 
-    :param tier: Tier EntryWrapper representing the Tier to search.
+    :param lus: List of LUs whose names contain luname, fetched after our
+                marker LU was created.
     :param luname: The name of the LU we intend to upload.
     :param mkr_luname: The name of the marker LU we use to signify our upload
                        is in progress.
     :return: True if we find a winning conflict and should abandon our upload;
              False otherwise.
     """
-    # Refetch the feed.  We must do this in case one or more other threads
-    # created their marker LU since our last feed GET.
-    lus = _find_lus(tier, luname)
-
     # First, if someone else already started the upload, we clean up
     # and wait for that one.
     if any([lu for lu in lus if lu.name == luname]):
@@ -167,7 +278,12 @@ def get_or_upload_image_lu(tier, luname, vios_uuid, io_handle, b_size,
 
     This method is designed to coordinate the upload of a particular image LU
     across multiple hosts which use the same SSP, but otherwise can not
-    communicate with each other.
+    communicate with each other.  While another host's upload is in progress,
+    the tier is checked again when the Session's event listener (if it has
+    one) reports the deletion of that upload's marker LU - but no sooner than
+    30 seconds after the last check - and otherwise at intervals which back
+    off from 30-60 seconds.  Within this process, concurrent calls for the
+    same image LU share a single wait and upload.
 
     :param tier: Tier EntryWrapper of the Shared Storage Pool Tier on which the
                  image LU is to be hosted.
@@ -191,8 +307,47 @@ def get_or_upload_image_lu(tier, luname, vios_uuid, io_handle, b_size,
     luname = u.sanitize_file_name_for_api(
         luname, max_len=c.MaxLen.FILENAME_DEFAULT - len(prefix))
     mkr_luname = prefix + luname
+    key = (tier.uuid, luname)
+    while True:
+        with _UPLOADS_LOCK:
+            shared = _UPLOADS.get(key)
+            # A finished Future is on its way out of the registry.
+            if shared is None or shared.done():
+                shared = _UPLOADS[key] = futures.Future()
+                break
+        LOG.info(_('Waiting for image LU %s from another thread.'), luname)
+        try:
+            return shared.result()
+        except Exception:
+            # That thread failed; try for ourselves.
+            continue
+
+    try:
+        lu = _get_or_upload_image_lu(tier, luname, mkr_luname, vios_uuid,
+                                     io_handle, b_size, upload_type)
+    except Exception as e:
+        shared.set_exception(e)
+        raise
+    else:
+        shared.set_result(lu)
+        return lu
+    finally:
+        with _UPLOADS_LOCK:
+            if _UPLOADS.get(key) is shared:
+                del _UPLOADS[key]
+        # E.g. on a BaseException, release the waiters to try themselves.
+        shared.cancel()
+
+
+def _get_or_upload_image_lu(tier, luname, mkr_luname, vios_uuid, io_handle,
+                            b_size, upload_type):
+    """Get or upload the image LU, on behalf of all threads in the process."""
+    lu_events = _LUEvents.get(tier.adapter)
     first = True
+    attempt = 0
     while True:
+        # Before looking, so no deletion after the search goes unnoticed.
+        generation = lu_events.generation
         # (Re)fetch the list of image LUs whose name *contains* luname.
         lus = _find_lus(tier, luname)
 
@@ -205,7 +360,9 @@ def get_or_upload_image_lu(tier, luname, vios_uuid, io_handle, b_size,
         # Is there an upload in progress?
         if _upload_in_progress(lus, luname, first):
             first = False
-            _sleep_for_upload()
+            _wait_for_upload(lu_events, generation,
+                             [lu for lu in lus if lu.name != luname], attempt)
+            attempt += 1
             continue
 
         # No upload in progress (at least as of when we grabbed the feed).
@@ -219,9 +376,15 @@ def get_or_upload_image_lu(tier, luname, vios_uuid, io_handle, b_size,
             # If another process (possibly on another host) created a marker LU
             # at the same time, there could be multiple marker LUs out there.
             # We all use _upload_conflict to decide which one of us gets to do
-            # the upload.
-            if _upload_conflict(tier, luname, mkr_luname):
-                _sleep_for_upload()
+            # the upload.  Refetch the feed, in case one or more other threads
+            # created their marker LU since our last feed GET.
+            generation = lu_events.generation
+            lus = _find_lus(tier, luname)
+            if _upload_conflict(lus, luname, mkr_luname):
+                _wait_for_upload(lu_events, generation,
+                                 [lu for lu in lus if lu.name not in
+                                  (luname, mkr_luname)], attempt)
+                attempt += 1
                 continue
 
             # Okay, we won.  Do the actual upload.
@@ -246,6 +409,33 @@ def get_or_upload_image_lu(tier, luname, vios_uuid, io_handle, b_size,
             mkrlu.delete()
 
 
-def _sleep_for_upload():
+def _upload_wait_time(attempt, cap):
+    """Random (jittered) seconds to wait, backing off with each attempt."""
+    return random.uniform(SLEEP_U_MIN, min(SLEEP_U_MAX * 2 ** attempt, cap))
+
+
+def _wait_for_upload(lu_events, generation, lus, attempt):
+    """Waits for another host's upload to progress.
+
+    :param lu_events: The _LUEvents of the tier's Session.
+    :param generation: The lu_events generation before the tier was searched.
+    :param lus: The marker LUs (found by that search) of the in-progress
+                upload(s).  Only their deletion ends the wait early.
+    :param attempt: The number of times we have already waited.
+    """
+    if not lu_events.enabled:
+        _sleep_for_upload(attempt)
+        return
+    start = time.time()
+    if lu_events.wait(generation, [lu.uuid for lu in lus],
+                      _upload_wait_time(attempt, SLEEP_U_EVENTS_MAX)):
+        # Don't search the tier more often than we would when polling.
+        time.sleep(max(0, SLEEP_U_MIN - (time.time() - start)))
+    else:
+        LOG.debug('No LogicalUnit deletion events while waiting for an '
+                  'upload; checking the tier.')
+
+
+def _sleep_for_upload(attempt=0):
     """Sleeps if a conflict was found during the SSP upload."""
-    time.sleep(randint(SLEEP_U_MIN, SLEEP_U_MAX))
+    time.sleep(_upload_wait_time(attempt, SLEEP_U_BACKOFF_MAX))
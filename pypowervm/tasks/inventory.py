@@ -0,0 +1,192 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Batched, parallel retrieval of wrapper feeds (e.g. for inventory)."""
+
+import collections
+import functools
+import threading
+
+from oslo_log import log as logging
+
+from pypowervm.i18n import _
+import pypowervm.util as u
+import pypowervm.utils.transaction as tx
+
+LOG = logging.getLogger(__name__)
+
+# Total number of concurrent GETs across all hosts.
+_DFLT_MAX_WORKERS = 10
+# Number of concurrent GETs against any one host.
+_DFLT_MAX_PER_HOST = 4
+
+
+class FeedSpec(collections.namedtuple(
+        'FeedSpec', 'wrapper_class parent_type parent_uuid xag')):
+    """Identifies one feed GET: the wrapper class, its parent and its xag.
+
+    FeedSpecs are hashable, so they can be used to key the results of
+    get_feeds.
+    """
+    def __new__(cls, wrapper_class, parent=None, xag=None, parent_type=None,
+                parent_uuid=None):
+        """Create a FeedSpec.
+
+        :param wrapper_class: The EntryWrapper subclass to GET and wrap.
+        :param parent: If wrapper_class represents a CHILD, the EntryWrapper
+                       of its parent ROOT object.  Alternatively, specify
+                       parent_type and parent_uuid.
+        :param xag: List of extended attribute group names to request.  None
+                    (the default) uses the REST server's default xags.
+        :param parent_type: Schema type or EntryWrapper subclass of the parent
+                            ROOT object.  Use with parent_uuid, instead of
+                            parent.
+        :param parent_uuid: UUID of the parent ROOT object.  Use with
+                            parent_type, instead of parent.
+        """
+        parent_type, parent_uuid = u.parent_spec(parent, parent_type,
+                                                 parent_uuid)
+        if xag is not None:
+            xag = tuple(xag)
+        return super(FeedSpec, cls).__new__(cls, wrapper_class, parent_type,
+                                            parent_uuid, xag)
+
+    @property
+    def host(self):
+        """The key by which GETs are limited per host.
+
+        This is the UUID of the parent (e.g. the ManagedSystem) of a CHILD
+        feed.  All ROOT feeds share the key None.
+        """
+        return self.parent_uuid
+
+    def get(self, adapter):
+        """Perform the GET described by this spec.
+
+        :param adapter: The pypowervm.adapter.Adapter for the REST API.
+        :return: The list of wrappers for the feed.
+        """
+        return self.wrapper_class.get(
+            adapter, parent_type=self.parent_type,
+            parent_uuid=self.parent_uuid,
+            xag=None if self.xag is None else list(self.xag))
+
+
+class FeedResult(object):
+    """The outcome of the GET for one FeedSpec."""
+    def __init__(self, spec, wrappers=None, error=None):
+        """Create a FeedResult.
+
+        :param spec: The FeedSpec describing the GET.
+        :param wrappers: The list of wrappers retrieved, if successful.
+        :param error: The exception raised by the GET, if it failed.
+        """
+        self.spec = spec
+        self.wrappers = wrappers
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return ('FeedResult(%s, %s)' %
+                (self.spec.wrapper_class.__name__,
+                 ('%d wrappers' % len(self.wrappers)) if self.ok
+                 else repr(self.error)))
+
+
+def _as_spec(spec):
+    if isinstance(spec, FeedSpec):
+        return spec
+    if isinstance(spec, tuple):
+        return FeedSpec(*spec)
+    # A bare wrapper class: its ROOT feed with default xags.
+    return FeedSpec(spec)
+
+
+def get_feeds(adapter, specs, max_workers=_DFLT_MAX_WORKERS,
+              max_per_host=_DFLT_MAX_PER_HOST):
+    """GET and wrap a batch of feeds in parallel.
+
+    For example, the inventory of a set of managed systems:
+
+        systems = ms.System.get(adapter)
+        specs = [lpar.LPAR, vios.VIOS]
+        for sys_w in systems:
+            specs.append((net.VSwitch, sys_w))
+            specs.append((net.VNet, sys_w, [c.XAG.VIO_NET]))
+        results = inventory.get_feeds(adapter, specs)
+        vswitches = results[inventory.FeedSpec(net.VSwitch, sys1)].wrappers
+
+    A failed GET does not affect the others; its exception is reported in the
+    error of its FeedResult.
+
+    :param adapter: The pypowervm.adapter.Adapter for the REST API.
+    :param specs: Iterable of the feeds to GET.  Each may be a FeedSpec; a
+                  tuple of the arguments to create one, i.e.
+                  (wrapper_class[, parent[, xag]]); or just a wrapper class
+                  for a ROOT feed.  Duplicates are only retrieved once.
+    :param max_workers: The maximum number of concurrent GETs in total.
+    :param max_per_host: The maximum number of concurrent GETs of CHILD feeds
+                         of any one parent (see FeedSpec.host), and of ROOT
+                         feeds.
+    :return: An OrderedDict, in the order of specs, of {FeedSpec: FeedResult}.
+    """
+    results = collections.OrderedDict(
+        (spec, None) for spec in (_as_spec(spec) for spec in specs))
+    if not results:
+        return results
+
+    pending = collections.OrderedDict()
+    for spec in results:
+        pending.setdefault(spec.host, collections.deque()).append(spec)
+    running = collections.Counter()
+    remaining = [len(results)]
+    cond = threading.Condition()
+
+    def _get(spec):
+        try:
+            return FeedResult(spec, wrappers=spec.get(adapter))
+        except Exception as e:
+            LOG.warning(_("Failed to retrieve %(type)s feed (parent "
+                          "%(parent)s): %(err)s"),
+                        {'type': spec.wrapper_class.__name__,
+                         'parent': spec.parent_uuid, 'err': e})
+            return FeedResult(spec, error=e)
+
+    def _done(spec, future):
+        with cond:
+            results[spec] = future.result()
+            running[spec.host] -= 1
+            remaining[0] -= 1
+            cond.notify()
+
+    with tx.ContextThreadPoolExecutor(
+            max_workers=min(max_workers, len(results))) as executor:
+        with cond:
+            while remaining[0]:
+                # Start whatever the per-host limits allow; the executor
+                # bounds the total.
+                for host, queue in pending.items():
+                    while queue and running[host] < max_per_host:
+                        spec = queue.popleft()
+                        running[host] += 1
+                        executor.submit(_get, spec).add_done_callback(
+                            functools.partial(_done, spec))
+                if remaining[0]:
+                    cond.wait()
+    return results
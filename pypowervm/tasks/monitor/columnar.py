@@ -0,0 +1,357 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Columnar (NumPy) per-LPAR metrics, for whole-host rate computation.
+
+vm_metrics builds a tree of LparMetric objects per LPAR, which suits looking
+at one VM.  For computing rates across every LPAR on a host, this module
+instead reduces a PCM sample to one array per metric, indexed by LPAR:
+
+    cache = util.LparMetricCache(adapter, host_uuid)
+    prev = columnar.lpar_snapshot(cache.prev_phyp, cache.prev_vioses,
+                                  cache.prev_lpars)
+    cur = columnar.lpar_snapshot(cache.cur_phyp, cache.cur_vioses,
+                                 cache.cur_lpars)
+    rates = columnar.rates(prev, cur)
+    busiest = rates.uuids[numpy.nanargmax(rates['cpu_util'])]
+
+NumPy is an optional dependency of pypowervm, required only by this module.
+"""
+
+import calendar
+import datetime
+import re
+
+from oslo_log import log as logging
+
+from pypowervm.i18n import _
+from pypowervm.tasks.monitor import lpar as lpar_mon
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOG = logging.getLogger(__name__)
+
+# Columns taken from the PhypLparProc of each LPAR.
+PROC_COLUMNS = ('entitled_proc_cycles', 'util_cap_proc_cycles',
+                'util_uncap_proc_cycles', 'idle_proc_cycles',
+                'donated_proc_cycles', 'proc_units', 'virt_procs')
+# Columns taken from the PhypLparMemory of each LPAR.
+PHYP_MEM_COLUMNS = ('logical_mem', 'backed_physical_mem')
+# Columns taken from the LparInfo (RMC) memory of each LPAR.
+RMC_MEM_COLUMNS = ('pct_real_mem_avbl', 'pct_real_mem_free', 'vm_pg_in_rate',
+                   'vm_pg_out_rate', 'vm_pg_swap_in_rate',
+                   'vm_pg_swap_out_rate')
+# Columns summed over the virtual SCSI and virtual FC adapters of each LPAR.
+# NaN for an LPAR with no storage metrics.
+STORAGE_COLUMNS = ('num_reads', 'num_writes', 'read_bytes', 'write_bytes')
+# Columns summed over the client network adapters of each LPAR.  NaN for an
+# LPAR with no network metrics.
+NETWORK_COLUMNS = ('received_packets', 'sent_packets', 'dropped_packets',
+                   'received_bytes', 'sent_bytes')
+
+# All the columns of an LparSnapshot.
+SNAPSHOT_COLUMNS = sum((PROC_COLUMNS, PHYP_MEM_COLUMNS, RMC_MEM_COLUMNS,
+                        STORAGE_COLUMNS, NETWORK_COLUMNS), ())
+# The monotonically increasing counters, for which delta is meaningful.
+COUNTER_COLUMNS = (('entitled_proc_cycles', 'util_cap_proc_cycles',
+                    'util_uncap_proc_cycles', 'idle_proc_cycles',
+                    'donated_proc_cycles') + STORAGE_COLUMNS + NETWORK_COLUMNS)
+
+# RMC memory values used when an LPAR has no RMC sample, as in LparMemory.
+_RMC_MEM_DEFAULTS = {'pct_real_mem_free': 0, 'vm_pg_in_rate': -1,
+                     'vm_pg_out_rate': -1, 'vm_pg_swap_in_rate': -1,
+                     'vm_pg_swap_out_rate': -1}
+
+_TIME_RE = re.compile(
+    r'^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:([+-])(\d\d)(\d\d))?$')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(_("NumPy is required for columnar LPAR metrics."))
+
+
+def _epoch(time_stamp):
+    """Seconds since the epoch of a PCM time stamp, or None if unparseable.
+
+    :param time_stamp: PCM sample time, e.g. '2015-05-27T08:17:45+0000'.
+    """
+    match = _TIME_RE.match(time_stamp or '')
+    if match is None:
+        return None
+    date, sign, hours, mins = match.groups()
+    secs = calendar.timegm(datetime.datetime.strptime(
+        date, '%Y-%m-%dT%H:%M:%S').timetuple())
+    if sign:
+        offset = int(hours) * 3600 + int(mins) * 60
+        secs += -offset if sign == '+' else offset
+    return float(secs)
+
+
+def _storage_adpts(storage, vios_index):
+    """The VIOS adapters serving the PHYP storage adapters of one LPAR."""
+    for vadpt in storage.v_stor_adpts:
+        adpt = vios_index.find_vstor_adpt(vadpt)
+        if adpt is not None:
+            yield adpt
+    for phyp_vfc in storage.v_fc_adpts:
+        adpt = vios_index.find_vfc_adpt(phyp_vfc)
+        if adpt is not None:
+            yield adpt
+
+
+def sum_attrs(items, attrs):
+    """Totals of the specified attributes over items (None counts as zero).
+
+    :param items: Iterable of metric objects, e.g. storage adapters.
+    :param attrs: Sequence of the names of the attributes to total.
+    :return: List of the totals, in the order of attrs.
+    """
+    totals = [0] * len(attrs)
+    for item in items:
+        for i, attr in enumerate(attrs):
+            totals[i] += getattr(item, attr) or 0
+    return totals
+
+
+class LparColumns(object):
+    """Per-LPAR metrics as one NumPy array per metric.
+
+    Row i of every array belongs to the LPAR whose UUID is uuids[i].
+    """
+
+    def __init__(self, uuids, columns):
+        """Create the LparColumns.
+
+        :param uuids: List of the LPAR UUIDs, in row order.
+        :param columns: Dict of {metric name: numpy array, by row}.
+        """
+        self.uuids = uuids
+        self.index = {uuid: i for i, uuid in enumerate(uuids)}
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, uuid):
+        return uuid in self.index
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def row(self, uuid):
+        """Dict of {metric name: value} for one LPAR, or None if not present.
+
+        NaN values (metrics that are not available) are returned as None.
+        """
+        i = self.index.get(uuid)
+        if i is None:
+            return None
+        return {name: None if np.isnan(col[i]) else col[i].item()
+                for name, col in self.columns.items()}
+
+
+class LparSnapshot(LparColumns):
+    """The metrics of all the LPARs on a host from one PCM sample.
+
+    The columns are those named in SNAPSHOT_COLUMNS.  Metrics which are not
+    available for an LPAR are NaN.
+    """
+
+    def __init__(self, uuids, columns, time=None, time_based_cycles=None):
+        """Create the LparSnapshot.
+
+        :param uuids: List of the LPAR UUIDs, in row order.
+        :param columns: Dict of {metric name: numpy array, by row}.
+        :param time: Sample time, in seconds since the epoch.
+        :param time_based_cycles: The host's time based cycles counter at the
+                                  time of the sample.
+        """
+        super(LparSnapshot, self).__init__(uuids, columns)
+        self.time = time
+        self.time_based_cycles = time_based_cycles
+
+
+class LparDelta(LparColumns):
+    """The change in the COUNTER_COLUMNS between two LparSnapshots."""
+
+    def __init__(self, uuids, columns, seconds, time_based_cycles):
+        """Create the LparDelta.
+
+        :param uuids: List of the LPAR UUIDs, in row order.
+        :param columns: Dict of {metric name: numpy array, by row}.
+        :param seconds: The time between the two samples.
+        :param time_based_cycles: The change in the host's time based cycles
+                                  counter between the two samples.
+        """
+        super(LparDelta, self).__init__(uuids, columns)
+        self.seconds = seconds
+        self.time_based_cycles = time_based_cycles
+
+
+def lpar_snapshot(phyp, vioses, lpars):
+    """Reduces the metrics of all the LPARs of a host to an LparSnapshot.
+
+    The columnar equivalent of vm_metrics.  The storage adapters of each LPAR
+    are correlated with the VIOS metrics in the same way.
+
+    :param phyp: The PhypInfo for the metrics.
+    :param vioses: A list of the ViosInfos for the Virtual I/O Server
+                   components.
+    :param lpars: The LparInfo object representing Lpar metrics collected
+                  via RMC.
+    :return: The LparSnapshot, or None if there is no PHYP data.
+    """
+    _require_numpy()
+    if phyp is None:
+        LOG.warning(_("Metric data is not available.  This may be due to "
+                      "the metrics being recently initialized."))
+        return None
+
+    vios_index = lpar_mon.ViosStorageIndex(vioses)
+    nan_stor = [None] * len(STORAGE_COLUMNS)
+    nan_net = [None] * len(NETWORK_COLUMNS)
+    uuids, rows = [], []
+    for sample in phyp.sample.lpars:
+        uuids.append(sample.uuid)
+        row = [getattr(sample.processor, attr, None) for attr in PROC_COLUMNS]
+        row += [getattr(sample.memory, attr, None)
+                for attr in PHYP_MEM_COLUMNS]
+
+        rmc = lpars.find(sample.uuid) if lpars else None
+        if rmc is None:
+            row += [_RMC_MEM_DEFAULTS.get(attr) for attr in RMC_MEM_COLUMNS]
+        else:
+            row += [getattr(rmc.memory, attr) for attr in RMC_MEM_COLUMNS]
+
+        if sample.storage is None:
+            row += nan_stor
+        else:
+            row += sum_attrs(_storage_adpts(sample.storage, vios_index),
+                             STORAGE_COLUMNS)
+
+        if sample.network is None:
+            row += nan_net
+        else:
+            row += sum_attrs(sample.network.veas, NETWORK_COLUMNS)
+        rows.append(row)
+
+    # One conversion for the whole host; None becomes NaN.
+    table = np.array(rows, dtype=np.float64).reshape(len(rows),
+                                                     len(SNAPSHOT_COLUMNS))
+    columns = {name: table[:, i].copy()
+               for i, name in enumerate(SNAPSHOT_COLUMNS)}
+    return LparSnapshot(uuids, columns, time=_epoch(phyp.sample.time_stamp),
+                        time_based_cycles=phyp.sample.time_based_cycles)
+
+
+def _aligned(prev, cur):
+    """Function returning a prev column aligned to the rows of cur."""
+    if prev.uuids == cur.uuids:
+        return lambda name: prev[name]
+    rows = np.array([prev.index.get(uuid, -1) for uuid in cur.uuids],
+                    dtype=np.intp)
+    missing = rows < 0
+
+    def column(name):
+        if not len(prev):
+            return np.full(len(cur), np.nan)
+        col = prev[name][rows]
+        col[missing] = np.nan
+        return col
+    return column
+
+
+def _div(num, den):
+    """num / den, NaN wherever den is not positive (or NaN)."""
+    den = np.asarray(den, dtype=np.float64)
+    return np.true_divide(num, den, out=np.full(np.shape(num), np.nan),
+                          where=den > 0)
+
+
+def delta(prev, cur):
+    """The change in the counters of every LPAR between two LparSnapshots.
+
+    Rows follow cur.  An LPAR not in prev, or whose counter went backwards
+    (e.g. it was restarted), has a NaN delta.
+
+    :param prev: The earlier LparSnapshot.
+    :param cur: The later LparSnapshot.
+    :return: An LparDelta with the COUNTER_COLUMNS.
+    """
+    _require_numpy()
+    prev_col = _aligned(prev, cur)
+    columns = {}
+    for name in COUNTER_COLUMNS:
+        diff = cur[name] - prev_col(name)
+        diff[diff < 0] = np.nan
+        columns[name] = diff
+    seconds = cycles = None
+    if None not in (cur.time, prev.time):
+        seconds = cur.time - prev.time
+    if None not in (cur.time_based_cycles, prev.time_based_cycles):
+        cycles = cur.time_based_cycles - prev.time_based_cycles
+    return LparDelta(cur.uuids, columns, seconds, cycles)
+
+
+def rates(prev, cur):
+    """Utilization and I/O rates of every LPAR between two LparSnapshots.
+
+    Rows follow cur.  The columns are:
+     - cpu_util: Utilized processor cycles as a fraction of the entitled
+                 cycles.  May exceed 1 for uncapped LPARs.
+     - cpu_units: Processor units consumed (utilized cycles per time based
+                  cycle of the host).
+     - read_iops, write_iops, iops: Storage operations per second.
+     - read_bytes_per_sec, write_bytes_per_sec: Storage throughput.
+     - received_bytes_per_sec, sent_bytes_per_sec,
+       received_packets_per_sec, sent_packets_per_sec: Network throughput.
+     - vm_pg_in_rate, vm_pg_out_rate, vm_pg_swap_in_rate,
+       vm_pg_swap_out_rate: Paging rates (pages per second) from the RMC
+       metrics of cur.
+
+    Rates which can not be determined are NaN.
+
+    :param prev: The earlier LparSnapshot.
+    :param cur: The later LparSnapshot.
+    :return: LparColumns of the rates.
+    """
+    diff = delta(prev, cur)
+    if not diff.seconds or diff.seconds < 0:
+        raise ValueError(_("Cannot compute metric rates between samples "
+                           "taken at %(prev)s and %(cur)s.") %
+                         {'prev': prev.time, 'cur': cur.time})
+    used = diff['util_cap_proc_cycles'] + diff['util_uncap_proc_cycles']
+    secs = diff.seconds
+    columns = {
+        'cpu_util': _div(used, diff['entitled_proc_cycles']),
+        'cpu_units': _div(used, diff.time_based_cycles or 0),
+        'read_iops': diff['num_reads'] / secs,
+        'write_iops': diff['num_writes'] / secs,
+        'iops': (diff['num_reads'] + diff['num_writes']) / secs}
+    for name in ('read_bytes', 'write_bytes', 'received_bytes', 'sent_bytes',
+                 'received_packets', 'sent_packets'):
+        columns[name + '_per_sec'] = diff[name] / secs
+    for name in ('vm_pg_in_rate', 'vm_pg_out_rate', 'vm_pg_swap_in_rate',
+                 'vm_pg_swap_out_rate'):
+        # RMC reports -1 when it could not determine the rate.
+        col = cur[name].copy()
+        col[col < 0] = np.nan
+        columns[name] = col
+    return LparColumns(cur.uuids, columns)
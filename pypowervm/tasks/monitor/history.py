@@ -0,0 +1,486 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A local, on-disk history of the PCM metrics of a host.
+
+The LTM only retains a short window of samples, and the MetricCache only the
+latest two.  A MetricHistory keeps the per-LPAR and per-VIOS metrics of every
+sample it is given, for trend and capacity analysis:
+
+    hist = history.MetricHistory('/var/lib/pvm-metrics', host_uuid)
+    cache = util.LparMetricCache(adapter, host_uuid, history=hist)
+    ...
+    series = hist.series(lpar_uuid, start=time.time() - 86400)
+    cpu = numpy.diff(series['util_cap_proc_cycles']) / numpy.diff(
+        series.times)
+
+Each kind of entity (LPAR, VIOS) is stored in one file per tier.  A tier is a
+fixed-size ring of rows (one row per entity per sample), stored column by
+column, so old samples are overwritten once the tier is full.  Rows are
+appended; reads go through a read-only memory map.  Samples are recorded in
+the finest tier, and downsampled into the coarser ones as each of their
+intervals completes: counters keep their last value in the interval, while
+gauges are averaged.
+
+NumPy is required, as for the columnar metrics.
+"""
+
+import errno
+import json
+import os
+import struct
+import threading
+
+from oslo_log import log as logging
+
+from pypowervm.i18n import _
+from pypowervm.tasks.monitor import columnar
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOG = logging.getLogger(__name__)
+
+LPAR = 'lpar'
+VIOS = 'vios'
+
+# (interval in seconds, capacity in rows) of each tier, finest first.  A row
+# holds one entity's sample, so e.g. 2**18 rows of 30 second samples retain
+# about 22 hours of a host with 100 LPARs.
+DEFAULT_TIERS = ((30, 2 ** 18), (300, 2 ** 18), (3600, 2 ** 17))
+
+LPAR_COLUMNS = columnar.SNAPSHOT_COLUMNS
+LPAR_COUNTERS = frozenset(columnar.COUNTER_COLUMNS)
+VIOS_COLUMNS = ('entitled_proc_cycles', 'util_cap_proc_cycles',
+                'util_uncap_proc_cycles', 'idle_proc_cycles', 'utilized_mem',
+                'num_reads', 'num_writes', 'read_bytes', 'write_bytes',
+                'received_bytes', 'sent_bytes')
+VIOS_COUNTERS = frozenset(VIOS_COLUMNS) - {'utilized_mem'}
+
+_MAGIC = b'PVMTSDB1'
+# magic, number of columns, capacity, rows ever written, time up to which
+# this tier has been downsampled into the next, last sample time.
+_HEADER = struct.Struct('<8sIQQdd')
+_HEADER_SIZE = 4096
+_ENTITIES = 'entities.json'
+
+
+class Series(object):
+    """The samples of one LPAR or VIOS over a time range, in time order."""
+
+    def __init__(self, uuid, kind, interval, times, columns):
+        """Create the Series.
+
+        :param uuid: The UUID of the LPAR or VIOS.
+        :param kind: LPAR or VIOS.
+        :param interval: The sampling interval (seconds) of the tier from which
+                         the series was read.
+        :param times: numpy array of the sample times (seconds since the
+                      epoch).
+        :param columns: Dict of {metric name: numpy array, by sample}.
+        """
+        self.uuid = uuid
+        self.kind = kind
+        self.interval = interval
+        self.times = times
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.times)
+
+
+class _Tier(object):
+    """One ring buffer file of rows, stored column by column.
+
+    The file is a header, then the time column, the metric columns (all
+    float64) and finally the entity ID column (int32), each of capacity
+    rows.
+    """
+
+    def __init__(self, path, interval, capacity, columns):
+        self.path = path
+        self.interval = interval
+        self.capacity = capacity
+        self.columns = columns
+        self._offsets = {name: _HEADER_SIZE + i * 8 * capacity for i, name in
+                         enumerate(('time',) + columns)}
+        self._offsets['entity'] = _HEADER_SIZE + (
+            (len(columns) + 1) * 8 * capacity)
+        self.count, self.rolled, self.last = 0, 0.0, None
+        if not self._load():
+            self._create()
+        self._fh = open(path, 'r+b')
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                head = fh.read(_HEADER_SIZE)
+        except IOError as e:
+            if e.errno == errno.ENOENT:
+                return False
+            raise
+        try:
+            magic, ncols, capacity, count, rolled, last = _HEADER.unpack_from(
+                head)
+            names = json.loads(head[_HEADER.size:].rstrip(b'\0').decode())
+        except (struct.error, ValueError):
+            magic, capacity, names = None, None, ()
+        if (magic, capacity, tuple(names)) != (_MAGIC, self.capacity,
+                                               self.columns):
+            LOG.warning(_("Discarding the incompatible metric history file "
+                          "%s."), self.path)
+            return False
+        self.count, self.rolled = count, rolled
+        self.last = None if last < 0 else last
+        return True
+
+    def _create(self):
+        names = json.dumps(list(self.columns)).encode()
+        if _HEADER.size + len(names) > _HEADER_SIZE:
+            raise ValueError(_("Too many metric history columns."))
+        with open(self.path, 'wb') as fh:
+            fh.write(self._header() + names)
+            # Sparse, where the file system allows.
+            fh.truncate(self._offsets['entity'] + 4 * self.capacity)
+
+    def _header(self):
+        return _HEADER.pack(_MAGIC, len(self.columns), self.capacity,
+                            self.count, self.rolled,
+                            -1.0 if self.last is None else self.last)
+
+    def close(self):
+        self._fh.close()
+        self._map = None
+
+    def _column(self, name):
+        dtype = np.int32 if name == 'entity' else np.float64
+        offset = self._offsets[name]
+        return np.frombuffer(self._map, dtype=dtype, count=self.capacity,
+                             offset=offset)
+
+    def append(self, times, entities, values):
+        """Append rows.
+
+        :param times: Array of the row times.
+        :param entities: Array of the row entity IDs.
+        :param values: Dict of {column: array of the row values}.
+        """
+        num = len(times)
+        if not num:
+            return
+        if num > self.capacity:
+            # Only the newest rows would survive anyway.
+            times, entities = times[-self.capacity:], entities[-self.capacity:]
+            values = {name: col[-self.capacity:]
+                      for name, col in values.items()}
+            self.count += num - self.capacity
+            num = self.capacity
+        start = self.count % self.capacity
+        # The rows may wrap around the end of the ring.
+        first = min(num, self.capacity - start)
+        cols = [('time', np.asarray(times, dtype='<f8')),
+                ('entity', np.asarray(entities, dtype='<i4'))]
+        cols += [(name, np.asarray(values[name], dtype='<f8'))
+                 for name in self.columns]
+        for name, col in cols:
+            for pos, chunk in ((start, col[:first]), (0, col[first:])):
+                if len(chunk):
+                    self._fh.seek(self._offsets[name] + pos * col.itemsize)
+                    self._fh.write(chunk.tobytes())
+        self.count += num
+        self.last = float(np.max(times))
+        self.write_header()
+
+    def write_header(self):
+        # The header is written last, so a partial append is not seen.
+        self._fh.flush()
+        self._fh.seek(0)
+        self._fh.write(self._header())
+        self._fh.flush()
+
+    def oldest(self):
+        """The time of the oldest retained row, or None if empty."""
+        if not self.count:
+            return None
+        return float(self._column('time')[
+            self.count % self.capacity if self.count > self.capacity else 0])
+
+    def select(self, start=None, end=None, entity=None):
+        """Indices of the retained rows in a time range, in time order."""
+        valid = min(self.count, self.capacity)
+        times = self._column('time')[:valid]
+        mask = np.ones(valid, dtype=bool)
+        if entity is not None:
+            mask &= self._column('entity')[:valid] == entity
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        rows = np.nonzero(mask)[0]
+        return rows[np.argsort(times[rows], kind='mergesort')]
+
+    def read(self, rows, names):
+        """{name: array} of the given rows; names may include time/entity."""
+        return {name: self._column(name)[rows] for name in names}
+
+
+class MetricHistory(object):
+    """On-disk history of the LPAR and VIOS metrics of one host."""
+
+    def __init__(self, base_dir, host_uuid, tiers=DEFAULT_TIERS):
+        """Open (creating if needed) the metric history of a host.
+
+        :param base_dir: Directory in which the history of each host is kept,
+                         in a subdirectory named for the host UUID.
+        :param host_uuid: The UUID of the host (ManagedSystem).
+        :param tiers: Sequence of (interval in seconds, capacity in rows) of
+                      each tier, finest first.  Each interval must be a
+                      multiple of the one before.  The finest interval should
+                      match the LTM's (30 seconds by default).  Changing the
+                      capacity of a tier discards its history.
+        """
+        if np is None:
+            raise ImportError(_("NumPy is required for the metric history."))
+        intervals = [interval for interval, _cap in tiers]
+        if not intervals or any(
+                coarse % fine for fine, coarse in zip(intervals,
+                                                      intervals[1:])):
+            raise ValueError(_("Each metric history interval must be a "
+                               "multiple of the one before."))
+        self.host_uuid = host_uuid
+        self.path = os.path.join(base_dir, host_uuid)
+        try:
+            os.makedirs(self.path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        self._lock = threading.Lock()
+        self._entities = self._load_entities()
+        self._tiers = {
+            kind: [_Tier(os.path.join(self.path, '%s-%d.ts' % (kind, ival)),
+                         ival, cap, cols) for ival, cap in tiers]
+            for kind, cols in ((LPAR, LPAR_COLUMNS), (VIOS, VIOS_COLUMNS))}
+
+    @property
+    def intervals(self):
+        return [tier.interval for tier in self._tiers[LPAR]]
+
+    def close(self):
+        with self._lock:
+            for tiers in self._tiers.values():
+                for tier in tiers:
+                    tier.close()
+
+    def _load_entities(self):
+        try:
+            with open(os.path.join(self.path, _ENTITIES)) as fh:
+                return {uuid: tuple(val) for uuid, val in
+                        json.load(fh).items()}
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        except ValueError:
+            LOG.warning(_("Discarding the corrupt metric history entity list "
+                          "in %s."), self.path)
+        return {}
+
+    def _save_entities(self):
+        path = os.path.join(self.path, _ENTITIES)
+        with open(path + '.tmp', 'w') as fh:
+            json.dump(self._entities, fh)
+        os.rename(path + '.tmp', path)
+
+    def _entity_ids(self, kind, uuids):
+        new = [uuid for uuid in uuids if uuid not in self._entities]
+        for uuid in new:
+            self._entities[uuid] = (len(self._entities), kind)
+        if new:
+            self._save_entities()
+        return np.array([self._entities[uuid][0] for uuid in uuids],
+                        dtype=np.int32)
+
+    def entities(self, kind=None):
+        """The UUIDs of the LPARs and/or VIOSes with history.
+
+        :param kind: LPAR or VIOS to list only those; None for both.
+        """
+        with self._lock:
+            return sorted(uuid for uuid, (_id, ekind) in self._entities.items()
+                          if kind in (None, ekind))
+
+    def record(self, phyp, vioses, lpars):
+        """Record one sample of the host's metrics.
+
+        A sample no newer than the last one recorded is ignored, so this may
+        be called on every metrics refresh.
+
+        :param phyp: The PhypInfo for the metrics.
+        :param vioses: A list of the ViosInfos for the Virtual I/O Server
+                       components.
+        :param lpars: The LparInfo object representing Lpar metrics collected
+                      via RMC.
+        :return: True if the sample was recorded; False otherwise.
+        """
+        if phyp is None:
+            return False
+        snap = columnar.lpar_snapshot(phyp, vioses, lpars)
+        time = snap.time
+        if time is None:
+            LOG.warning(_("Not recording metrics with an unrecognized time "
+                          "stamp: %s"), phyp.sample.time_stamp)
+            return False
+        vios_uuids, vios_cols = _vios_rows(phyp, vioses)
+        with self._lock:
+            lasts = [tiers[0].last for tiers in self._tiers.values()
+                     if tiers[0].last is not None]
+            if lasts and time <= max(lasts):
+                return False
+            for kind, uuids, cols in ((LPAR, snap.uuids, snap.columns),
+                                      (VIOS, vios_uuids, vios_cols)):
+                tiers = self._tiers[kind]
+                tiers[0].append(np.full(len(uuids), time),
+                                self._entity_ids(kind, uuids), cols)
+                self._downsample(kind, tiers, time)
+        return True
+
+    def _downsample(self, kind, tiers, time):
+        """Roll the completed intervals of each tier into the next."""
+        counters = LPAR_COUNTERS if kind == LPAR else VIOS_COUNTERS
+        for fine, coarse in zip(tiers, tiers[1:]):
+            # Everything before the interval of the latest sample is complete.
+            done = (time // coarse.interval) * coarse.interval
+            if done <= fine.rolled:
+                break
+            rows = fine.select(start=fine.rolled, end=done)
+            rows = rows[fine.read(rows, ('time',))['time'] < done]
+            _rollup(fine, coarse, rows, counters)
+            fine.rolled = done
+            fine.write_header()
+
+    def _tier(self, kind, start, interval):
+        tiers = self._tiers[kind]
+        if interval is not None:
+            for tier in tiers:
+                if tier.interval == interval:
+                    return tier
+            raise ValueError(_("No metric history tier with an interval of "
+                               "%d seconds.") % interval)
+        oldest = [(tier, tier.oldest()) for tier in tiers]
+        oldest = [(tier, time) for tier, time in oldest if time is not None]
+        if not oldest:
+            return tiers[0]
+        # The finest tier that still covers the start of the range; else the
+        # one that goes furthest back.
+        for tier, time in oldest:
+            if start is None or time <= start:
+                return tier
+        return min(oldest, key=lambda item: item[1])[0]
+
+    def series(self, uuid, start=None, end=None, interval=None):
+        """The history of one LPAR or VIOS over a time range.
+
+        :param uuid: The UUID of the LPAR or VIOS.
+        :param start: Start of the range (seconds since the epoch, inclusive).
+                      None for the oldest retained sample.
+        :param end: End of the range (seconds since the epoch, inclusive).
+                    None for the latest sample.
+        :param interval: The interval (seconds) of the tier to read.  By
+                         default, the finest tier which retains samples from
+                         start.
+        :return: A Series, or None if there is no history of the UUID.
+        """
+        with self._lock:
+            entity = self._entities.get(uuid)
+            if entity is None:
+                return None
+            eid, kind = entity
+            tier = self._tier(kind, start, interval)
+            rows = tier.select(start=start, end=end, entity=eid)
+            cols = tier.read(rows, ('time',) + tier.columns)
+        times = cols.pop('time')
+        return Series(uuid, kind, tier.interval, times, cols)
+
+
+def _rollup(fine, coarse, rows, counters):
+    """Downsample rows of the fine tier into the coarse one.
+
+    For each entity and coarse interval, the row takes the time and counter
+    values of the entity's last sample in the interval, and the mean of its
+    gauge values.
+    """
+    if not len(rows):
+        return
+    data = fine.read(rows, ('time', 'entity') + fine.columns)
+    buckets = data['time'] // coarse.interval
+    order = np.lexsort((data['time'], data['entity'], buckets))
+    buckets, entities = buckets[order], data['entity'][order]
+    # Start of each (interval, entity) group, and the last row of each.
+    changed = np.logical_or(buckets[1:] != buckets[:-1],
+                            entities[1:] != entities[:-1])
+    starts = np.nonzero(np.concatenate(([True], changed)))[0]
+    lasts = np.append(starts[1:], len(order)) - 1
+    values = {}
+    for name in fine.columns:
+        col = data[name][order]
+        if name in counters:
+            values[name] = col[lasts]
+        else:
+            known = ~np.isnan(col)
+            sums = np.add.reduceat(np.where(known, col, 0), starts)
+            nums = np.add.reduceat(known.astype(np.int64), starts)
+            values[name] = np.true_divide(
+                sums, nums, out=np.full(len(starts), np.nan), where=nums > 0)
+    coarse.append(data['time'][order][lasts], entities[lasts], values)
+
+
+def _vios_rows(phyp, vioses):
+    """The VIOS_COLUMNS of each VIOS in a sample.
+
+    :return: (list of VIOS UUIDs, {column: numpy array by VIOS}).
+    """
+    by_id = {vios.sample.id: vios for vios in vioses or []}
+    uuids, rows = [], []
+    for sample in phyp.sample.vioses:
+        uuids.append(sample.uuid)
+        proc = sample.processor
+        row = [getattr(proc, attr, None) for attr in VIOS_COLUMNS[:4]]
+        vios = by_id.get(sample.id)
+        vsample = None if vios is None else vios.sample
+        row.append(None if vsample is None or vsample.mem is None
+                   else vsample.mem.utilized_mem)
+        stor = None if vsample is None else vsample.storage
+        if stor is None:
+            row += [None] * 4
+        else:
+            row += columnar.sum_attrs(stor.fc_adpts + stor.phys_adpts,
+                                      columnar.STORAGE_COLUMNS)
+        net = None if vsample is None else vsample.network
+        if net is None:
+            row += [None] * 2
+        else:
+            row += columnar.sum_attrs(
+                [adpt for adpt in net.adpts if adpt.type == 'physical'],
+                ('received_bytes', 'sent_bytes'))
+        rows.append(row)
+    table = np.array(rows, dtype=np.float64).reshape(len(rows),
+                                                     len(VIOS_COLUMNS))
+    return uuids, {name: table[:, i] for i, name in enumerate(VIOS_COLUMNS)}
@@ -17,9 +17,13 @@
 """Objects that contain the per LPAR monitor data."""
 
 import abc
+import re
 
 import six
 
+# The server slot of a VIOS virtual adapter, from its location code.
+_SLOT_RE = re.compile(r'-C(\d+)$')
+
 
 class LparMetric(object):
     """Represents a set of metrics for a given LPAR.
@@ -177,6 +181,67 @@ class LparProc(PropertyWrapper):
                           'total_inst_exec_time')
 
 
+class ViosStorageIndex(object):
+    """Index of the VIOS storage adapter metrics of one sample.
+
+    PHYP only identifies the VIOS adapter backing a client storage adapter by
+    the VIOS ID and either the server slot (virtual SCSI) or the WWPNs
+    (virtual FC).  The VIOS metrics are indexed by those once, so that each
+    client adapter can be correlated in constant time, rather than by
+    scanning every adapter of every VIOS.
+    """
+
+    def __init__(self, vios_metrics):
+        """Indexes the storage adapters of the VIOS samples.
+
+        :param vios_metrics: The list of ViosInfos.
+        """
+        # {(vios id, slot): ViosStorageVAdpt}
+        self._vadpts = {}
+        # {(vios id, wwpn): (order, ViosFCVirtAdpt)}
+        self._vfcs = {}
+        for vios_ltm in vios_metrics or []:
+            raw_stor = vios_ltm.sample.storage
+            if raw_stor is None:
+                continue
+            vios_id = vios_ltm.sample.id
+            for vadpt in raw_stor.virt_adpts or []:
+                # We can only match on the tail end of the location code: the
+                # slot.  (Being on the right VIOS, the slot is sufficient.)
+                match = _SLOT_RE.search(vadpt.physical_location or '')
+                if match is not None:
+                    self._vadpts.setdefault(
+                        (vios_id, int(match.group(1))), vadpt)
+            for pfc_adpt in raw_stor.fc_adpts or []:
+                for vfc_adpt in pfc_adpt.ports or []:
+                    self._vfcs.setdefault((vios_id, vfc_adpt.wwpn),
+                                          (len(self._vfcs), vfc_adpt))
+
+    def find_vstor_adpt(self, phyp_vadpt):
+        """Finds the VIOS virtual storage adapter for a PHYP one.
+
+        :param phyp_vadpt: The PhypStorageVAdpt raw metric.
+        :return: The corresponding ViosStorageVAdpt if one can be found.
+                 None otherwise.
+        """
+        return self._vadpts.get((phyp_vadpt.vios_id, phyp_vadpt.vios_slot))
+
+    def find_vfc_adpt(self, phyp_vfc_adpt):
+        """Finds the VIOS virtual FC adapter for a PHYP one.
+
+        :param phyp_vfc_adpt: The PhypVirtualFCAdpt raw metric.
+        :return: The corresponding ViosFCVirtAdpt if one can be found.  None
+                 otherwise.
+        """
+        # If both WWPNs match, the adapter a scan would find first wins.
+        best = None
+        for wwpn in phyp_vfc_adpt.wwpn_pair:
+            item = self._vfcs.get((phyp_vfc_adpt.vios_id, wwpn))
+            if item is not None and (best is None or item[0] < best[0]):
+                best = item
+        return None if best is None else best[1]
+
+
 class LparStorage(object):
     """Represents the Storage statistics for a given LPAR.
 
@@ -193,125 +258,27 @@ class LparStorage(object):
         :param lpar_phyp_storage: The raw Phyp Storage object.
         :param vios_metrics: The list of Virtual I/O Server raw metrics that
                              are paired to the sample from the lpar_phyp
-                             metrics.
+                             metrics.  When creating the LparStorage of many
+                             LPARs, pass a ViosStorageIndex of them instead,
+                             so they are only indexed once.
         """
+        vios_index = (vios_metrics if isinstance(vios_metrics,
+                                                 ViosStorageIndex)
+                      else ViosStorageIndex(vios_metrics))
+
         # Add the various adapters.
         self.virt_adpts = []
         for vadpt in lpar_phyp_storage.v_stor_adpts:
-            vio_adpt = self._find_vio_vstor_adpt(vadpt, vios_metrics)
+            vio_adpt = vios_index.find_vstor_adpt(vadpt)
             if vio_adpt is not None:
                 self.virt_adpts.append(LparVirtStorageAdpt(vio_adpt))
 
         self.vfc_adpts = []
         for phyp_vfc_adpt in lpar_phyp_storage.v_fc_adpts:
-            vfc_adpt = self._find_vio_vfc_adpt(phyp_vfc_adpt, vios_metrics)
+            vfc_adpt = vios_index.find_vfc_adpt(phyp_vfc_adpt)
             if vfc_adpt is not None:
                 self.vfc_adpts.append(LparVFCAdpt(vfc_adpt))
 
-    @staticmethod
-    def _find_vio_vstor_adpt(phyp_vadpt, vios_metrics):
-        """Finds the appropriate VIOS virtual storage adapter.
-
-        For a given PHYP virtual adapter, PHYP only has a little bit of
-        information about it.  Which VIOS is hosting it, and the slot.
-
-        The VIOS metrics actually contain the information for that
-        device.
-
-        This method will look through all the VIOS samples to find the
-        matching ViosStorageVAdpt for the given PhypStorageVAdpt.  If one
-        can not be found, None is returned.
-
-        :param phyp_vadpt: The PhypStorageVAdpt raw metric.
-        :param vios_metrics: The list of ViosInfos.
-        :return: The corresponding ViosStorageVAdpt from the ViosInfos
-                 if one can be found.  None otherwise.
-        """
-        for vios_ltm in vios_metrics:
-            # We need to find the VIOS sample that matches this storage
-            # element.  Loop until we find one (if one doesn't exist, then
-            # this will just return None).
-            if vios_ltm.sample.id != phyp_vadpt.vios_id:
-                continue
-
-            # If we reach here, we found the VIOS.  From that sample, see
-            # if we have the appropriate storage.
-            raw_stor = vios_ltm.sample.storage
-            if raw_stor is None or raw_stor.virt_adpts is None:
-                break
-
-            # See if this virtual adapters has the right data.
-            slot_str = "-C%d" % phyp_vadpt.vios_slot
-            for vadpt in raw_stor.virt_adpts:
-                # We have to match on the location code.  We can only match
-                # on the tail end of the slot (we've already validated that
-                # we have the right VIOS, so slot is sufficient).
-                if vadpt.physical_location.endswith(slot_str):
-                    return vadpt
-
-            # If we reached this point, we found the right VIOS, but couldn't
-            # find proper data.  Therefore we can just exit the loop.
-            break
-
-        return None
-
-    @staticmethod
-    def _find_vio_vfc_adpt(phyp_vfc_adpt, vios_metrics):
-        """Finds the appropriate VIOS virtual FC adapter.
-
-        For a given PHYP virtual FC adapter, PHYP only has a little bit of
-        information about it.  Which VIOS is hosting it, and the WWPNs.
-
-        The VIOS metrics actually contain the information for that
-        device.
-
-        This method will look through all the VIOS samples to find the
-        matching ViosFCVirtAdpt for the given PhypVirtualFCAdpt.  If one
-        can not be found, None is returned.
-
-        :param phyp_vadpt: The PhypVirtualFCAdpt raw metric.
-        :param vios_metrics: The list of ViosInfos.
-        :return: The corresponding ViosFCVirtAdpt from the ViosInfos
-                 if one can be found.  None otherwise.
-        """
-        for vios_ltm in vios_metrics:
-            # We need to find the VIOS sample that matches this VFC
-            # element.  Loop until we find one (if one doesn't exist, then
-            # this will just return None).
-            if vios_ltm.sample.id != phyp_vfc_adpt.vios_id:
-                continue
-
-            # If we reach here, we found the VIOS.  From that sample, see
-            # if we have the appropriate storage.
-            raw_stor = vios_ltm.sample.storage
-            if raw_stor is None or raw_stor.fc_adpts is None:
-                return None
-
-            # Check the WWPNs.
-            for pfc_adpt in raw_stor.fc_adpts:
-                vfc_adpt = LparStorage._find_vfc(phyp_vfc_adpt, pfc_adpt)
-                if vfc_adpt is not None:
-                    return vfc_adpt
-
-        return None
-
-    @staticmethod
-    def _find_vfc(phyp_vfc_adpt, vio_pfc_adpt):
-        """Finds the matching VIOS vfc adpt for a given PHYP adapter
-
-        :param phyp_vfc_adpt: The raw PhypVirtualFCAdpt object.
-        :param vio_pfc_adpt: The raw ViosFCPhysAdpt.
-        :return: The matching ViosFCVirtAdpt contained within the physical VIOS
-                 adapter.  If one can't be found, None will be returned.
-        """
-        if vio_pfc_adpt.ports is None:
-            return None
-        for vfc_adpt in vio_pfc_adpt.ports:
-            for wwpn in phyp_vfc_adpt.wwpn_pair:
-                if wwpn == vfc_adpt.wwpn:
-                    return vfc_adpt
-        return None
-
 
 @six.add_metaclass(abc.ABCMeta)
 class LparStorageAdpt(PropertyWrapper):
@@ -19,6 +19,8 @@
 
 import abc
 import datetime
+import threading
+import weakref
 
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
@@ -27,6 +29,7 @@ import six
 from pypowervm import adapter as pvm_adpt
 from pypowervm.i18n import _
 from pypowervm.tasks.monitor import lpar as lpar_mon
+import pypowervm.utils.transaction as tx
 from pypowervm.wrappers import managed_system as pvm_ms
 from pypowervm.wrappers import monitor as pvm_mon
 from pypowervm.wrappers.pcm import lpar as lpar_pcm
@@ -38,6 +41,10 @@ LOG = logging.getLogger(__name__)
 
 RAW_METRICS = 'RawMetrics'
 
+# When prefetching, if the LTM has not yet published a new sample, try again
+# after this many seconds.
+_PREFETCH_RETRY = 5
+
 
 @six.add_metaclass(abc.ABCMeta)
 class MetricCache(object):
@@ -48,9 +55,14 @@ class MetricCache(object):
     of the metrics.  It stores both the raw phyp and vios metrics (if
     available) and will only refresh them after a specified time period has
     elapsed (30 seconds by default).
+
+    With prefetch=True, the metrics are instead refreshed by a background
+    thread, following the LTM's cadence, so queries never wait on the REST
+    API.
     """
 
-    def __init__(self, adapter, host_uuid, refresh_delta=30, include_vio=True):
+    def __init__(self, adapter, host_uuid, refresh_delta=30, include_vio=True,
+                 prefetch=False, history=None):
         """Creates an instance of the cache.
 
         :param adapter: The pypowervm Adapter.
@@ -64,6 +76,14 @@ class MetricCache(object):
         :param include_vio: (Optional) Defaults to True.  If set to False, the
                             cur_vioses and prev_vioses will always be
                             unavailable.  This increases the speed for refresh.
+        :param prefetch: (Optional) Defaults to False.  If True, a background
+                         thread refreshes the metrics when the LTM publishes a
+                         new sample (about every refresh_delta seconds) and
+                         queries never refresh.  The thread ends when the
+                         cache goes out of scope, or on stop_prefetch.
+        :param history: (Optional) A pypowervm.tasks.monitor.history.
+                        MetricHistory for the host.  If specified, each new
+                        sample is recorded in it as the cache is refreshed.
         """
         # Ensure that the metric monitoring is enabled.
         ensure_ltm_monitors(adapter, host_uuid)
@@ -73,9 +93,15 @@ class MetricCache(object):
         self.host_uuid = host_uuid
         self.refresh_delta = datetime.timedelta(seconds=refresh_delta)
         self.include_vio = include_vio
+        self.history = history
 
         self.is_first_pass = False
 
+        # Held while the metrics are swapped in, so readers see a consistent
+        # snapshot.  Never held during REST calls.
+        self._lock = threading.RLock()
+        self._prefetch_stop = None
+
         # Ensure these elements are defined up front.
         self.cur_date, self.cur_phyp, self.cur_vioses, self.cur_lpars = (
             None, None, None, None)
@@ -85,8 +111,45 @@ class MetricCache(object):
         # Run a refresh up front.
         self._refresh_if_needed()
 
+        if prefetch:
+            self.start_prefetch()
+
+    def start_prefetch(self):
+        """Start refreshing the metrics in a background thread."""
+        with self._lock:
+            if self._prefetch_stop is not None:
+                return
+            self._prefetch_stop = threading.Event()
+            # The thread only holds a weak reference, so the cache can still
+            # go out of scope.
+            thread = threading.Thread(
+                target=_prefetch, name='MetricCache-%s' % self.host_uuid,
+                args=(weakref.ref(self), self._prefetch_stop))
+            thread.daemon = True
+            thread.start()
+
+    def stop_prefetch(self):
+        """Stop refreshing the metrics in the background."""
+        with self._lock:
+            if self._prefetch_stop is not None:
+                self._prefetch_stop.set()
+                self._prefetch_stop = None
+
+    @property
+    def prefetching(self):
+        return self._prefetch_stop is not None
+
+    def __del__(self):
+        stop = getattr(self, '_prefetch_stop', None)
+        if stop is not None:
+            stop.set()
+
     def _refresh_if_needed(self):
         """Refreshes the cache if needed."""
+        # When prefetching, the background thread keeps the cache fresh.
+        if self.prefetching:
+            return
+
         # The refresh is needed if the current date is none, or if the refresh
         # time delta has been crossed.
         refresh_needed = self.cur_date is None
@@ -101,24 +164,70 @@ class MetricCache(object):
         if not refresh_needed:
             return
 
-        self._set_prev()
-        self.cur_date, self.cur_phyp, self.cur_vioses, self.cur_lpars = (
-            latest_stats(self.adapter, self.host_uuid,
-                         include_vio=self.include_vio))
+        self._refresh()
 
-        # Have the class that is implementing the cache update its simplified
-        # representation of the data.  Ex. LparMetricCache
-        self._update_internal_metric()
+    def _refresh(self, only_new=False):
+        """Fetch the latest metrics and swap them in.
 
-    def _set_prev(self):
-        # On first boot, the cur data will be None.  Query to seed it with the
-        # second latest data (which may also still be none if LTM was just
-        # turned on, but just in case).
+        :param only_new: If True, and the LTM has not published a new sample
+                         since the last refresh, keep the current metrics.
+        :return: True if new metrics were swapped in; False otherwise.
+        """
+        # The REST calls are made without holding the lock, so readers are not
+        # blocked on them.
+        first_stats = None
+        if self.cur_date is None:
+            # On first boot, the cur data will be None.  Query to seed it with
+            # the second latest data (which may also still be none if LTM was
+            # just turned on, but just in case).
+            first_stats = latest_stats(self.adapter, self.host_uuid,
+                                       include_vio=self.include_vio,
+                                       second_latest=True)
+        stats = latest_stats(self.adapter, self.host_uuid,
+                             include_vio=self.include_vio)
+        new_time = _sample_time(stats[1])
+        if only_new and new_time is not None and (
+                new_time == _sample_time(self.cur_phyp)):
+            return False
+
+        with self._lock:
+            self._set_prev(first_stats=first_stats)
+            self.cur_date, self.cur_phyp, self.cur_vioses, self.cur_lpars = (
+                stats)
+
+            # Have the class that is implementing the cache update its
+            # simplified representation of the data.  Ex. LparMetricCache
+            self._update_internal_metric()
+            samples = ([(self.prev_phyp, self.prev_vioses, self.prev_lpars)]
+                       if self.is_first_pass else [])
+            samples.append(stats[1:])
+
+        if self.history is not None:
+            self._record_history(samples)
+        return True
+
+    def _record_history(self, samples):
+        """Record samples of (phyp, vioses, lpars) in the history."""
+        # The history ignores samples it already has.
+        for sample in samples:
+            try:
+                self.history.record(*sample)
+            except Exception as e:
+                # Losing history should not break the cache.
+                LOG.warning(_("Failed to record the metrics history of host "
+                              "%(host)s: %(err)s"),
+                            {'host': self.host_uuid, 'err': e})
+
+    def _set_prev(self, first_stats=None):
+        # On first boot, the cur data will be None.  Seed it with the second
+        # latest data, queried now if it was not provided.
         self.is_first_pass = self.cur_date is None
         if self.is_first_pass:
-            p_date, p_phyp, p_vioses, p_lpars = (
-                latest_stats(self.adapter, self.host_uuid,
-                             include_vio=self.include_vio, second_latest=True))
+            if first_stats is None:
+                first_stats = latest_stats(
+                    self.adapter, self.host_uuid,
+                    include_vio=self.include_vio, second_latest=True)
+            p_date, p_phyp, p_vioses, p_lpars = first_stats
             self.prev_date, self.prev_phyp = p_date, p_phyp
             self.prev_vioses, self.prev_lpars = p_vioses, p_lpars
         else:
@@ -134,6 +243,45 @@ class MetricCache(object):
         raise NotImplementedError()
 
 
+def _sample_time(phyp):
+    """The time stamp of a PhypInfo's sample, or None."""
+    if phyp is None or phyp.sample is None:
+        return None
+    return phyp.sample.time_stamp
+
+
+def _prefetch(cache_ref, stop):
+    """Background refresh loop for a MetricCache.
+
+    :param cache_ref: weakref to the MetricCache.
+    :param stop: threading.Event which ends the loop when set.
+    """
+    delay = None
+    while True:
+        cache = cache_ref()
+        if cache is None:
+            return
+        if delay is None:
+            delay = cache.refresh_delta.total_seconds()
+        host_uuid = cache.host_uuid
+        # Don't keep the cache alive while waiting.
+        del cache
+        if stop.wait(delay):
+            return
+        cache = cache_ref()
+        if cache is None:
+            return
+        try:
+            # If the LTM hasn't published the next sample yet, check again
+            # shortly; once it has, the one after is refresh_delta away.
+            delay = None if cache._refresh(only_new=True) else _PREFETCH_RETRY
+        except Exception as e:
+            LOG.warning(_("Failed to prefetch the metrics for host "
+                          "%(host)s: %(err)s"), {'host': host_uuid, 'err': e})
+            delay = _PREFETCH_RETRY
+        del cache
+
+
 class LparMetricCache(MetricCache):
     """Provides a cache of metrics on a per LPAR level.
 
@@ -167,7 +315,8 @@ class LparMetricCache(MetricCache):
     go out of scope and it will be cleared.  No manual clean up is required.
     """
 
-    def __init__(self, adapter, host_uuid, refresh_delta=30):
+    def __init__(self, adapter, host_uuid, refresh_delta=30, prefetch=False,
+                 history=None):
         """Creates an instance of the cache.
 
         :param adapter: The pypowervm Adapter.
@@ -178,6 +327,11 @@ class LparMetricCache(MetricCache):
                               interval has been passed and the user invokes a
                               cache query.  Will not update in the background,
                               only if the cache is used.
+        :param prefetch: (Optional) Defaults to False.  If True, the metrics
+                         are refreshed in the background instead (see
+                         MetricCache).
+        :param history: (Optional) A MetricHistory in which to record each
+                        new sample (see MetricCache).
         """
         # Ensure these elements are defined up front so that references don't
         # error out if they haven't been set yet.  These will be the results
@@ -186,7 +340,9 @@ class LparMetricCache(MetricCache):
 
         # Invoke the parent to seed the metrics.
         super(LparMetricCache, self).__init__(adapter, host_uuid,
-                                              refresh_delta=refresh_delta)
+                                              refresh_delta=refresh_delta,
+                                              prefetch=prefetch,
+                                              history=history)
 
     @lockutils.synchronized('pvm_lpar_metrics_get')
     def get_latest_metric(self, lpar_uuid):
@@ -215,11 +371,12 @@ class LparMetricCache(MetricCache):
         # Refresh if needed.  Will no-op if no refresh is required.
         self._refresh_if_needed()
 
-        # No metric, no operation.
-        if self.cur_metric is None:
-            return self.cur_date, None
+        with self._lock:
+            # No metric, no operation.
+            if self.cur_metric is None:
+                return self.cur_date, None
 
-        return self.cur_date, self.cur_metric.get(lpar_uuid)
+            return self.cur_date, self.cur_metric.get(lpar_uuid)
 
     @lockutils.synchronized('pvm_lpar_metrics_get')
     def get_previous_metric(self, lpar_uuid):
@@ -245,11 +402,12 @@ class LparMetricCache(MetricCache):
                  occur where the current metric may have a value but not the
                  previous (ex. when a LPAR was just created).
         """
-        # No metric, no operation.
-        if self.prev_metric is None:
-            return self.prev_date, None
+        with self._lock:
+            # No metric, no operation.
+            if self.prev_metric is None:
+                return self.prev_date, None
 
-        return self.prev_date, self.prev_metric.get(lpar_uuid)
+            return self.prev_date, self.prev_metric.get(lpar_uuid)
 
     def _update_internal_metric(self):
         if self.is_first_pass:
@@ -292,9 +450,6 @@ def latest_stats(adapter, host_uuid, include_vio=True, second_latest=False):
     if latest_phyp is None:
         return datetime.datetime.now(), None, None, None
 
-    phyp_json = adapter.read_by_href(latest_phyp.link, xag=[]).body
-    phyp_metric = phyp_mon.PhypInfo(phyp_json)
-
     # Now find the corresponding VIOS metrics for this.
     vios_ltms = []
     for metric in ltm_metrics:
@@ -304,16 +459,25 @@ def latest_stats(adapter, host_uuid, include_vio=True, second_latest=False):
 
         if metric.updated_datetime == latest_phyp.updated_datetime:
             vios_ltms.append(metric)
-
-    if include_vio:
-        vios_metrics = [vios_mon.ViosInfo(adapter.read_by_href(x.link).body)
-                        for x in vios_ltms]
-    else:
-        vios_metrics = []
-
-    # Now find the corresponding LPAR metrics for this.
-    lpar_metrics = get_lpar_metrics(ltm_metrics, adapter,
-                                    second_latest=second_latest)
+    if not include_vio:
+        vios_ltms = []
+
+    # The PHYP, VIOS and LPAR documents are independent: fetch them
+    # concurrently.
+    with tx.ContextThreadPoolExecutor(
+            max_workers=len(vios_ltms) + 2) as executor:
+        phyp_fut = executor.submit(
+            lambda: phyp_mon.PhypInfo(
+                adapter.read_by_href(latest_phyp.link, xag=[]).body))
+        vios_futs = [executor.submit(
+            lambda link: vios_mon.ViosInfo(adapter.read_by_href(link).body),
+            x.link) for x in vios_ltms]
+        # Now find the corresponding LPAR metrics for this.
+        lpar_fut = executor.submit(get_lpar_metrics, ltm_metrics, adapter,
+                                   second_latest=second_latest)
+    phyp_metric = phyp_fut.result()
+    vios_metrics = [fut.result() for fut in vios_futs]
+    lpar_metrics = lpar_fut.result()
 
     # Get the latest date, but if we're getting the second latest we know
     # it is 30 seconds old.  The 30 seconds is the cadence that the REST API
@@ -449,6 +613,8 @@ def vm_metrics(phyp, vioses, lpars):
                       "the metrics being recently initialized."))
         return {}
 
+    # Index the VIOS adapters once, rather than search them for each LPAR.
+    vios_index = lpar_mon.ViosStorageIndex(vioses)
     vm_data = {}
     for lpar_sample in phyp.sample.lpars:
         lpar_metric = lpar_mon.LparMetric(lpar_sample.uuid)
@@ -476,7 +642,7 @@ def vm_metrics(phyp, vioses, lpars):
             lpar_metric.storage = None
         else:
             lpar_metric.storage = lpar_mon.LparStorage(lpar_sample.storage,
-                                                       vioses)
+                                                       vios_index)
 
         vm_data[lpar_metric.uuid] = lpar_metric
     return vm_data
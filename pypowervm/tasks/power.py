@@ -170,9 +170,10 @@ class PowerOp(object):
                   "%(opts)s",
                   dict(lpar_nm=part.name, timeout=timeout,
                        synchronous=synchronous, opts=str(opts)))
-        # Run the Job, letting exceptions raise up.
+        # Run the Job, letting exceptions raise up.  The host is passed so the
+        # JobScheduler can limit concurrent power Jobs per managed system.
         jwrap.run_job(part.uuid, job_parms=opts.bld_jparms(), timeout=timeout,
-                      synchronous=synchronous)
+                      synchronous=synchronous, host_uuid=part.assoc_sys_uuid)
 
 
 def _legacy_power_opts(klass, add_parms):
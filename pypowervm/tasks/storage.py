@@ -16,16 +16,25 @@
 
 """Create, remove, map, unmap, and populate virtual storage objects."""
 
+import collections
 import contextlib
+import hashlib
+import heapq
+import itertools
 import math
+import mmap
 import os
+import stat
 import tempfile
 import threading
 import time
 
 from concurrent import futures
 from oslo_concurrency import lockutils as lock
+from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import units
+from six.moves import queue
 from taskflow import engines as tf_eng
 from taskflow.patterns import unordered_flow as tf_uf
 from taskflow import task as tf_tsk
@@ -39,6 +48,7 @@ from pypowervm.tasks import vfc_mapper as fm
 from pypowervm import util
 from pypowervm.utils import retry
 from pypowervm.utils import transaction as tx
+from pypowervm.wrappers import entry_wrapper as ewrap
 from pypowervm.wrappers import job
 from pypowervm.wrappers import logical_partition as lpar
 from pypowervm.wrappers import managed_system as sys
@@ -52,10 +62,9 @@ _RESCAN_VSTOR = 'RescanVirtualDisk'
 # Setup logging
 LOG = logging.getLogger(__name__)
 
-_LOCK_VOL_GRP = 'vol_grp_lock'
+CONF = cfg.CONF
 
-# Concurrent uploads
-_UPLOAD_SEM = threading.Semaphore(3)
+_LOCK_VOL_GRP = 'vol_grp_lock'
 
 
 class UploadType(object):
@@ -79,6 +88,276 @@ class UploadType(object):
     FUNC = 'delegate_function'
 
 
+class UploadPriority(object):
+    """Priority classes for uploads queued by the UploadScheduler."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class _UploadTicket(object):
+    """An upload's place in an UploadScheduler: first queued, then running."""
+    def __init__(self, scheduler, key, priority, size):
+        self._scheduler = scheduler
+        # (REST server, VIOS uuid)
+        self.key = key
+        self.priority = priority
+        self.size = size
+        self.queued_at = time.time()
+        self.started_at = None
+        self.run_time = None
+        self.released = False
+        self.dispatched = threading.Event()
+
+    def release(self, succeeded=False):
+        """Free the upload's slot, letting queued uploads run.  Idempotent.
+
+        :param succeeded: True if the upload completed successfully, so its
+                          size counts toward the throughput statistics.
+        """
+        self._scheduler._release(self, succeeded)
+
+
+class UploadScheduler(object):
+    """Limits the uploads running concurrently to each VIOS.
+
+    _upload_stream (and thus each of the upload_* methods) waits here for a
+    slot before sending the data.  An upload counts against the limit for its
+    (REST server, VIOS) pair and against the limit for its REST server.  When
+    an upload finishes, the next queued upload whose limits have room is
+    started: the highest UploadPriority first and, within a priority, the
+    oldest; or, with 'fifo' ordering, simply the oldest.
+
+    Obtain the process-wide UploadScheduler via UploadScheduler.get.  The
+    limits default to the pypowervm_upload_max_per_vios and
+    pypowervm_upload_max_per_server config options, and the ordering to
+    pypowervm_upload_ordering.  set_limit overrides the limit for one VIOS.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_per_vios=None, max_per_server=None, ordering=None):
+        """Create an UploadScheduler.
+
+        :param max_per_vios: Maximum number of uploads to run at once to any
+                             one VIOS through one REST server.  None uses the
+                             config option; 0 means no limit.
+        :param max_per_server: Maximum number of uploads to run at once
+                               through any one REST server.  None uses the
+                               config option; 0 means no limit.
+        :param ordering: 'priority' or 'fifo'.  None uses the config option.
+        """
+        def _dflt(val, opt):
+            return CONF[opt] if val is None else val
+        self.max_per_vios = _dflt(max_per_vios,
+                                  'pypowervm_upload_max_per_vios')
+        self.max_per_server = _dflt(max_per_server,
+                                    'pypowervm_upload_max_per_server')
+        self.ordering = _dflt(ordering, 'pypowervm_upload_ordering')
+        if self.ordering not in ('priority', 'fifo'):
+            raise ValueError(_("Invalid upload ordering '%s'.") %
+                             self.ordering)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # {(server, VIOS uuid): limit overriding max_per_vios}
+        self._limits = {}
+        # {server: {VIOS uuid: heap of (priority, seq, _UploadTicket)}}
+        self._queues = {}
+        # {(server, VIOS uuid): running uploads} and {server: running uploads}
+        self._running = collections.Counter()
+        self._running_by_server = collections.Counter()
+        # {(server, VIOS uuid): Counter of completed, failed, bytes, seconds}
+        self._done = collections.defaultdict(collections.Counter)
+        self._waits = collections.Counter()
+
+    @classmethod
+    def get(cls):
+        """Get the process-wide UploadScheduler."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def _key(adapter, vios_uuid):
+        return adapter.session.dest, vios_uuid
+
+    def set_limit(self, adapter, vios_uuid, limit):
+        """Override the number of concurrent uploads to one VIOS.
+
+        :param adapter: The Adapter for the REST server through which the
+                        uploads are sent.
+        :param vios_uuid: The UUID of the VIOS.
+        :param limit: Maximum number of uploads to run at once to the VIOS
+                      (0 means no limit), or None to revert to max_per_vios.
+        """
+        key = self._key(adapter, vios_uuid)
+        with self._lock:
+            if limit is None:
+                self._limits.pop(key, None)
+            else:
+                self._limits[key] = limit
+            self._dispatch(key[0])
+
+    def acquire(self, vio_file, priority=UploadPriority.NORMAL):
+        """Wait for a slot in which to upload a File.
+
+        :param vio_file: The File EntryWrapper of the upload.  Its adapter and
+                         vios_uuid identify the REST server and VIOS.
+        :param priority: UploadPriority value.  Ignored with 'fifo' ordering.
+        :return: A ticket, whose release method must be invoked when the
+                 upload is finished.
+        """
+        key = self._key(vio_file.adapter, vio_file.vios_uuid)
+        ticket = _UploadTicket(self, key, priority,
+                               vio_file.expected_file_size)
+        sort = priority if self.ordering == 'priority' else 0
+        with self._lock:
+            heapq.heappush(
+                self._queues.setdefault(key[0], {}).setdefault(key[1], []),
+                (sort, next(self._seq), ticket))
+            self._dispatch(key[0])
+        try:
+            ticket.dispatched.wait()
+        except BaseException:
+            # E.g. the waiting greenthread was killed: don't leave the ticket
+            # to take a slot no one will release.
+            self._withdraw(ticket)
+            raise
+        return ticket
+
+    def _withdraw(self, ticket):
+        """Remove a ticket from its queue, or release it if it has started."""
+        server, vios_uuid = ticket.key
+        with self._lock:
+            if ticket.started_at is None:
+                queues = self._queues.get(server, {})
+                heap = [item for item in queues.get(vios_uuid, [])
+                        if item[2] is not ticket]
+                heapq.heapify(heap)
+                if heap:
+                    queues[vios_uuid] = heap
+                else:
+                    queues.pop(vios_uuid, None)
+                if not queues:
+                    self._queues.pop(server, None)
+                ticket.released = True
+                return
+        # Dispatched before the lock was taken.
+        ticket.release()
+
+    def _has_room(self, key):
+        limit = self._limits.get(key, self.max_per_vios)
+        return limit <= 0 or self._running[key] < limit
+
+    def _server_has_room(self, server):
+        limit = self.max_per_server
+        return limit <= 0 or self._running_by_server[server] < limit
+
+    def _dispatch(self, server):
+        """Start the queued uploads to server that the limits allow.
+
+        Hold the lock.
+        """
+        queues = self._queues.get(server, {})
+        while queues and self._server_has_room(server):
+            heads = [heap[0] for vios_uuid, heap in queues.items()
+                     if self._has_room((server, vios_uuid))]
+            if not heads:
+                return
+            ticket = min(heads)[2]
+            heapq.heappop(queues[ticket.key[1]])
+            if not queues[ticket.key[1]]:
+                del queues[ticket.key[1]]
+            self._start(ticket)
+        if not queues:
+            self._queues.pop(server, None)
+
+    def _start(self, ticket):
+        ticket.started_at = time.time()
+        wait = ticket.started_at - ticket.queued_at
+        self._running[ticket.key] += 1
+        self._running_by_server[ticket.key[0]] += 1
+        self._waits['dispatched'] += 1
+        self._waits['total'] += wait
+        self._waits['max'] = max(self._waits['max'], wait)
+        ticket.dispatched.set()
+
+    def _release(self, ticket, succeeded):
+        with self._lock:
+            if ticket.released or ticket.started_at is None:
+                return
+            ticket.released = True
+            ticket.run_time = time.time() - ticket.started_at
+            self._running[ticket.key] -= 1
+            self._running_by_server[ticket.key[0]] -= 1
+            done = self._done[ticket.key]
+            if succeeded:
+                done['completed'] += 1
+                done['bytes'] += ticket.size or 0
+                done['seconds'] += ticket.run_time
+            else:
+                done['failed'] += 1
+            self._dispatch(ticket.key[0])
+
+    def stats(self):
+        """Queue-depth and throughput statistics.
+
+        :return: Dict of:
+            queued: Number of uploads waiting for a slot.
+            queued_by_priority: {UploadPriority value: number waiting}.
+            running: Number of uploads holding a slot.
+            completed, failed: Number of uploads which have finished
+                               successfully and unsuccessfully.
+            bytes: Size of the successfully completed uploads.
+            bytes_per_sec: Average rate of the successfully completed uploads.
+            wait_avg, wait_max: Average and maximum seconds an upload waited
+                                for a slot.
+            by_vios: {(REST server, VIOS uuid): dict of queued, running,
+                      limit, completed, failed, bytes and bytes_per_sec for
+                      the uploads to that VIOS}.
+        """
+        def _rate(done):
+            return done['bytes'] / done['seconds'] if done['seconds'] else 0.0
+
+        with self._lock:
+            by_prio = collections.Counter()
+            by_vios = {}
+            keys = set(key for key, num in self._running.items() if num)
+            keys.update(self._done)
+            for server, queues in self._queues.items():
+                for vios_uuid, heap in queues.items():
+                    keys.add((server, vios_uuid))
+                    by_prio.update(ticket.priority for _s, _q, ticket in heap)
+            for key in keys:
+                done = self._done.get(key, collections.Counter())
+                heap = self._queues.get(key[0], {}).get(key[1], [])
+                by_vios[key] = {
+                    'queued': len(heap),
+                    'running': self._running[key],
+                    'limit': self._limits.get(key, self.max_per_vios),
+                    'completed': done['completed'],
+                    'failed': done['failed'],
+                    'bytes': done['bytes'],
+                    'bytes_per_sec': _rate(done)}
+            total = collections.Counter()
+            for done in self._done.values():
+                total.update(done)
+            dispatched = self._waits['dispatched']
+            return {
+                'queued': sum(by_prio.values()),
+                'queued_by_priority': dict(by_prio),
+                'running': sum(self._running_by_server.values()),
+                'completed': total['completed'],
+                'failed': total['failed'],
+                'bytes': total['bytes'],
+                'bytes_per_sec': _rate(total),
+                'wait_avg': (self._waits['total'] / dispatched
+                             if dispatched else 0.0),
+                'wait_max': self._waits['max'],
+                'by_vios': by_vios}
+
+
 def _delete_vio_file(vio_file):
     """Try to delete a File artifact.
 
@@ -149,7 +428,8 @@ def _clean_out_bad_upload(adapter, vol_grp_uuid, v_uuid, n_vdisk, vio_file):
 
 def upload_new_vdisk(adapter, v_uuid, vol_grp_uuid, io_handle, d_name, f_size,
                      d_size=None, sha_chksum=None,
-                     upload_type=UploadType.IO_STREAM, file_format=None):
+                     upload_type=UploadType.IO_STREAM, file_format=None,
+                     priority=UploadPriority.NORMAL, pipeline=None):
     """Uploads a new virtual disk.
 
     :param adapter: The adapter to talk over the API.
@@ -170,6 +450,11 @@ def upload_new_vdisk(adapter, v_uuid, vol_grp_uuid, io_handle, d_name, f_size,
                         UploadType enumeration for valid upload mechanisms.
     :param file_format: (Optional) Format of file coming from io_handle.  See
                         stor.FileFormatType enumeration for valid formats.
+    :param priority: (Optional) UploadPriority with which the upload waits
+                     for a slot in the UploadScheduler.
+    :param pipeline: (Optional) UploadPipeline through which to stream the
+                     data.  If None, the data is read from io_handle as it is
+                     sent.
     :return: The first return value is the virtual disk that the file is
              uploaded into.
     :return: Normally the second return value will be None, indicating that the
@@ -200,7 +485,8 @@ def upload_new_vdisk(adapter, v_uuid, vol_grp_uuid, io_handle, d_name, f_size,
 
     try:
         # Run the upload
-        maybe_file = _upload_stream(vio_file, io_handle, upload_type)
+        maybe_file = _upload_stream(vio_file, io_handle, upload_type,
+                                    priority=priority, pipeline=pipeline)
     except Exception:
         _clean_out_bad_upload(adapter, vol_grp_uuid, v_uuid, n_vdisk, vio_file)
 
@@ -210,7 +496,8 @@ def upload_new_vdisk(adapter, v_uuid, vol_grp_uuid, io_handle, d_name, f_size,
 
 
 def upload_vopt(adapter, v_uuid, d_stream, f_name, f_size=None,
-                sha_chksum=None):
+                sha_chksum=None, priority=UploadPriority.NORMAL,
+                pipeline=None):
     """Upload a file/stream into a virtual media repository on the VIOS.
 
     :param adapter: The adapter to talk over the API.
@@ -222,6 +509,11 @@ def upload_vopt(adapter, v_uuid, d_stream, f_name, f_size=None,
                    for integrity checks.
     :param sha_chksum: (OPTIONAL) The SHA256 checksum for the file.  Useful for
                        integrity checks.
+    :param priority: (OPTIONAL) UploadPriority with which the upload waits
+                     for a slot in the UploadScheduler.
+    :param pipeline: (OPTIONAL) UploadPipeline through which to stream the
+                     data.  If None, the data is read from io_handle as it is
+                     sent.
     :return: The vOpt loaded into the media repository.  This is a reference,
              for use in scsi mappings.
     :return: Normally this method will return None, indicating that the disk
@@ -235,9 +527,11 @@ def upload_vopt(adapter, v_uuid, d_stream, f_name, f_size=None,
         adapter, f_name, vf.FileType.MEDIA_ISO, v_uuid, sha_chksum, f_size)
 
     if isinstance(d_stream, str):
-        f_wrap = _upload_file(vio_file, d_stream)
+        f_wrap = _upload_file(vio_file, d_stream, priority=priority,
+                              pipeline=pipeline)
     else:
-        f_wrap = _upload_stream(vio_file, d_stream, UploadType.IO_STREAM)
+        f_wrap = _upload_stream(vio_file, d_stream, UploadType.IO_STREAM,
+                                priority=priority, pipeline=pipeline)
 
     # Simply return a reference to this.
     reference = stor.VOptMedia.bld_ref(adapter, f_name)
@@ -247,7 +541,8 @@ def upload_vopt(adapter, v_uuid, d_stream, f_name, f_size=None,
 
 def upload_new_lu(v_uuid, ssp, io_handle, lu_name, f_size, d_size=None,
                   sha_chksum=None, return_ssp=False,
-                  upload_type=UploadType.IO_STREAM):
+                  upload_type=UploadType.IO_STREAM,
+                  priority=UploadPriority.NORMAL, pipeline=None):
     """Creates a new SSP Logical Unit and uploads an image to it.
 
     Note: return spec varies based on the return_ssp parameter:
@@ -278,6 +573,11 @@ def upload_new_lu(v_uuid, ssp, io_handle, lu_name, f_size, d_size=None,
     :param upload_type: (Optional, Default: IO_STREAM) Defines the way in
                         which the LU should be uploaded.  Refer to the
                         UploadType enumeration for valid upload mechanisms.
+    :param priority: (Optional) UploadPriority with which the upload waits
+                     for a slot in the UploadScheduler.
+    :param pipeline: (Optional) UploadPipeline through which to stream the
+                     data.  If None, the data is read from io_handle as it is
+                     sent.
     :return: If the return_ssp parameter is True, the first return value is the
              updated SSP EntryWrapper, containing the newly-created and
              -uploaded LU.  If return_ssp is False, this return value is absent
@@ -298,13 +598,15 @@ def upload_new_lu(v_uuid, ssp, io_handle, lu_name, f_size, d_size=None,
     ssp, new_lu = crt_lu(ssp, lu_name, gb_size, typ=stor.LUType.IMAGE)
 
     maybe_file = upload_lu(v_uuid, new_lu, io_handle, f_size,
-                           sha_chksum=sha_chksum, upload_type=upload_type)
+                           sha_chksum=sha_chksum, upload_type=upload_type,
+                           priority=priority, pipeline=pipeline)
 
     return (ssp, new_lu, maybe_file) if return_ssp else (new_lu, maybe_file)
 
 
 def upload_lu(v_uuid, lu, io_handle, f_size, sha_chksum=None,
-              upload_type=UploadType.IO_STREAM):
+              upload_type=UploadType.IO_STREAM,
+              priority=UploadPriority.NORMAL, pipeline=None):
     """Uploads a data stream to an existing SSP Logical Unit.
 
     :param v_uuid: The UUID of the Virtual I/O Server through which to perform
@@ -318,6 +620,11 @@ def upload_lu(v_uuid, lu, io_handle, f_size, sha_chksum=None,
     :param upload_type: (Optional, Default: IO_STREAM) Defines the way in
                         which the LU should be uploaded.  Refer to the
                         UploadType enumeration for valid upload mechanisms.
+    :param priority: (Optional) UploadPriority with which the upload waits
+                     for a slot in the UploadScheduler.
+    :param pipeline: (Optional) UploadPipeline through which to stream the
+                     data.  If None, the data is read from io_handle as it is
+                     sent.
     :return: Normally the return value will be None, indicating that the image
              was uploaded without issue.  If for some reason the File metadata
              for the VIOS was not cleaned up, the return value is the LU
@@ -330,15 +637,21 @@ def upload_lu(v_uuid, lu, io_handle, f_size, sha_chksum=None,
         lu.adapter, lu.name, vf.FileType.DISK_IMAGE, v_uuid, f_size=f_size,
         tdev_udid=lu.udid, sha_chksum=sha_chksum)
 
-    return _upload_stream(vio_file, io_handle, upload_type)
+    return _upload_stream(vio_file, io_handle, upload_type, priority=priority,
+                          pipeline=pipeline)
 
 
-def _upload_file(vio_file, path):
+def _upload_file(vio_file, path, priority=UploadPriority.NORMAL,
+                 pipeline=None):
     """Upload a file by its path
 
     :param vio_file: The File EntryWrapper representing the metadata for the
                      file.
     :param path: The path as a string to the file to be uploaded.
+    :param priority: UploadPriority with which the upload waits for a slot in
+                     the UploadScheduler.
+    :param pipeline: UploadPipeline through which to stream the data, or None
+                     to read it from the file as it is sent.
     :return: Returns None if file upload is successful. Otherwise returns the
              File EntryWrapper if the File metadata was not cleaned up.
     """
@@ -348,7 +661,8 @@ def _upload_file(vio_file, path):
         try:
             with open(path, 'rb') as d_stream:
                 f_wrap = _upload_stream(vio_file, d_stream,
-                                        UploadType.IO_STREAM)
+                                        UploadType.IO_STREAM,
+                                        priority=priority, pipeline=pipeline)
             break
         except Exception:
             if i < 3:
@@ -360,7 +674,8 @@ def _upload_file(vio_file, path):
     return f_wrap
 
 
-def _upload_stream(vio_file, io_handle, upload_type):
+def _upload_stream(vio_file, io_handle, upload_type,
+                   priority=UploadPriority.NORMAL, pipeline=None):
     """Upload a file stream and clean up the metadata afterward.
 
     When files are uploaded to either VIOS or the PowerVM management
@@ -383,6 +698,10 @@ def _upload_stream(vio_file, io_handle, upload_type):
     :param upload_type: Defines the way in which the element should be
                         uploaded.  Refer to the UploadType enumeration for
                         valid upload mechanisms.
+    :param priority: UploadPriority with which the upload waits for a slot in
+                     the UploadScheduler.
+    :param pipeline: UploadPipeline through which to stream the data, or None
+                     to read it from io_handle as it is sent.
     :return: Normally this method will return None, indicating that the disk
              and image were uploaded without issue.  If for some reason the
              File metadata for the VIOS was not cleaned up, the return value
@@ -394,17 +713,20 @@ def _upload_stream(vio_file, io_handle, upload_type):
     if upload_type == UploadType.IO_STREAM_BUILDER:
         io_handle, upload_type = io_handle(), UploadType.IO_STREAM
 
+    ticket = None
     try:
-        # Acquire the upload semaphore
-        _UPLOAD_SEM.acquire()
+        # Wait for a slot to upload to this VIOS
+        ticket = UploadScheduler.get().acquire(vio_file, priority=priority)
 
-        start = time.time()
         # Upload the file directly to the REST API server.
-        _upload_stream_api(vio_file, io_handle, upload_type)
-        LOG.debug("Upload took %.2fs", time.time() - start)
+        _upload_stream_api(vio_file, io_handle, upload_type,
+                           pipeline=pipeline)
+        ticket.release(succeeded=True)
+        LOG.debug("Upload took %.2fs", ticket.run_time)
     finally:
-        # Must release the semaphore
-        _UPLOAD_SEM.release()
+        # Must release the slot.  (No-op if the upload succeeded.)
+        if ticket is not None:
+            ticket.release()
 
         # Allow the exception to be raised up...if there was one.
         ret_vio = _delete_vio_file(vio_file)
@@ -453,14 +775,191 @@ def _rest_api_pipe(file_writer):
             os.rmdir(temp_dir)
 
 
-def _upload_stream_api(vio_file, io_handle, upload_type):
+class UploadPipeline(object):
+    """Streams an upload through a read-ahead buffer, checksumming it.
+
+    Pass an UploadPipeline as the pipeline argument of the upload_* methods
+    to have a background thread read the data ahead of the network, in large
+    chunks, into a bounded buffer.  A regular file is read through mmap rather
+    than in successive read() calls.
+
+    The SHA256 checksum of the data is computed as it is read.  If the upload
+    was given a sha_chksum, the data sent is verified against it, and
+    UploadChecksumMismatch raised if they differ.  (The File metadata is
+    created before the upload, so the computed checksum can't be sent to the
+    server in its place.)
+
+    After the upload, sha256 is the hex digest of the data sent, and stats()
+    tells whether the upload was waiting on its source or on the network.  An
+    UploadPipeline may be reused for successive uploads; each resets it.
+    """
+    def __init__(self, chunk_size=4 * units.Mi, depth=4, progress=None,
+                 progress_interval=1.0):
+        """Create an UploadPipeline.
+
+        :param chunk_size: Number of bytes to read (and send) at a time.
+        :param depth: Maximum number of chunks to read ahead of the network.
+        :param progress: Callable invoked with the stats() dict as the upload
+                         proceeds, and once more when it is done.
+        :param progress_interval: Minimum seconds between progress calls.
+        """
+        self.chunk_size = chunk_size
+        self.depth = depth
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.sha256 = None
+        self._reset(None)
+
+    def _reset(self, total):
+        self.sha256 = None
+        self._sha = hashlib.sha256()
+        self._total = total
+        self._start = time.time()
+        self._end = None
+        self._reported = self._start
+        self._times = collections.Counter()
+        self._bytes = 0
+
+    def stats(self):
+        """Progress and timing of the current (or last) upload.
+
+        :return: Dict of:
+            bytes: Number of bytes sent.
+            total: Expected number of bytes, if known; otherwise None.
+            elapsed: Seconds since the upload started.
+            bytes_per_sec: Average rate of the upload.
+            read_time: Seconds spent reading (and checksumming) the source.
+            source_wait: Seconds the network waited for data from the source.
+            sink_wait: Seconds the read-ahead waited for the network, with
+                       the buffer full.
+            done: True if all the data was sent.
+            sha256: Hex digest of the data, once done; otherwise None.
+        """
+        elapsed = (self._end or time.time()) - self._start
+        return {'bytes': self._bytes,
+                'total': self._total,
+                'elapsed': elapsed,
+                'bytes_per_sec': self._bytes / elapsed if elapsed else 0.0,
+                'read_time': self._times['read'],
+                'source_wait': self._times['source_wait'],
+                'sink_wait': self._times['sink_wait'],
+                'done': self._end is not None,
+                'sha256': self.sha256}
+
+    def _report(self, force=False):
+        if self.progress is None:
+            return
+        now = time.time()
+        if force or now - self._reported >= self.progress_interval:
+            self._reported = now
+            self.progress(self.stats())
+
+    @staticmethod
+    def _regular_file(io_handle):
+        """The (fileno, size) of a regular file io_handle, else None."""
+        try:
+            fileno = io_handle.fileno()
+            fstat = os.fstat(fileno)
+        except Exception:
+            return None
+        if not stat.S_ISREG(fstat.st_mode) or fstat.st_size == 0:
+            return None
+        return fileno, fstat.st_size
+
+    def _chunks(self, io_handle):
+        """Generate the chunks of data in io_handle."""
+        regular = self._regular_file(io_handle)
+        if regular is not None:
+            fileno, size = regular
+            pos = io_handle.tell()
+            mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            try:
+                if hasattr(mapped, 'madvise'):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                for offset in range(pos, size, self.chunk_size):
+                    yield mapped[offset:offset + self.chunk_size]
+            finally:
+                mapped.close()
+            # Leave the file where read() would have.
+            io_handle.seek(size)
+        elif hasattr(io_handle, 'read'):
+            while True:
+                chunk = io_handle.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            for chunk in io_handle:
+                yield chunk
+
+    def _read_ahead(self, io_handle, buf, stop):
+        """Read io_handle into buf, ending with None.  Runs on a thread."""
+        chunks = self._chunks(io_handle)
+        try:
+            while not stop.is_set():
+                start = time.time()
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    self._sha.update(chunk)
+                self._times['read'] += time.time() - start
+                if chunk is None:
+                    break
+                start = time.time()
+                buf.put(chunk)
+                self._times['sink_wait'] += time.time() - start
+        finally:
+            chunks.close()
+            buf.put(None)
+
+    def stream(self, io_handle, total=None):
+        """Generate the chunks of io_handle, read ahead on a thread.
+
+        :param io_handle: A readable stream (or an iterable of chunks).
+        :param total: Expected number of bytes, for progress reporting.
+        """
+        self._reset(total)
+        buf = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        with futures.ThreadPoolExecutor(1) as th_pool:
+            reader = th_pool.submit(self._read_ahead, io_handle, buf, stop)
+            try:
+                while True:
+                    start = time.time()
+                    chunk = buf.get()
+                    self._times['source_wait'] += time.time() - start
+                    if chunk is None:
+                        break
+                    self._bytes += len(chunk)
+                    self._report()
+                    yield chunk
+                # Raise anything the reader raised.
+                reader.result()
+                self._end = time.time()
+                self.sha256 = self._sha.hexdigest()
+                self._report(force=True)
+            finally:
+                # If the upload stopped early, unblock the reader.
+                stop.set()
+                while not reader.done():
+                    try:
+                        buf.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+
+def _upload_stream_api(vio_file, io_handle, upload_type, pipeline=None):
+    def _source(stream):
+        if pipeline is None:
+            return stream
+        return pipeline.stream(stream, total=vio_file.expected_file_size)
+
     # If using a FUNCtion-based upload remotely, we have to make that function
     # (which is passed in as io_handle) think it's writing to a local file.  We
     # spoof this with _RestApiPipe, which uses a fifo (named pipe) that it
     # populates from d_stream in a separate thread.
     if upload_type == UploadType.FUNC:
         with _rest_api_pipe(io_handle) as in_stream:
-            vio_file.adapter.upload_file(vio_file.element, in_stream)
+            vio_file.adapter.upload_file(vio_file.element, _source(in_stream))
     else:
         # We don't want to use the VIOS retry mechanism here.
         helpers = vio_file.adapter.helpers
@@ -469,8 +968,24 @@ def _upload_stream_api(vio_file, io_handle, upload_type):
         except ValueError:
             pass
         # io_handle is already an open, readable stream
-        vio_file.adapter.upload_file(vio_file.element, io_handle,
+        vio_file.adapter.upload_file(vio_file.element, _source(io_handle),
                                      helpers=helpers)
+    if pipeline is not None:
+        _verify_chksum(vio_file, pipeline)
+
+
+def _verify_chksum(vio_file, pipeline):
+    """Compare the data streamed by pipeline to vio_file's sha_chksum, if any.
+
+    :raise UploadChecksumMismatch: If the checksums differ.
+    """
+    expected = vio_file.sha_chksum
+    if not expected or pipeline.sha256 is None:
+        return
+    if expected.lower() != pipeline.sha256:
+        raise exc.UploadChecksumMismatch(file_name=vio_file.file_name,
+                                         actual=pipeline.sha256,
+                                         expected=expected)
 
 
 def _create_file(adapter, f_name, f_type, v_uuid, sha_chksum=None, f_size=None,
@@ -537,6 +1052,147 @@ def crt_lu_linked_clone(ssp, cluster, src_lu, new_lu_name, lu_size_gb=0):
     return ssp, dst_lu
 
 
+class LUIndex(object):
+    """Index of the LUs in an SSP or Tier: by UDID, by name and by clone.
+
+    Build an LUIndex once from a list of LUs (e.g. SSP.logical_units or the
+    LUEnt feed of a Tier) to find LUs, resolve linked clones to their Image
+    LUs, and count the clones of each Image LU, each in constant time rather
+    than by scanning the list.  LUs removed via the remove method leave the
+    index at once, and the list when flush is invoked.
+    """
+    def __init__(self, lus):
+        """Index a list of LUs.
+
+        :param lus: List of LUs (LU or LUEnt) to index.  They must have UDIDs
+                    (i.e. must have been retrieved from the server, not
+                    created locally).
+        """
+        self.lus = lus
+        # {udid: [LU, ...]}.  More than one is an error, raised on removal.
+        self._by_udid = collections.defaultdict(list)
+        self._by_name = collections.defaultdict(list)
+        # {udid sans type prefix: Image LU}
+        self._images = collections.OrderedDict()
+        # {Image LU udid sans type prefix: number of Disk LUs cloned from it}
+        self._clones = collections.Counter()
+        # Disk LUs with no backing Image LU, warned of by image_in_use.
+        self._unbacked = []
+        self._removed = []
+        for lu in lus:
+            self._by_udid[lu.udid].append(lu)
+            self._by_name[lu.name].append(lu)
+            if lu.lu_type == stor.LUType.IMAGE and lu.udid:
+                self._images.setdefault(self._key(lu.udid), lu)
+            elif lu.lu_type == stor.LUType.DISK:
+                if lu.cloned_from_udid is None:
+                    self._unbacked.append(lu)
+                else:
+                    self._clones[self._key(lu.cloned_from_udid)] += 1
+
+    @staticmethod
+    def _key(udid):
+        # When comparing udid/cloned_from_udid, disregard the 2-digit 'type'
+        # prefix.
+        return udid[2:]
+
+    def by_udid(self, udid):
+        """The LU with the specified UDID, or None if there is none."""
+        matches = self._by_udid.get(udid)
+        return matches[0] if matches else None
+
+    def by_name(self, name):
+        """List of the LUs with the specified name."""
+        return list(self._by_name.get(name, []))
+
+    def image_for_clone(self, clone_lu):
+        """Find the Image LU to which a Disk LU linked clone is linked.
+
+        :param clone_lu: The LU representing the Disk LU linked clone.
+        :return: The Image LU backing the clone_lu.  None if no such Image LU
+                 can be found.
+        """
+        # Check if the clone never happened
+        if clone_lu.cloned_from_udid is None:
+            return None
+        return self._images.get(self._key(clone_lu.cloned_from_udid))
+
+    def clone_count(self, image_lu):
+        """The number of Disk LU linked clones backed by an Image LU."""
+        return self._clones[self._key(image_lu.udid)]
+
+    def image_in_use(self, image_lu):
+        """Determine whether an Image LU still has any Disk LU linked clones.
+
+        :param image_lu: LU representing the Image LU.
+        :return: True if the index contains any Disk LU linked clones backed
+                 by the image_lu; False otherwise.
+        """
+        for lu in self._unbacked:
+            LOG.warning(
+                _("Disk Logical Unit %(luname)s has no backing image LU.  "
+                  "(UDID: %(udid)s) "), {'luname': lu.name, 'udid': lu.udid})
+        self._unbacked = []
+        return self.clone_count(image_lu) > 0
+
+    def orphan_images(self):
+        """List of the Image LUs which have no Disk LU linked clones."""
+        return [lu for key, lu in self._images.items()
+                if not self._clones[key]]
+
+    def remove(self, dev):
+        """Use UDID matching to remove an LU from the index.
+
+        The LU is removed from the underlying list when flush is invoked.
+
+        :param dev: The LU to remove.  It may originate from somewhere other
+                    than the indexed list (e.g. a VSCSI mapping's
+                    backing_storage).
+        :return: The LU removed, as it existed in the indexed list.  None if
+                 the LU was not found by UDID.
+        :raise FoundDevMultipleTimes: If the list has several LUs with the
+                                      UDID.
+        """
+        if not dev.udid:
+            LOG.warning(_("Ignoring device because it lacks a UDID:\n%s"),
+                        dev.toxmlstring(pretty=True))
+            return None
+
+        matches = self._by_udid.get(dev.udid)
+        if not matches:
+            LOG.warning(_("Device %s not found in list."), dev.name)
+            return None
+        if len(matches) > 1:
+            raise exc.FoundDevMultipleTimes(devname=dev.name,
+                                            count=len(matches))
+
+        LOG.debug("Removing %s from devlist.", dev.name)
+        match = matches[0]
+        del self._by_udid[dev.udid]
+        self._by_name[match.name].remove(match)
+        if match.lu_type == stor.LUType.IMAGE:
+            if self._images.get(self._key(match.udid)) is match:
+                del self._images[self._key(match.udid)]
+        elif match.lu_type == stor.LUType.DISK:
+            if match.cloned_from_udid is not None:
+                self._clones[self._key(match.cloned_from_udid)] -= 1
+        self._removed.append(match)
+        return match
+
+    def flush(self):
+        """Remove the LUs removed from the index from the underlying list."""
+        removed, self._removed = self._removed, []
+        if not removed:
+            return
+        if isinstance(self.lus, ewrap.WrapperElemList):
+            # Removing the very element is cheap.
+            for lu in removed:
+                self.lus.remove(lu)
+        else:
+            removed = set(id(lu) for lu in removed)
+            self.lus[:] = [lu for lu in self.lus if id(lu) not in removed]
+
+
 def _image_lu_for_clone(lus, clone_lu):
     """Given a Disk LU linked clone, find the Image LU to which it is linked.
 
@@ -546,17 +1202,7 @@ def _image_lu_for_clone(lus, clone_lu):
     :return: The LU EntryWrapper representing the Image LU backing the
              clone_lu.  None if no such Image LU can be found.
     """
-    # Check if the clone never happened
-    if clone_lu.cloned_from_udid is None:
-        return None
-    # When comparing udid/cloned_from_udid, disregard the 2-digit 'type' prefix
-    image_udid = clone_lu.cloned_from_udid[2:]
-    for lu in lus:
-        if lu.lu_type != stor.LUType.IMAGE:
-            continue
-        if lu.udid[2:] == image_udid:
-            return lu
-    return None
+    return LUIndex(lus).image_for_clone(clone_lu)
 
 
 def _image_lu_in_use(lus, image_lu):
@@ -569,20 +1215,7 @@ def _image_lu_in_use(lus, image_lu):
     :return: True if the SSP contains any Disk LU linked clones backed by the
              image_lu; False otherwise.
     """
-    # When comparing udid/cloned_from_udid, disregard the 2-digit 'type' prefix
-    image_udid = image_lu.udid[2:]
-    for lu in lus:
-        if lu.lu_type != stor.LUType.DISK:
-            continue
-        cloned_from = lu.cloned_from_udid
-        if cloned_from is None:
-            LOG.warning(
-                _("Disk Logical Unit %(luname)s has no backing image LU.  "
-                  "(UDID: %(udid)s) "), {'luname': lu.name, 'udid': lu.udid})
-            continue
-        if cloned_from[2:] == image_udid:
-            return True
-    return False
+    return LUIndex(lus).image_in_use(image_lu)
 
 
 def find_vg(adapter, vg_name, vios_name=None):
@@ -823,7 +1456,9 @@ def crt_lu(tier_or_ssp, name, size, thin=None, typ=None, clone=None):
     :param typ: The type of LU to create, one of the LUType values.  If
                 unspecified, use the server default.
     :param clone: If the new LU is to be a linked clone, this param is a
-                  LU(Ent) wrapper representing the backing image LU.
+                  LU(Ent) wrapper representing the backing image LU.  To
+                  create many linked clones of one image, use
+                  crt_lu_linked_clones.
     :return: If the tier_or_ssp argument is an SSP, the updated SSP wrapper
              (containing the new LU and with a new etag) is returned.
              Otherwise, the first return value is the Tier.
@@ -843,17 +1478,121 @@ def crt_lu(tier_or_ssp, name, size, thin=None, typ=None, clone=None):
     return tier_or_ssp, lu
 
 
+class CloneSpec(collections.namedtuple('CloneSpec', 'name size')):
+    """One linked clone LU to be created by crt_lu_linked_clones."""
+    def __new__(cls, name, size=0):
+        """Create a CloneSpec.
+
+        :param name: Name for the new Logical Unit.
+        :param size: LU size in GB with decimal precision.  If this is not
+                     specified or is smaller than the size of the image LU,
+                     the size of the image LU is used.
+        """
+        return super(CloneSpec, cls).__new__(cls, name, size)
+
+
+# The result of one CloneSpec: the new LUEnt, or the exception which prevented
+# its creation.
+CloneResult = collections.namedtuple('CloneResult', 'spec lu error')
+
+# {(REST server, Tier UUID): BoundedSemaphore}
+_TIER_CLONE_SEMS = {}
+_TIER_CLONE_SEMS_LOCK = threading.Lock()
+
+
+def _tier_clone_sem(tier):
+    """The semaphore limiting concurrent clone creates on a Tier, or None."""
+    limit = CONF.pypowervm_lu_clone_max_per_tier
+    if limit <= 0:
+        return None
+    key = (tier.adapter.session.dest, tier.uuid)
+    with _TIER_CLONE_SEMS_LOCK:
+        if key not in _TIER_CLONE_SEMS:
+            _TIER_CLONE_SEMS[key] = threading.BoundedSemaphore(limit)
+        return _TIER_CLONE_SEMS[key]
+
+
+def crt_lu_linked_clones(tier_or_ssp, src_lu, clone_specs):
+    """Create many thin Disk LUs as linked clones of one backing image LU.
+
+    The LUs are created concurrently, up to pypowervm_lu_clone_max_per_tier
+    at a time on the Tier (across all callers in this process).  Unlike
+    repeated calls to crt_lu, the default Tier is looked up and the SSP
+    refreshed only once.
+
+    A failure to create one LU does not prevent the creation of the others;
+    the caller should inspect the error of each result.
+
+    :param tier_or_ssp: Tier or SSP EntryWrapper denoting the Tier or Shared
+                        Storage Pool on which to create the LUs.  If an SSP is
+                        supplied, the LUs are created on the default Tier.
+    :param src_lu: The LU ElementWrapper or LUEnt EntryWrapper representing the
+                   backing image LU.
+    :param clone_specs: Iterable of CloneSpec, (name, size) tuples, or names of
+                        the LUs to create.
+    :return: If the tier_or_ssp argument is an SSP, the SSP wrapper, refreshed
+             once all the LUs have been created, if any was.  Otherwise, the
+             first return value is the Tier.
+    :return: List of CloneResult, in the order of clone_specs.
+    """
+    specs = [CloneSpec(*spec) if isinstance(spec, tuple) else CloneSpec(spec)
+             for spec in clone_specs]
+    if not specs:
+        return tier_or_ssp, []
+    is_ssp = isinstance(tier_or_ssp, stor.SSP)
+    tier = default_tier_for_ssp(tier_or_ssp) if is_ssp else tier_or_ssp
+    sem = _tier_clone_sem(tier)
+    workers = CONF.pypowervm_lu_clone_max_per_tier or len(specs)
+
+    def _create(spec):
+        if sem is not None:
+            sem.acquire()
+        try:
+            lu = stor.LUEnt.bld(tier_or_ssp.adapter, spec.name, spec.size,
+                                thin=True, typ=stor.LUType.DISK, clone=src_lu)
+            return CloneResult(spec, lu.create(parent=tier), None)
+        except Exception as e:
+            LOG.warning(_("Failed to create linked clone LU %(lu_name)s of "
+                          "Image LU %(img_name)s: %(error)s"),
+                        {'lu_name': spec.name, 'img_name': src_lu.name,
+                         'error': e})
+            return CloneResult(spec, None, e)
+        finally:
+            if sem is not None:
+                sem.release()
+
+    with tx.ContextThreadPoolExecutor(min(workers, len(specs))) as executor:
+        results = list(executor.map(_create, specs))
+
+    created = sum(1 for result in results if result.error is None)
+    msgargs = {'created': created, 'total': len(specs),
+               'img_name': src_lu.name}
+    LOG.info(_("Created %(created)d of %(total)d linked clones of Image LU "
+               "%(img_name)s."), msgargs)
+    if is_ssp and created:
+        # Refresh the SSP to pick up the new LUs and etag
+        tier_or_ssp = tier_or_ssp.refresh()
+
+    return tier_or_ssp, results
+
+
 def _rm_lus(all_lus, lus_to_rm, del_unused_images=True):
+    # Index the LUs once, rather than scanning them for each LU removed.
+    index = LUIndex(all_lus)
     changes = []
-    backing_images = set()
+    # {udid: Image LU}
+    backing_images = collections.OrderedDict()
 
     for lu in lus_to_rm:
         # Is it a linked clone?  (We only care if del_unused_images.)
         if del_unused_images and lu.lu_type == stor.LUType.DISK:
-            # Note: This can add None to the set
-            backing_images.add(_image_lu_for_clone(all_lus, lu))
+            back_img = index.image_for_clone(lu)
+            # Ignore None, which could appear if a clone existed with no
+            # backing image.
+            if back_img is not None:
+                backing_images[back_img.udid] = back_img
         msgargs = {'lu_name': lu.name, 'lu_udid': lu.udid}
-        removed = _rm_dev_by_udid(lu, all_lus)
+        removed = index.remove(lu)
         if removed:
             LOG.debug(_("Removing LU %(lu_name)s (UDID %(lu_udid)s)"), msgargs)
             changes.append(removed)
@@ -864,18 +1603,14 @@ def _rm_lus(all_lus, lus_to_rm, del_unused_images=True):
 
     # Now remove any unused backing images.  This set will be empty if
     # del_unused_images=False
-    for back_img in backing_images:
-        # Ignore None, which could have appeared if a clone existed with no
-        # backing image.
-        if back_img is None:
-            continue
+    for back_img in backing_images.values():
         msgargs = {'lu_name': back_img.name, 'lu_udid': back_img.udid}
         # Only remove backing images that are not in use.
-        if _image_lu_in_use(all_lus, back_img):
+        if index.image_in_use(back_img):
             LOG.debug("Not removing Image LU %(lu_name)s because it is still "
                       "in use.  (UDID: %(lu_udid)s)", msgargs)
         else:
-            removed = _rm_dev_by_udid(back_img, all_lus)
+            removed = index.remove(back_img)
             if removed:
                 LOG.info(_("Removing Image LU %(lu_name)s because it is no "
                            "longer in use.  (UDID: %(lu_udid)s)"), msgargs)
@@ -884,6 +1619,7 @@ def _rm_lus(all_lus, lus_to_rm, del_unused_images=True):
                 # This would be wildly unexpected
                 LOG.warning(_("Backing LU %(lu_name)s was not found.  "
                               "(UDID: %(lu_udid)s)"), msgargs)
+    index.flush()
     return changes
 
 
@@ -0,0 +1,247 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import fixtures
+import functools
+import threading
+import time
+
+import mock
+import testtools
+
+import pypowervm.adapter as adp
+import pypowervm.exceptions as pvmex
+from pypowervm.helpers import rate_limit
+from pypowervm.tests.test_utils import pvmhttp
+
+HTTPRESP_FILE = "fake_httperror.txt"
+HTTPRESP_SA_FILE = "fake_httperror_service_unavail.txt"
+
+MS_PATH = '/rest/api/uom/ManagedSystem/MS-UUID'
+VIOS_PATH = MS_PATH + '/VirtualIOServer/VIOS-UUID'
+
+
+class TestRateLimitHelper(testtools.TestCase):
+
+    def setUp(self):
+        super(TestRateLimitHelper, self).setUp()
+        self.vios_busy = pvmex.Error('busy', response=pvmhttp.load_pvm_resp(
+            HTTPRESP_FILE).response)
+        self.unavail = pvmex.Error('unavail', response=pvmhttp.load_pvm_resp(
+            HTTPRESP_SA_FILE).response)
+        self.sess = mock.Mock()
+        # The helper's clock
+        self.now = 1000.0
+        self.useFixture(fixtures.MockPatch(
+            'pypowervm.helpers.rate_limit.time')).mock.time.side_effect = (
+            lambda: self.now)
+
+    def _adapter(self, **kwargs):
+        self.limiter = rate_limit.RateLimiter(**kwargs)
+        return adp.Adapter(self.sess, helpers=functools.partial(
+            rate_limit.rate_limit_helper, limiter=self.limiter))
+
+    def _stats(self, kind='VirtualIOServer', ident='vios-uuid'):
+        return self.limiter.stats()[(kind, ident)]
+
+    def test_gates(self):
+        limiter = rate_limit.RateLimiter()
+        self.assertEqual(
+            ['VirtualIOServer vios-uuid', 'ManagedSystem ms-uuid',
+             'REST server localhost'],
+            [gate.name for gate in limiter.gates(VIOS_PATH + '/ClientNetwork'
+                                                 'Adapter?group=None')])
+        self.assertEqual(['ManagedSystem ms-uuid', 'REST server localhost'],
+                         [gate.name for gate in limiter.gates(
+                             MS_PATH + '/VirtualIOServer')])
+        lpar_href = 'https://host:12443/rest/api/uom/LogicalPartition'
+        self.assertEqual(['REST server host:12443'],
+                         [gate.name for gate in limiter.gates(lpar_href)])
+        # Gates are shared
+        self.assertIs(limiter.gates(MS_PATH)[0],
+                      limiter.gates(VIOS_PATH)[1])
+        # The default limiter is used by default
+        with mock.patch.object(rate_limit.DEFAULT_LIMITER, 'gates') as gates:
+            gates.side_effect = ValueError
+            self.assertRaises(ValueError, adp.Adapter(
+                self.sess, helpers=rate_limit.rate_limit_helper)._request,
+                'GET', MS_PATH)
+
+    def test_server_per_session(self):
+        """Adapters on different REST servers get their own server gates."""
+        class _Session(object):
+            def __init__(self, dest, resp):
+                self.dest = dest
+                self.resp = resp
+
+            def request(self, method, path, **kwds):
+                if isinstance(self.resp, Exception):
+                    raise self.resp
+                return self.resp
+
+        limiter = rate_limit.RateLimiter(trip_threshold=1, fail_fast=True)
+        sess1 = _Session('https://host1:12443', self.unavail)
+        sess2 = _Session('https://host2:12443', 'resp')
+        adpt1, adpt2 = [adp.Adapter(sess, helpers=functools.partial(
+            rate_limit.rate_limit_helper, limiter=limiter))
+            for sess in (sess1, sess2)]
+        lpar_path = '/rest/api/uom/LogicalPartition'
+        # host1 is busy: its circuit opens.
+        self.assertRaises(pvmex.Error, adpt1._request, 'GET', lpar_path)
+        self.assertRaises(pvmex.RequestThrottled, adpt1._request, 'GET',
+                          lpar_path)
+        # host2 is unaffected.
+        self.assertEqual('resp', adpt2._request('GET', lpar_path))
+        stats = limiter.stats()
+        self.assertEqual(rate_limit.OPEN,
+                         stats[('server', sess1.dest)]['state'])
+        self.assertEqual(rate_limit.CLOSED,
+                         stats[('server', sess2.dest)]['state'])
+        self.assertNotIn(('server', ''), stats)
+
+        # The server may also be given explicitly.
+        helper = rate_limit.rate_limit_helper(mock.Mock(), limiter=limiter,
+                                              server='https://host3:12443')
+        helper('GET', lpar_path)
+        self.assertIn(('server', 'https://host3:12443'), limiter.stats())
+
+    def test_aimd(self):
+        adpt = self._adapter(initial_limit=4, max_limit=5,
+                             decrease_interval=0)
+        self.sess.request.return_value = 'resp'
+        self.assertEqual('resp', adpt._request('GET', VIOS_PATH))
+        # Additive increase on success
+        self.assertEqual(4.25, self.limiter.gates(VIOS_PATH)[0].limit)
+        for i in range(10):
+            adpt._request('GET', VIOS_PATH)
+        # ...up to the max
+        self.assertEqual(5, self._stats()['limit'])
+
+        # Multiplicative decrease when busy - charged to the VIOS only
+        self.sess.request.side_effect = self.vios_busy
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(2, self._stats()['limit'])
+        self.assertEqual(5, self._stats('ManagedSystem', 'ms-uuid')['limit'])
+        self.sess.request.side_effect = self.unavail
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(1, self._stats()['limit'])
+        # ...to the min
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(1, self._stats()['limit'])
+
+        # Other errors don't affect the limit
+        self.sess.request.side_effect = pvmex.Error('foo', response=None)
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(1, self._stats()['limit'])
+        stats = self._stats()
+        self.assertEqual(15, stats['requests'])
+        self.assertEqual(3, stats['busy'])
+        self.assertEqual(1, stats['errors'])
+        self.assertEqual(0, stats['inflight'])
+        self.assertEqual(rate_limit.CLOSED, stats['state'])
+        # The window expires
+        self.now += 61
+        self.assertEqual(0, self._stats()['requests'])
+
+    def test_decrease_interval(self):
+        adpt = self._adapter(initial_limit=8, decrease_interval=1)
+        self.sess.request.side_effect = self.unavail
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', MS_PATH)
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', MS_PATH)
+        self.assertEqual(4, self._stats('ManagedSystem', 'ms-uuid')['limit'])
+        self.now += 1
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', MS_PATH)
+        self.assertEqual(2, self._stats('ManagedSystem', 'ms-uuid')['limit'])
+
+    def test_latency_target(self):
+        adpt = self._adapter(initial_limit=8, latency_target=2)
+
+        def slow(*args, **kwargs):
+            self.now += 3
+        self.sess.request.side_effect = slow
+        adpt._request('GET', '/rest/api/uom/LogicalPartition')
+        self.assertEqual(4, self._stats('server', '')['limit'])
+        self.assertEqual(3, self._stats('server', '')['latency_max'])
+
+    def test_circuit(self):
+        adpt = self._adapter(trip_threshold=2, open_time=5, max_open_time=8,
+                             fail_fast=True)
+        self.sess.request.side_effect = self.vios_busy
+        for i in range(2):
+            self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(rate_limit.OPEN, self._stats()['state'])
+        # Fail fast, without sending the request
+        self.sess.request.reset_mock()
+        self.assertRaises(pvmex.RequestThrottled, adpt._request, 'GET',
+                          VIOS_PATH)
+        self.assertEqual(0, self.sess.request.call_count)
+        # Other targets are unaffected
+        self.sess.request.side_effect = None
+        adpt._request('GET', MS_PATH)
+        # Nor are their limits held by the throttled request
+        self.assertEqual(0, self._stats('ManagedSystem', 'ms-uuid')[
+            'inflight'])
+
+        # Still busy after the open time: open again, for longer
+        self.now += 5
+        self.sess.request.side_effect = self.vios_busy
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(rate_limit.OPEN, self._stats()['state'])
+        self.now += 5
+        self.assertRaises(pvmex.RequestThrottled, adpt._request, 'GET',
+                          VIOS_PATH)
+        # A successful probe closes it
+        self.now += 3
+        self.sess.request.side_effect = None
+        adpt._request('GET', VIOS_PATH)
+        self.assertEqual(rate_limit.CLOSED, self._stats()['state'])
+        adpt._request('GET', VIOS_PATH)
+
+    def test_queueing(self):
+        """Requests over the limit, or to an open circuit, wait."""
+        adpt = self._adapter(initial_limit=1, trip_threshold=1, open_time=0)
+        started = threading.Event()
+        proceed = threading.Event()
+        results = []
+
+        def request(*args, **kwargs):
+            started.set()
+            proceed.wait()
+        self.sess.request.side_effect = request
+
+        def run():
+            results.append(adpt._request('GET', VIOS_PATH))
+        threads = [threading.Thread(target=run) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        while self._stats()['queued'] < 2:
+            time.sleep(0.001)
+        self.assertEqual(1, self._stats()['inflight'])
+        self.assertEqual(1, self.sess.request.call_count)
+        proceed.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(3, len(results))
+        self.assertEqual(3, self.sess.request.call_count)
+
+        # An open circuit makes requests wait for its open time
+        self.sess.request.side_effect = self.vios_busy
+        self.assertRaises(pvmex.Error, adpt._request, 'GET', VIOS_PATH)
+        self.assertEqual(rate_limit.OPEN, self._stats()['state'])
+        self.sess.request.side_effect = None
+        adpt._request('GET', VIOS_PATH)
+        self.assertEqual(rate_limit.CLOSED, self._stats()['state'])
@@ -0,0 +1,201 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the columnar LPAR metrics."""
+
+import math
+
+import mock
+import testtools
+
+from pypowervm.tasks.monitor import columnar
+from pypowervm.tasks.monitor import util as pvm_t_mon
+from pypowervm.tests.test_utils import pvmhttp
+from pypowervm.wrappers.pcm import lpar as pvm_mon_lpar
+from pypowervm.wrappers.pcm import phyp as pvm_mon_phyp
+from pypowervm.wrappers.pcm import vios as pvm_mon_vios
+
+PHYP_DATA = 'phyp_pcm_data.txt'
+VIOS_DATA = 'vios_pcm_data.txt'
+LPAR_DATA = 'lpar_pcm_data.txt'
+
+GOOD_VM = '42AD4FD4-DC64-4935-9E29-9B7C6F35AFCC'
+OFF_VM = '3B0237F9-26F1-41C7-BE57-A08C9452AD9D'
+NO_RMC_VM = '66A2E886-D05D-42F4-87E0-C3BA02CF7C7E'
+
+
+def _snapshot(uuids, time, cycles, **cols):
+    columns = {name: columnar.np.full(len(uuids), columnar.np.nan)
+               for name in columnar.SNAPSHOT_COLUMNS}
+    for name, vals in cols.items():
+        columns[name] = columnar.np.array(vals, dtype=float)
+    return columnar.LparSnapshot(uuids, columns, time=time,
+                                 time_based_cycles=cycles)
+
+
+@testtools.skipIf(columnar.np is None, "NumPy is not installed.")
+class TestColumnar(testtools.TestCase):
+
+    def _load(self):
+        return (pvm_mon_phyp.PhypInfo(pvmhttp.PVMFile(PHYP_DATA).body),
+                [pvm_mon_vios.ViosInfo(pvmhttp.PVMFile(VIOS_DATA).body)],
+                pvm_mon_lpar.LparInfo(pvmhttp.PVMFile(LPAR_DATA).body))
+
+    def test_lpar_snapshot(self):
+        phyp, vioses, lpars = self._load()
+        snap = columnar.lpar_snapshot(phyp, vioses, lpars)
+        self.assertEqual([lpar.uuid for lpar in phyp.sample.lpars],
+                         snap.uuids)
+        self.assertEqual(5, len(snap))
+        self.assertIn(GOOD_VM, snap)
+        self.assertNotIn('foo', snap)
+        self.assertIsNone(snap.row('foo'))
+        # 2015-05-27T08:17:45+0000
+        self.assertEqual(1432714665.0, snap.time)
+        self.assertEqual(phyp.sample.time_based_cycles,
+                         snap.time_based_cycles)
+        for name in columnar.SNAPSHOT_COLUMNS:
+            self.assertEqual((5,), snap[name].shape)
+
+        # The columns agree with vm_metrics
+        metrics = pvm_t_mon.vm_metrics(phyp, vioses, lpars)
+        row = snap.row(GOOD_VM)
+        metric = metrics[GOOD_VM]
+        for name in ('entitled_proc_cycles', 'util_cap_proc_cycles',
+                     'util_uncap_proc_cycles', 'proc_units', 'virt_procs'):
+            self.assertEqual(getattr(metric.processor, name), row[name])
+        for name in columnar.PHYP_MEM_COLUMNS + columnar.RMC_MEM_COLUMNS:
+            self.assertEqual(getattr(metric.memory, name), row[name])
+        vadpt = metric.storage.virt_adpts[0]
+        for name in columnar.STORAGE_COLUMNS:
+            self.assertEqual(getattr(vadpt, name), row[name])
+        cna = metric.network.cnas[0]
+        for name in columnar.NETWORK_COLUMNS:
+            self.assertEqual(getattr(cna, name), row[name])
+
+        # Powered off: no storage or network; RMC reports free memory.
+        row = snap.row(OFF_VM)
+        for name in columnar.STORAGE_COLUMNS + columnar.NETWORK_COLUMNS:
+            self.assertIsNone(row[name])
+        self.assertIsNone(row['pct_real_mem_avbl'])
+        self.assertEqual(100, row['pct_real_mem_free'])
+        self.assertEqual(0, row['vm_pg_in_rate'])
+
+        # Not in the RMC data: the LparMemory defaults.
+        row = snap.row(NO_RMC_VM)
+        self.assertEqual(.2, row['proc_units'])
+        self.assertEqual(0, row['pct_real_mem_free'])
+        self.assertEqual(-1, row['vm_pg_in_rate'])
+        self.assertIsNone(row['pct_real_mem_avbl'])
+
+        # Without VIOS or RMC data
+        snap = columnar.lpar_snapshot(phyp, [], None)
+        row = snap.row(GOOD_VM)
+        self.assertEqual(0, row['num_reads'])
+        self.assertEqual(-1, row['vm_pg_out_rate'])
+        self.assertEqual(10000, row['received_bytes'])
+
+    def test_lpar_snapshot_no_phyp(self):
+        self.assertIsNone(columnar.lpar_snapshot(None, [], None))
+
+    @mock.patch('pypowervm.tasks.monitor.columnar.np', new=None)
+    def test_no_numpy(self):
+        self.assertRaises(ImportError, columnar.lpar_snapshot, None, [], None)
+
+    def test_epoch(self):
+        self.assertEqual(1432714665.0,
+                         columnar._epoch('2015-05-27T08:17:45+0000'))
+        self.assertEqual(1432714665.0,
+                         columnar._epoch('2015-05-27T10:17:45+0200'))
+        self.assertEqual(1432714665.0,
+                         columnar._epoch('2015-05-27T07:47:45-0030'))
+        self.assertEqual(1432714665.0, columnar._epoch('2015-05-27T08:17:45'))
+        self.assertIsNone(columnar._epoch('yesterday'))
+        self.assertIsNone(columnar._epoch(None))
+
+    def test_delta(self):
+        prev = _snapshot(['a', 'b', 'c'], 100.0, 1000,
+                         util_cap_proc_cycles=[10, 20, 30],
+                         num_reads=[5, 50, 500])
+        cur = _snapshot(['a', 'b', 'c'], 130.0, 4000,
+                        util_cap_proc_cycles=[40, 20, 90],
+                        num_reads=[6, 10, 530])
+        diff = columnar.delta(prev, cur)
+        self.assertIsInstance(diff, columnar.LparDelta)
+        self.assertEqual(30.0, diff.seconds)
+        self.assertEqual(3000, diff.time_based_cycles)
+        self.assertEqual(set(columnar.COUNTER_COLUMNS), set(diff.columns))
+        self.assertEqual([30, 0, 60], list(diff['util_cap_proc_cycles']))
+        # The counter of b went backwards
+        self.assertEqual({'a': 1, 'b': None, 'c': 30},
+                         {uuid: diff.row(uuid)['num_reads']
+                          for uuid in diff.uuids})
+        self.assertTrue(math.isnan(diff['sent_bytes'][0]))
+
+        # Rows are aligned by UUID
+        cur = _snapshot(['c', 'd', 'a'], 130.0, None,
+                        util_cap_proc_cycles=[90, 70, 40])
+        diff = columnar.delta(prev, cur)
+        self.assertEqual(['c', 'd', 'a'], diff.uuids)
+        self.assertIsNone(diff.time_based_cycles)
+        self.assertEqual(60, diff['util_cap_proc_cycles'][0])
+        self.assertTrue(math.isnan(diff['util_cap_proc_cycles'][1]))
+        self.assertEqual(30, diff['util_cap_proc_cycles'][2])
+
+        # No previous LPARs
+        diff = columnar.delta(_snapshot([], 100.0, 1000), cur)
+        self.assertEqual(3, len(diff))
+        self.assertTrue(all(math.isnan(val)
+                            for val in diff['util_cap_proc_cycles']))
+
+    def test_rates(self):
+        prev = _snapshot(
+            ['a', 'b'], 100.0, 1000, entitled_proc_cycles=[100, 100],
+            util_cap_proc_cycles=[10, 10], util_uncap_proc_cycles=[0, 0],
+            num_reads=[0, 0], num_writes=[0, 0], read_bytes=[0, 0],
+            write_bytes=[0, 0], received_bytes=[0, 0], sent_bytes=[0, 0],
+            received_packets=[0, 0], sent_packets=[0, 0])
+        cur = _snapshot(
+            ['a', 'b'], 110.0, 2000, entitled_proc_cycles=[200, 100],
+            util_cap_proc_cycles=[60, 110], util_uncap_proc_cycles=[25, 50],
+            num_reads=[100, 0], num_writes=[50, 0], read_bytes=[1000, 0],
+            write_bytes=[500, 0], received_bytes=[20, 0], sent_bytes=[40, 0],
+            received_packets=[2, 0], sent_packets=[4, 0],
+            vm_pg_in_rate=[7, -1], vm_pg_out_rate=[3, 0])
+        rates = columnar.rates(prev, cur)
+        self.assertEqual(['a', 'b'], rates.uuids)
+        self.assertEqual(
+            {'cpu_util': .75, 'cpu_units': .075, 'read_iops': 10,
+             'write_iops': 5, 'iops': 15, 'read_bytes_per_sec': 100,
+             'write_bytes_per_sec': 50, 'received_bytes_per_sec': 2,
+             'sent_bytes_per_sec': 4, 'received_packets_per_sec': .2,
+             'sent_packets_per_sec': .4, 'vm_pg_in_rate': 7,
+             'vm_pg_out_rate': 3, 'vm_pg_swap_in_rate': None,
+             'vm_pg_swap_out_rate': None},
+            rates.row('a'))
+        row = rates.row('b')
+        # No entitled cycles in the interval
+        self.assertIsNone(row['cpu_util'])
+        self.assertEqual(.15, row['cpu_units'])
+        # RMC could not determine the rate
+        self.assertIsNone(row['vm_pg_in_rate'])
+        self.assertEqual(0, row['vm_pg_out_rate'])
+
+        # Same, or unknown, sample times
+        self.assertRaises(ValueError, columnar.rates, cur, cur)
+        self.assertRaises(ValueError, columnar.rates, cur, prev)
+        self.assertRaises(ValueError, columnar.rates,
+                          _snapshot(['a'], None, None), cur)
@@ -0,0 +1,198 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the on-disk metrics history."""
+
+import datetime
+import os
+
+import fixtures
+import mock
+import testtools
+
+from pypowervm.tasks.monitor import history
+from pypowervm.tests.test_utils import pvmhttp
+from pypowervm.wrappers.pcm import lpar as pvm_mon_lpar
+from pypowervm.wrappers.pcm import phyp as pvm_mon_phyp
+from pypowervm.wrappers.pcm import vios as pvm_mon_vios
+
+GOOD_VM = '42AD4FD4-DC64-4935-9E29-9B7C6F35AFCC'
+VIOS_UUID = '3443DB77-AED1-47ED-9AA5-3DB9C6CF7089'
+# 2015-05-27T08:00:00+0000, on an hour boundary.
+T0 = 1432713600.0
+TIERS = ((30, 1000), (300, 100), (3600, 10))
+
+
+@testtools.skipIf(history.np is None, "NumPy is not installed.")
+class TestMetricHistory(testtools.TestCase):
+
+    def setUp(self):
+        super(TestMetricHistory, self).setUp()
+        self.base = self.useFixture(fixtures.TempDir()).path
+        self.bodies = [pvmhttp.PVMFile(fname).body for fname in (
+            'phyp_pcm_data.txt', 'vios_pcm_data.txt', 'lpar_pcm_data.txt')]
+
+    def _sample(self, num):
+        """Sample num, 30s apart: counters and gauges grow with num."""
+        phyp = pvm_mon_phyp.PhypInfo(self.bodies[0])
+        stamp = datetime.datetime.utcfromtimestamp(T0 + 30 * num)
+        phyp.sample.time_stamp = stamp.strftime('%Y-%m-%dT%H:%M:%S+0000')
+        for lpar in phyp.sample.lpars + phyp.sample.vioses:
+            lpar.processor.util_cap_proc_cycles = 100 * num
+        for lpar in phyp.sample.lpars:
+            lpar.memory.logical_mem = num
+        return (phyp, [pvm_mon_vios.ViosInfo(self.bodies[1])],
+                pvm_mon_lpar.LparInfo(self.bodies[2]))
+
+    def _history(self, tiers=TIERS):
+        hist = history.MetricHistory(self.base, 'host_uuid', tiers=tiers)
+        self.addCleanup(hist.close)
+        return hist
+
+    def test_record_and_series(self):
+        hist = self._history()
+        self.assertEqual([30, 300, 3600], hist.intervals)
+        self.assertIsNone(hist.series(GOOD_VM))
+        self.assertEqual([], hist.entities())
+        for num in range(12):
+            self.assertTrue(hist.record(*self._sample(num)))
+        # Samples no newer than the last are ignored.
+        self.assertFalse(hist.record(*self._sample(11)))
+        self.assertFalse(hist.record(*self._sample(3)))
+        self.assertFalse(hist.record(None, [], None))
+
+        self.assertEqual(6, len(hist.entities()))
+        self.assertEqual([VIOS_UUID], hist.entities(kind=history.VIOS))
+        self.assertIn(GOOD_VM, hist.entities(kind=history.LPAR))
+
+        series = hist.series(GOOD_VM)
+        self.assertEqual((GOOD_VM, history.LPAR, 30),
+                         (series.uuid, series.kind, series.interval))
+        self.assertEqual(12, len(series))
+        self.assertEqual([T0 + 30 * num for num in range(12)],
+                         list(series.times))
+        self.assertEqual([100 * num for num in range(12)],
+                         list(series['util_cap_proc_cycles']))
+        self.assertEqual(set(history.LPAR_COLUMNS), set(series.columns))
+        self.assertEqual(1074, series['num_reads'][0])
+        self.assertEqual(25, series['vm_pg_out_rate'][0])
+
+        # Time range
+        series = hist.series(GOOD_VM, start=T0 + 60, end=T0 + 120)
+        self.assertEqual([T0 + 60, T0 + 90, T0 + 120], list(series.times))
+
+        # VIOS
+        series = hist.series(VIOS_UUID, end=T0)
+        self.assertEqual(history.VIOS, series.kind)
+        self.assertEqual([0], list(series['util_cap_proc_cycles']))
+        self.assertEqual(set(history.VIOS_COLUMNS), set(series.columns))
+        vios = self._sample(0)[1][0].sample
+        self.assertEqual(vios.mem.utilized_mem, series['utilized_mem'][0])
+        self.assertEqual(
+            sum(adpt.num_reads for adpt in
+                vios.storage.fc_adpts + vios.storage.phys_adpts),
+            series['num_reads'][0])
+        self.assertEqual(
+            sum(adpt.sent_bytes for adpt in vios.network.adpts
+                if adpt.type == 'physical'),
+            series['sent_bytes'][0])
+
+    def test_downsample(self):
+        hist = self._history()
+        for num in range(12):
+            hist.record(*self._sample(num))
+        # Samples 0-9 complete the first five minutes.  The counters take
+        # their last value; the gauges are averaged.
+        series = hist.series(GOOD_VM, interval=300)
+        self.assertEqual([T0 + 270], list(series.times))
+        self.assertEqual([900], list(series['util_cap_proc_cycles']))
+        self.assertEqual([4.5], list(series['logical_mem']))
+        self.assertEqual([1074], list(series['num_reads']))
+        self.assertEqual(0, len(hist.series(GOOD_VM, interval=3600)))
+
+        # Skip ahead past the hour (with a gap).
+        for num in range(115, 125):
+            hist.record(*self._sample(num))
+        series = hist.series(GOOD_VM, interval=300)
+        self.assertEqual([T0 + 270, T0 + 330, T0 + 3570],
+                         list(series.times))
+        self.assertEqual([4.5, 10.5, 117.0], list(series['logical_mem']))
+        series = hist.series(GOOD_VM, interval=3600)
+        self.assertEqual([T0 + 3570], list(series.times))
+        self.assertEqual([11900], list(series['util_cap_proc_cycles']))
+        # The mean of the 5 minute means
+        self.assertAlmostEqual((4.5 + 10.5 + 117.0) / 3,
+                               series['logical_mem'][0])
+        series = hist.series(VIOS_UUID, interval=3600)
+        self.assertEqual([11900], list(series['util_cap_proc_cycles']))
+
+        self.assertRaises(ValueError, hist.series, GOOD_VM, interval=60)
+
+    def test_retention(self):
+        # Five LPARs and a VIOS: six samples of the LPARs fit in 30 rows.
+        hist = self._history(tiers=((30, 30), (300, 100)))
+        for num in range(20):
+            hist.record(*self._sample(num))
+        series = hist.series(GOOD_VM)
+        self.assertEqual([T0 + 30 * num for num in range(14, 20)],
+                         list(series.times))
+        self.assertEqual([1400, 1500, 1600, 1700, 1800, 1900],
+                         list(series['util_cap_proc_cycles']))
+        # The VIOS tier is its own ring.
+        self.assertEqual(20, len(hist.series(VIOS_UUID)))
+
+        # A range reaching back past the finest tier reads a coarser one.
+        self.assertEqual(300, hist.series(GOOD_VM, start=T0).interval)
+        self.assertEqual(30, hist.series(GOOD_VM, start=T0 + 420).interval)
+
+    def test_persistence(self):
+        hist = self._history()
+        for num in range(12):
+            hist.record(*self._sample(num))
+        hist.close()
+        self.assertEqual(
+            ['entities.json', 'lpar-30.ts', 'lpar-300.ts', 'lpar-3600.ts',
+             'vios-30.ts', 'vios-300.ts', 'vios-3600.ts'],
+            sorted(os.listdir(os.path.join(self.base, 'host_uuid'))))
+
+        hist = self._history()
+        self.assertEqual(6, len(hist.entities()))
+        self.assertEqual(12, len(hist.series(GOOD_VM)))
+        self.assertFalse(hist.record(*self._sample(11)))
+        self.assertTrue(hist.record(*self._sample(12)))
+        self.assertEqual(13, len(hist.series(GOOD_VM)))
+        self.assertEqual(1, len(hist.series(GOOD_VM, interval=300)))
+        hist.close()
+
+        # A tier whose capacity changed is discarded.
+        with mock.patch('pypowervm.tasks.monitor.history.LOG') as mock_log:
+            hist = self._history(tiers=((30, 500), (300, 100), (3600, 10)))
+            self.assertEqual(2, mock_log.warning.call_count)
+        self.assertEqual(0, len(hist.series(GOOD_VM, interval=30)))
+        # So the retained coarser history is read instead.
+        self.assertEqual(300, hist.series(GOOD_VM).interval)
+        self.assertTrue(hist.record(*self._sample(13)))
+
+    def test_bad_tiers(self):
+        self.assertRaises(ValueError, history.MetricHistory, self.base,
+                          'host_uuid', tiers=((30, 10), (45, 10)))
+        self.assertRaises(ValueError, history.MetricHistory, self.base,
+                          'host_uuid', tiers=())
+
+    @mock.patch('pypowervm.tasks.monitor.history.np', new=None)
+    def test_no_numpy(self):
+        self.assertRaises(ImportError, history.MetricHistory, self.base,
+                          'host_uuid')
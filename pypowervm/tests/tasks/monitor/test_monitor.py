@@ -17,11 +17,15 @@
 """Test for the monitoring functions."""
 
 import datetime
+import gc
+import threading
+import time
 
 import mock
 import testtools
 
 from pypowervm import entities as pvm_e
+from pypowervm.tasks.monitor import lpar as lpar_mon
 from pypowervm.tasks.monitor import util as pvm_t_mon
 from pypowervm.tests.tasks import util as tju
 from pypowervm.tests import test_fixtures as fx
@@ -221,6 +225,59 @@ class TestMonitors(testtools.TestCase):
         self.assertEqual(0, metric.memory.pct_real_mem_free)
         self.assertEqual(-1, metric.memory.vm_pg_in_rate)
 
+    def test_vios_storage_index(self):
+        """VIOS storage adapters are correlated via the index."""
+        def vios(vios_id, vadpts, pfcs):
+            vios_ltm = mock.Mock()
+            vios_ltm.sample.id = vios_id
+            vios_ltm.sample.storage.virt_adpts = [
+                mock.Mock(physical_location=loc) for loc in vadpts]
+            vios_ltm.sample.storage.fc_adpts = [
+                mock.Mock(ports=[mock.Mock(wwpn=wwpn) for wwpn in wwpns])
+                for wwpns in pfcs]
+            return vios_ltm
+        vios1 = vios(1, ['U1-V1-C7', 'U1-V1-C17', 'U1-V1-C7-T1'],
+                     [['a1', 'a2'], ['a3']])
+        vios2 = vios(2, ['U1-V2-C7'], [['b1', 'b2']])
+        vios3 = mock.Mock()
+        vios3.sample.id = 3
+        vios3.sample.storage = None
+        index = lpar_mon.ViosStorageIndex([vios1, vios2, vios3])
+
+        def vadpt(vios_id, slot):
+            return mock.Mock(vios_id=vios_id, vios_slot=slot)
+        vstor = vios1.sample.storage.virt_adpts
+        self.assertEqual(vstor[0], index.find_vstor_adpt(vadpt(1, 7)))
+        self.assertEqual(vstor[1], index.find_vstor_adpt(vadpt(1, 17)))
+        self.assertEqual(vios2.sample.storage.virt_adpts[0],
+                         index.find_vstor_adpt(vadpt(2, 7)))
+        for vios_id, slot in ((1, 1), (2, 17), (3, 7), (4, 7)):
+            self.assertIsNone(index.find_vstor_adpt(vadpt(vios_id, slot)))
+
+        def vfc(vios_id, wwpns):
+            return mock.Mock(vios_id=vios_id, wwpn_pair=wwpns)
+        ports1 = vios1.sample.storage.fc_adpts
+        self.assertEqual(ports1[0].ports[1],
+                         index.find_vfc_adpt(vfc(1, ['x', 'a2'])))
+        # The first port of the scan wins when both WWPNs match
+        self.assertEqual(ports1[0].ports[0],
+                         index.find_vfc_adpt(vfc(1, ['a3', 'a1'])))
+        self.assertEqual(vios2.sample.storage.fc_adpts[0].ports[1],
+                         index.find_vfc_adpt(vfc(2, ['b2'])))
+        for vios_id, wwpns in ((2, ['a1']), (1, []), (3, ['a1'])):
+            self.assertIsNone(index.find_vfc_adpt(vfc(vios_id, wwpns)))
+        self.assertIsNone(lpar_mon.ViosStorageIndex(
+            None).find_vstor_adpt(vadpt(1, 7)))
+
+        # LparStorage takes the index or (for compatibility) the VIOS list
+        phyp_stor = mock.Mock(v_stor_adpts=[vadpt(1, 7), vadpt(1, 8)],
+                              v_fc_adpts=[vfc(2, ['b1']), vfc(1, ['b1'])])
+        for vioses in (index, [vios1, vios2, vios3]):
+            stor = lpar_mon.LparStorage(phyp_stor, vioses)
+            self.assertEqual([vstor[0]], [a.elem for a in stor.virt_adpts])
+            self.assertEqual([vios2.sample.storage.fc_adpts[0].ports[0]],
+                             [a.elem for a in stor.vfc_adpts])
+
     def test_vm_metrics_no_phyp_data(self):
         self.assertEqual({}, pvm_t_mon.vm_metrics(None, [], None))
 
@@ -419,3 +476,96 @@ class TestMetricsCache(testtools.TestCase):
         prev_date, prev_metric = metric_cache.get_previous_metric('lpar_uuid')
         self.assertEqual(pre_date, prev_date)
         self.assertEqual(2, prev_metric)
+
+    @mock.patch('pypowervm.tasks.monitor.util._PREFETCH_RETRY', new=0.01)
+    @mock.patch('pypowervm.tasks.monitor.util.vm_metrics')
+    @mock.patch('pypowervm.tasks.monitor.util.latest_stats')
+    @mock.patch('pypowervm.tasks.monitor.util.ensure_ltm_monitors')
+    def test_prefetch(self, mock_ensure_monitor, mock_stats, mock_vm_metrics):
+        def phyp(stamp):
+            return mock.Mock(sample=mock.Mock(time_stamp=stamp))
+
+        fetching = threading.Event()
+        proceed = threading.Event()
+        samples = iter([None, 't1', 't1', 't2'])
+
+        def stats(adapter, host_uuid, include_vio=True, second_latest=False):
+            if second_latest:
+                return 'date0', phyp('t0'), [], None
+            stamp = next(samples, None) or 't1'
+            if stamp == 't2':
+                fetching.set()
+                proceed.wait()
+            return 'date-' + stamp, phyp(stamp), [], None
+        mock_stats.side_effect = stats
+        mock_vm_metrics.side_effect = lambda phyp, vioses, lpars: {
+            'lpar_uuid': phyp.sample.time_stamp}
+
+        cache = pvm_t_mon.LparMetricCache(self.adpt, 'host_uuid',
+                                          refresh_delta=.01, prefetch=True)
+        self.assertTrue(cache.prefetching)
+        # The background refresh is blocked in the REST call (for t2)...
+        self.assertTrue(fetching.wait(2))
+        # ...but readers aren't blocked by it, and don't refresh.
+        calls = mock_stats.call_count
+        self.assertEqual(('date-t1', 't1'),
+                         cache.get_latest_metric('lpar_uuid'))
+        self.assertEqual(('date0', 't0'),
+                         cache.get_previous_metric('lpar_uuid'))
+        self.assertEqual(calls, mock_stats.call_count)
+        # The sample which was not new (t1 again) was not swapped in.
+        proceed.set()
+        for i in range(200):
+            if cache.get_latest_metric('lpar_uuid')[1] == 't2':
+                break
+            time.sleep(0.01)
+        self.assertEqual(('date-t2', 't2'),
+                         cache.get_latest_metric('lpar_uuid'))
+        self.assertEqual(('date-t1', 't1'),
+                         cache.get_previous_metric('lpar_uuid'))
+
+        # Stopped
+        cache.stop_prefetch()
+        self.assertFalse(cache.prefetching)
+        time.sleep(0.05)
+        calls = mock_stats.call_count
+        time.sleep(0.05)
+        self.assertEqual(calls, mock_stats.call_count)
+
+        # The thread ends when the cache goes out of scope.  (The thread may
+        # be holding it for a refresh, in which case it is freed, and the
+        # thread stopped, when that is done.)
+        cache.start_prefetch()
+        stop = cache._prefetch_stop
+        del cache
+        gc.collect()
+        self.assertTrue(stop.wait(5))
+
+    @mock.patch('pypowervm.tasks.monitor.util.vm_metrics')
+    @mock.patch('pypowervm.tasks.monitor.util.latest_stats')
+    @mock.patch('pypowervm.tasks.monitor.util.ensure_ltm_monitors')
+    def test_history(self, mock_ensure_monitor, mock_stats, mock_vm_metrics):
+        """Refreshes record their samples in the history."""
+        def phyp(stamp):
+            return mock.Mock(sample=mock.Mock(time_stamp=stamp))
+        mock_stats.side_effect = [
+            ('date0', phyp('t0'), ['v0'], 'l0'),
+            ('date1', phyp('t1'), ['v1'], 'l1'),
+            ('date2', phyp('t2'), ['v2'], 'l2')]
+        history = mock.Mock()
+        cache = pvm_t_mon.LparMetricCache(self.adpt, 'host_uuid',
+                                          history=history)
+        self.assertEqual(history, cache.history)
+        # The first pass records the second latest sample too.
+        self.assertEqual([mock.call(cache.prev_phyp, ['v0'], 'l0'),
+                          mock.call(cache.cur_phyp, ['v1'], 'l1')],
+                         history.record.call_args_list)
+
+        # A failure to record is logged, but the refresh goes on.
+        history.reset_mock()
+        history.record.side_effect = IOError('disk full')
+        with mock.patch('pypowervm.tasks.monitor.util.LOG') as mock_log:
+            self.assertTrue(cache._refresh())
+            self.assertEqual(1, mock_log.warning.call_count)
+        history.record.assert_called_once_with(mock.ANY, ['v2'], 'l2')
+        self.assertEqual('date2', cache.cur_date)
@@ -14,8 +14,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from concurrent import futures
 import fixtures
 import mock
+import threading
 import unittest
 import uuid
 
@@ -30,6 +32,9 @@ import pypowervm.wrappers.job as jwrap
 import pypowervm.wrappers.storage as stor
 
 CREATE_CLUSTER = 'cluster_create_job_template.txt'
+SSP_UUID = '6233b070-31cc-4b57-99bd-37f80e845de9'
+MKR_UUID = '3a9a3bd0-1c5d-4c7f-8bcb-b9d2bd04d7bb'
+OTHER_UUID = 'c4bd0ae5-9c1e-4b4e-a3c1-f4b0e6fc3c3d'
 
 
 class TestClusterSSP(unittest.TestCase):
@@ -401,3 +406,197 @@ class TestGetOrUploadImageLU(twrap.TestWrapper):
         # We left the SSP as it was (plus the other guy's extra, which would
         # actually be removed normally).
         self.assertEqual(self.exp_num_lus, len(self.entries))
+
+    def test_upload_wait_time(self):
+        for attempt, cap, high in ((0, cs.SLEEP_U_BACKOFF_MAX, 60),
+                                   (1, cs.SLEEP_U_BACKOFF_MAX, 120),
+                                   (5, cs.SLEEP_U_BACKOFF_MAX, 180),
+                                   (5, cs.SLEEP_U_EVENTS_MAX, 600)):
+            for i in range(20):
+                self.assertTrue(cs.SLEEP_U_MIN <= cs._upload_wait_time(
+                    attempt, cap) <= high)
+
+    @mock.patch('pypowervm.tasks.cluster_ssp._LUEvents.get')
+    def test_conflict_started_events(self, mock_events):
+        """Another upload is in progress; we wait for LU events."""
+        self.confl_mkr_lu_lose.entry.properties = {'id': MKR_UUID}
+        self.entries.append(self.confl_mkr_lu_lose)
+        self.entries.append(self.img_lu)
+        lu_events = mock_events.return_value
+        lu_events.enabled = True
+        lu_events.generation = 5
+        lu_events.wait.side_effect = (
+            lambda gen, lu_uuids, timeout: self.sleep_conflict_finishes(
+                timeout))
+
+        self.assertEqual(self.img_lu, cs.get_or_upload_image_lu(
+            self.tier, self.img_lu.name, self.vios_uuid, self.mock_stream_func,
+            self.b_size))
+        mock_events.assert_called_once_with(self.tier.adapter)
+        # Waiting on the marker LU only
+        lu_events.wait.assert_called_once_with(
+            5, [MKR_UUID], mock.ANY)
+        self.mock_sleep.assert_not_called()
+        self.mock_crt_lu.assert_not_called()
+        self.assertEqual(2, self.mock_luent_srch.call_count)
+
+    @mock.patch('pypowervm.tasks.cluster_ssp.LOG')
+    def test_shared_upload(self, mock_log):
+        """Concurrent threads share one upload of an image LU."""
+        self.setup_crt_lu_mock(self.crt_img_lu)
+        uploading = threading.Event()
+        proceed = threading.Event()
+
+        def upload_lu(*args, **kwargs):
+            uploading.set()
+            proceed.wait(10)
+        self.mock_upload_lu.side_effect = upload_lu
+
+        results = []
+
+        def get_lu():
+            results.append(cs.get_or_upload_image_lu(
+                self.tier, self.img_lu.name, self.vios_uuid,
+                self.mock_stream_func, self.b_size))
+        leader = threading.Thread(target=get_lu)
+        leader.start()
+        self.assertTrue(uploading.wait(10))
+        key = (self.tier.uuid, self.img_lu.name)
+        shared = cs._UPLOADS[key]
+        followers = [threading.Thread(target=get_lu) for i in range(3)]
+        for thread in followers:
+            thread.start()
+        # Wait for the followers to be waiting.
+        msg = 'Waiting for image LU %s from another thread.'
+        for i in range(1000):
+            if mock_log.info.call_args_list.count(
+                    mock.call(msg, self.img_lu.name)) == 3:
+                break
+            # (time.sleep is mocked.)
+            proceed.wait(0.01)
+        proceed.set()
+        for thread in [leader] + followers:
+            thread.join(10)
+        self.assertEqual([self.img_lu] * 4, results)
+        self.assertEqual(1, self.mock_upload_lu.call_count)
+        # Only the leader searched: first time through, and _upload_conflict
+        self.assertEqual(2, self.mock_luent_srch.call_count)
+        self.assertNotIn(key, cs._UPLOADS)
+        self.assertTrue(shared.done())
+
+    def test_shared_upload_fails(self):
+        """A thread whose shared upload failed tries for itself."""
+        self.entries.append(self.img_lu)
+        key = (self.tier.uuid, self.img_lu.name)
+        shared = futures.Future()
+        cs._UPLOADS[key] = shared
+        self.addCleanup(cs._UPLOADS.pop, key, None)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            cs.get_or_upload_image_lu(
+                self.tier, self.img_lu.name, self.vios_uuid,
+                self.mock_stream_func, self.b_size)))
+        thread.start()
+        self.mock_luent_srch.assert_not_called()
+        shared.set_exception(IOError('upload failed'))
+        thread.join(10)
+        self.assertEqual([self.img_lu], results)
+        self.assertEqual(1, self.mock_luent_srch.call_count)
+        self.assertNotIn(key, cs._UPLOADS)
+
+
+class TestLUEvents(unittest.TestCase):
+
+    def setUp(self):
+        super(TestLUEvents, self).setUp()
+        self.adpt = mock.Mock()
+        self.adpt.session.has_event_listener = True
+        self.listener = self.adpt.session.get_event_listener.return_value
+
+    def test_events(self):
+        lu_events = cs._LUEvents.get(self.adpt)
+        self.assertTrue(lu_events.enabled)
+        self.assertIs(lu_events, cs._LUEvents.get(self.adpt))
+        self.listener.subscribe.assert_called_once_with(mock.ANY)
+        handler = self.listener.subscribe.call_args[0][0]
+        self.assertIsInstance(handler, cs._LUEventHandler)
+
+        self.assertFalse(lu_events.wait(0, ['lu'], 0.01))
+        uri = ('https://host:12443/rest/api/uom/SharedStoragePool/%s/'
+               'LogicalUnit/%s')
+        mkr_uri = uri % (SSP_UUID, MKR_UUID)
+        other_uri = uri % (SSP_UUID, OTHER_UUID)
+        handler.process({mkr_uri: 'add', 'https://host:12443/rest/api/uom/'
+                         'LogicalPartition/%s' % MKR_UUID: 'delete'})
+        self.assertEqual(0, lu_events.generation)
+        # Deletion of another LU doesn't satisfy waiters on the marker LU.
+        handler.process({other_uri: 'delete'})
+        self.assertEqual(1, lu_events.generation)
+        self.assertFalse(lu_events.wait(0, [MKR_UUID.upper()], 0.01))
+        self.assertTrue(lu_events.wait(0, [OTHER_UUID, MKR_UUID], 10))
+        handler.process({mkr_uri: 'delete'})
+        self.assertTrue(lu_events.wait(0, [MKR_UUID.upper()], 10))
+        self.assertFalse(lu_events.wait(2, [MKR_UUID], 0.01))
+        # Events may have been missed
+        handler.process({'general': 'invalidate'})
+        self.assertEqual(3, lu_events.generation)
+        self.assertTrue(lu_events.wait(2, [MKR_UUID], 10))
+        # ...as may forgotten notifications.
+        for i in range(cs._LUEvents._HISTORY + 1):
+            handler.process({other_uri: 'delete'})
+        self.assertTrue(lu_events.wait(3, [MKR_UUID], 10))
+        gen = lu_events.generation
+        self.assertFalse(lu_events.wait(gen - 1, [MKR_UUID], 0.01))
+
+        # Waiters are woken by the deletion of their LUs only.
+        woken = []
+        thread = threading.Thread(
+            target=lambda: woken.append(lu_events.wait(gen, [MKR_UUID], 10)))
+        thread.start()
+        handler.process({other_uri: 'delete'})
+        thread.join(0.1)
+        self.assertEqual([], woken)
+        handler.process({mkr_uri: 'delete'})
+        thread.join(10)
+        self.assertEqual([True], woken)
+
+    def test_no_listener(self):
+        self.adpt.session.has_event_listener = False
+        lu_events = cs._LUEvents.get(self.adpt)
+        self.assertFalse(lu_events.enabled)
+        self.adpt.session.get_event_listener.assert_not_called()
+        # Picked up once the Session has an event listener.
+        self.adpt.session.has_event_listener = True
+        self.assertTrue(cs._LUEvents.get(self.adpt).enabled)
+
+    @mock.patch('pypowervm.tasks.cluster_ssp.LOG')
+    def test_subscribe_fails(self, mock_log):
+        self.listener.subscribe.side_effect = ValueError('Shutting down')
+        self.assertFalse(cs._LUEvents.get(self.adpt).enabled)
+        self.assertEqual(1, mock_log.warning.call_count)
+
+    @mock.patch('time.sleep')
+    @mock.patch('time.time')
+    @mock.patch('pypowervm.tasks.cluster_ssp._sleep_for_upload')
+    def test_wait_for_upload(self, mock_sleep_for, mock_time, mock_sleep):
+        lus = [mock.Mock(uuid=MKR_UUID)]
+        lu_events = mock.Mock(enabled=False)
+        cs._wait_for_upload(lu_events, 3, lus, 2)
+        mock_sleep_for.assert_called_once_with(2)
+        lu_events.wait.assert_not_called()
+        mock_sleep_for.reset_mock()
+        lu_events.enabled = True
+        lu_events.wait.return_value = False
+        mock_time.side_effect = [100, 700]
+        cs._wait_for_upload(lu_events, 3, lus, 2)
+        mock_sleep_for.assert_not_called()
+        mock_sleep.assert_not_called()
+        lu_events.wait.assert_called_once_with(3, [MKR_UUID], mock.ANY)
+        timeout = lu_events.wait.call_args[0][2]
+        self.assertTrue(cs.SLEEP_U_MIN <= timeout <= cs.SLEEP_U_MAX * 4)
+        # Woken early by an event: the tier isn't searched again before the
+        # minimum interval.
+        lu_events.wait.return_value = True
+        mock_time.side_effect = [100, 101]
+        cs._wait_for_upload(lu_events, 3, lus, 2)
+        mock_sleep.assert_called_once_with(cs.SLEEP_U_MIN - 1)
@@ -0,0 +1,154 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for pypowervm.tasks.inventory."""
+
+import collections
+import threading
+import time
+
+import mock
+import testtools
+
+import pypowervm.exceptions as ex
+import pypowervm.tasks.inventory as inv
+import pypowervm.tests.test_fixtures as fx
+from pypowervm.tests.test_utils import pvmhttp
+import pypowervm.wrappers.logical_partition as lpar
+import pypowervm.wrappers.managed_system as ms
+import pypowervm.wrappers.network as net
+import pypowervm.wrappers.virtual_io_server as vios
+
+LPAR_FILE = 'lpar.txt'
+VIOS_FILE = 'fake_vios_feed.txt'
+VSWITCH_FILE = 'vswitch_feed.txt'
+
+
+class TestInventory(testtools.TestCase):
+
+    def setUp(self):
+        super(TestInventory, self).setUp()
+        self.adpt = self.useFixture(fx.AdapterFx()).adpt
+        self.resps = {
+            lpar.LPAR.schema_type: pvmhttp.load_pvm_resp(
+                LPAR_FILE).get_response(),
+            vios.VIOS.schema_type: pvmhttp.load_pvm_resp(
+                VIOS_FILE).get_response(),
+            net.VSwitch.schema_type: pvmhttp.load_pvm_resp(
+                VSWITCH_FILE).get_response()}
+
+    def _read(self, root_type, root_id=None, child_type=None, **kwargs):
+        return self.resps[child_type or root_type]
+
+    def test_feed_spec(self):
+        sys_w = mock.Mock(schema_type=ms.System.schema_type, uuid='sys1')
+        spec = inv.FeedSpec(net.VSwitch, sys_w, ['a', 'b'])
+        self.assertEqual((net.VSwitch, 'ManagedSystem', 'sys1', ('a', 'b')),
+                         spec)
+        self.assertEqual('sys1', spec.host)
+        # Equivalent specs hash the same
+        self.assertEqual(spec, inv.FeedSpec(
+            net.VSwitch, parent_type=ms.System, parent_uuid='sys1',
+            xag=('a', 'b')))
+        self.assertEqual(1, len({spec, inv.FeedSpec(
+            net.VSwitch, parent_type='ManagedSystem', parent_uuid='sys1',
+            xag=['a', 'b'])}))
+        root = inv.FeedSpec(lpar.LPAR)
+        self.assertEqual((lpar.LPAR, None, None, None), root)
+        self.assertIsNone(root.host)
+        self.assertRaises(ValueError, inv.FeedSpec, lpar.LPAR,
+                          parent_type=ms.System)
+
+        # get
+        self.adpt.read.side_effect = self._read
+        self.assertEqual(2, len(inv.FeedSpec(vios.VIOS).get(self.adpt)))
+        self.adpt.read.assert_called_once_with('VirtualIOServer', xag=None)
+        self.adpt.read.reset_mock()
+        self.assertEqual(2, len(spec.get(self.adpt)))
+        self.adpt.read.assert_called_once_with(
+            'ManagedSystem', root_id='sys1', child_type='VirtualSwitch',
+            xag=['a', 'b'])
+
+    def test_get_feeds(self):
+        def read(root_type, root_id=None, **kwargs):
+            if root_id == 'bad':
+                raise ex.HttpError(mock.Mock(status=500))
+            return self._read(root_type, root_id=root_id, **kwargs)
+        self.adpt.read.side_effect = read
+        sys1 = mock.Mock(schema_type='ManagedSystem', uuid='good')
+        specs = [lpar.LPAR, (vios.VIOS, None, ['ViosStorage']),
+                 (net.VSwitch, sys1),
+                 inv.FeedSpec(net.VSwitch, parent_type=ms.System,
+                              parent_uuid='bad'),
+                 # Duplicate
+                 lpar.LPAR]
+        results = inv.get_feeds(self.adpt, specs)
+        self.assertIsInstance(results, collections.OrderedDict)
+        self.assertEqual(4, len(results))
+        self.assertEqual(4, self.adpt.read.call_count)
+        rlist = list(results.values())
+        self.assertEqual([inv.FeedSpec(lpar.LPAR),
+                          inv.FeedSpec(vios.VIOS, xag=['ViosStorage']),
+                          inv.FeedSpec(net.VSwitch, sys1),
+                          inv.FeedSpec(net.VSwitch, parent_type=ms.System,
+                                       parent_uuid='bad')],
+                         [res.spec for res in rlist])
+        self.assertEqual([21, 2, 2], [len(res.wrappers) for res in rlist[:3]])
+        self.assertIsInstance(rlist[0].wrappers[0], lpar.LPAR)
+        self.assertIsInstance(rlist[2].wrappers[0], net.VSwitch)
+        for res in rlist[:3]:
+            self.assertTrue(res.ok)
+            self.assertIsNone(res.error)
+        # The failure is reported, not raised
+        self.assertFalse(rlist[3].ok)
+        self.assertIsNone(rlist[3].wrappers)
+        self.assertIsInstance(rlist[3].error, ex.HttpError)
+        self.assertIn('HttpError', repr(rlist[3]))
+        self.assertIn('21 wrappers', repr(rlist[0]))
+
+        self.assertEqual({}, inv.get_feeds(self.adpt, []))
+
+    def test_get_feeds_limits(self):
+        """Per-host and total concurrency limits are honored."""
+        lock = threading.Lock()
+        running = collections.Counter()
+        peaks = collections.Counter()
+
+        def read(root_type, root_id=None, **kwargs):
+            with lock:
+                running[root_id] += 1
+                running['total'] += 1
+                for key in (root_id, 'total'):
+                    peaks[key] = max(peaks[key], running[key])
+            time.sleep(0.02)
+            with lock:
+                running[root_id] -= 1
+                running['total'] -= 1
+            return self._read(root_type, **kwargs)
+        self.adpt.read.side_effect = read
+
+        specs = [(net.VSwitch, None, [str(i)], 'ManagedSystem', host)
+                 for i in range(6) for host in ('sys1', 'sys2', 'sys3')]
+        specs += [(lpar.LPAR, None, [str(i)]) for i in range(6)]
+        results = inv.get_feeds(self.adpt, specs, max_workers=7,
+                                max_per_host=2)
+        self.assertEqual(24, len(results))
+        self.assertTrue(all(res.ok for res in results.values()))
+        for key in ('sys1', 'sys2', 'sys3', None):
+            self.assertLessEqual(peaks[key], 2)
+        self.assertLessEqual(peaks['total'], 7)
+        # GETs did run in parallel
+        self.assertGreater(peaks['total'], 2)
@@ -63,7 +63,8 @@ class TestPower(testtools.TestCase):
                     Typically the return from another validate_run() call.
         :return: A method suitable for assigning to self.run_job.side_effect.
         """
-        def run_job_seff(uuid, job_parms=None, timeout=None, synchronous=None):
+        def run_job_seff(uuid, job_parms=None, timeout=None, synchronous=None,
+                         host_uuid=None):
             # We fetched the Job template with the correct bits of the
             # partition wrapper and the correct suffix
             self.adpt.read.assert_called_once_with(
@@ -76,6 +77,7 @@ class TestPower(testtools.TestCase):
             self.assertEqual(ex_parms or set(), set(job_parms))
             self.assertEqual(ex_timeout, timeout)
             self.assertEqual(ex_synch, synchronous)
+            self.assertEqual(part.assoc_sys_uuid, host_uuid)
             if nxt:
                 self.run_job.side_effect = nxt
             if result:
@@ -14,6 +14,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+import io
+import mmap
+import os
+import threading
+import time
+
 from six.moves import builtins
 
 import fixtures
@@ -268,7 +275,8 @@ class TestUploadLV(testtools.TestCase):
     def test_upload_new_vdisk_func_remote(self, mock_usa, mock_crt_file,
                                           mock_crt_vdisk):
         """With FUNC and non-local, upload_new_vdisk uses REST API upload."""
-        mock_crt_file.return_value = mock.Mock(schema_type='File')
+        mock_crt_file.return_value = mock.Mock(schema_type='File',
+                                               expected_file_size=10)
 
         n_vdisk, maybe_file = ts.upload_new_vdisk(
             self.adpt, 'v_uuid', 'vg_uuid', 'io_handle', 'd_name', 10,
@@ -281,7 +289,8 @@ class TestUploadLV(testtools.TestCase):
             self.adpt, 'd_name', vf.FileType.DISK_IMAGE, 'v_uuid', f_size=10,
             tdev_udid=mock_crt_vdisk.return_value.udid, sha_chksum=None)
         mock_usa.assert_called_once_with(
-            mock_crt_file.return_value, 'io_handle', ts.UploadType.FUNC)
+            mock_crt_file.return_value, 'io_handle', ts.UploadType.FUNC,
+            pipeline=None)
         mock_crt_file.return_value.adapter.delete.assert_called_once_with(
             vf.File.schema_type, root_id=mock_crt_file.return_value.uuid,
             service='web')
@@ -309,7 +318,8 @@ class TestUploadLV(testtools.TestCase):
         # Make sure the function was called.
         mock_io_handle.assert_called_once_with()
         mock_upload_st.assert_called_once_with(
-            mock_file, mock_io_stream, ts.UploadType.IO_STREAM)
+            mock_file, mock_io_stream, ts.UploadType.IO_STREAM,
+            pipeline=None)
 
     @mock.patch('pypowervm.tasks.storage._create_file')
     def test_upload_new_vdisk_failure(self, mock_create_file):
@@ -384,7 +394,9 @@ class TestUploadLV(testtools.TestCase):
                                     typ=stor.LUType.IMAGE)
         mock_upl.assert_called_with('v_uuid', 'new_lu', 'd_stream', f_size,
                                     sha_chksum=None,
-                                    upload_type=ts.UploadType.IO_STREAM)
+                                    upload_type=ts.UploadType.IO_STREAM,
+                                    priority=ts.UploadPriority.NORMAL,
+                                    pipeline=None)
         mock_b2g.reset_mock()
         mock_crt.reset_mock()
         mock_upl.reset_mock()
@@ -398,7 +410,9 @@ class TestUploadLV(testtools.TestCase):
                                     typ=stor.LUType.IMAGE)
         mock_upl.assert_called_with('v_uuid', 'new_lu', 'd_stream', f_size,
                                     sha_chksum='sha_chksum',
-                                    upload_type=ts.UploadType.IO_STREAM)
+                                    upload_type=ts.UploadType.IO_STREAM,
+                                    priority=ts.UploadPriority.NORMAL,
+                                    pipeline=None)
         mock_b2g.reset_mock()
         mock_crt.reset_mock()
         mock_upl.reset_mock()
@@ -413,7 +427,9 @@ class TestUploadLV(testtools.TestCase):
                                     typ=stor.LUType.IMAGE)
         mock_upl.assert_called_with('v_uuid', 'new_lu', 'd_stream', f_size,
                                     sha_chksum=None,
-                                    upload_type=ts.UploadType.IO_STREAM)
+                                    upload_type=ts.UploadType.IO_STREAM,
+                                    priority=ts.UploadPriority.NORMAL,
+                                    pipeline=None)
 
     @mock.patch('pypowervm.tasks.storage._create_file')
     @mock.patch('pypowervm.tasks.storage._upload_stream_api')
@@ -426,7 +442,8 @@ class TestUploadLV(testtools.TestCase):
             lu.adapter, lu.name, vf.FileType.DISK_IMAGE, 'v_uuid',
             f_size='f_size', tdev_udid=lu.udid, sha_chksum=None)
         mock_usa.assert_called_once_with(mock_crt_file.return_value,
-                                         'io_handle', ts.UploadType.FUNC)
+                                         'io_handle', ts.UploadType.FUNC,
+                                         pipeline=None)
 
     @mock.patch('pypowervm.util.convert_bytes_to_gb')
     @mock.patch('pypowervm.tasks.storage.crt_lu')
@@ -446,7 +463,9 @@ class TestUploadLV(testtools.TestCase):
                                     typ=stor.LUType.IMAGE)
         mock_upl.assert_called_with('v_uuid', 'new_lu', 'd_stream', f_size,
                                     sha_chksum=None,
-                                    upload_type=ts.UploadType.FUNC)
+                                    upload_type=ts.UploadType.FUNC,
+                                    priority=ts.UploadPriority.NORMAL,
+                                    pipeline=None)
 
     def test_create_file(self):
         """Validates that the _create_file builds the Element properly."""
@@ -477,6 +496,300 @@ class TestUploadLV(testtools.TestCase):
         return vf.File.wrap(resp)
 
 
+class TestUploadScheduler(testtools.TestCase):
+    """Unit Tests for the UploadScheduler."""
+
+    def setUp(self):
+        super(TestUploadScheduler, self).setUp()
+        self.adpt1 = mock.Mock(session=mock.Mock(dest='https://hmc1:12443'))
+        self.adpt2 = mock.Mock(session=mock.Mock(dest='https://hmc2:12443'))
+        # (vio_file, ticket) in the order in which the queued uploads start
+        self.started = []
+
+    @staticmethod
+    def _file(adpt, vios_uuid, size=100):
+        return mock.Mock(adapter=adpt, vios_uuid=vios_uuid,
+                         expected_file_size=size)
+
+    @staticmethod
+    def _wait_for(cond):
+        for i in range(500):
+            if cond():
+                return
+            time.sleep(0.01)
+        raise AssertionError("Timed out")
+
+    def _queue(self, sched, vio_file, priority=ts.UploadPriority.NORMAL):
+        """Acquire on a thread, waiting until the upload is queued."""
+        queued = sched.stats()['queued']
+        thread = threading.Thread(target=lambda: self.started.append(
+            (vio_file, sched.acquire(vio_file, priority=priority))))
+        thread.daemon = True
+        thread.start()
+        self._wait_for(lambda: sched.stats()['queued'] > queued)
+
+    def _next_started(self, num):
+        self._wait_for(lambda: len(self.started) >= num)
+        return self.started[num - 1]
+
+    def test_limits_and_priority(self):
+        sched = ts.UploadScheduler(max_per_vios=1, max_per_server=2)
+        key = ('https://hmc1:12443', 'v1')
+        # Different VIOSes, and a different REST server, don't wait.
+        tkt_a = sched.acquire(self._file(self.adpt1, 'v1'))
+        tkt_b = sched.acquire(self._file(self.adpt1, 'v2', size=300))
+        tkt_c = sched.acquire(self._file(self.adpt2, 'v1'))
+        self.assertEqual(key, tkt_a.key)
+        # The REST server limit is reached.
+        f_v3 = self._file(self.adpt1, 'v3')
+        self._queue(sched, f_v3)
+        # The VIOS limit is reached.
+        f_low = self._file(self.adpt1, 'v1')
+        self._queue(sched, f_low, priority=ts.UploadPriority.LOW)
+        f_high = self._file(self.adpt1, 'v1')
+        self._queue(sched, f_high, priority=ts.UploadPriority.HIGH)
+        stats = sched.stats()
+        self.assertEqual(3, stats['queued'])
+        self.assertEqual({ts.UploadPriority.LOW: 1,
+                          ts.UploadPriority.NORMAL: 1,
+                          ts.UploadPriority.HIGH: 1},
+                         stats['queued_by_priority'])
+        self.assertEqual(3, stats['running'])
+        self.assertEqual({'queued': 2, 'running': 1, 'limit': 1,
+                          'completed': 0, 'failed': 0, 'bytes': 0,
+                          'bytes_per_sec': 0.0}, stats['by_vios'][key])
+
+        # Room on the REST server, but only for v3.
+        tkt_b.release(succeeded=True)
+        self.assertIs(f_v3, self._next_started(1)[0])
+        # Room on v1: the higher priority goes first, despite its age.
+        tkt_a.release()
+        # Idempotent
+        tkt_a.release(succeeded=True)
+        self.assertIs(f_high, self._next_started(2)[0])
+        self.assertEqual(1, sched.stats()['queued'])
+        self.started[0][1].release(succeeded=True)
+        self.started[1][1].release(succeeded=True)
+        self.assertIs(f_low, self._next_started(3)[0])
+        self.started[2][1].release(succeeded=True)
+        tkt_c.release(succeeded=True)
+
+        stats = sched.stats()
+        self.assertEqual(0, stats['queued'])
+        self.assertEqual(0, stats['running'])
+        self.assertEqual(5, stats['completed'])
+        self.assertEqual(1, stats['failed'])
+        self.assertEqual(700, stats['bytes'])
+        self.assertGreater(stats['bytes_per_sec'], 0)
+        self.assertGreater(stats['wait_max'], 0)
+        self.assertEqual(4, len(stats['by_vios']))
+        by_vios = stats['by_vios'][key]
+        self.assertEqual((2, 1, 200), (by_vios['completed'],
+                                       by_vios['failed'], by_vios['bytes']))
+
+    def test_fifo(self):
+        sched = ts.UploadScheduler(max_per_vios=1, max_per_server=0,
+                                   ordering='fifo')
+        ticket = sched.acquire(self._file(self.adpt1, 'v1'))
+        f_low = self._file(self.adpt1, 'v1')
+        self._queue(sched, f_low, priority=ts.UploadPriority.LOW)
+        self._queue(sched, self._file(self.adpt1, 'v1'),
+                    priority=ts.UploadPriority.HIGH)
+        ticket.release()
+        self.assertIs(f_low, self._next_started(1)[0])
+        self.started[0][1].release()
+        self._next_started(2)[1].release()
+
+    def test_set_limit(self):
+        sched = ts.UploadScheduler(max_per_vios=1, max_per_server=0)
+        ticket = sched.acquire(self._file(self.adpt1, 'v1'))
+        self._queue(sched, self._file(self.adpt1, 'v1'))
+        # Raising the limit starts the queued upload.
+        sched.set_limit(self.adpt1, 'v1', 2)
+        self._next_started(1)
+        self.assertEqual(
+            2, sched.stats()['by_vios'][('https://hmc1:12443', 'v1')]['limit'])
+        # 0 means no limit
+        sched.set_limit(self.adpt1, 'v1', 0)
+        sched.acquire(self._file(self.adpt1, 'v1')).release()
+        # None reverts to the default.
+        sched.set_limit(self.adpt1, 'v1', None)
+        self._queue(sched, self._file(self.adpt1, 'v1'))
+        ticket.release()
+        self.assertEqual(1, sched.stats()['queued'])
+        self.started[0][1].release()
+        self._next_started(2)[1].release()
+
+    @mock.patch('pypowervm.tasks.storage.CONF')
+    def test_config(self, mock_conf):
+        mock_conf.__getitem__.side_effect = {
+            'pypowervm_upload_max_per_vios': 4,
+            'pypowervm_upload_max_per_server': 10,
+            'pypowervm_upload_ordering': 'fifo'}.get
+        sched = ts.UploadScheduler()
+        self.assertEqual((4, 10, 'fifo'), (sched.max_per_vios,
+                                           sched.max_per_server,
+                                           sched.ordering))
+        self.assertEqual(2, ts.UploadScheduler(max_per_vios=2).max_per_vios)
+        self.assertRaises(ValueError, ts.UploadScheduler, ordering='lifo')
+
+    def test_get(self):
+        self.assertIs(ts.UploadScheduler.get(), ts.UploadScheduler.get())
+
+    def test_interrupted(self):
+        """A waiter interrupted while queued gives up its place."""
+        sched = ts.UploadScheduler(max_per_vios=1, max_per_server=0)
+        tkt_a = sched.acquire(self._file(self.adpt1, 'v1'))
+        with mock.patch('pypowervm.tasks.storage.threading') as mock_thr:
+            mock_thr.Event.return_value.wait.side_effect = KeyboardInterrupt
+            # Queued behind tkt_a
+            self.assertRaises(KeyboardInterrupt, sched.acquire,
+                              self._file(self.adpt1, 'v1'))
+            self.assertEqual(0, sched.stats()['queued'])
+            self.assertEqual({}, sched._queues)
+            # Dispatched (to another VIOS) just before being interrupted
+            self.assertRaises(KeyboardInterrupt, sched.acquire,
+                              self._file(self.adpt1, 'v2'))
+        stats = sched.stats()
+        self.assertEqual(1, stats['running'])
+        self.assertEqual(1, stats['failed'])
+        # The slot isn't taken by the withdrawn ticket.
+        tkt_a.release(succeeded=True)
+        tkt_b = sched.acquire(self._file(self.adpt1, 'v1'))
+        self.assertIsNotNone(tkt_b.started_at)
+        tkt_b.release()
+        self.assertEqual(0, sched.stats()['running'])
+
+    @mock.patch('pypowervm.tasks.storage._delete_vio_file')
+    @mock.patch('pypowervm.tasks.storage._upload_stream_api')
+    @mock.patch('pypowervm.tasks.storage.UploadScheduler.get')
+    def test_upload_stream(self, mock_get, mock_usa, mock_del):
+        """_upload_stream holds a slot in the UploadScheduler."""
+        sched = ts.UploadScheduler(max_per_vios=1)
+        mock_get.return_value = sched
+        vio_file = self._file(self.adpt1, 'v1')
+
+        def upload(*args, **kwargs):
+            self.assertEqual(1, sched.stats()['running'])
+        mock_usa.side_effect = upload
+        self.assertEqual(mock_del.return_value, ts._upload_stream(
+            vio_file, 'io_handle', ts.UploadType.IO_STREAM,
+            priority=ts.UploadPriority.HIGH))
+        mock_usa.assert_called_once_with(vio_file, 'io_handle',
+                                         ts.UploadType.IO_STREAM,
+                                         pipeline=None)
+        mock_del.assert_called_once_with(vio_file)
+        stats = sched.stats()
+        self.assertEqual((0, 1, 100), (stats['running'], stats['completed'],
+                                       stats['bytes']))
+
+        # A failed upload releases its slot too.
+        mock_usa.side_effect = exc.ConnectionError('fake error')
+        self.assertRaises(exc.ConnectionError, ts._upload_stream, vio_file,
+                          'io_handle', ts.UploadType.IO_STREAM)
+        stats = sched.stats()
+        self.assertEqual((0, 1, 1), (stats['running'], stats['completed'],
+                                     stats['failed']))
+        self.assertEqual(2, mock_del.call_count)
+
+
+class TestUploadPipeline(testtools.TestCase):
+    """Unit Tests for the UploadPipeline."""
+
+    def setUp(self):
+        super(TestUploadPipeline, self).setUp()
+        self.data = os.urandom(100000)
+        self.progress = []
+        self.pipe = ts.UploadPipeline(chunk_size=4096, depth=2,
+                                      progress=self.progress.append,
+                                      progress_interval=0)
+
+    def _check(self, chunks, data):
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(data, b''.join(chunks))
+        self.assertEqual(hashlib.sha256(data).hexdigest(), self.pipe.sha256)
+        stats = self.pipe.stats()
+        self.assertEqual(len(data), stats['bytes'])
+        self.assertTrue(stats['done'])
+        self.assertEqual(self.pipe.sha256, stats['sha256'])
+        self.assertEqual(stats, self.progress[-1])
+        self.assertFalse(any(prg['done'] for prg in self.progress[:-1]))
+        del self.progress[:]
+
+    def test_regular_file(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'img')
+        with open(path, 'wb') as fh:
+            fh.write(self.data)
+        with open(path, 'rb') as fh:
+            fh.seek(10)
+            with mock.patch('mmap.mmap', wraps=mmap.mmap) as mock_mmap:
+                chunks = list(self.pipe.stream(fh, total=len(self.data)))
+            mock_mmap.assert_called_once_with(fh.fileno(), 0,
+                                              access=mmap.ACCESS_READ)
+            # The file is left at its end.
+            self.assertEqual(len(self.data), fh.tell())
+        self._check(chunks, self.data[10:])
+        self.assertEqual(len(self.data), self.pipe.stats()['total'])
+
+        # Reusable, and an empty file works.
+        with open(path, 'wb') as fh:
+            pass
+        with open(path, 'rb') as fh:
+            self._check(list(self.pipe.stream(fh)), b'')
+
+    def test_stream(self):
+        self._check(list(self.pipe.stream(io.BytesIO(self.data))), self.data)
+        self.assertIsNone(self.pipe.stats()['total'])
+        # An iterable of chunks
+        chunks = iter([self.data[:4000], self.data[4000:8000]])
+        self._check(list(self.pipe.stream(chunks)), self.data[:8000])
+
+    def test_read_error(self):
+        stream = mock.Mock()
+        stream.read.side_effect = [self.data[:4096], IOError('fake error')]
+        chunks = self.pipe.stream(stream)
+        self.assertEqual(self.data[:4096], next(chunks))
+        self.assertRaises(IOError, next, chunks)
+        self.assertFalse(self.pipe.stats()['done'])
+        self.assertIsNone(self.pipe.sha256)
+
+    def test_stop_early(self):
+        """The read-ahead stops if the upload does."""
+        stream = io.BytesIO(self.data)
+        chunks = self.pipe.stream(stream)
+        next(chunks)
+        chunks.close()
+        self.assertFalse(self.pipe.stats()['done'])
+        # No more than the chunks in flight were read.
+        self.assertLessEqual(stream.tell(), 4096 * 5)
+
+    def test_upload_stream_api(self):
+        """_upload_stream_api sends the data through the pipeline."""
+        sha = hashlib.sha256(self.data).hexdigest()
+        vio_file = mock.Mock(expected_file_size=len(self.data),
+                             sha_chksum=sha.upper())
+        sent = []
+        vio_file.adapter.upload_file.side_effect = (
+            lambda elem, source, **kwargs: sent.extend(source))
+        ts._upload_stream_api(vio_file, io.BytesIO(self.data),
+                              ts.UploadType.IO_STREAM, pipeline=self.pipe)
+        vio_file.adapter.upload_file.assert_called_once_with(
+            vio_file.element, mock.ANY, helpers=vio_file.adapter.helpers)
+        self._check(sent, self.data)
+        self.assertEqual(len(self.data), self.pipe.stats()['total'])
+
+        # The data sent doesn't match the File's checksum
+        vio_file.sha_chksum = hashlib.sha256(b'other').hexdigest()
+        self.assertRaises(exc.UploadChecksumMismatch, ts._upload_stream_api,
+                          vio_file, io.BytesIO(self.data),
+                          ts.UploadType.IO_STREAM, pipeline=self.pipe)
+        # No checksum to verify
+        vio_file.sha_chksum = None
+        ts._upload_stream_api(vio_file, io.BytesIO(self.data),
+                              ts.UploadType.IO_STREAM, pipeline=self.pipe)
+        self.assertEqual(sha, self.pipe.sha256)
+
+
 class TestVG(twrap.TestWrapper):
     file = VG_FEED
     wrapper_class_to_test = stor.VG
@@ -876,6 +1189,90 @@ class TestLU(testtools.TestCase):
         # But that doesn't happen if specifying tier
         validate(ts.crt_lu(tier, 'lu5', 10), False, None, None, None)
 
+    @mock.patch('pypowervm.tasks.storage._TIER_CLONE_SEMS', new={})
+    @mock.patch('pypowervm.wrappers.storage.LUEnt.bld')
+    @mock.patch('pypowervm.wrappers.storage.Tier.search')
+    def test_crt_lu_linked_clones(self, mock_tier_srch, mock_lu_bld):
+        ssp = mock.Mock(spec=stor.SSP)
+        tier = mock.Mock(spec=stor.Tier, adapter=self.adpt, uuid='tier_uuid')
+        mock_tier_srch.return_value = tier
+        src_lu = mock.Mock(udid='image_udid')
+        src_lu.name = 'image'
+        lock = threading.Lock()
+        running = []
+        peak = [0]
+
+        def bld(adapter, name, size, **kwargs):
+            self.assertEqual(dict(thin=True, typ=stor.LUType.DISK,
+                                  clone=src_lu), kwargs)
+            lu = mock.Mock()
+
+            def create(parent):
+                self.assertIs(tier, parent)
+                with lock:
+                    running.append(name)
+                    peak[0] = max(peak[0], len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.remove(name)
+                if name == 'bad':
+                    raise exc.HttpError(mock.Mock())
+                return name, size
+            lu.create.side_effect = create
+            return lu
+        mock_lu_bld.side_effect = bld
+
+        # SSP: the default Tier is found, and the SSP refreshed, once.
+        specs = ['lu%d' % num for num in range(20)] + [
+            ('bad', 5), ts.CloneSpec('big', size=10)]
+        ret, results = ts.crt_lu_linked_clones(ssp, src_lu, specs)
+        self.assertEqual(ssp.refresh.return_value, ret)
+        ssp.refresh.assert_called_once_with()
+        mock_tier_srch.assert_called_once_with(
+            ssp.adapter, parent=ssp, is_default=True, one_result=True)
+        self.assertEqual(22, len(results))
+        self.assertEqual(
+            [ts.CloneResult(ts.CloneSpec('lu%d' % num), ('lu%d' % num, 0),
+                            None) for num in range(20)], results[:20])
+        self.assertEqual((ts.CloneSpec('bad', 5), None), results[20][:2])
+        self.assertIsInstance(results[20].error, exc.HttpError)
+        self.assertEqual(ts.CloneResult(ts.CloneSpec('big', 10), ('big', 10),
+                                        None), results[21])
+        # Concurrent, within the default limit per Tier
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 8)
+
+        # Tier, not refreshed; the Tier limit holds across concurrent calls.
+        peak[0] = 0
+        threads = [threading.Thread(
+            target=ts.crt_lu_linked_clones,
+            args=(tier, src_lu, ['lu%d_%d' % (thr, num) for num in range(6)]))
+            for thr in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 8)
+        self.assertEqual(0, tier.refresh.call_count)
+
+        # Nothing to do
+        self.assertEqual((ssp, []), ts.crt_lu_linked_clones(ssp, src_lu, []))
+        # All failed: no refresh.
+        ssp.refresh.reset_mock()
+        ret, results = ts.crt_lu_linked_clones(ssp, src_lu, ['bad'])
+        self.assertEqual(ssp, ret)
+        self.assertIsNotNone(results[0].error)
+        ssp.refresh.assert_not_called()
+
+        # No limit
+        with mock.patch('pypowervm.tasks.storage.CONF') as mock_conf:
+            mock_conf.pypowervm_lu_clone_max_per_tier = 0
+            peak[0] = 0
+            ts.crt_lu_linked_clones(tier, src_lu, ['lu%d' % num
+                                                   for num in range(12)])
+            self.assertGreater(peak[0], 8)
+
     def test_rm_lu_by_lu(self):
         lu = self.ssp.logical_units[2]
         ssp = ts.rm_ssp_storage(self.ssp, [lu])
@@ -958,6 +1355,60 @@ class TestLULinkedClone(testtools.TestCase):
         self.assertIsNone(ts._image_lu_for_clone(self.ssp.logical_units,
                                                  self.dsk_lu3))
 
+    def test_lu_index(self):
+        index = ts.LUIndex(self.ssp.logical_units)
+        self.assertEqual(self.img_lu2.name,
+                         index.by_udid(self.img_lu2.udid).name)
+        self.assertIsNone(index.by_udid('bogus'))
+        self.assertEqual([self.dsk_lu3.udid],
+                         [lu.udid for lu in index.by_name('dsk_lu3')])
+        self.assertEqual([], index.by_name('bogus'))
+        self.assertEqual(self.img_lu2.udid,
+                         index.image_for_clone(self.dsk_lu4).udid)
+        self.assertIsNone(index.image_for_clone(self.dsk_lu_orphan))
+        self.assertEqual((0, 2, 1), tuple(index.clone_count(lu) for lu in (
+            self.img_lu1, self.img_lu2, self.img_lu5)))
+        self.assertEqual([self.img_lu1.udid],
+                         [lu.udid for lu in index.orphan_images()])
+        # The orphan clone is warned of once.
+        with self.assertLogs(ts.__name__, 'WARNING') as logs:
+            self.assertTrue(index.image_in_use(self.img_lu5))
+            self.assertFalse(index.image_in_use(self.img_lu1))
+        self.assertEqual(1, len(logs.output))
+
+        # Removal by UDID, from the index at once and the list on flush.
+        self.assertEqual(self.dsk_lu6.udid, index.remove(self.dsk_lu6).udid)
+        self.assertFalse(index.image_in_use(self.img_lu5))
+        self.assertEqual([self.img_lu1.udid, self.img_lu5.udid],
+                         [lu.udid for lu in index.orphan_images()])
+        img5 = stor.LU.bld(None, 'img_lu5', 1)
+        img5._udid(self.img_lu5.udid)
+        self.assertEqual(self.img_lu5.udid, index.remove(img5).udid)
+        self.assertIsNone(index.by_udid(self.img_lu5.udid))
+        self.assertEqual([], index.by_name('img_lu5'))
+        self.assertIsNone(index.remove(self.img_lu5))
+        self.assertEqual(7, len(self.ssp.logical_units))
+        index.flush()
+        self.assertEqual(['img_lu1', 'img_lu2', 'dsk_lu3', 'dsk_lu4',
+                          'dsk_lu7'],
+                         [lu.name for lu in self.ssp.logical_units])
+
+        # A plain list
+        lus = list(self.ssp.logical_units)
+        index = ts.LUIndex(lus)
+        index.remove(self.dsk_lu3)
+        index.remove(self.dsk_lu4)
+        self.assertEqual(['img_lu2'],
+                         [lu.name for lu in index.orphan_images()][1:])
+        index.flush()
+        self.assertEqual(['img_lu1', 'img_lu2', 'dsk_lu7'],
+                         [lu.name for lu in lus])
+
+        # Duplicate UDIDs are an error on removal.
+        index = ts.LUIndex(lus + [self.img_lu1])
+        self.assertRaises(exc.FoundDevMultipleTimes, index.remove,
+                          self.img_lu1)
+
     def test_rm_ssp_storage(self):
         lu_names = set(lu.name for lu in self.ssp.logical_units)
         # This one should remove the disk LU but *not* the image LU
@@ -14,6 +14,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import copy
 import errno
 import fixtures
@@ -21,6 +22,8 @@ import gc
 from lxml import etree
 import six
 import subunit
+import threading
+import time
 
 if six.PY2:
     import __builtin__ as builtins
@@ -78,6 +81,9 @@ class TestAdapter(testtools.TestCase):
         my_response._content = content
         return my_response
 
+    ms_uuid = 'caae9209-25e5-35cd-a71a-ed55c03f294d'
+    lpar_uuid = '089ffb20-5d19-4a8c-bb80-13650627d985'
+
     def setUp(self):
         super(TestAdapter, self).setUp()
         """Set up a mocked Session instance."""
@@ -129,6 +135,8 @@ class TestAdapter(testtools.TestCase):
             event_listen.subscribe(wrap_evh)
             events, raw_events, evtwraps = event_listen._get_events()
             event_listen._dispatch_events(events, raw_events, evtwraps)
+            # Each handler is invoked on its own thread
+            self.assertTrue(event_listen.flush(timeout=5))
             evh.process.assert_called_once_with({'general': 'init'})
             raw_evh.process.assert_called_once_with('raw_evt')
             wrap_evh.process.assert_called_once_with('wrap_evt')
@@ -221,14 +229,401 @@ class TestAdapter(testtools.TestCase):
         self.assertEqual(raw_result, raw_events)
         self.assertEqual(dict_result, events)
 
+    def _raw_event(self, eid, etype, uri=None):
+        if uri is not None:
+            uri = 'https://9.1.2.3:12443/rest/api/uom/' + uri
+        return {'EventType': etype, 'EventData': uri, 'EventID': eid,
+                'EventDetail': None}
+
+    def _evt_batch(self, *raws):
+        raws = list(raws)
+        return ({}, raws, [mock.Mock(etype=raw['EventType'],
+                                     data=raw['EventData'], eid=raw['EventID'])
+                           for raw in raws])
+
+    @mock.patch('pypowervm.adapter._EventPollThread')
+    @mock.patch('pypowervm.adapter._EventListener._get_events')
+    def test_event_bus(self, mock_events, mock_poll):
+        """Per-handler queues and threads, filters, stats."""
+        self.sess._sessToken = 'token'.encode('utf-8')
+        mock_events.return_value = {'general': 'init'}, [], []
+        listener = self.sess.get_event_listener()
+        lpar_uri = 'LogicalPartition/' + self.lpar_uuid
+        # A handler which blocks until told to proceed
+        gate = threading.Event()
+        slow = mock.Mock(spec=adp.RawEventHandler)
+        slow.process.side_effect = lambda events: gate.wait(5)
+        listener.subscribe(slow, queue_size=2)
+        # Filtered handlers
+        raw_evh = mock.Mock(spec=adp.RawEventHandler)
+        listener.subscribe(raw_evh, uri_prefixes=['/rest/api/uom/Logical'])
+        evh = mock.Mock(spec=adp.EventHandler)
+        listener.subscribe(evh, event_types=['ADD_URI'])
+        wrap_evh = mock.Mock(spec=adp.WrapperEventHandler)
+        listener.subscribe(
+            wrap_evh, uri_prefixes=['https://9.1.2.3:12443/rest/api/uom/Man'],
+            event_types=['MODIFY_URI'])
+
+        batch1 = self._evt_batch(
+            self._raw_event('1', 'ADD_URI', lpar_uri),
+            self._raw_event('2', 'MODIFY_URI',
+                            'ManagedSystem/' + self.ms_uuid),
+            self._raw_event('3', 'MODIFY_URI', lpar_uri))
+        listener._dispatch_events(*batch1)
+        # The slow handler doesn't hold up the others
+        for handler in (slow, raw_evh, evh, wrap_evh):
+            for i in range(500):
+                if handler.process.called:
+                    break
+                time.sleep(0.01)
+        raw_evh.process.assert_called_once_with(
+            [batch1[1][0], batch1[1][2]])
+        evh.process.assert_called_once_with(
+            {batch1[1][0]['EventData']: 'add'})
+        wrap_evh.process.assert_called_once_with([batch1[2][1]])
+
+        # Global events are never filtered; empty batches only go to handlers
+        # without filters.
+        batch2 = self._evt_batch(self._raw_event('4', 'CACHE_CLEARED'))
+        listener._dispatch_events(*batch2)
+        listener._dispatch_events({}, [], [])
+        # The slow handler's queue (still busy with batch1) overflows.
+        listener._dispatch_events({}, [], [])
+        stats = listener.stats()[slow]
+        self.assertEqual(3, stats['dropped'])
+        self.assertEqual(2, stats['max_depth'])
+        gate.set()
+        self.assertTrue(listener.flush(timeout=5))
+        evh.process.assert_called_with({'general': 'invalidate'})
+        self.assertEqual(2, evh.process.call_count)
+        self.assertEqual(2, raw_evh.process.call_count)
+        # The slow handler got batch1, then MISSING_EVENTS in place of the rest
+        self.assertEqual(2, slow.process.call_count)
+        self.assertEqual('MISSING_EVENTS',
+                         slow.process.call_args[0][0][0]['EventType'])
+        stats = listener.stats()[slow]
+        self.assertEqual(0, stats['depth'])
+        self.assertEqual(2, stats['delivered'])
+        self.assertGreater(stats['max_lag'], 0)
+        self.assertEqual(4, len(listener.stats()))
+
+        # Unsubscribing stops the handler's thread
+        sub = listener._subscriptions[0]
+        listener.unsubscribe(slow)
+        sub._thread.join(5)
+        self.assertFalse(sub._thread.is_alive())
+        listener.shutdown()
+        self.assertEqual([], listener.handlers)
+        self.assertEqual([], listener._subscriptions)
+
+    @mock.patch('pypowervm.adapter._EventPollThread')
+    @mock.patch('pypowervm.adapter._EventListener._get_events')
+    def test_event_unsubscribe_busy(self, mock_events, mock_poll):
+        """Unsubscribing a handler with a full queue doesn't block."""
+        self.sess._sessToken = 'token'.encode('utf-8')
+        mock_events.return_value = {'general': 'init'}, [], []
+        listener = self.sess.get_event_listener()
+        gate = threading.Event()
+        slow = mock.Mock(spec=adp.RawEventHandler)
+        slow.process.side_effect = lambda events: gate.wait(10)
+        listener.subscribe(slow, queue_size=1)
+        other = mock.Mock(spec=adp.RawEventHandler)
+        listener.subscribe(other)
+        sub = listener._subscriptions[0]
+        listener._dispatch_events({}, [], [])
+        for i in range(500):
+            if slow.process.called:
+                break
+            time.sleep(0.01)
+        # One batch in process, one filling the queue
+        listener._dispatch_events({}, [], [])
+        self.assertEqual(1, sub.stats()['depth'])
+        unsub = threading.Thread(target=listener.unsubscribe, args=(slow,))
+        unsub.start()
+        unsub.join(1)
+        self.assertFalse(unsub.is_alive())
+        # Event intake continues for the other handler.
+        listener._dispatch_events({}, [], [])
+        self.assertTrue(sub._thread.is_alive())
+        # The queued batch is still delivered, then the thread exits.
+        gate.set()
+        sub._thread.join(5)
+        self.assertFalse(sub._thread.is_alive())
+        self.assertEqual(2, slow.process.call_count)
+
+        # A handler may unsubscribe itself while processing.
+        def unsub_self(events):
+            listener.unsubscribe(other)
+        other.process.side_effect = unsub_self
+        sub = listener._subscriptions[0]
+        listener._dispatch_events({}, [], [])
+        sub._thread.join(5)
+        self.assertFalse(sub._thread.is_alive())
+        self.assertEqual([], listener.handlers)
+
+    @mock.patch('pypowervm.adapter._EventPollThread')
+    @mock.patch('pypowervm.adapter._EventListener._get_events')
+    def test_event_replay(self, mock_events, mock_poll):
+        self.sess._sessToken = 'token'.encode('utf-8')
+        mock_events.return_value = {'general': 'init'}, [], []
+        listener = self.sess.get_event_listener()
+        lpar_uri = 'LogicalPartition/' + self.lpar_uuid
+        batch = self._evt_batch(
+            self._raw_event('1', 'ADD_URI', lpar_uri),
+            self._raw_event('2', 'MODIFY_URI', lpar_uri),
+            self._raw_event('3', 'DELETE_URI', lpar_uri))
+        with mock.patch('pypowervm.adapter._EVENT_REPLAY_SIZE', new=2):
+            listener._recent = collections.deque(maxlen=2)
+        listener._dispatch_events(*batch)
+        self.assertEqual(batch[1][1:], listener.recent_events())
+        self.assertEqual(batch[1][2:], listener.recent_events(after_id='2'))
+        self.assertIsNone(listener.recent_events(after_id='1'))
+
+        # Replay from a retained event
+        raw_evh = mock.Mock(spec=adp.RawEventHandler)
+        listener.subscribe(raw_evh, replay_from='2')
+        wrap_evh = mock.Mock(spec=adp.WrapperEventHandler)
+        listener.subscribe(wrap_evh, replay_from='2')
+        # Replay from an event no longer retained
+        evh = mock.Mock(spec=adp.EventHandler)
+        listener.subscribe(evh, replay_from='1')
+        self.assertTrue(listener.flush(timeout=5))
+        raw_evh.process.assert_called_once_with(batch[1][2:])
+        wrap_evh.process.assert_called_once_with(batch[2][2:])
+        # MISSING_EVENTS, then the retained events
+        evh.process.assert_called_once_with(
+            {'general': 'invalidate', batch[1][1]['EventData']: 'delete'})
+        listener.shutdown()
+
     @mock.patch('pypowervm.adapter.Session')
     def test_empty_init(self, mock_sess):
         adp.Adapter()
         mock_sess.assert_called_with()
 
-    def test_no_cache(self):
-        self.assertRaises(pvmex.CacheNotSupportedException,
-                          adp.Adapter, use_cache=True)
+    @mock.patch('pypowervm.adapter._EventPollThread')
+    @mock.patch('pypowervm.adapter._EventListener._get_events')
+    def test_cache_unsubscribe(self, mock_events, mock_poll):
+        """A cached Adapter's event subscription doesn't outlive it."""
+        self.sess._sessToken = 'token'.encode('utf-8')
+        mock_events.return_value = {'general': 'init'}, [], []
+        listener = self.sess.get_event_listener()
+
+        # close()
+        adapter = adp.Adapter(self.sess, use_cache=True)
+        self.assertEqual(1, len(listener.handlers))
+        sub = listener._subscriptions[0]
+        adapter.close()
+        self.assertEqual([], listener.handlers)
+        self.assertIsNone(adapter._cache)
+        sub._thread.join(5)
+        self.assertFalse(sub._thread.is_alive())
+        # Again is harmless
+        adapter.close()
+
+        # Garbage collected: unsubscribed on the next poll
+        adapter = adp.Adapter(self.sess, use_cache=True)
+        sub = listener._subscriptions[0]
+        del adapter
+        gc.collect()
+        listener._dispatch_events({}, [], [])
+        sub._thread.join(5)
+        self.assertFalse(sub._thread.is_alive())
+        self.assertEqual([], listener.handlers)
+
+    @mock.patch('time.time')
+    @mock.patch('requests.Session')
+    def test_cache(self, mock_session, mock_time):
+        """Reads through the Adapter cache."""
+        mock_time.return_value = 1000
+        with mock.patch.object(self.sess, 'get_event_listener') as mock_gel:
+            adapter = adp.Adapter(self.sess, use_cache=True)
+        evh = mock_gel.return_value.subscribe.call_args[0][0]
+        self.assertIsInstance(evh, adp._CacheEventHandler)
+
+        resp200 = self._mk_response(200, response_text)
+        resp200.headers['etag'] = '123'
+        resp304 = self._mk_response(200)
+        resp304.status_code = 304
+        mock_rq = mock_session.return_value.request
+        mock_rq.return_value = resp200
+
+        path = '/rest/api/uom/ManagedSystem/%s?group=None' % self.ms_uuid
+
+        # First read goes to the server; second is served from the cache.
+        ret1 = adapter.read('ManagedSystem', root_id=self.ms_uuid)
+        ret2 = adapter.read('ManagedSystem', root_id=self.ms_uuid)
+        self.assertEqual(1, mock_rq.call_count)
+        self.assertEqual(200, ret2.status)
+        self.assertEqual('123', ret2.etag)
+        self.assertIs(adapter, ret2.adapter)
+        self.assertEqual(len(ret1.feed.entries), len(ret2.feed.entries))
+        # The cached data is independent of what was handed out
+        self.assertIsNot(ret1.feed.entries[0].element.element,
+                         ret2.feed.entries[0].element.element)
+
+        # Different xag is a different cache key
+        adapter.read('ManagedSystem', root_id=self.ms_uuid, xag=['Advanced'])
+        self.assertEqual(2, mock_rq.call_count)
+
+        # Stale per 'age' => revalidated with the etag; 304 uses the cache
+        mock_time.return_value = 1010
+        mock_rq.return_value = resp304
+        ret3 = adapter.read('ManagedSystem', root_id=self.ms_uuid, age=5)
+        self.assertEqual(3, mock_rq.call_count)
+        self.assertEqual(
+            '123', mock_rq.call_args[1]['headers']['If-None-Match'])
+        self.assertEqual(200, ret3.status)
+        self.assertIsNotNone(ret3.feed)
+        # Revalidation reset the age
+        adapter.read('ManagedSystem', root_id=self.ms_uuid, age=5)
+        self.assertEqual(3, mock_rq.call_count)
+
+        # Caller-specified etag bypasses the cache
+        ret4 = adapter.read('ManagedSystem', root_id=self.ms_uuid, etag='123')
+        self.assertEqual(4, mock_rq.call_count)
+        self.assertEqual(304, ret4.status)
+
+        # An event on the URI (under any parent) invalidates it
+        mock_rq.return_value = resp200
+        evh.process({'https://host:12443/rest/api/uom/ManagedSystem/'
+                     '%s' % self.ms_uuid.upper(): 'invalidate'})
+        adapter.read('ManagedSystem', root_id=self.ms_uuid)
+        self.assertEqual(5, mock_rq.call_count)
+        adapter.read_by_path(path)
+        self.assertEqual(5, mock_rq.call_count)
+
+        # A general invalidate clears everything
+        evh.process({'general': 'invalidate'})
+        self.assertEqual(0, len(adapter._cache))
+
+        # Jobs and non-uom services aren't cached
+        adapter.read('jobs', self.ms_uuid)
+        adapter.read('jobs', self.ms_uuid)
+        self.assertEqual(7, mock_rq.call_count)
+        self.assertEqual(0, len(adapter._cache))
+
+    @mock.patch('requests.Session')
+    def test_read_iter(self, mock_session):
+        """Streaming, incremental read of a feed."""
+        adapter = adp.Adapter(self.sess)
+        body = pvmhttp.PVMFile('fake_vios_feed.txt').body.encode('utf-8')
+        expected = adp.Response('GET', '/path', 200, 'OK', {}, body=body)
+        expected.adapter = adapter
+        expected._unmarshal_atom()
+        resp = self._mk_response(200)
+        # Small chunks, splitting entries across writes
+        resp.iter_content = mock.Mock(return_value=(
+            body[i:i + 1000] for i in range(0, len(body), 1000)))
+        mock_rq = mock_session.return_value.request
+        mock_rq.return_value = resp
+
+        entries = list(adapter.read_iter(
+            'ManagedSystem', root_id=self.ms_uuid,
+            child_type='VirtualIOServer', xag=['ViosStorage'],
+            chunksize=1000))
+        self.assertEqual(
+            [e.uuid for e in expected.feed.entries], [e.uuid for e in entries])
+        self.assertEqual(
+            [e.etag for e in expected.feed.entries], [e.etag for e in entries])
+        for exp, act in zip(expected.feed.entries, entries):
+            self.assertEqual(exp.element, act.element)
+            self.assertIs(adapter, act.adapter)
+            # Released from the feed as it was processed
+            self.assertIsNone(
+                act.element.element.getparent().getparent().getparent())
+        mock_rq.assert_called_once_with(
+            'GET', self.sess.dest + adp.Adapter.build_path(
+                'uom', 'ManagedSystem', self.ms_uuid, 'VirtualIOServer',
+                xag=['ViosStorage']),
+            stream=True, headers=mock.ANY, timeout=1200)
+        self.assertEqual('application/atom+xml',
+                         mock_rq.call_args[1]['headers']['Accept'])
+        resp.iter_content.assert_called_once_with(1000)
+
+        # Empty feed
+        mock_rq.return_value = self._mk_response(204)
+        self.assertEqual([], list(adapter.read_iter('VirtualIOServer')))
+
+        # HTTP error
+        mock_rq.return_value = self._mk_response(401)
+        self.sess._relogin_unsafe = True
+        self.assertRaises(pvmex.HttpError, list,
+                          adapter.read_iter('VirtualIOServer'))
+
+        # Truncated body
+        resp = self._mk_response(200)
+        resp.iter_content = mock.Mock(return_value=[body[:5000]])
+        mock_rq.return_value = resp
+        self.assertRaises(pvmex.AtomError, list,
+                          adapter.read_iter('VirtualIOServer'))
+
+    @mock.patch('pypowervm.adapter._STREAM_QUEUE_SIZE', new=1)
+    @mock.patch('requests.Session')
+    def test_read_iter_abandoned(self, mock_session):
+        """The download stops if the consumer abandons the generator."""
+        adapter = adp.Adapter(self.sess)
+        body = pvmhttp.PVMFile('lpar.txt').body.encode('utf-8')
+        resp = self._mk_response(200)
+        chunks = []
+
+        def _chunks(size):
+            for i in range(0, len(body), size):
+                chunks.append(i)
+                yield body[i:i + size]
+        resp.iter_content = _chunks
+        mock_session.return_value.request.return_value = resp
+
+        gen = adapter.read_iter('LogicalPartition', chunksize=100)
+        self.assertIsNotNone(next(gen))
+        gen.close()
+        # The fetch thread notices within a second, well before the end.
+        time.sleep(1.5)
+        self.assertLess(chunks[-1] + 100, len(body))
+
+    def test_read_cache(self):
+        """_ReadCache LRU, invalidation, and generation checks."""
+        def mkresp(path, size):
+            return adp.Response('GET', path, 200, 'OK', {'etag': path},
+                                reqheaders={'Accept': 'application/atom+xml'},
+                                body='x' * size)
+        lpar = '/rest/api/uom/LogicalPartition/' + self.lpar_uuid
+        ms_lpar = ('/rest/api/uom/ManagedSystem/%s/LogicalPartition/%s' %
+                   (self.ms_uuid, self.lpar_uuid))
+        lpar_feed = '/rest/api/uom/ManagedSystem/%s/LogicalPartition' % (
+            self.ms_uuid)
+        ms = '/rest/api/uom/ManagedSystem/' + self.ms_uuid
+        cache = adp._ReadCache(100)
+        for path in (lpar, ms_lpar + '?group=None', lpar_feed, ms):
+            cache.put(path, mkresp(path, 20), cache.generation)
+        self.assertEqual(4, len(cache))
+        self.assertEqual(80, cache.size)
+        # Invalidating the LPAR kills the LPAR (by any parent, any xag) and
+        # its feed, but not the ManagedSystem.
+        cache.invalidate(ms_lpar.upper())
+        self.assertEqual(1, len(cache))
+        self.assertEqual(ms, cache.get(ms).etag)
+        # Stale generation doesn't populate the cache
+        gen = cache.generation
+        cache.invalidate(lpar_feed)
+        cache.put(lpar, mkresp(lpar, 20), gen)
+        self.assertIsNone(cache.get(lpar))
+        # LRU eviction
+        cache.put(lpar, mkresp(lpar, 50), cache.generation)
+        cache.get(ms)
+        cache.put(lpar_feed, mkresp(lpar_feed, 50), cache.generation)
+        self.assertIsNone(cache.get(lpar))
+        self.assertIsNotNone(cache.get(ms))
+        self.assertEqual(70, cache.size)
+        # Too big to cache at all
+        cache.put(lpar, mkresp(lpar, 101), cache.generation)
+        self.assertIsNone(cache.get(lpar))
+        # Cacheability
+        self.assertTrue(adp._ReadCache.cacheable(ms + '?group=None'))
+        self.assertFalse(adp._ReadCache.cacheable(ms + '/quick/State'))
+        self.assertFalse(adp._ReadCache.cacheable(ms + '/do/PowerOn'))
+        self.assertFalse(adp._ReadCache.cacheable('/rest/api/uom/Event?a=b'))
+        self.assertFalse(adp._ReadCache.cacheable('/rest/api/pcm/preferences'))
+        self.assertFalse(adp._ReadCache.cacheable(lpar + '/x.json'))
 
     @mock.patch('requests.Session')
     def test_read(self, mock_session):
@@ -0,0 +1,160 @@
+# Copyright 2017 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+
+import mock
+import six
+import testtools
+
+from pypowervm import async_adapter as aadp
+import pypowervm.exceptions as pvmex
+import pypowervm.tests.test_fixtures as fx
+from pypowervm.tests.test_utils import pvmhttp
+import pypowervm.wrappers.job as jwrap
+
+
+class TestAsyncAdapter(testtools.TestCase):
+    def setUp(self):
+        super(TestAsyncAdapter, self).setUp()
+        self.adpt = self.useFixture(fx.AdapterFx()).adpt
+        self.asess = aadp.AsyncSession(self.adpt.session, max_workers=4)
+        self.addCleanup(self.asess.shutdown)
+        self.aadp = aadp.AsyncAdapter(self.asess)
+        self.aadp.adapter = self.adpt
+
+    def _job(self, fname, status=None):
+        job = jwrap.Job.wrap(pvmhttp.load_pvm_resp(
+            fname, adapter=self.adpt).response)
+        if status:
+            job.entry.element.find(jwrap._JOB_STATUS).text = status
+        return job
+
+    def test_delegation(self):
+        # The synchronous Adapter shares the AsyncSession's Session
+        self.adpt.assert_called_once_with(self.adpt.session, use_cache=False,
+                                          helpers=None)
+        self.assertIs(self.adpt.session, self.aadp.session)
+        self.assertEqual(self.adpt.read.return_value,
+                         self.aadp.read('root', xag=['a']).result(5))
+        self.adpt.read.assert_called_once_with('root', xag=['a'])
+        for meth in ('create', 'create_by_path', 'create_job', 'read_by_href',
+                     'read_by_path', 'read_job', 'update', 'update_by_path',
+                     'delete', 'delete_by_href', 'delete_by_path',
+                     'upload_file', 'download_file'):
+            self.assertEqual(getattr(self.adpt, meth).return_value,
+                             getattr(self.aadp, meth)('arg').result(5))
+            getattr(self.adpt, meth).assert_called_once_with('arg')
+        # Exceptions are raised through the future
+        self.adpt.update.side_effect = pvmex.HttpNotFound(mock.Mock())
+        self.assertRaises(pvmex.HttpNotFound,
+                          self.aadp.update('data', 'etag').result, 5)
+
+    def test_asyncio(self):
+        if six.PY2:
+            self.skipTest('asyncio requires python 3')
+        import asyncio
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        aadpt = aadp.AsyncAdapter(self.asess, loop=loop)
+        aadpt.adapter = self.adpt
+        fut = aadpt.read('root')
+        self.assertIsInstance(fut, asyncio.Future)
+        self.assertEqual(self.adpt.read.return_value,
+                         loop.run_until_complete(fut))
+
+    def test_call_later(self):
+        fn = mock.Mock(return_value='ret')
+        self.assertEqual('ret', self.asess.call_later(0.01, fn, 'a',
+                                                      b='c').result(5))
+        fn.assert_called_once_with('a', b='c')
+
+    def test_shutdown(self):
+        """Pending delayed calls and Job polls fail on shutdown."""
+        fn = mock.Mock()
+        fut = self.asess.call_later(60, fn)
+        poll = self.aadp.poll_job(self._job(
+            'job_response_completed_ok.txt',
+            status=jwrap.JobStatus.RUNNING), interval=60)
+        self.asess.shutdown()
+        self.assertRaises(RuntimeError, fut.result, 5)
+        self.assertRaises(RuntimeError, poll.result, 5)
+        fn.assert_not_called()
+        self.assertRaises(RuntimeError, self.asess.call_later, 0, fn)
+
+    def test_call_later_submit_fails(self):
+        """A delayed call whose submission fails fails its future."""
+        with mock.patch.object(self.asess, 'submit') as mock_submit:
+            mock_submit.side_effect = RuntimeError('shut down')
+            self.assertRaises(RuntimeError, self.asess.call_later(
+                0.01, mock.Mock()).result, 5)
+
+    def test_run_job(self):
+        ok = self._job('job_response_completed_ok.txt')
+        running = self._job('job_response_completed_ok.txt',
+                            status=jwrap.JobStatus.RUNNING)
+        self.adpt.create_job.return_value.entry = copy.deepcopy(running.entry)
+        self.adpt.read_job.side_effect = [
+            mock.Mock(entry=copy.deepcopy(running.entry)),
+            mock.Mock(entry=ok.entry)]
+        job = self._job('job_request_power_off.txt')
+        self.assertIs(job, self.aadp.run_job(job, 'uuid', interval=0.01,
+                                             sensitive=True).result(5))
+        self.adpt.create_job.assert_called_once_with(
+            mock.ANY, 'LogicalPartition', 'uuid', sensitive=True)
+        self.assertEqual(2, self.adpt.read_job.call_count)
+        self.adpt.delete.assert_called_once_with('jobs', ok.job_id)
+
+        # Failed job
+        self.adpt.create_job.return_value.entry = self._job(
+            'job_response_completed_failed.txt').entry
+        self.assertRaises(pvmex.JobRequestFailed, self.aadp.run_job(
+            self._job('job_request_power_off.txt'), 'uuid').result, 5)
+
+        # Create failure
+        self.adpt.create_job.side_effect = pvmex.Error('boom')
+        self.assertRaises(pvmex.JobRequestFailed, self.aadp.run_job(
+            self._job('job_request_power_off.txt'), 'uuid').result, 5)
+
+    @mock.patch('pypowervm.wrappers.job.Job.cancel_job')
+    def test_run_job_timeout(self, mock_cancel):
+        self.adpt.create_job.return_value.entry = self._job(
+            'job_response_completed_ok.txt',
+            status=jwrap.JobStatus.NOT_ACTIVE).entry
+        self.adpt.read_job.return_value.entry = self._job(
+            'job_response_completed_ok.txt',
+            status=jwrap.JobStatus.RUNNING).entry
+        self.assertRaises(pvmex.JobRequestTimedOut, self.aadp.run_job(
+            self._job('job_request_power_off.txt'), 'uuid', timeout=0.05,
+            interval=0.01).result, 5)
+        mock_cancel.assert_called_once_with()
+        self.adpt.delete.assert_not_called()
+
+    def test_poll_job(self):
+        job = self._job('job_response_completed_ok.txt',
+                        status=jwrap.JobStatus.NOT_ACTIVE)
+        self.adpt.read_job.side_effect = [
+            mock.Mock(entry=self._job('job_response_completed_ok.txt',
+                                      status=jwrap.JobStatus.RUNNING).entry)]
+        # Polls only while NOT_ACTIVE
+        self.assertFalse(self.aadp.poll_job(
+            job, statuses=[jwrap.JobStatus.NOT_ACTIVE], interval=0.01).result(
+            5))
+        self.assertEqual(jwrap.JobStatus.RUNNING, job.job_status)
+        # Read errors are raised through the future
+        self.adpt.read_job.side_effect = pvmex.Error('boom')
+        self.assertRaises(pvmex.Error, self.aadp.poll_job(
+            job, interval=0.01).result, 5)
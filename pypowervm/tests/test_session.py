@@ -223,3 +223,84 @@ class TestSession(subunit.IsolatedTestCase, testtools.TestCase):
         # validate_certificate should not have been called again
         self.assertEqual(1, mock_validate_cert.call_count)
         self.assertEqual('PVM', result.mc_type)
+
+    @mock.patch('pypowervm.adapter.Session._logon', new=mock.Mock())
+    @mock.patch('requests.Session')
+    def test_conn_pool(self, mock_session):
+        """Persistent connection pool setup, reuse and reset."""
+        mock_http = mock_session.return_value
+        mock_http.request.return_value = mock.Mock(
+            status_code=204, headers={})
+
+        # Default: a new requests.Session per request, closed afterward.
+        sess = adp.Session()
+        sess._sessToken = 'token'
+        sess.request('GET', '/rest/api/uom/ManagedSystem')
+        sess.request('GET', '/rest/api/uom/ManagedSystem')
+        self.assertEqual(2, mock_session.call_count)
+        self.assertEqual(2, mock_http.close.call_count)
+        mock_http.mount.assert_not_called()
+        self.assertFalse(mock_http.verify)
+        self.assertEqual({'requests': 2, 'new_conns': 2, 'handshakes': 2,
+                          'reused': 0}, sess.conn_stats)
+        sess.reset_connections()
+        self.assertEqual(2, mock_http.close.call_count)
+
+        # Pooled: one requests.Session, mounted with the pooling adapter.
+        mock_session.reset_mock()
+        sess = adp.Session(conn_pool_size=5)
+        sess._sessToken = 'token'
+        sess.request('GET', '/rest/api/uom/ManagedSystem')
+        sess.request('GET', '/rest/api/uom/ManagedSystem', verify=True)
+        mock_session.assert_called_once_with()
+        mock_http.close.assert_not_called()
+        self.assertEqual(2, mock_http.mount.call_count)
+        pool_adp = mock_http.mount.call_args[0][1]
+        self.assertIsInstance(pool_adp, adp._PooledHTTPAdapter)
+        self.assertEqual(5, pool_adp._pool_maxsize)
+        # verify is passed per request rather than set on the shared session
+        self.assertEqual(
+            [False, True],
+            [kw['verify'] for _, kw in mock_http.request.call_args_list])
+        self.assertEqual(2, sess.conn_stats['requests'])
+
+        # Reset closes the pool; the next request builds a new one.
+        sess.reset_connections()
+        mock_http.close.assert_called_once_with()
+        sess.request('GET', '/rest/api/uom/ManagedSystem')
+        self.assertEqual(2, mock_session.call_count)
+
+    def test_pooled_adapter_stats(self):
+        """_PooledHTTPAdapter counts new connections and handshakes."""
+        stats = adp._ConnStats()
+        pool_adp = adp._PooledHTTPAdapter(stats, pool_maxsize=2)
+        pool = pool_adp.poolmanager.connection_from_host(
+            'localhost', port=12080, scheme='http')
+        # Pool checkout with an empty pool creates a new connection
+        with mock.patch.object(pool.ConnectionCls, 'connect') as mock_conn:
+            conn = pool._get_conn()
+            conn.connect()
+            mock_conn.assert_called_once_with()
+        pool._put_conn(conn)
+        # Reusing the pooled connection is not counted as new
+        self.assertIs(conn, pool._get_conn())
+        for i in range(3):
+            stats.incr('requests')
+        self.assertEqual({'requests': 3, 'new_conns': 1, 'handshakes': 1,
+                          'reused': 2}, stats.snapshot())
+
+    @mock.patch('pypowervm.adapter.Session._logon')
+    @mock.patch('pypowervm.adapter.Session.reset_connections')
+    @mock.patch('requests.Session')
+    def test_conn_pool_relogin(self, mock_session, mock_reset, mock_logon):
+        """Pooled connections are recycled after re-login."""
+        mock_http = mock_session.return_value
+        mock_http.request.side_effect = [
+            mock.Mock(status_code=401, headers={}, text=''),
+            mock.Mock(status_code=204, headers={})]
+        sess = adp.Session(conn_pool_size=2)
+        sess._sessToken = 'token'
+        mock_logon.reset_mock()
+        sess.request('GET', '/rest/api/uom/ManagedSystem')
+        mock_logon.assert_called_once_with()
+        mock_reset.assert_called_once_with()
@@ -25,7 +25,11 @@ elif six.PY3:
 import unittest
 
 from pypowervm import const
+import pypowervm.entities as ent
+from pypowervm.tests.test_utils import pvmhttp
 from pypowervm import util
+from pypowervm.wrappers import entry_wrapper as ewrap
+from pypowervm.wrappers import logical_partition as lpar
 
 dummyuuid1 = "abcdef01-2345-2345-2345-67890abcdef0"
 dummyuuid2 = "67890abc-5432-5432-5432-def0abcdef01"
@@ -81,6 +85,23 @@ class TestUtil(unittest.TestCase):
         self.assertEqual(wrap2, util.find_wrapper(wraps, 'b'))
         self.assertIsNone(util.find_wrapper(wraps, 'c'))
 
+    @mock.patch('pypowervm.entities.Entry.unmarshal_element',
+                wraps=ent.Entry.unmarshal_element)
+    def test_find_wrapper_feed(self, mock_unm):
+        resp = pvmhttp.load_pvm_resp('lpar.txt').get_response()
+        lpar_uuid = '089FFB20-5D19-4A8C-BB80-13650627D985'
+        # Found by the Feed's index: only that entry is unmarshalled.
+        wrp = util.find_wrapper(resp, lpar_uuid.lower())
+        self.assertIsInstance(wrp, lpar.LPAR)
+        self.assertEqual(lpar_uuid, wrp.uuid)
+        self.assertEqual(1, mock_unm.call_count)
+        wrp = util.find_wrapper(resp.feed, lpar_uuid,
+                                wrapper_class=ewrap.EntryWrapper)
+        self.assertEqual(lpar_uuid, wrp.uuid)
+        self.assertEqual(1, mock_unm.call_count)
+        self.assertIsNone(util.find_wrapper(resp, 'c'))
+        self.assertIsNone(util.find_wrapper(resp.feed, 'c'))
+
     def test_dice_href(self):
         href = 'https://server:1234/rest/api/uom/Obj/UUID//?group=One,Two#frag'
         self.assertEqual(util.dice_href(href),
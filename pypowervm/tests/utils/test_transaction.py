@@ -17,13 +17,17 @@
 """Tests for pypowervm.utils.transaction."""
 
 import copy
+import fixtures
 import mock
+import threading
 import oslo_concurrency.lockutils as lock
 import oslo_context.context as ctx
 from taskflow import engines as tf_eng
 from taskflow import exceptions as tf_ex
 from taskflow.patterns import unordered_flow as tf_uf
 from taskflow import task as tf_task
+from taskflow.types import failure as tf_fail
+import time
 import unittest
 
 import pypowervm.const as c
@@ -773,6 +777,122 @@ class TestFeedTask(twrap.TestWrapper):
             'post_exec_implicit': 'verify_rets_implicit_return',
             'post_exec_explicit': 'verify_rets_explicit_return'}, ret)
 
+    def test_native(self):
+        """A native FeedTask runs the same as one using TaskFlow engines."""
+        ftfx = self.useFixture(fx.FeedTaskFx(self.entries[:4]))
+        called = []
+
+        def post_exec(wrapper_task_rets, extra=None):
+            called.append(('post1', extra))
+            return sorted(wrapper_task_rets)
+
+        def post_exec2(uuids):
+            called.append(('post2', len(uuids)))
+            return 'a', 'b'
+
+        def bld():
+            ftsk = tx.FeedTask('native', lpar.LPAR.getter(None), native=True)
+            ftsk.add_functor_subtask(lambda wrapper: wrapper.name,
+                                     provides='the_name')
+            ftsk.add_post_execute(tf_task.FunctorTask(
+                post_exec, provides='uuids'))
+            ftsk.add_post_execute(tf_task.FunctorTask(
+                post_exec2, provides=('first', 'second')))
+            return ftsk
+
+        ftsk = bld()
+        with mock.patch('taskflow.engines.run') as mock_run, \
+                mock.patch('taskflow.engines.load') as mock_load:
+            ret = ftsk.execute()
+        # No TaskFlow engines were used
+        mock_run.assert_not_called()
+        mock_load.assert_not_called()
+        self.assertEqual([('post1', None), ('post2', 4)], called)
+        # Same result as with TaskFlow
+        del called[:]
+        ftsk.native = False
+        self.assertEqual(ftsk.execute(), ret)
+        self.assertEqual([('post1', None), ('post2', 4)], called)
+        self.assertEqual(sorted(wrp.uuid for wrp in self.entries[:4]),
+                         ret['uuids'])
+        self.assertEqual(('a', 'b'), (ret['first'], ret['second']))
+        self.assertEqual({wrp.uuid: {'wrapper': wrp, 'the_name': wrp.name}
+                          for wrp in self.entries[:4]},
+                         ret['wrapper_task_rets'])
+        self.assertEqual(8, ftfx.patchers['update'].mock.call_count)
+
+        # A post-exec with requirements not provided falls back to TaskFlow,
+        # which raises as it always did.
+        ftsk = bld()
+        ftsk.add_post_execute(tf_task.FunctorTask(
+            lambda missing: None, name='needy'))
+        self.assertRaises(tf_ex.MissingDependencies, ftsk.execute)
+
+        # A failing post-exec reverts it and the ones before it, in reverse.
+        reverted = []
+
+        class Post(tf_task.Task):
+            def execute(self, wrapper_task_rets):
+                if self.name == 'bad':
+                    raise ValueError('bad post-exec')
+                return self.name
+
+            def revert(self, wrapper_task_rets, result, flow_failures,
+                       **kwargs):
+                reverted.append((self.name, result))
+
+        ftsk = bld()
+        ftsk.add_post_execute(Post('good', provides='good'))
+        ftsk.add_post_execute(Post('bad'))
+        self.assertRaises(ValueError, ftsk.execute)
+        self.assertEqual(['bad', 'good'], [rev[0] for rev in reverted])
+        self.assertIsInstance(reverted[0][1], tf_fail.Failure)
+        self.assertEqual('good', reverted[1][1])
+
+    def test_native_exceptions(self):
+        def bad(wrapper):
+            raise IOError("this is an exception on %s!" % wrapper.field)
+
+        # One exception bubbles up as normal
+        feed = [mock.Mock(spec=lpar.LPAR, field='lpar1')]
+        ftsk = tx.FeedTask('ft', feed, native=True).add_functor_subtask(bad)
+        self.assertRaises(IOError, ftsk.execute)
+
+        # Several are repackaged in MultipleExceptionsInFeedTask, even if
+        # fewer threads than WrapperTasks are used.
+        feed += [mock.Mock(spec=lpar.LPAR, field='lpar%d' % i)
+                 for i in range(2, 6)]
+        ftsk = tx.FeedTask('ft', feed, native=True,
+                           max_workers=2).add_functor_subtask(bad)
+        with self.assertRaises(ex.MultipleExceptionsInFeedTask) as mult_ex:
+            ftsk.execute()
+        for i in range(1, 6):
+            self.assertIn('exception on lpar%d!' % i,
+                          mult_ex.exception.args[0])
+
+    def test_native_parallel(self):
+        """Native WrapperTasks run in parallel, up to max_workers."""
+        self.useFixture(fx.FeedTaskFx(self.entries))
+        running = [0, 0]
+        cond = threading.Condition()
+
+        def func(wrapper):
+            with cond:
+                running[0] += 1
+                running[1] = max(running)
+                cond.notify_all()
+                # Wait (a while) for the others to start
+                end = time.time() + 1
+                while running[1] < 3 and time.time() < end:
+                    cond.wait(0.05)
+                running[0] -= 1
+            return False
+
+        ftsk = tx.FeedTask('native', lpar.LPAR.getter(None), native=True,
+                           max_workers=3).add_functor_subtask(func)
+        ftsk.execute()
+        self.assertEqual(3, running[1])
+
     def test_subtask_thread_local(self):
         """Security context and locks, if set, propagates to WrapperTasks."""
         def verify_no_ctx(wrapper):
@@ -811,6 +931,128 @@ class TestFeedTask(twrap.TestWrapper):
             executor=tx.ContextThreadPoolExecutor(2))
 
 
+class TestCoalescedTransaction(twrap.TestWrapper):
+    file = 'lpar.txt'
+    wrapper_class_to_test = lpar.LPAR
+
+    def setUp(self):
+        super(TestCoalescedTransaction, self).setUp()
+        # Long enough for all the test threads to join the first batch.
+        self.useFixture(fixtures.MockPatchObject(tx, 'COALESCE_WINDOW', 0.2))
+        self.adpt.read.side_effect = lambda *a, **k: copy.deepcopy(
+            self.dwrap.entry)
+        self.getter = lpar.LPAR.getter(self.adpt, self.dwrap.uuid)
+        self.mock_update = self.useFixture(fixtures.MockPatchObject(
+            lpar.LPAR, 'update', autospec=True)).mock
+        self.mock_update.side_effect = lambda wrp, **k: wrp
+        self.mock_refresh = self.useFixture(fixtures.MockPatchObject(
+            lpar.LPAR, 'refresh', autospec=True)).mock
+        self.mock_refresh.side_effect = lambda wrp, **k: copy.deepcopy(
+            self.dwrap)
+        self.calls = []
+
+        @tx.coalesced_transaction
+        def set_mem(wrapper, mem, fail=None):
+            self.calls.append(mem)
+            if fail == 'before':
+                raise ValueError(mem)
+            wrapper.mem_config.desired = mem
+            if fail == 'after':
+                raise IOError(mem)
+            return wrapper if mem == 1024 else mem
+        self.set_mem = set_mem
+
+    def _run(self, *calls):
+        """Run set_mem concurrently, for each of calls (a tuple of its args).
+
+        :return: List of the return value or exception of each call.
+        """
+        results = [None] * len(calls)
+
+        def run(idx):
+            try:
+                results[idx] = self.set_mem(self.getter, *calls[idx])
+            except Exception as e:
+                results[idx] = e
+        threads = [threading.Thread(target=run, args=(idx,))
+                   for idx in range(len(calls))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesce(self):
+        results = self._run((1024,), (2048,), (3072, 'before'),
+                            (4096, 'after'), (5120,))
+        # One GET and one update, applying all the mutations that succeeded
+        self.assertEqual(1, self.adpt.read.call_count)
+        self.assertEqual(1, self.mock_update.call_count)
+        updated = self.mock_update.call_args[0][0]
+        self.assertIsInstance(results[0], lpar.LPAR)
+        self.assertIs(updated, results[0])
+        self.assertEqual([2048, 5120], [results[1], results[4]])
+        self.assertIsInstance(results[2], ValueError)
+        self.assertIsInstance(results[3], IOError)
+        # 4096 raised after changing the wrapper, so the others were applied
+        # again to a fresh one.
+        self.assertEqual(1, self.mock_refresh.call_count)
+        self.assertNotIn(4096, self.calls[self.calls.index(4096) + 1:])
+        self.assertIn(updated.mem_config.desired, (1024, 2048, 5120))
+
+        # Later calls start a new batch
+        self.assertEqual(2048, self.set_mem(
+            lpar.LPAR.getter(self.adpt, self.dwrap.uuid), 2048))
+        self.assertEqual(2, self.adpt.read.call_count)
+        self.assertEqual(2, self.mock_update.call_count)
+
+    def test_etag_mismatch(self):
+        self.mock_update.side_effect = [
+            ex.HttpError(mock.Mock(status=c.HTTPStatus.ETAG_MISMATCH)),
+            self.dwrap]
+        self.assertEqual([self.dwrap, 2048], self._run((1024,), (2048,)))
+        # All mutations were reapplied to the refreshed wrapper.
+        self.assertEqual(1, self.mock_refresh.call_count)
+        self.assertEqual(2, self.mock_update.call_count)
+        self.assertEqual(4, len(self.calls))
+
+    def test_followers_get_updated_wrapper(self):
+        updated = copy.deepcopy(self.dwrap)
+        self.mock_update.side_effect = lambda wrp, **k: updated
+        results = self._run((1024,), (1024,), (1024,))
+        self.assertEqual(1, self.mock_update.call_count)
+        self.assertEqual([updated] * 3, results)
+
+    def test_etag_mismatch_dropped_op(self):
+        """A mutation dropped from the batch is not reapplied on retry."""
+        self.mock_update.side_effect = [
+            ex.HttpError(mock.Mock(status=c.HTTPStatus.ETAG_MISMATCH)),
+            self.dwrap]
+        results = self._run((2048,), (4096, 'after'))
+        self.assertEqual(2048, results[0])
+        self.assertIsInstance(results[1], IOError)
+        self.assertEqual(1, self.calls.count(4096))
+        self.assertEqual(2, self.mock_update.call_count)
+
+    def test_update_fails(self):
+        self.mock_update.side_effect = IOError('update failed')
+        results = self._run((1024,), (2048, 'before'))
+        self.assertEqual('update failed', str(results[0]))
+        self.assertIsInstance(results[1], ValueError)
+        # GET fails
+        self.adpt.read.side_effect = IOError('get failed')
+        self.assertRaises(IOError, self.set_mem, self.getter, 1024)
+        self.assertEqual({}, tx._open_batches)
+
+    def test_nested(self):
+        """Within an entry_transaction on the UUID, the update is immediate."""
+        @tx.entry_transaction
+        def outer(wrapper):
+            return self.set_mem(wrapper, 2048)
+        self.assertEqual(2048, outer(self.dwrap))
+        self.assertEqual(1, self.mock_update.call_count)
+
+
 class TestExceptions(unittest.TestCase):
     def test_exceptions(self):
         def bad1(wrapper, s):
@@ -16,9 +16,12 @@
 
 import copy
 import re
+import threading
+import time
 import unittest
 import uuid
 
+import fixtures
 from lxml import etree
 import mock
 import six
@@ -73,6 +76,12 @@ class SubWrapper(ewrap.Wrapper):
         except KeyError:
             return None
 
+    def _find_text(self, prop_name):
+        try:
+            return self.data[prop_name].text
+        except KeyError:
+            return ewrap._MISSING
+
 
 class TestElement(twrap.TestWrapper):
     file = NET_BRIDGE_FILE
@@ -113,6 +122,48 @@ class TestElement(twrap.TestWrapper):
                          newel.toxmlstring(pretty=True))
         mock_tostring.assert_called_once_with(newel.element, pretty_print=True)
 
+    def test_qualifypath(self):
+        ns = 'http://foo/bar'
+        qpath = '{%s}Foo/{%s}Bar/./*/{%s}Baz' % (ns, ns, ns)
+        self.assertEqual(qpath, ent.Element._qualifypath(
+            'Foo/Bar/./*/Baz', ns))
+        self.assertEqual('Foo/Bar', ent.Element._qualifypath('Foo/Bar', ''))
+        # Memoized per (path, ns)
+        self.assertEqual(qpath, ent._QPATH_CACHE[('Foo/Bar/./*/Baz', ns)])
+        with mock.patch('lxml.etree.QName') as mock_qn:
+            self.assertEqual(qpath, ent.Element._qualifypath(
+                'Foo/Bar/./*/Baz', ns))
+            mock_qn.assert_not_called()
+        # The memo is bounded
+        with mock.patch('pypowervm.entities._QPATH_CACHE_MAX', new=1):
+            ent.Element._qualifypath('Other', ns)
+            self.assertEqual(1, len(ent._QPATH_CACHE))
+
+    def test_findrawtext(self):
+        elem = self.dwrap.element
+        self.assertEqual(elem.find('PortVLANID').text,
+                         elem.findrawtext('PortVLANID'))
+        self.assertEqual(
+            elem.find('SharedEthernetAdapters/SharedEthernetAdapter/'
+                      'IsPrimary').text,
+            elem.findrawtext('SharedEthernetAdapters/SharedEthernetAdapter/'
+                             'IsPrimary'))
+        self.assertIsNone(elem.findrawtext('Nonexistent'))
+        self.assertEqual('x', elem.findrawtext('Nonexistent', missing='x'))
+        # An element with no text is distinguished from a missing element
+        elem.append(ent.Element('Empty', None))
+        self.assertIsNone(elem.findrawtext('Empty', missing='x'))
+
+    def test_wrapelement(self):
+        raw = etree.Element('foo')
+        adapter = mock.Mock()
+        with mock.patch('lxml.etree.Element') as mock_elem:
+            wrapped = ent.Element.wrapelement(raw, adapter)
+            mock_elem.assert_not_called()
+        self.assertIs(raw, wrapped.element)
+        self.assertIs(adapter, wrapped.adapter)
+        self.assertIsNone(ent.Element.wrapelement(None, adapter))
+
 
 class TestElementList(twrap.TestWrapper):
     file = SYS_SRIOV_FILE
@@ -590,6 +641,87 @@ class TestElementWrapper(testtools.TestCase):
         self._verify_element_clone(ew1.element, ew2.element)
 
 
+class TestLazyFeed(testtools.TestCase):
+    """Tests for lazy unmarshalling of Feed entries."""
+
+    def setUp(self):
+        super(TestLazyFeed, self).setUp()
+        self.resp = pvmhttp.load_pvm_resp(LPAR_FILE).get_response()
+        self.feed = self.resp.feed
+        self.lpar_uuid = '089FFB20-5D19-4A8C-BB80-13650627D985'
+
+    def test_lazy_entries(self):
+        mock_unm = self.useFixture(fixtures.MockPatchObject(
+            ent.Entry, 'unmarshal_element',
+            wraps=ent.Entry.unmarshal_element)).mock
+        # Nothing is unmarshalled until it is accessed
+        self.assertIsInstance(self.feed.entries, ent.LazyEntryList)
+        self.assertEqual(21, len(self.feed.entries))
+        mock_unm.assert_not_called()
+        entry = self.feed.entries[3]
+        self.assertEqual(1, mock_unm.call_count)
+        # The same Entry is returned on subsequent access
+        self.assertIs(entry, self.feed.entries[3])
+        self.assertIs(entry, list(self.feed.entries)[3])
+        self.assertEqual(21, mock_unm.call_count)
+        self.assertIs(self.resp.adapter, mock_unm.call_args[0][1])
+
+    def test_find_entry(self):
+        mock_unm = self.useFixture(fixtures.MockPatchObject(
+            ent.Entry, 'unmarshal_element',
+            wraps=ent.Entry.unmarshal_element)).mock
+        # Case-insensitive, and only the found entry is unmarshalled
+        entry = self.feed.find_entry(self.lpar_uuid.lower())
+        self.assertEqual(self.lpar_uuid, entry.uuid)
+        self.assertEqual(1, mock_unm.call_count)
+        self.assertIs(entry, self.feed.find_entry(self.lpar_uuid))
+        self.assertIs(entry, self.feed.find_entry_by_href(entry.self_link))
+        self.assertEqual(1, mock_unm.call_count)
+        self.assertIsNone(self.feed.find_entry('bogus'))
+        self.assertIsNone(self.feed.find_entry_by_href('bogus'))
+
+    def test_find_entry_list_ops(self):
+        entry = self.feed.find_entry(self.lpar_uuid)
+        # Removing the entry resets the index
+        self.feed.entries.remove(entry)
+        self.assertEqual(20, len(self.feed.entries))
+        self.assertIsNone(self.feed.find_entry(self.lpar_uuid))
+        # Unmarshalled entries can be added back
+        self.feed.entries.append(entry)
+        self.assertIs(entry, self.feed.find_entry(self.lpar_uuid))
+        self.assertIs(entry, self.feed.entries[-1])
+        self.assertEqual(list(self.feed.entries), self.feed.entries[:])
+        # Plain lists of entries are searched linearly
+        self.feed.entries = list(self.feed.entries)
+        self.assertIs(entry, self.feed.find_entry(self.lpar_uuid.lower()))
+        self.assertIs(entry, self.feed.find_entry_by_href(entry.self_link))
+        self.assertIsNone(self.feed.find_entry('bogus'))
+
+    def test_wrap_from_feed(self):
+        wrp = lpar.LPAR.wrap_from_feed(self.resp, self.lpar_uuid)
+        self.assertIsInstance(wrp, lpar.LPAR)
+        self.assertEqual(self.lpar_uuid, wrp.uuid)
+        self.assertEqual('z3-9-5-126-127-00000001', wrp.name)
+        self.assertIsNone(lpar.LPAR.wrap_from_feed(self.resp, 'bogus'))
+        self.assertRaises(KeyError, lpar.LPAR.wrap_from_feed,
+                          pvmhttp.load_pvm_resp(
+                              'get_volume_group_no_rep.txt').get_response(),
+                          self.lpar_uuid)
+
+    @mock.patch('pypowervm.adapter.Adapter.read')
+    def test_search_by_uuid(self, mock_read):
+        mock_read.return_value = self.resp
+        adpt = mock.Mock(read=mock_read)
+        rets = lpar.LPAR.search(adpt, uuid=self.lpar_uuid)
+        self.assertEqual(1, len(rets))
+        self.assertEqual(self.lpar_uuid, rets[0].uuid)
+        # Matching is exact, as for other keys
+        self.assertEqual([], lpar.LPAR.search(adpt,
+                                              uuid=self.lpar_uuid.lower()))
+        self.assertEqual(20, len(lpar.LPAR.search(adpt, negate=True,
+                                                  uuid=self.lpar_uuid)))
+
+
 class TestWrapperElemList(testtools.TestCase):
     """Tests for the WrapperElemList class."""
 
@@ -1220,6 +1352,75 @@ class TestUpdate(testtools.TestCase):
         mock_warn.assert_called_with(mock.ANY, DeprecationWarning)
 
 
+class TestDirtyTracking(twrap.TestWrapper):
+    file = LPAR_FILE
+    wrapper_class_to_test = lpar.LPAR
+
+    def test_dirty(self):
+        # Fresh from the server
+        lwrap = self.entries[0]
+        self.assertFalse(lwrap.dirty)
+        self.assertEqual([], lwrap.changes)
+        # Writes which don't change anything aren't recorded
+        lwrap.name = lwrap.name
+        lwrap.set_parm_value('PartitionID', str(lwrap.id))
+        lwrap.element.inject(copy.deepcopy(lwrap.element.find('PartitionID')))
+        self.assertFalse(lwrap.dirty)
+        # Real changes are, wherever they are in the tree
+        lwrap.name = 'new_name'
+        lwrap.mem_config.desired = 1234
+        self.assertTrue(lwrap.dirty)
+        self.assertEqual(['set PartitionName', 'set DesiredMemory'],
+                         lwrap.changes)
+        # Another entry of the same feed is unaffected
+        self.assertFalse(self.entries[1].dirty)
+        # Copies keep the state
+        self.assertEqual(lwrap.changes, copy.deepcopy(lwrap).changes)
+        self.assertFalse(copy.deepcopy(self.entries[1]).dirty)
+
+        # List edits
+        vwrap1, vwrap2 = vios.VIOS.wrap(pvmhttp.load_pvm_resp(
+            VIOS_FILE).get_response())
+        smap = copy.deepcopy(vwrap1.scsi_mappings[0])
+        vwrap1.scsi_mappings.append(smap)
+        self.assertEqual(['add VirtualSCSIMapping'], vwrap1.changes)
+        vwrap1.scsi_mappings.remove(smap)
+        self.assertEqual(['add VirtualSCSIMapping',
+                          'remove VirtualSCSIMapping'], vwrap1.changes)
+        vwrap1.entry.mark_clean()
+        self.assertFalse(vwrap1.dirty)
+        # Moving an element out of one entry changes it too
+        vwrap2.scsi_mappings.append(vwrap1.scsi_mappings[0])
+        self.assertEqual(['move VirtualSCSIMapping'], vwrap1.changes)
+        self.assertEqual(['add VirtualSCSIMapping'], vwrap2.changes)
+
+        # Built (not retrieved) entries start out dirty
+        vswitch = net.VSwitch.bld(self.adpt, 'name')
+        self.assertTrue(vswitch.dirty)
+        self.assertEqual('create VirtualSwitch', vswitch.changes[0])
+
+    def test_changes_summary(self):
+        lwrap = self.entries[0]
+        for i in range(25):
+            lwrap.name = 'name%d' % i
+        self.assertEqual(21, len(lwrap.changes))
+        self.assertEqual('(5 more)', lwrap.changes[-1])
+
+    def test_update(self):
+        lwrap = self.entries[0]
+        self.adpt.update_by_path.return_value = lwrap.entry
+        # Unchanged: no-op, returning the same wrapper
+        self.assertIs(lwrap, lwrap.update())
+        self.adpt.update_by_path.assert_not_called()
+        # Unless forced
+        lwrap.update(force=True)
+        self.assertEqual(1, self.adpt.update_by_path.call_count)
+        # Changed
+        lwrap.name = 'new_name'
+        lwrap.update()
+        self.assertEqual(2, self.adpt.update_by_path.call_count)
+
+
 class TestDelete(testtools.TestCase):
     def setUp(self):
         super(TestDelete, self).setUp()
@@ -1471,13 +1672,17 @@ class TestGetters(twrap.TestWrapper):
                           parent_class=ewrap.EntryWrapperGetter,
                           parent_uuid='parent_uuid')
 
-    @mock.patch('pypowervm.wrappers.entry_wrapper.EntryWrapper.refresh')
+    @mock.patch('pypowervm.wrappers.entry_wrapper.EntryWrapper.refresh',
+                autospec=True)
     def test_feed_getter(self, mock_refresh):
         self.adpt.read.return_value = self.resp
-        feediter = iter(self.entries)
-        mock_refresh.side_effect = lambda: next(feediter)
+        # Refresh "changes" the odd-numbered LPARs; the rest are unchanged
+        # (as if the server responded 304).
+        mock_refresh.side_effect = lambda wrp: (
+            wrp if wrp.id % 2 == 0 else lpar.LPAR.wrap(wrp.entry))
         # ROOT
         getter = ewrap.FeedGetter(self.adpt, lpar.LPAR)
+        self.assertIsNone(getter.changed)
         lfeed = getter.get()
         self.assertEqual(21, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
@@ -1485,18 +1690,29 @@ class TestGetters(twrap.TestWrapper):
             'LogicalPartition', None, child_id=None, child_type=None, xag=None)
         self.assertEqual(1, self.adpt.read.call_count)
         self.assertEqual(0, mock_refresh.call_count)
+        self.assertEqual(21, getter.changed)
         # Second get doesn't re-read
         lfeed = getter.get()
         self.assertEqual(21, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.assertEqual(1, self.adpt.read.call_count)
         self.assertEqual(0, mock_refresh.call_count)
+        self.assertEqual(0, getter.changed)
         # get with refresh refreshes all 21 wrappers (but doesn't call read)
+        old_feed = lfeed
         lfeed = getter.get(refresh=True)
         self.assertEqual(21, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.assertEqual(1, self.adpt.read.call_count)
         self.assertEqual(21, mock_refresh.call_count)
+        # The order is kept, and unchanged wrappers are reused
+        self.assertEqual([wrp.uuid for wrp in old_feed],
+                         [wrp.uuid for wrp in lfeed])
+        changed = [old.id for old, new in zip(old_feed, lfeed)
+                   if old is not new]
+        self.assertTrue(changed)
+        self.assertTrue(all(lpar_id % 2 for lpar_id in changed))
+        self.assertEqual(len(changed), getter.changed)
         # get with refetch calls read, not refresh
         lfeed = getter.get(refetch=True)
         self.assertEqual(21, len(lfeed))
@@ -1505,6 +1721,28 @@ class TestGetters(twrap.TestWrapper):
         self.adpt.read.assert_called_with(
             'LogicalPartition', None, child_id=None, child_type=None, xag=None)
         self.assertEqual(21, mock_refresh.call_count)
+        self.assertEqual(21, getter.changed)
+
+        # Refreshes run in parallel, bounded by max_workers
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def slow_refresh(wrp):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return wrp
+        mock_refresh.side_effect = slow_refresh
+        getter = ewrap.FeedGetter(self.adpt, lpar.LPAR, max_workers=4)
+        getter.get()
+        lfeed = getter.get(refresh=True)
+        self.assertEqual(21, len(lfeed))
+        self.assertEqual(0, getter.changed)
+        self.assertGreater(running[1], 1)
+        self.assertLessEqual(running[1], 4)
 
         # CHILD, use the EntryWrapper.getter classmethod, use xags
         getter = lpar.LPAR.getter(self.adpt, parent_class=stor.VDisk,
@@ -1550,20 +1788,23 @@ class TestGetters(twrap.TestWrapper):
                           parent_class=ewrap.EntryWrapperGetter,
                           parent_uuid='parent_uuid')
 
-    @mock.patch('pypowervm.wrappers.entry_wrapper.EntryWrapper.refresh')
+    @mock.patch('pypowervm.wrappers.entry_wrapper.EntryWrapper.refresh',
+                autospec=True)
     def test_uuid_feed_getter(self, mock_refresh):
         """Verify UUIDFeedGetter."""
-        # Mock return separate entries per read.  Need multiple copies for
-        # multiple calls.
-        read_iter = iter(wrp.entry for wrp in (
-            self.entries[:3] + self.entries[:3] + self.entries[:3] +
-            self.entries[:3]))
-        self.adpt.read.side_effect = lambda *a, **k: next(read_iter)
-        # Separate iterator for refreshes
-        refresh_iter = iter(self.entries[:3])
-        mock_refresh.side_effect = lambda: next(refresh_iter)
-        # ROOT
+        # Mock return a separate entry per UUID (the reads run in parallel).
         uuids = ['u1', 'u2', 'u3']
+        entries = dict(zip(uuids, (wrp.entry for wrp in self.entries[:3])))
+
+        def read(root_type, root_id, child_type=None, child_id=None,
+                 xag=None):
+            return entries[child_id or root_id]
+        self.adpt.read.side_effect = read
+        # Refresh changes only the second wrapper
+        mock_refresh.side_effect = lambda wrp: (
+            lpar.LPAR.wrap(wrp.entry) if wrp.uuid == self.entries[1].uuid
+            else wrp)
+        # ROOT
         getter = ewrap.UUIDFeedGetter(self.adpt, lpar.LPAR, uuids)
         # In order to be useful for a FeedTask, this has to evaluate as an
         # instance of FeedGetter
@@ -1571,29 +1812,39 @@ class TestGetters(twrap.TestWrapper):
         lfeed = getter.get()
         self.assertEqual(3, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
+        self.assertEqual([wrp.uuid for wrp in self.entries[:3]],
+                         [wrp.uuid for wrp in lfeed])
         # This does three separate reads
         self.adpt.read.assert_has_calls([mock.call(
             lpar.LPAR.schema_type, uuid, child_type=None, child_id=None,
-            xag=None) for uuid in uuids])
+            xag=None) for uuid in uuids], any_order=True)
         self.assertEqual(0, mock_refresh.call_count)
+        self.assertEqual(3, getter.changed)
         # Second get doesn't re-read
         lfeed = getter.get()
         self.assertEqual(3, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.assertEqual(3, self.adpt.read.call_count)
         self.assertEqual(0, mock_refresh.call_count)
+        self.assertEqual(0, getter.changed)
         # get with refresh refreshes all thre wrappers (but doesn't call read)
+        old_feed = lfeed
         lfeed = getter.get(refresh=True)
         self.assertEqual(3, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.assertEqual(3, self.adpt.read.call_count)
         self.assertEqual(3, mock_refresh.call_count)
+        self.assertEqual(1, getter.changed)
+        self.assertIs(old_feed[0], lfeed[0])
+        self.assertIsNot(old_feed[1], lfeed[1])
+        self.assertIs(old_feed[2], lfeed[2])
         # get with refetch calls read, not refresh
         lfeed = getter.get(refetch=True)
         self.assertEqual(3, len(lfeed))
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.assertEqual(6, self.adpt.read.call_count)
         self.assertEqual(3, mock_refresh.call_count)
+        self.assertEqual(3, getter.changed)
 
         # CHILD
         getter = ewrap.UUIDFeedGetter(
@@ -1605,7 +1856,8 @@ class TestGetters(twrap.TestWrapper):
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.adpt.read.assert_has_calls([mock.call(
             stor.VDisk.schema_type, 'p_uuid', child_type=lpar.LPAR.schema_type,
-            child_id=uuid, xag=['one', 'two']) for uuid in uuids])
+            child_id=uuid, xag=['one', 'two']) for uuid in uuids],
+            any_order=True)
 
         # With parent instance
         parent = mock.Mock(spec=stor.VDisk, schema_type='st', uuid='uuid')
@@ -1617,7 +1869,8 @@ class TestGetters(twrap.TestWrapper):
         self.assertEqual('089FFB20-5D19-4A8C-BB80-13650627D985', lfeed[0].uuid)
         self.adpt.read.assert_has_calls(
             [mock.call('st', 'uuid', child_type=lpar.LPAR.schema_type,
-                       child_id=uuid, xag=None) for uuid in uuids])
+                       child_id=uuid, xag=None) for uuid in uuids],
+            any_order=True)
 
 
 if __name__ == '__main__':
@@ -14,6 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+import time
+
 import mock
 import testtools
 
@@ -215,15 +218,15 @@ class TestJobEntryWrapper(testtools.TestCase):
         self.assertEqual(0, mock_del.call_count)
 
     @mock.patch('pypowervm.wrappers.job.Job.poll_while_status')
-    @mock.patch('pypowervm.wrappers.job.PollAndDeleteThread')
-    def test_montor_job(self, mock_thread, mock_poll):
+    @mock.patch('pypowervm.wrappers.job.JobMonitor.watch')
+    def test_montor_job(self, mock_watch, mock_poll):
         wrapper = self._ok_wrapper
         # Synchronous is a pass-through to poll_while_status
         mock_poll.return_value = 'abc123'
         self.assertEqual('abc123', wrapper._monitor_job())
         mock_poll.assert_called_once_with(['RUNNING', 'NOT_STARTED'], mock.ANY,
                                           mock.ANY)
-        self.assertEqual(0, mock_thread.call_count)
+        self.assertEqual(0, mock_watch.call_count)
 
         # Asynchronous
         # Time out
@@ -231,48 +234,150 @@ class TestJobEntryWrapper(testtools.TestCase):
         mock_poll.return_value = True
         self.assertTrue(wrapper._monitor_job(synchronous=False))
         mock_poll.assert_called_once_with(['NOT_STARTED'], mock.ANY, mock.ANY)
-        self.assertEqual(0, mock_thread.call_count)
+        self.assertEqual(0, mock_watch.call_count)
 
-        # No timeout
+        # No timeout - the JobMonitor deletes the Job when done
         mock_poll.reset_mock()
         mock_poll.return_value = False
-        thread_inst = mock.Mock()
-        mock_thread.return_value = thread_inst
         self.assertFalse(wrapper._monitor_job(synchronous=False))
-        mock_thread.assert_called_once_with(wrapper, False)
-        thread_inst.start.assert_called_once_with()
+        mock_watch.assert_called_once_with(
+            wrapper, ['RUNNING'], sensitive=False, callback=mock.ANY)
+        callback = mock_watch.call_args[1]['callback']
+        self.assertIs(jwrap._delete_in_background, callback.func)
+        self.assertEqual({'on_done': None}, callback.keywords)
+
+    @mock.patch('pypowervm.wrappers.job.time.time', return_value=100.0)
+    @mock.patch('pypowervm.wrappers.job.Job._finish')
+    @mock.patch('pypowervm.wrappers.job.Job._submit')
+    @mock.patch('pypowervm.wrappers.job.Job._monitor_job')
+    @mock.patch('pypowervm.wrappers.job.JobScheduler.acquire')
+    def test_run_job_scheduler(self, mock_acq, mock_monitor, mock_submit,
+                               mock_finish, mock_time):
+        """run_job waits for the JobScheduler and releases its ticket."""
+        wrapper = self._request_wrapper
+        ticket = mock_acq.return_value
+        mock_monitor.return_value = False
+        wrapper.run_job('uuid', timeout=12, host_uuid='host',
+                        priority=jwrap.JobPriority.HIGH, tenant='ten')
+        mock_acq.assert_called_once_with(
+            wrapper, 'uuid', host_uuid='host',
+            priority=jwrap.JobPriority.HIGH, tenant='ten', timeout=12)
+        mock_monitor.assert_called_once_with(
+            timeout=12, sensitive=False, synchronous=True,
+            on_done=ticket.release)
+        ticket.release.assert_called_once_with()
+
+        # Released on failure
+        ticket.reset_mock()
+        mock_submit.side_effect = ex.JobRequestFailed(operation_name='op',
+                                                      error='err')
+        self.assertRaises(ex.JobRequestFailed, wrapper.run_job, 'uuid',
+                          synchronous=False)
+        ticket.release.assert_called_once_with()
+
+        # Asynchronous: the JobMonitor releases it when the Job is done
+        ticket.reset_mock()
+        mock_submit.side_effect = None
+        wrapper.run_job('uuid', synchronous=False)
+        ticket.release.assert_not_called()
+
+        # ...unless it timed out starting
+        mock_monitor.return_value = True
+        with mock.patch.object(wrapper, '_cancel_timed_out') as mock_cancel:
+            mock_cancel.side_effect = ex.JobRequestTimedOut(
+                operation_name='op', seconds=1)
+            self.assertRaises(ex.JobRequestTimedOut, wrapper.run_job, 'uuid',
+                              synchronous=False)
+        ticket.release.assert_called_once_with()
+
+    @mock.patch('pypowervm.wrappers.job.time.time')
+    @mock.patch('pypowervm.wrappers.job.Job._cancel_timed_out')
+    @mock.patch('pypowervm.wrappers.job.Job._finish')
+    @mock.patch('pypowervm.wrappers.job.Job._submit')
+    @mock.patch('pypowervm.wrappers.job.Job._monitor_job')
+    @mock.patch('pypowervm.wrappers.job.JobScheduler.acquire')
+    def test_run_job_timeout_includes_queue(self, mock_acq, mock_monitor,
+                                            mock_submit, mock_finish,
+                                            mock_cancel, mock_time):
+        """Time waiting for the JobScheduler counts against the timeout."""
+        wrapper = self._request_wrapper
+        ticket = mock_acq.return_value
+        # Four seconds of the twelve spent in the queue
+        mock_time.side_effect = [100.0, 104.0]
+        mock_monitor.return_value = True
+        mock_cancel.side_effect = ex.JobRequestTimedOut(operation_name='op',
+                                                        seconds=8)
+        self.assertRaises(ex.JobRequestTimedOut, wrapper.run_job, 'uuid',
+                          timeout=12)
+        mock_acq.assert_called_once_with(
+            wrapper, 'uuid', host_uuid=None,
+            priority=jwrap.JobPriority.NORMAL, tenant=None, timeout=12)
+        mock_monitor.assert_called_once_with(
+            timeout=8.0, sensitive=False, synchronous=True,
+            on_done=ticket.release)
+        mock_cancel.assert_called_once_with(8.0)
+        ticket.release.assert_called_once_with()
+
+        # The whole timeout spent in the queue: the Job isn't submitted.
+        mock_monitor.reset_mock()
+        ticket.reset_mock()
+        mock_time.side_effect = [100.0, 112.5]
+        self.assertRaises(ex.JobRequestTimedOut, wrapper.run_job, 'uuid',
+                          timeout=12)
+        mock_submit.assert_called_once_with('uuid', job_parms=None,
+                                            sensitive=False)
+        mock_monitor.assert_not_called()
+        ticket.release.assert_called_once_with()
+
+        # No timeout: none is imposed after the queue, either.
+        mock_time.side_effect = [100.0, 5000.0]
+        mock_monitor.return_value = False
+        wrapper.run_job('uuid', timeout=0)
+        mock_monitor.assert_called_once_with(
+            timeout=0, sensitive=False, synchronous=True,
+            on_done=ticket.release)
+
+    @mock.patch('pypowervm.wrappers.job._delete_when_done')
+    @mock.patch('pypowervm.wrappers.job.Job.poll_while_status')
+    @mock.patch('pypowervm.wrappers.job.JobMonitor.watch')
+    def test_monitor_job_on_done(self, mock_watch, mock_poll, mock_dwd):
+        mock_poll.return_value = False
+        on_done = mock.Mock()
+        self.assertFalse(self._ok_wrapper._monitor_job(synchronous=False,
+                                                       on_done=on_done))
+        callback = mock_watch.call_args[1]['callback']
+        # The delete runs on a worker thread, not the monitor's.
+        threads = []
+
+        def delete(watch, log_failure=True):
+            threads.append(threading.current_thread())
+            raise ValueError
+        mock_dwd.side_effect = delete
+        watch = mock.Mock()
+        with self.assertLogs(jwrap.__name__, 'ERROR'):
+            callback(watch).result(5)
+        mock_dwd.assert_called_once_with(watch, log_failure=True)
+        self.assertNotEqual([threading.current_thread()], threads)
+        # on_done is invoked even though the delete failed.
+        on_done.assert_called_once_with()
 
-    @mock.patch('time.time')
-    @mock.patch('time.sleep')
+    @mock.patch('pypowervm.wrappers.job.JobMonitor.wait')
     @mock.patch('pypowervm.wrappers.job.Job.job_status')
-    def test_poll_while_status(self, mock_status, mock_sleep, mock_time):
+    def test_poll_while_status(self, mock_status, mock_wait):
         wrapper = self._ok_wrapper
         mock_status.__get__ = mock.Mock(return_value=jwrap.JobStatus.RUNNING)
         # Short-circuit if the status is already not in the list
         self.assertFalse(wrapper.poll_while_status(
             [jwrap.JobStatus.NOT_ACTIVE], 10, False))
-        self.assertEqual(0, mock_sleep.call_count)
-        self.assertEqual(1, mock_time.call_count)
-
-        # Engineer a timeout after the third run
-        mock_time.reset_mock()
-        mock_time.side_effect = [0, 1, 2, 3, 4, 5]
-        self.assertTrue(wrapper.poll_while_status(
-            [jwrap.JobStatus.RUNNING], 3, False))
-        self.assertEqual(3, mock_sleep.call_count)
-        # Initial setup, bail on the fourth iteration
-        self.assertEqual(5, mock_time.call_count)
-
-        # "Infinite" timeout, status eventually becomes one not in the list
-        mock_status.__get__.side_effect = ['a', 'b', 'c', 'd', 'e', 'f']
-        mock_time.reset_mock()
-        mock_time.side_effect = [0, 1, 2, 3, 4, 5]
-        mock_sleep.reset_mock()
-        self.assertFalse(wrapper.poll_while_status(['a', 'b', 'c', 'd', 'e'],
-                                                   0, False))
-        self.assertEqual(5, mock_sleep.call_count)
-        # Only the initial timer setup
-        self.assertEqual(6, mock_time.call_count)
+        self.assertEqual(0, mock_wait.call_count)
+
+        # Otherwise wait via the JobMonitor
+        self.assertEqual(mock_wait.return_value, wrapper.poll_while_status(
+            [jwrap.JobStatus.RUNNING], 3, 'sens'))
+        mock_wait.assert_called_once_with(wrapper, [jwrap.JobStatus.RUNNING],
+                                          3, 'sens')
+        self.assertIs(jwrap.JobMonitor.get(self.adpt),
+                      jwrap.JobMonitor.get(self.adpt))
 
     @mock.patch('pypowervm.wrappers.job.Job.poll_while_status')
     @mock.patch('pypowervm.wrappers.job.Job.delete_job')
@@ -298,13 +403,12 @@ class TestJobEntryWrapper(testtools.TestCase):
                                           0, 'sens')
         mock_del.assert_called_once_with()
 
-    @mock.patch('pypowervm.wrappers.job.CancelJobThread.start')
+    @mock.patch('pypowervm.wrappers.job._delete_when_done')
+    @mock.patch('pypowervm.wrappers.job.JobMonitor.watch')
     @mock.patch('pypowervm.wrappers.job.Job.delete_job')
-    @mock.patch('pypowervm.wrappers.job.Job._monitor_job')
-    def test_cancel_job(self, mock_monitor, mock_delete, mock_start):
+    def test_cancel_job(self, mock_delete, mock_watch, mock_dwd):
         wrapper = self._ok_wrapper
         self.adpt.update.side_effect = ex.Error('error')
-        mock_monitor.return_value = False
         wrapper.cancel_job()
         self.adpt.update.assert_called_with(
             None, None, root_type='jobs', root_id=wrapper.job_id,
@@ -312,13 +416,17 @@ class TestJobEntryWrapper(testtools.TestCase):
         self.assertEqual(0, mock_delete.call_count)
         self.adpt.update.reset_mock()
         self.adpt.update.side_effect = None
-        mock_start.reset_mock()
-        mock_monitor.return_value = False
-        wrapper.cancel_job()
+        mock_watch.reset_mock()
+        wrapper.cancel_job(sensitive=True)
         self.adpt.update.assert_called_with(
             None, None, root_type='jobs', root_id=wrapper.job_id,
             suffix_type='cancel')
-        self.assertEqual(1, mock_start.call_count)
+        mock_watch.assert_called_once_with(
+            wrapper, ['RUNNING', 'NOT_STARTED'], sensitive=True,
+            callback=mock.ANY)
+        # The JobMonitor deletes the Job when it terminates, without logging
+        mock_watch.call_args[1]['callback']('watch').result(5)
+        mock_dwd.assert_called_once_with('watch', log_failure=False)
 
     @mock.patch('pypowervm.wrappers.job.Job.job_status')
     def test_delete_job(self, mock_status):
@@ -334,3 +442,247 @@ class TestJobEntryWrapper(testtools.TestCase):
         with self.assertLogs(jwrap.__name__, 'ERROR'):
             wrapper.delete_job()
         self.adpt.delete.assert_called_with('jobs', wrapper.job_id)
+
+
+@mock.patch('pypowervm.wrappers.job._POLL_MIN', new=0.01)
+@mock.patch('pypowervm.wrappers.job._POLL_MAX', new=0.02)
+class TestJobMonitor(testtools.TestCase):
+
+    def setUp(self):
+        super(TestJobMonitor, self).setUp()
+        self.adpt = self.useFixture(fx.AdapterFx()).adpt
+        self.monitor = jwrap.JobMonitor.get(self.adpt)
+
+    def _job(self, status, job_id=EXPECTED_ID):
+        job = jwrap.Job.wrap(pvmhttp.load_pvm_resp(
+            JOB_RESPONSE_OK, adapter=self.adpt).response)
+        job.entry.element.find(jwrap._JOB_ID).text = job_id
+        job.entry.element.find(jwrap._JOB_STATUS).text = status
+        return job
+
+    def _reads(self, *statuses):
+        return [mock.Mock(entry=self._job(status).entry)
+                for status in statuses]
+
+    def test_wait(self):
+        job = self._job(jwrap.JobStatus.NOT_ACTIVE)
+        self.adpt.read_job.side_effect = self._reads(
+            jwrap.JobStatus.NOT_ACTIVE, jwrap.JobStatus.RUNNING,
+            jwrap.JobStatus.COMPLETED_OK)
+        self.assertFalse(self.monitor.wait(
+            job, [jwrap.JobStatus.NOT_ACTIVE, jwrap.JobStatus.RUNNING], 0,
+            True))
+        self.assertEqual(jwrap.JobStatus.COMPLETED_OK, job.job_status)
+        self.assertEqual(3, self.adpt.read_job.call_count)
+        self.adpt.read_job.assert_called_with(EXPECTED_ID, sensitive=True)
+        # The monitor thread goes away when there's nothing to track
+        for i in range(100):
+            if self.monitor._thread is None:
+                break
+            time.sleep(0.01)
+        self.assertIsNone(self.monitor._thread)
+        self.assertEqual({}, self.monitor._watches)
+
+    def test_wait_timeout(self):
+        job = self._job(jwrap.JobStatus.RUNNING)
+        self.adpt.read_job.return_value.entry = job.entry
+        self.assertTrue(self.monitor.wait(job, [jwrap.JobStatus.RUNNING],
+                                          0.1, False))
+        self.assertEqual({}, self.monitor._watches)
+        # Backoff: far fewer reads than the 10 a fixed 0.01s poll would do
+        self.assertLess(self.adpt.read_job.call_count, 8)
+
+    def test_wait_error(self):
+        job = self._job(jwrap.JobStatus.RUNNING)
+        self.adpt.read_job.side_effect = ex.Error('foo')
+        self.assertRaises(ex.Error, self.monitor.wait, job,
+                          [jwrap.JobStatus.RUNNING], 10, False)
+
+    def test_shared_poll(self):
+        """Waiters on the same Job share reads; the callback is invoked."""
+        job1 = self._job(jwrap.JobStatus.RUNNING)
+        job2 = self._job(jwrap.JobStatus.RUNNING)
+        self.adpt.read_job.side_effect = self._reads(
+            jwrap.JobStatus.COMPLETED_OK)
+        callback = mock.Mock()
+        with mock.patch('pypowervm.wrappers.job._POLL_MIN', new=0.2):
+            watch1 = self.monitor.watch(job1, [jwrap.JobStatus.RUNNING],
+                                        callback=callback)
+            watch2 = self.monitor.watch(job2, [jwrap.JobStatus.RUNNING])
+        self.assertTrue(watch1.done.wait(5))
+        self.assertTrue(watch2.done.wait(5))
+        self.assertEqual(1, self.adpt.read_job.call_count)
+        callback.assert_called_once_with(watch1)
+        self.assertEqual(jwrap.JobStatus.COMPLETED_OK, job2.job_status)
+
+    def test_events(self):
+        """Job events trigger an immediate poll."""
+        self.adpt.session.has_event_listener = True
+        listener = self.adpt.session.get_event_listener.return_value
+        monitor = jwrap.JobMonitor(self.adpt.session)
+        job = self._job(jwrap.JobStatus.RUNNING)
+        self.adpt.read_job.side_effect = self._reads(
+            jwrap.JobStatus.COMPLETED_OK)
+        with mock.patch('pypowervm.wrappers.job._POLL_MIN', new=60):
+            watch = monitor.watch(job, [jwrap.JobStatus.RUNNING])
+        self.assertTrue(monitor.events_enabled)
+        handler = listener.subscribe.call_args[0][0]
+        self.assertIsInstance(handler, jwrap._JobEventHandler)
+        self.assertEqual({'uri_prefixes': ['/rest/api/web/jobs/']},
+                         listener.subscribe.call_args[1])
+        # Unrelated events don't wake the Job
+        uri = 'https://server:12443/rest/api/%s/' + EXPECTED_ID
+        handler.process({uri % 'uom/LogicalPartition': 'invalidate'})
+        self.assertFalse(watch.done.wait(0.1))
+        handler.process({uri % 'web/jobs': 'invalidate'})
+        self.assertTrue(watch.done.wait(5))
+        self.assertEqual(1, self.adpt.read_job.call_count)
+        # Only subscribed once
+        monitor.watch(job, [jwrap.JobStatus.RUNNING]).done.wait(5)
+        self.assertEqual(1, listener.subscribe.call_count)
+
+    def test_event_handler(self):
+        monitor = mock.Mock()
+        handler = jwrap._JobEventHandler(monitor)
+        handler.process({'general': 'init'})
+        monitor.notify.assert_called_once_with()
+        monitor.notify.reset_mock()
+        handler.process({'/rest/api/web/jobs/123': 'invalidate',
+                         '/rest/api/uom/LogicalPartition/abc': 'invalidate'})
+        monitor.notify.assert_called_once_with(job_id='123')
+        # No-op once the monitor is gone
+        del monitor
+        handler.process({'general': 'init'})
+
+    @mock.patch('pypowervm.wrappers.job.Job.delete_job')
+    def test_delete_when_done(self, mock_del):
+        ok = mock.Mock(job=self._job(jwrap.JobStatus.COMPLETED_OK),
+                       error=None)
+        jwrap._delete_when_done(ok)
+        mock_del.assert_called_once_with()
+        mock_del.reset_mock()
+        failed = mock.Mock(job=self._job(jwrap.JobStatus.COMPLETED_WITH_ERROR),
+                           error=None)
+        with self.assertLogs(jwrap.__name__, 'ERROR'):
+            jwrap._delete_when_done(failed)
+        mock_del.assert_called_once_with()
+        mock_del.reset_mock()
+        jwrap._delete_when_done(failed, log_failure=False)
+        mock_del.assert_called_once_with()
+        mock_del.reset_mock()
+        with self.assertLogs(jwrap.__name__, 'ERROR'):
+            jwrap._delete_when_done(mock.Mock(error=ex.Error('foo')))
+        self.assertEqual(0, mock_del.call_count)
+
+
+class TestJobScheduler(testtools.TestCase):
+
+    def setUp(self):
+        super(TestJobScheduler, self).setUp()
+        self.adpt = self.useFixture(fx.AdapterFx()).adpt
+
+    @staticmethod
+    def _job(group):
+        job = mock.Mock(op='op')
+        job._get_val_str.return_value = group
+        return job
+
+    def test_get(self):
+        sched = jwrap.JobScheduler.get(self.adpt)
+        self.assertIs(sched, jwrap.JobScheduler.get(self.adpt))
+        # No limits by default
+        self.assertEqual({'total': 0, 'host': 0, 'vios': 0}, sched.limits)
+
+    def test_limits(self):
+        sched = jwrap.JobScheduler(max_running=3, max_per_host=1,
+                                   max_per_vios=1)
+        vios = self._job('VirtualIOServer')
+        lpar = self._job('LogicalPartition')
+        msys = self._job('ManagedSystem')
+        vios1 = sched.acquire(vios, 'v1', host_uuid='h1')
+        self.assertEqual([('total', None), ('host', 'h1'), ('vios', 'v1')],
+                         vios1.keys)
+        # Per-VIOS limit
+        self.assertRaises(ex.JobRequestTimedOut, sched.acquire, vios, 'v1',
+                          timeout=0.01)
+        sched.acquire(vios, 'v2')
+        # Per-host limit.  A ManagedSystem Job's host is its target.
+        self.assertRaises(ex.JobRequestTimedOut, sched.acquire, msys, 'h1',
+                          host_uuid='h1', timeout=0.01)
+        self.assertEqual([('total', None), ('host', 'h2')],
+                         sched.acquire(msys, 'h2').keys)
+        # Total limit
+        self.assertRaises(ex.JobRequestTimedOut, sched.acquire, lpar, 'l1',
+                          timeout=0.01)
+        stats = sched.stats()
+        self.assertEqual(3, stats['running'])
+        self.assertEqual({'h1': 1, 'h2': 1}, stats['running_by_host'])
+        self.assertEqual({'v1': 1, 'v2': 1}, stats['running_by_vios'])
+        self.assertEqual(3, stats['timed_out'])
+        self.assertEqual(0, stats['queued'])
+
+        # Releasing (once) lets another run
+        vios1.release()
+        vios1.release()
+        self.assertEqual(2, sched.stats()['running'])
+        self.assertEqual([('total', None)], sched.acquire(lpar, 'l1').keys)
+        self.assertEqual(3, sched.stats()['running'])
+
+        # Zero means no limit
+        sched = jwrap.JobScheduler(max_running=0, max_per_host=0,
+                                   max_per_vios=0)
+        for i in range(20):
+            sched.acquire(vios, 'v1', host_uuid='h1')
+        self.assertEqual(20, sched.stats()['running_by_vios']['v1'])
+
+    @mock.patch('oslo_context.context.get_current')
+    def test_queueing(self, mock_ctx):
+        """Jobs start by priority, and tenants take turns."""
+        mock_ctx.return_value = mock.Mock(project_id='proj')
+        sched = jwrap.JobScheduler(max_running=1, max_per_host=0,
+                                   max_per_vios=0)
+        first = sched.acquire(self._job('LogicalPartition'), 'l0')
+        self.assertEqual('proj', first.tenant)
+        order = []
+
+        def run(label, priority, tenant):
+            ticket = sched.acquire(self._job('LogicalPartition'), label,
+                                   priority=priority, tenant=tenant)
+            order.append(label)
+            ticket.release()
+
+        threads = []
+        for label, prio, tenant in (
+                ('low', jwrap.JobPriority.LOW, 'A'),
+                ('A1', jwrap.JobPriority.NORMAL, 'A'),
+                ('A2', jwrap.JobPriority.NORMAL, 'A'),
+                ('B1', jwrap.JobPriority.NORMAL, 'B'),
+                ('A3', jwrap.JobPriority.NORMAL, 'A'),
+                ('B2', jwrap.JobPriority.NORMAL, 'B'),
+                ('high', jwrap.JobPriority.HIGH, 'C')):
+            thread = threading.Thread(target=run, args=(label, prio, tenant))
+            thread.start()
+            threads.append(thread)
+            # Queue them in order
+            while sched.stats()['queued'] < len(threads):
+                time.sleep(0.001)
+        stats = sched.stats()
+        self.assertEqual({jwrap.JobPriority.HIGH: 1,
+                          jwrap.JobPriority.NORMAL: 5,
+                          jwrap.JobPriority.LOW: 1},
+                         stats['queued_by_priority'])
+        self.assertEqual(1, stats['running'])
+
+        time.sleep(0.01)
+        first.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['high', 'A1', 'B1', 'A2', 'B2', 'A3', 'low'], order)
+        stats = sched.stats()
+        self.assertEqual(0, stats['queued'])
+        self.assertEqual(0, stats['running'])
+        self.assertEqual(8, stats['dispatched'])
+        self.assertEqual(8, stats['completed'])
+        self.assertGreater(stats['wait_max'], 0.01)
+        self.assertGreater(stats['run_max'], 0.01)
+        self.assertLess(stats['wait_avg'], stats['wait_max'])
@@ -48,3 +48,9 @@ class TestVIOSFile(twrap.TestWrapper):
                          vio_file.vios_uuid)
         self.assertEqual('0300f8d6de00004b000000014a54555cd9.28',
                          vio_file.tdev_udid)
+
+    def test_sha_chksum(self):
+        self.assertIsNone(self.entries[0].sha_chksum)
+        vio_file = vf.File.bld(self.adpt, 'fname', vf.FileType.DISK_IMAGE,
+                               'vios_uuid', sha_chksum='abc123')
+        self.assertEqual('abc123', vio_file.sha_chksum)
@@ -32,6 +32,8 @@ class TestVIOSWrapper(twrap.TestWrapper):
     wrapper_class_to_test = vios.VIOS
 
     def test_update_timeout(self):
+        # An unchanged wrapper would not be updated.
+        self.dwrap.name = 'new_name'
         self.adpt.update_by_path.return_value = self.dwrap.entry
         self.assertEqual(self.dwrap.entry, self.dwrap.update().entry)
         self.adpt.update_by_path.assert_called_with(self.dwrap, None, mock.ANY,
@@ -422,14 +422,31 @@ def find_equivalent(elem, find_list):
     return None
 
 
-def find_wrapper(haystack, needle_uuid):
+def find_wrapper(haystack, needle_uuid, wrapper_class=None):
     """Finds the corresponding wrapper from a list given the UUID.
 
     :param haystack:  A list of wrappers.  Usually generated from a 'feed' that
                       has been loaded via the wrapper's wrap(response) method.
+                      May also be the feed itself - a Response or Feed - in
+                      which case the entry is looked up by the Feed's UUID
+                      index, and only that entry is unmarshalled and wrapped.
     :param needle_uuid: The UUID of the object to find in the list.
+    :param wrapper_class: The EntryWrapper subclass with which to wrap the
+                          entry found in a feed.  If not specified, the class
+                          registered for the entry's schema type is used.
     :return: The corresponding wrapper for that UUID.  If not found, None.
     """
+    # These modules import this one.
+    from pypowervm import adapter
+    from pypowervm import entities
+    from pypowervm.wrappers import entry_wrapper as ewrap
+    if isinstance(haystack, adapter.Response):
+        return (wrapper_class or ewrap.EntryWrapper).wrap_from_feed(
+            haystack, needle_uuid)
+    if isinstance(haystack, entities.Feed):
+        entry = haystack.find_entry(str(needle_uuid))
+        return None if entry is None else (
+            wrapper_class or ewrap.EntryWrapper).wrap(entry, etag=entry.etag)
     for wrapper in haystack:
         if wrapper.uuid == needle_uuid:
             return wrapper
@@ -15,6 +15,7 @@
 #    under the License.
 
 import abc
+import collections
 from concurrent.futures import thread as th
 import oslo_concurrency.lockutils as lock
 import oslo_context.context as ctx
@@ -26,7 +27,10 @@ from taskflow import exceptions as tf_ex
 from taskflow.patterns import linear_flow as tf_lf
 from taskflow.patterns import unordered_flow as tf_uf
 from taskflow import task as tf_task
+from taskflow.types import failure as tf_fail
+import sys
 import threading
+import time
 
 import pypowervm.exceptions as ex
 from pypowervm.i18n import _
@@ -36,6 +40,18 @@ import pypowervm.wrappers.entry_wrapper as ewrap
 LOG = logging.getLogger(__name__)
 _local = threading.local()
 
+# Seconds a coalesced_transaction batch stays open for more mutations before
+# it starts waiting for the UUID lock.  (It stays open while it waits.)
+COALESCE_WINDOW = 0.1
+# {uuid: _CoalescedBatch} of the batches open to more mutations.
+_open_batches = {}
+_open_batches_lock = threading.Lock()
+
+# Size of the thread pool shared by all FeedTasks created with native=True.
+_NATIVE_POOL_SIZE = 32
+_native_pool = None
+_native_pool_lock = threading.Lock()
+
 
 def _get_locks():
     """Returns the list of UUIDs locked by this thread."""
@@ -131,6 +147,181 @@ def entry_transaction(func):
     return _synchronize
 
 
+class _CoalescedOp(object):
+    """One caller's mutation in a _CoalescedBatch, and its outcome."""
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.exc_info = None
+        # Whether func returned the wrapper it was given.
+        self.returned_wrapper = False
+        self.done = threading.Event()
+
+    def apply(self, wrapper):
+        """Run the mutation on wrapper, recording its result or exception.
+
+        :return: False if the mutation raised after changing the wrapper,
+                 which must therefore be discarded.  True otherwise.
+        """
+        before = wrapper.changes
+        try:
+            self.result = self.func(wrapper, *self.args, **self.kwargs)
+            self.returned_wrapper = self.result is wrapper
+            self.exc_info = None
+            return True
+        except Exception:
+            self.exc_info = sys.exc_info()
+            return wrapper.changes == before
+
+    def outcome(self, batch):
+        """Wait for the batch; return the result (or raise the exception).
+
+        :param batch: The _CoalescedBatch containing this op.  Its (updated)
+                      wrapper is read only once the batch is done.
+        """
+        self.done.wait()
+        if self.exc_info is not None:
+            six.reraise(*self.exc_info)
+        return batch.wrapper if self.returned_wrapper else self.result
+
+
+class _CoalescedBatch(object):
+    """Mutations of one PowerVM object, applied and sent in one update."""
+    def __init__(self, uuid, wrapper_or_getter):
+        self.uuid = uuid
+        self.wrapper_or_getter = wrapper_or_getter
+        self.ops = []
+        # The ops still to be applied: those which raised after changing the
+        # wrapper are dropped, and not reapplied on etag mismatch.
+        self.live_ops = []
+        self.wrapper = None
+
+    def run(self):
+        """Fetch the wrapper, apply all the mutations and update it once.
+
+        Runs under the UUID lock.  On etag mismatch, the wrapper is refreshed
+        and all the mutations are reapplied, as for entry_transaction.
+        """
+        @retry.retry(argmod_func=retry.refresh_wrapper, tries=60,
+                     delay_func=retry.STEPPED_RANDOM_DELAY)
+        def _apply_and_update(wrapper):
+            while True:
+                for op in self.live_ops:
+                    if not op.apply(wrapper):
+                        # Partially applied before failing.  Start over with
+                        # a fresh wrapper, without it.
+                        self.live_ops.remove(op)
+                        wrapper = wrapper.refresh(use_etag=False)
+                        break
+                else:
+                    break
+            return wrapper.update()
+
+        self.live_ops = list(self.ops)
+        try:
+            wos = self.wrapper_or_getter
+            if isinstance(wos, ewrap.EntryWrapperGetter):
+                wos = wos.get()
+            self.wrapper = _apply_and_update(wos)
+        except Exception:
+            self.fail(sys.exc_info())
+        LOG.debug("Coalesced %(num)d mutations of %(uuid)s into one update.",
+                  {'num': len(self.ops), 'uuid': self.uuid})
+
+    def fail(self, exc_info):
+        """Fail every mutation that succeeded (or wasn't tried) with exc_info.
+
+        Used when the batch as a whole fails, e.g. to GET or update.
+        """
+        for op in self.ops:
+            if op.exc_info is None:
+                op.exc_info = exc_info
+
+
+def coalesced_transaction(func):
+    """Decorator coalescing concurrent mutations of a PowerVM object.
+
+    Like entry_transaction, the decorated method may be invoked with either an
+    EntryWrapper or an EntryWrapperGetter as its first argument, and receives
+    an EntryWrapper; and calls are serialized on the object's UUID.  Unlike
+    entry_transaction, the decorated method must only modify the wrapper - it
+    must not update() it.
+
+    Calls for the same UUID made within COALESCE_WINDOW seconds of each other,
+    or while an earlier update of that object is in progress, are batched: the
+    wrapper is retrieved once, each call's modifications are applied to it in
+    turn, and a single update is sent.  (Each call thus sees the modifications
+    of those before it in the batch.)  If the update fails with etag mismatch,
+    the wrapper is refreshed and all of the modifications are reapplied.
+
+    The calls of a batch all run on the thread of the first one; each caller
+    gets its own return value or exception.  A method which raises after
+    modifying the wrapper is left out of the batch; the others are reapplied
+    to a freshly-retrieved wrapper.  If the update fails, the exception is
+    raised to all callers whose modifications had succeeded.  If the decorated
+    method returns the wrapper it was given, its caller gets the updated
+    wrapper.
+
+    Example usage:
+
+    @coalesced_transaction
+    def add_gizmo_to_vios_wrapper(vios_wrapper, gizmo):
+        vios_wrapper.gizmo_list.append(gizmo)
+        return vios_wrapper
+
+    Thirty concurrent calls of:
+
+    add_gizmo_to_vios_wrapper(pvm_vios.VIOS.getter(adapter, uuid), gizmo)
+
+    are likely to result in one GET and one update of the VIOS.
+    """
+    def _coalesce(wrp_or_spec, *args, **kwargs):
+        uuid = wrp_or_spec.uuid
+        op = _CoalescedOp(func, args, kwargs)
+        if uuid in _get_locks():
+            # This thread already holds the UUID lock (a nested transaction),
+            # so nobody else can update the object: do it now, alone.
+            batch = _CoalescedBatch(uuid, wrp_or_spec)
+            batch.ops.append(op)
+            batch.run()
+            op.done.set()
+            return op.outcome(batch)
+
+        with _open_batches_lock:
+            batch = _open_batches.get(uuid)
+            leader = batch is None
+            if leader:
+                batch = _CoalescedBatch(uuid, wrp_or_spec)
+                _open_batches[uuid] = batch
+            batch.ops.append(op)
+        if not leader:
+            return op.outcome(batch)
+
+        try:
+            time.sleep(COALESCE_WINDOW)
+            with lock.lock(uuid):
+                # Close the batch to newcomers: they start the next one.
+                with _open_batches_lock:
+                    del _open_batches[uuid]
+                try:
+                    _get_locks().append(uuid)
+                    batch.run()
+                finally:
+                    _get_locks().remove(uuid)
+        except Exception:
+            batch.fail(sys.exc_info())
+        finally:
+            with _open_batches_lock:
+                if _open_batches.get(uuid) is batch:
+                    del _open_batches[uuid]
+            for bop in batch.ops:
+                bop.done.set()
+        return op.outcome(batch)
+    return _coalesce
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Subtask(object):
     """A single EntryWrapper modification to be performed within a WrapperTask.
@@ -495,6 +686,15 @@ class ContextThreadPoolExecutor(th.ThreadPoolExecutor):
         return super(ContextThreadPoolExecutor, self).submit(wrapped)
 
 
+def _get_native_pool():
+    """The long-lived ContextThreadPoolExecutor for native FeedTasks."""
+    global _native_pool
+    with _native_pool_lock:
+        if _native_pool is None:
+            _native_pool = ContextThreadPoolExecutor(_NATIVE_POOL_SIZE)
+        return _native_pool
+
+
 class FeedTask(tf_task.Task):
     """Invokes WrapperTasks in parallel over each EntryWrapper in a feed.
 
@@ -547,7 +747,7 @@ class FeedTask(tf_task.Task):
     avoid them subsequently.
     """
     def __init__(self, name, feed_or_getter, max_workers=10,
-                 update_timeout=-1):
+                 update_timeout=-1, native=False):
         """Create a FeedTask with a FeedGetter (preferred) or existing feed.
 
         :param name: A descriptive string name.  This will be used along with
@@ -565,6 +765,14 @@ class FeedTask(tf_task.Task):
                                the default, causes the request to use the
                                timeout value configured on the Session
                                belonging to the Adapter.
+        :param native: (Optional) If True, the execute method runs the
+                       WrapperTasks on a shared, long-lived thread pool, and
+                       the post-execs in sequence, without building and
+                       running TaskFlow engines.  The results and exceptions
+                       are the same.  (Post-execs which are Flows, or whose
+                       requirements are not all provided by the FeedTask or
+                       earlier post-execs, are still run by a TaskFlow
+                       engine.)
         """
         super(FeedTask, self).__init__(name)
         if isinstance(feed_or_getter, ewrap.FeedGetter):
@@ -587,6 +795,7 @@ class FeedTask(tf_task.Task):
         # Max WrapperTasks to run in parallel
         self.max_workers = max_workers
         self.update_timeout = update_timeout
+        self.native = native
         # Map of {uuid: WrapperTask}.  We keep this empty until we need the
         # individual WraperTasks.  This is triggered by .wrapper_tasks and
         # .get_wrapper(uuid) (and obviously executing).
@@ -745,6 +954,114 @@ class FeedTask(tf_task.Task):
                                  wrapper=subtask_rets['wrapper_%s' % uuid])
         return ret
 
+    def _run_wrapper_tasks_native(self):
+        """Run the WrapperTasks in parallel on the shared pool.
+
+        As with the TaskFlow parallel engine, a failed WrapperTask does not
+        prevent the others from running.
+
+        :return: Dict of the WrapperTasks' results, keyed by the names they
+                 provide, as from TaskFlow storage.
+        :raise: The exception, if one WrapperTask failed; WrappedFailure if
+                more than one did.
+        """
+        pending = collections.deque(self.wrapper_tasks.values())
+        results = {}
+        failures = []
+        qlock = threading.Lock()
+
+        def _lane():
+            while True:
+                with qlock:
+                    if not pending:
+                        return
+                    wtask = pending.popleft()
+                try:
+                    ret = wtask.execute()
+                except Exception:
+                    with qlock:
+                        failures.append(tf_fail.Failure())
+                    continue
+                if ret is None:
+                    # allow_empty WrapperTask with no Subtasks
+                    continue
+                with qlock:
+                    for name, idx in wtask.save_as.items():
+                        results[name] = ret if idx is None else ret[idx]
+
+        # This thread runs one lane itself, so the work gets done even if the
+        # shared pool is busy (e.g. with the FeedTask running this one).
+        # Lanes which haven't started when this one runs dry are cancelled.
+        lanes = [_get_native_pool().submit(_lane) for _ in
+                 range(min(self.max_workers, len(pending)) - 1)]
+        _lane()
+        for lane in lanes:
+            if not lane.cancel():
+                lane.result()
+        tf_fail.Failure.reraise_if_any(failures)
+        return results
+
+    def _can_run_post_execs_native(self, store):
+        """Whether _run_post_execs_native can run the post-execs.
+
+        :param store: Dict of the values available to the post-execs.
+        """
+        available = set(store)
+        for task in self._post_exec:
+            if not isinstance(task, tf_task.Task):
+                return False
+            inject = task.inject or {}
+            for arg, key in task.rebind.items():
+                if key in available or arg in inject:
+                    continue
+                if arg not in task.optional:
+                    return False
+            available.update(task.save_as)
+        return True
+
+    @staticmethod
+    def _task_args(task, store):
+        """Execute kwargs of a TaskFlow Task, resolved from store."""
+        kwargs = {}
+        for arg, key in task.rebind.items():
+            if task.inject and arg in task.inject:
+                kwargs[arg] = task.inject[arg]
+            elif key in store:
+                kwargs[arg] = store[key]
+        return kwargs
+
+    def _run_post_execs_native(self, store):
+        """Run the post-execs in sequence, in this thread.
+
+        As with a TaskFlow engine running a linear flow, if a post-exec fails,
+        it and those before it are reverted (in reverse order) and its
+        exception is raised.
+
+        :param store: Dict of the values available to the post-execs.  Their
+                      results are added to it.
+        """
+        done = []
+        for task in self._post_exec:
+            kwargs = self._task_args(task, store)
+            try:
+                result = task.execute(**kwargs)
+            except Exception:
+                fail = tf_fail.Failure()
+                done.append((task, kwargs, fail))
+                flow_failures = {task.name: fail}
+                for rtask, rkwargs, rresult in reversed(done):
+                    try:
+                        rtask.revert(result=rresult,
+                                     flow_failures=flow_failures, **rkwargs)
+                    except Exception:
+                        LOG.exception(_("FeedTask %(ft)s: failed to revert "
+                                        "post-exec %(task)s."),
+                                      {'ft': self.name, 'task': rtask.name})
+                fail.reraise()
+            for name, idx in task.save_as.items():
+                store[name] = result if idx is None else result[idx]
+            done.append((task, kwargs, result))
+
     def execute(self):
         """Run this FeedTask's WrapperTasks in parallel TaskFlow engine.
 
@@ -771,20 +1088,27 @@ class FeedTask(tf_task.Task):
             # if there exists at least one WrapperTask with Subtasks.
             # (NB: It is legal to have a FeedTask that *only* has post-execs.)
             if self._tx_by_uuid or self._common_tx.subtasks:
-                pflow = tf_uf.Flow("%s_parallel_flow" % self.name)
-                pflow.add(*self.wrapper_tasks.values())
-                # Execute the parallel flow now so the results can be provided
-                # to any post-execs.
-                rets['wrapper_task_rets'] = self._process_subtask_rets(
-                    tf_eng.run(
+                if self.native:
+                    subtask_rets = self._run_wrapper_tasks_native()
+                else:
+                    pflow = tf_uf.Flow("%s_parallel_flow" % self.name)
+                    pflow.add(*self.wrapper_tasks.values())
+                    # Execute the parallel flow now so the results can be
+                    # provided to any post-execs.
+                    subtask_rets = tf_eng.run(
                         pflow, engine='parallel',
-                        executor=ContextThreadPoolExecutor(self.max_workers)))
+                        executor=ContextThreadPoolExecutor(self.max_workers))
+                rets['wrapper_task_rets'] = self._process_subtask_rets(
+                    subtask_rets)
             if self._post_exec:
-                flow = tf_lf.Flow('%s_post_execs' % self.name)
-                flow.add(*self._post_exec)
-                eng = tf_eng.load(flow, store=rets)
-                eng.run()
-                rets = eng.storage.fetch_all()
+                if self.native and self._can_run_post_execs_native(rets):
+                    self._run_post_execs_native(rets)
+                else:
+                    flow = tf_lf.Flow('%s_post_execs' % self.name)
+                    flow.add(*self._post_exec)
+                    eng = tf_eng.load(flow, store=rets)
+                    eng.run()
+                    rets = eng.storage.fetch_all()
         except tf_ex.WrappedFailure as wfail:
             LOG.error(_("FeedTask %s experienced multiple exceptions. They "
                         "are logged individually below."), self.name)
@@ -32,6 +32,34 @@ import pypowervm.utils.uuid as pvm_uuid
 
 LOG = logging.getLogger(__name__)
 
+# Sentinel distinguishing "property not found" from "property has no text".
+_MISSING = object()
+
+# Default number of concurrent per-entry GETs issued by FeedGetter.get
+# (refresh) and UUIDFeedGetter.get.
+_FEED_GETTER_MAX_WORKERS = 10
+
+
+def _parallel_map(func, items, max_workers):
+    """Like map(func, items), running up to max_workers calls concurrently.
+
+    Results are returned (as a list) in the order of items.  The first
+    exception raised by any call is raised to the caller.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    # Not imported at the top: pypowervm.utils.transaction imports this module
+    from pypowervm.utils import transaction as tx
+    with tx.ContextThreadPoolExecutor(
+            max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def _count_changed(old_feed, new_feed):
+    """Count the wrappers in new_feed which aren't those in old_feed."""
+    return sum(1 for old, new in zip(old_feed, new_feed) if new is not old)
+
 
 def _indirect_child_elem(wrap, indirect):
     if indirect is None:
@@ -275,6 +303,20 @@ class Wrapper(object):
 
         return found_value  # May be None
 
+    def _find_text(self, property_name):
+        """Will find the raw text of a given element within the object.
+
+        Fast path for property reads, which doesn't wrap the found element.
+
+        :param property_name: The property to search within the tree for.
+        :return: The text of the element, which may be None; or _MISSING if
+                 the element was not found.
+        """
+        element = self.element
+        if element is None:
+            return _MISSING
+        return element.findrawtext(property_name, missing=_MISSING)
+
     def _find_or_seed(self, prop_name, attrib=pc.DEFAULT_SCHEMA_ATTR):
         """Will find the existing element, or create if needed.
 
@@ -424,12 +466,11 @@ class Wrapper(object):
         :return: The (possibly converted) value corresponding to the identified
                  property.
         """
-        element_value = self._find(property_name)
-        if element_value is None:
+        text = self._find_text(property_name)
+        if text is _MISSING:
             self.log_missing_value(property_name)
             return default
 
-        text = element_value.text
         if text is None:
             return default
 
@@ -604,8 +645,8 @@ class Wrapper(object):
             append_point.element.inject(link, ordering_list=self.child_order)
         # At this point we have found or created the propname element.  Its
         # handle is in the link var.
-        link.attrib['href'] = href
-        link.attrib['rel'] = 'related'
+        link.set('href', href)
+        link.set('rel', 'related')
 
     def toxmlstring(self, pretty=False):
         """Produce an XML dump of this Wrapper's Element.
@@ -774,6 +815,24 @@ class EntryWrapper(Wrapper):
         fmt = _("Must supply a Response or Entry to wrap.  Got %s")
         raise TypeError(fmt % str(type(response_or_entry)))
 
+    @classmethod
+    def wrap_from_feed(cls, response, uuid):
+        """Wrap only the Entry with the specified UUID from a feed Response.
+
+        Unlike wrap, this does not unmarshal or wrap the other entries in the
+        feed.
+
+        :param response: The Response from an adapter.Adapter.read request of
+                         a feed.
+        :param uuid: The UUID (case-insensitive) of the entry to wrap.
+        :return: A single wrapper for the matching Entry, or None if the feed
+                 contains no Entry with the specified UUID.
+        """
+        if response.feed is None:
+            raise KeyError(_("Response is missing 'feed' property."))
+        entry = response.feed.find_entry(str(uuid))
+        return None if entry is None else cls.wrap(entry, etag=entry.etag)
+
     def refresh(self, use_etag=True):
         """Fetch the latest version of the entry from the REST API server.
 
@@ -1035,9 +1094,13 @@ class EntryWrapper(Wrapper):
             raise ValueError(_("Wrapper class %(class)s does not support "
                                "search key '%(key)s'.") %
                              {'class': cls.__name__, 'key': key})
-        feedwrap = cls.wrap(cls._read_parent_or_child(adapter, target_type,
-                                                      parent_type, parent_uuid,
-                                                      xag=xag))
+        resp = cls._read_parent_or_child(adapter, target_type, parent_type,
+                                         parent_uuid, xag=xag)
+        if key == 'uuid' and not negate:
+            # Indexed lookup - avoids unmarshalling the rest of the feed.
+            wrapper = cls.wrap_from_feed(resp, val)
+            return [wrapper] if wrapper and wrapper.uuid == str(val) else []
+        feedwrap = cls.wrap(resp)
         retlist = []
         val = str(val)
         for entry in feedwrap:
@@ -1119,14 +1182,20 @@ class EntryWrapper(Wrapper):
         self.adapter.delete_by_href(self.href, etag=self.etag)
 
     # TODO(IBM): Remove deprecated xag parameter
-    def update(self, xag='__DEPRECATED__', timeout=-1):
+    def update(self, xag='__DEPRECATED__', timeout=-1, force=False):
         """Performs adapter.update of this wrapper.
 
+        If the wrapper's XML has not been changed since it was retrieved (see
+        the dirty property), no request is sent, and this wrapper is returned.
+
         :param xag: DEPRECATED - do not use.
         :param timeout: (Optional) Integer number of seconds after which to
                         time out the POST request.  -1, the default, causes the
                         request to use the timeout value configured on the
                         Session belonging to the Adapter.
+        :param force: (Optional) If True, send the update even if the wrapper
+                      appears unchanged - e.g. because the underlying
+                      etree.Element was modified directly.
         :return: The updated wrapper, per the response from the Adapter.update.
         """
         if xag != '__DEPRECATED__':
@@ -1136,6 +1205,12 @@ class EntryWrapper(Wrapper):
                   "At best, using it will result in a no-op.  At worst, it "
                   "will give you incurable etag mismatch errors."),
                 DeprecationWarning)
+        if not (force or self.dirty):
+            LOG.debug("Skipping update of unchanged %s.", self._type_and_uuid)
+            return self
+        LOG.debug("Updating %(obj)s: %(changes)s",
+                  {'obj': self._type_and_uuid,
+                   'changes': ', '.join(self.changes)})
         if timeout == -1:
             # Override default timeout to 60 minutes unless the Session is
             # configured for longer already.
@@ -1151,6 +1226,22 @@ class EntryWrapper(Wrapper):
     def element(self):
         return self.entry.element
 
+    @property
+    def dirty(self):
+        """Whether this wrapper's XML has changed since it was retrieved.
+
+        See entities.Entry.dirty.
+        """
+        return self.entry.dirty
+
+    @property
+    def changes(self):
+        """List of strings summarizing the changes to this wrapper's XML.
+
+        See entities.Entry.changes.
+        """
+        return self.entry.changes
+
     @property
     def etag(self):
         return self._etag
@@ -1382,8 +1473,7 @@ class WrapperElemList(list):
             self.append(elem)
 
     def append(self, elem):
-        self.root_elem.element.append(
-            _indirect_child_elem(elem, self.indirect).element)
+        self.root_elem.append(_indirect_child_elem(elem, self.indirect))
 
     def remove(self, elem):
         find_elem = _indirect_child_elem(elem, self.indirect)
@@ -1591,7 +1681,8 @@ class FeedGetter(EntryWrapperGetter):
     a retry.
     """
     def __init__(self, adapter, entry_class, parent_class=None,
-                 parent_uuid=None, xag=None, parent=None):
+                 parent_uuid=None, xag=None, parent=None,
+                 max_workers=_FEED_GETTER_MAX_WORKERS):
         """Create a GET specification for an EntryWrapper feed.
 
         :param adapter: A pypowervm.adapter.Adapter instance through which the
@@ -1610,11 +1701,16 @@ class FeedGetter(EntryWrapperGetter):
         :param parent: If the target object type is CHILD, specify either the
                        parent parameter or BOTH parent_class and parent_uuid.
                        This parameter represents the ROOT parent object.
+        :param max_workers: The maximum number of per-entry GETs to run
+                            concurrently when refreshing the feed.
         """
         # Using entry_uuid=None will cause the GET to fetch the feed.
         super(FeedGetter, self).__init__(
             adapter, entry_class, None, parent=parent,
             parent_class=parent_class, parent_uuid=parent_uuid, xag=xag)
+        self.max_workers = max_workers
+        # Number of entries changed by the last get(); None until then.
+        self.changed = None
 
     def get(self, refresh=False, refetch=False):
         """Return the feed (list of EntryWrappers) indicated by this instance.
@@ -1625,8 +1721,15 @@ class FeedGetter(EntryWrapperGetter):
         specified.
 
         The refresh option, if True, will cause each entry in the feed to be
-        refreshed if previously cached.  The refetch option, if True, will
-        cause the feed to be refetched as a whole.
+        refreshed if previously cached.  The refresh GETs run concurrently (up
+        to max_workers at a time) and are conditional on each entry's etag:
+        an entry which has not changed on the server is kept as is.  The
+        refetch option, if True, will cause the feed to be refetched as a
+        whole.
+
+        After each call, the changed attribute holds the number of entries
+        which are new or were changed by it: zero if the cached feed was
+        returned, or if nothing changed on refresh.
 
         Note: due to the design of the REST server, refetch will generally
         perform better than refresh.
@@ -1649,17 +1752,23 @@ class FeedGetter(EntryWrapperGetter):
         # this subclass.  Therefore, the superclass's concept of 'refresh' is
         # no good (it would be trying [ewrap, ...].refresh()).
         if refresh and self.cache is not None:
-            # Future: parallelize, for what it's worth.
-            new_feed = [ewrap.refresh() for ewrap in self.cache]
-            self.cache = new_feed
+            old_feed = self.cache
+            # EntryWrapper.refresh sends the etag, returning the same wrapper
+            # if the server responds 304 (Not Modified).
+            self.cache = _parallel_map(lambda wrp: wrp.refresh(), old_feed,
+                                       self.max_workers)
+            self.changed = _count_changed(old_feed, self.cache)
             return self.cache
 
         # To refetch, simply wipe the cache before super.get().
         if refetch:
             self.cache = None
+        fetch = self.cache is None
 
         # Never, never call super.get(refresh=True).
-        return super(FeedGetter, self).get(refresh=False)
+        feed = super(FeedGetter, self).get(refresh=False)
+        self.changed = len(feed) if fetch else 0
+        return feed
 
 
 class UUIDFeedGetter(FeedGetter):
@@ -1672,7 +1781,8 @@ class UUIDFeedGetter(FeedGetter):
       is not sufficient.
     """
     def __init__(self, adapter, entry_class, uuid_list, parent_class=None,
-                 parent_uuid=None, xag=None, parent=None):
+                 parent_uuid=None, xag=None, parent=None,
+                 max_workers=_FEED_GETTER_MAX_WORKERS):
         """Create a UUIDFeedGetter.
 
         :param adapter: See FeedGetter.
@@ -1683,10 +1793,12 @@ class UUIDFeedGetter(FeedGetter):
         :param parent_uuid: See FeedGetter.
         :param xag: See FeedGetter.
         :param parent: See FeedGetter.
+        :param max_workers: The maximum number of per-UUID GETs (or refreshes)
+                            to run concurrently.
         """
         super(UUIDFeedGetter, self).__init__(
             adapter, entry_class, parent=parent, parent_class=parent_class,
-            parent_uuid=parent_uuid, xag=xag)
+            parent_uuid=parent_uuid, xag=xag, max_workers=max_workers)
         self.uuid_list = uuid_list
         self._create_wrapper_getters()
 
@@ -1699,6 +1811,9 @@ class UUIDFeedGetter(FeedGetter):
     def get(self, refresh=False, refetch=False):
         """Get the individual wrappers for each UUID and put them in a 'feed'.
 
+        The GETs (or refreshes) run concurrently, up to max_workers at a time.
+        The changed attribute is set as for FeedGetter.get.
+
         :param refresh: See FeedGetter.get.
         :param refetch: See FeedGetter.get.
         """
@@ -1706,6 +1821,9 @@ class UUIDFeedGetter(FeedGetter):
             # Rebuild the wrapper getters, guaranteeing that we clear anything
             # already fetched
             self._create_wrapper_getters()
+        old_feed = [wg.cache for wg in self.wrapper_getters]
         # Populate the quasi-feed from the individual wrapper getters.
-        # Future: parallelize, for what it's worth.
-        return [wg.get(refresh=refresh) for wg in self.wrapper_getters]
+        feed = _parallel_map(lambda wg: wg.get(refresh=refresh),
+                             self.wrapper_getters, self.max_workers)
+        self.changed = _count_changed(old_feed, feed)
+        return feed
@@ -16,13 +16,19 @@
 
 """EntryWrapper, constants, and enums around Job ('web' namespace)."""
 
+import collections
+import functools
 import threading
 import time
+import weakref
 
+from concurrent import futures
 from oslo_config import cfg
+from oslo_context import context as ctx
 from oslo_log import log as logging
 import six
 
+from pypowervm import adapter as adpt
 import pypowervm.const as pc
 import pypowervm.entities as ent
 import pypowervm.exceptions as pvmex
@@ -47,6 +53,27 @@ _JOB_STACKTRACE = u.xpath(_RESPONSE_EXCEPTION, 'StackTrace')
 _JOB_STATUS = 'Status'
 _JOB_ID = 'JobID'
 
+# Fallback polling by the JobMonitor starts at _POLL_MIN seconds, and backs off
+# by a factor of _POLL_BACKOFF for each poll, to at most _POLL_MAX seconds; or
+# to _POLL_MAX_EVENTS seconds if Job events are being received.
+_POLL_MIN = 0.5
+_POLL_BACKOFF = 1.5
+_POLL_MAX = 5
+_POLL_MAX_EVENTS = 30
+# Log a warning each time a waiter has been waiting this many more seconds.
+_WARN_INTERVAL = 300
+# Number of threads deleting completed Jobs on behalf of the JobMonitors.
+_DELETE_WORKERS = 4
+_delete_pool = None
+_delete_pool_lock = threading.Lock()
+
+
+class JobPriority(object):
+    """Priority classes for Jobs queued by the JobScheduler."""
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
 
 class JobStatus(object):
     NOT_ACTIVE = 'NOT_STARTED'
@@ -56,7 +83,496 @@ class JobStatus(object):
     COMPLETED_WITH_ERROR = 'COMPLETED_WITH_ERROR'
 
 
+class _JobWatch(object):
+    """A Job being tracked by a JobMonitor."""
+    def __init__(self, job, statuses, sensitive, callback):
+        self.job = job
+        self.statuses = statuses
+        self.sensitive = sensitive
+        self.callback = callback
+        self.interval = _POLL_MIN
+        self.next_poll = time.time() + self.interval
+        # Exception from reading the Job, if any.
+        self.error = None
+        self.done = threading.Event()
+
+
+class _JobEventHandler(adpt.EventHandler):
+    """Wakes a JobMonitor's watches on events for their Jobs."""
+    def __init__(self, monitor):
+        # Weak, so the event listener doesn't keep the monitor alive.
+        self._monitor = weakref.ref(monitor)
+
+    def process(self, events):
+        monitor = self._monitor()
+        if monitor is None:
+            return
+        if events.get('general') in ('init', 'invalidate'):
+            # Events may have been missed - check all the Jobs.
+            monitor.notify()
+        for href in events:
+            # Job hrefs are of the form .../rest/api/web/jobs/<job_id>
+            path = href.rstrip('/').split('/')
+            if len(path) > 1 and path[-2] == _JOBS:
+                monitor.notify(job_id=path[-1])
+
+
+class JobMonitor(object):
+    """Tracks the outstanding Jobs of a Session, in a single thread.
+
+    The Jobs are polled with exponential backoff.  If the Session has an event
+    listener, MODIFY_URI events for a Job's href trigger an immediate poll of
+    that Job, and the backoff is allowed to grow much larger.
+
+    Obtain the JobMonitor for an Adapter via JobMonitor.get.  The thread exists
+    only while there are Jobs to track.
+    """
+    _monitors = weakref.WeakKeyDictionary()
+    _monitors_lock = threading.Lock()
+
+    def __init__(self, session):
+        self._session = weakref.proxy(session)
+        self._cond = threading.Condition()
+        # {job_id: [_JobWatch, ...]}
+        self._watches = {}
+        self._thread = None
+        self._event_handler = None
+
+    @classmethod
+    def get(cls, adapter):
+        """Get the JobMonitor for the Session of the specified Adapter."""
+        with cls._monitors_lock:
+            monitor = cls._monitors.get(adapter.session)
+            if monitor is None:
+                monitor = cls(adapter.session)
+                cls._monitors[adapter.session] = monitor
+            return monitor
+
+    @property
+    def events_enabled(self):
+        return self._event_handler is not None
+
+    def _subscribe(self):
+        """Subscribe to the Session's events, if it is listening for them."""
+        if self._event_handler is not None:
+            return
+        try:
+            if self._session.has_event_listener is not True:
+                return
+            handler = _JobEventHandler(self)
+            self._session.get_event_listener().subscribe(
+                handler, uri_prefixes=['/rest/api/web/jobs/'])
+        except Exception as e:
+            LOG.warning(_("Unable to monitor Jobs via events; falling back to "
+                          "polling.  Error: %s"), e)
+            return
+        self._event_handler = handler
+
+    def watch(self, job, statuses, sensitive=False, callback=None):
+        """Track a Job until its status is no longer in the specified list.
+
+        :param job: The Job wrapper to track.  Its entry is refreshed in place.
+        :param statuses: Iterable of JobStatus enum values.  The Job is tracked
+                         as long as its status is in this list.
+        :param sensitive: If True, mask the Job payload in the logs.
+        :param callback: Optional callable accepting the watch (whose 'job' and
+                         'error' attributes are of interest), invoked on the
+                         monitor thread when the Job leaves the statuses, or
+                         fails to be read.  It should be brief.
+        :return: The watch, whose 'done' threading.Event is set when the Job
+                 leaves the statuses, or fails to be read.
+        """
+        self._subscribe()
+        watch = _JobWatch(job, statuses, sensitive, callback)
+        with self._cond:
+            self._watches.setdefault(job.job_id, []).append(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run,
+                                                name='JobMonitor')
+                self._thread.daemon = True
+                self._thread.start()
+            self._cond.notify()
+        return watch
+
+    def unwatch(self, watch):
+        """Stop tracking a Job (e.g. because the waiter timed out)."""
+        with self._cond:
+            watches = self._watches.get(watch.job.job_id, [])
+            if watch in watches:
+                watches.remove(watch)
+                if not watches:
+                    del self._watches[watch.job.job_id]
+
+    def notify(self, job_id=None):
+        """Poll the specified Job (all Jobs if None) as soon as possible."""
+        with self._cond:
+            if job_id is None:
+                watches = [w for ws in self._watches.values() for w in ws]
+            else:
+                watches = self._watches.get(job_id, [])
+            for watch in watches:
+                watch.next_poll = 0
+            self._cond.notify()
+
+    def wait(self, job, statuses, timeout, sensitive):
+        """Wait for a Job's status to leave the specified list.
+
+        :param job: The Job wrapper to wait on.  Its entry is refreshed in
+                    place.
+        :param statuses: Iterable of JobStatus enum values.
+        :param timeout: Maximum number of seconds to wait.  If zero, wait
+                        indefinitely.
+        :param sensitive: If True, mask the Job payload in the logs.
+        :return: timed_out: True if the timeout was reached before the Job
+                            left the specified set of states.
+        """
+        start_time = time.time()
+        watch = self.watch(job, statuses, sensitive=sensitive)
+        while True:
+            elapsed_time = time.time() - start_time
+            if timeout and elapsed_time >= timeout:
+                self.unwatch(watch)
+                return True
+            wait_time = _WARN_INTERVAL - elapsed_time % _WARN_INTERVAL
+            if timeout:
+                wait_time = min(wait_time, timeout - elapsed_time)
+            if watch.done.wait(wait_time):
+                break
+            if not timeout or time.time() - start_time < timeout:
+                msg = _("Job %(job_id)s monitoring for %(time)i seconds.")
+                LOG.warning(msg, {'job_id': job.job_id,
+                                  'time': time.time() - start_time})
+        if watch.error is not None:
+            raise watch.error
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._watches:
+                    self._thread = None
+                    return
+                now = time.time()
+                watches = [w for ws in self._watches.values() for w in ws]
+                due = {w.job.job_id for w in watches if w.next_poll <= now}
+                if not due:
+                    self._cond.wait(min(w.next_poll for w in watches) - now)
+                    continue
+                # All the waiters on a Job share one read.
+                due = [list(self._watches[job_id]) for job_id in due]
+            # Poll outside the lock.
+            for watches in due:
+                self._poll(watches)
+
+    def _poll(self, watches):
+        job_id = watches[0].job.job_id
+        try:
+            entry = watches[0].job.adapter.read_job(
+                job_id, sensitive=any(w.sensitive for w in watches)).entry
+        except Exception as e:
+            entry, error = None, e
+        else:
+            error = None
+        for watch in watches:
+            if error is None:
+                watch.job.entry = entry
+                if watch.job.job_status in watch.statuses:
+                    maxint = (_POLL_MAX_EVENTS if self.events_enabled
+                              else _POLL_MAX)
+                    watch.interval = min(watch.interval * _POLL_BACKOFF,
+                                         maxint)
+                    watch.next_poll = time.time() + watch.interval
+                    continue
+            watch.error = error
+            self.unwatch(watch)
+            watch.done.set()
+            if watch.callback is not None:
+                try:
+                    watch.callback(watch)
+                except Exception:
+                    LOG.exception(_("Error processing completion of Job %s."),
+                                  job_id)
+
+
+def _delete_when_done(watch, log_failure=True):
+    """JobMonitor callback to delete a Job (and log if it failed)."""
+    job = watch.job
+    if watch.error is not None:
+        LOG.error(_("Unable to monitor Job %(job_id)s: %(error)s"),
+                  {'job_id': job.job_id, 'error': watch.error})
+        return
+    job.delete_job()
+    # If the Job failed, we still want to log it.
+    if log_failure and job.job_status != JobStatus.COMPLETED_OK:
+        exc = pvmex.JobRequestFailed(
+            operation_name=job.op, error=job.get_job_message())
+        LOG.error(exc.args[0])
+
+
+def _get_delete_pool():
+    """The long-lived thread pool in which completed Jobs are deleted."""
+    global _delete_pool
+    with _delete_pool_lock:
+        if _delete_pool is None:
+            _delete_pool = futures.ThreadPoolExecutor(_DELETE_WORKERS)
+        return _delete_pool
+
+
+def _delete_in_background(watch, log_failure=True, on_done=None):
+    """JobMonitor callback to _delete_when_done on a worker thread.
+
+    The delete_job REST call thus doesn't hold up the monitor thread.
+
+    :param watch: The _JobWatch of the completed Job.
+    :param log_failure: As for _delete_when_done.
+    :param on_done: Optional callable with no arguments, invoked once the Job
+                    has been deleted (or failed to be).
+    :return: The Future of the deletion.
+    """
+    def _delete():
+        try:
+            _delete_when_done(watch, log_failure=log_failure)
+        except Exception:
+            LOG.exception(_("Error deleting Job %s."), watch.job.job_id)
+        finally:
+            if on_done is not None:
+                on_done()
+    return _get_delete_pool().submit(_delete)
+
+
+class _JobTicket(object):
+    """A Job's place in a JobScheduler: first queued, then running."""
+    def __init__(self, scheduler, keys, priority, tenant):
+        self._scheduler = scheduler
+        # The (kind, id) limits the Job counts against while running.
+        self.keys = keys
+        self.priority = priority
+        self.tenant = tenant
+        self.queued_at = time.time()
+        self.started_at = None
+        self.released = False
+        self.dispatched = threading.Event()
+
+    def release(self):
+        """Free the Job's slot, letting queued Jobs run.  Idempotent."""
+        self._scheduler._release(self)
+
+
+class JobScheduler(object):
+    """Limits the Jobs running concurrently against a REST server.
+
+    Job.run_job waits here for a slot before creating its Job.  A Job counts
+    against the limit on all the Jobs of the Session; the limit for its
+    managed system (if it targets one, or its host_uuid is given); and the
+    limit for its VIOS (if it targets one).  When a Job finishes, the next
+    Job whose limits have room is started, taking the highest JobPriority
+    first and, within a priority, taking turns among the tenants (by default,
+    the project of the current request context).
+
+    Obtain the JobScheduler for an Adapter via JobScheduler.get.  The limits
+    default to the pypowervm_job_max_running, pypowervm_job_max_per_host and
+    pypowervm_job_max_per_vios config options, all of which default to no
+    limit.
+    """
+    _schedulers = weakref.WeakKeyDictionary()
+    _schedulers_lock = threading.Lock()
+
+    def __init__(self, max_running=None, max_per_host=None,
+                 max_per_vios=None):
+        """Create a JobScheduler.
+
+        :param max_running: Maximum number of Jobs to run at once.  None uses
+                            the config option; 0 means no limit.
+        :param max_per_host: Maximum number of Jobs to run at once against
+                             any one managed system.  None uses the config
+                             option; 0 means no limit.
+        :param max_per_vios: Maximum number of Jobs to run at once against
+                             any one VIOS.  None uses the config option; 0
+                             means no limit.
+        """
+        def _dflt(val, opt):
+            return CONF[opt] if val is None else val
+        self.limits = {
+            'total': _dflt(max_running, 'pypowervm_job_max_running'),
+            'host': _dflt(max_per_host, 'pypowervm_job_max_per_host'),
+            'vios': _dflt(max_per_vios, 'pypowervm_job_max_per_vios')}
+        self._lock = threading.Lock()
+        # {priority: OrderedDict({tenant: deque([_JobTicket, ...])})}.  The
+        # tenants are in the order in which they get their next turn.
+        self._queues = {}
+        # {(kind, id): number of running Jobs}
+        self._running = collections.Counter()
+        self._counts = collections.Counter()
+        self._waits = collections.Counter()
+        self._runs = collections.Counter()
+
+    @classmethod
+    def get(cls, adapter):
+        """Get the JobScheduler for the Session of the specified Adapter."""
+        with cls._schedulers_lock:
+            sched = cls._schedulers.get(adapter.session)
+            if sched is None:
+                sched = cls()
+                cls._schedulers[adapter.session] = sched
+            return sched
+
+    @staticmethod
+    def _keys(job, uuid, host_uuid):
+        keys = [('total', None)]
+        group = job._get_val_str(_JOB_GROUP_NAME)
+        if host_uuid is None and group == 'ManagedSystem':
+            host_uuid = uuid
+        if host_uuid is not None:
+            keys.append(('host', host_uuid))
+        if group == 'VirtualIOServer' and uuid is not None:
+            keys.append(('vios', uuid))
+        return keys
+
+    def acquire(self, job, uuid, host_uuid=None, priority=JobPriority.NORMAL,
+                tenant=None, timeout=0):
+        """Wait for a slot in which to run a Job.
+
+        :param job: The Job wrapper to be run.
+        :param uuid: The uuid of the Job's target, as passed to run_job.
+        :param host_uuid: The uuid of the managed system on which the Job
+                          runs, if known and not the target itself.
+        :param priority: JobPriority value.
+        :param tenant: Key by which Jobs of the same priority take turns.  If
+                       None, the project of the current request context.
+        :param timeout: Maximum number of seconds to wait.  If zero, wait
+                        indefinitely.
+        :return: A ticket, whose release method must be invoked when the Job
+                 is finished.
+        :raise JobRequestTimedOut: if no slot was available within the
+                                   timeout.
+        """
+        if tenant is None:
+            context = ctx.get_current()
+            tenant = getattr(context, 'project_id', None)
+        ticket = _JobTicket(self, self._keys(job, uuid, host_uuid), priority,
+                            tenant)
+        with self._lock:
+            self._queues.setdefault(
+                priority, collections.OrderedDict()).setdefault(
+                tenant, collections.deque()).append(ticket)
+            self._dispatch()
+        if ticket.dispatched.wait(timeout or None):
+            return ticket
+        with self._lock:
+            if not ticket.dispatched.is_set():
+                self._dequeue(ticket)
+                self._counts['timed_out'] += 1
+                exc = pvmex.JobRequestTimedOut(operation_name=job.op,
+                                               seconds=timeout)
+                LOG.error(exc.args[0])
+                raise exc
+        return ticket
+
+    def _dequeue(self, ticket):
+        tenants = self._queues[ticket.priority]
+        queue = tenants[ticket.tenant]
+        queue.remove(ticket)
+        if not queue:
+            del tenants[ticket.tenant]
+            if not tenants:
+                del self._queues[ticket.priority]
+
+    def _has_room(self, ticket):
+        for key in ticket.keys:
+            limit = self.limits[key[0]]
+            if limit > 0 and self._running[key] >= limit:
+                return False
+        return True
+
+    def _dispatch(self):
+        """Start as many queued Jobs as the limits allow.  Hold the lock."""
+        for priority in sorted(self._queues):
+            tenants = self._queues[priority]
+            started = True
+            while started and tenants:
+                # One Job per tenant per pass, so the tenants take turns.
+                started = False
+                for tenant in list(tenants):
+                    ticket = next((tkt for tkt in tenants[tenant]
+                                   if self._has_room(tkt)), None)
+                    if ticket is None:
+                        continue
+                    self._dequeue(ticket)
+                    # Send the tenant to the back of the line.
+                    if tenant in tenants:
+                        tenants[tenant] = tenants.pop(tenant)
+                    self._start(ticket)
+                    started = True
+
+    def _start(self, ticket):
+        ticket.started_at = time.time()
+        wait = ticket.started_at - ticket.queued_at
+        self._running.update(ticket.keys)
+        self._counts['dispatched'] += 1
+        self._waits['total'] += wait
+        self._waits['max'] = max(self._waits['max'], wait)
+        ticket.dispatched.set()
+
+    def _release(self, ticket):
+        with self._lock:
+            if ticket.released or ticket.started_at is None:
+                return
+            ticket.released = True
+            run = time.time() - ticket.started_at
+            self._running.subtract(ticket.keys)
+            self._counts['completed'] += 1
+            self._runs['total'] += run
+            self._runs['max'] = max(self._runs['max'], run)
+            self._dispatch()
+
+    def stats(self):
+        """Queue-depth and latency statistics.
+
+        :return: Dict of:
+            queued: Number of Jobs waiting for a slot.
+            queued_by_priority: {JobPriority value: number of Jobs waiting}.
+            running: Number of Jobs holding a slot.
+            running_by_host: {managed system uuid: number of Jobs running}.
+            running_by_vios: {VIOS uuid: number of Jobs running}.
+            dispatched: Number of Jobs started since the scheduler was created.
+            completed: Number of those which have finished.
+            timed_out: Number of Jobs which timed out waiting for a slot.
+            wait_avg, wait_max: Average and maximum seconds a Job waited for
+                                a slot.
+            run_avg, run_max: Average and maximum seconds a Job held its slot.
+        """
+        with self._lock:
+            by_prio = {prio: sum(len(queue) for queue in tenants.values())
+                       for prio, tenants in self._queues.items()}
+            dispatched = self._counts['dispatched']
+            completed = self._counts['completed']
+            return {
+                'queued': sum(by_prio.values()),
+                'queued_by_priority': by_prio,
+                'running': self._running[('total', None)],
+                'running_by_host': {key[1]: num for key, num in
+                                    self._running.items()
+                                    if key[0] == 'host' and num},
+                'running_by_vios': {key[1]: num for key, num in
+                                    self._running.items()
+                                    if key[0] == 'vios' and num},
+                'dispatched': dispatched,
+                'completed': completed,
+                'timed_out': self._counts['timed_out'],
+                'wait_avg': (self._waits['total'] / dispatched
+                             if dispatched else 0.0),
+                'wait_max': self._waits['max'],
+                'run_avg': (self._runs['total'] / completed
+                            if completed else 0.0),
+                'run_max': self._runs['max']}
+
+
 class PollAndDeleteThread(threading.Thread):
+    """Waits for a Job to finish, and deletes it.
+
+    Superseded by JobMonitor.watch, which does the same without a thread per
+    Job.
+    """
     def __init__(self, job, sensitive):
         super(PollAndDeleteThread, self).__init__()
         self.job = job
@@ -73,6 +589,11 @@ class PollAndDeleteThread(threading.Thread):
 
 
 class CancelJobThread(threading.Thread):
+    """Waits for a cancelled Job to finish, and deletes it.
+
+    Superseded by JobMonitor.watch, which does the same without a thread per
+    Job.
+    """
     def __init__(self, job, sensitive):
         super(CancelJobThread, self).__init__()
         self.job = job
@@ -200,10 +721,12 @@ class Job(ewrap.EntryWrapper):
 
     def run_job(self, uuid, job_parms=None,
                 timeout=CONF.pypowervm_job_request_timeout,
-                sensitive=False, synchronous=True):
+                sensitive=False, synchronous=True, host_uuid=None,
+                priority=JobPriority.NORMAL, tenant=None):
         """Invokes and polls a job.
 
-        Adds job parameters to the job element if specified and calls the
+        Waits for the Session's JobScheduler to allow the job to run, then
+        adds job parameters to the job element if specified and calls the
         create_job method. It then monitors the job for completion and sends a
         JobRequestFailed exception if it did not complete successfully.
 
@@ -217,8 +740,54 @@ class Job(ewrap.EntryWrapper):
                             (if the Job is waiting in queue to start), and may
                             still time out (if the Job hasn't started within
                             the requested timeout.)
+        :param host_uuid: The uuid of the managed system on which the job
+                          runs, if known, so the JobScheduler can limit the
+                          jobs per managed system.  (Not needed if uuid is
+                          that of the managed system.)
+        :param priority: JobPriority value, determining the order in which
+                         queued jobs are started.
+        :param tenant: Key by which queued jobs of the same priority take
+                       turns.  Defaults to the project of the current request
+                       context.
         :raise JobRequestFailed: if the job did not complete successfully.
-        :raise JobRequestTimedOut: if the job timed out.
+        :raise JobRequestTimedOut: if the job timed out (including waiting for
+                                   the JobScheduler).
+        """
+        start = time.time()
+        ticket = JobScheduler.get(self.adapter).acquire(
+            self, uuid, host_uuid=host_uuid, priority=priority, tenant=tenant,
+            timeout=timeout)
+        # An asynchronous Job's ticket is released by the JobMonitor.
+        monitored = False
+        try:
+            # The time spent waiting for the JobScheduler counts against the
+            # timeout.  (Zero still means no timeout.)
+            remaining = timeout and timeout - (time.time() - start)
+            if timeout and remaining <= 0:
+                raise pvmex.JobRequestTimedOut(operation_name=self.op,
+                                               seconds=timeout)
+            self._submit(uuid, job_parms=job_parms, sensitive=sensitive)
+            timed_out = self._monitor_job(
+                timeout=remaining, sensitive=sensitive,
+                synchronous=synchronous, on_done=ticket.release)
+            if timed_out:
+                self._cancel_timed_out(remaining)
+            if not synchronous:
+                # _monitor_job set up the JobMonitor to delete_job when done.
+                monitored = True
+                return
+            self._finish()
+        finally:
+            if not monitored:
+                ticket.release()
+
+    def _submit(self, uuid, job_parms=None, sensitive=False):
+        """Add job parameters and create (start) the Job on the server.
+
+        :param uuid: uuid of the target
+        :param job_parms: list of JobParamters to add
+        :param sensitive: If True, mask the Job payload in the logs.
+        :raise JobRequestFailed: if the job could not be created.
         """
         if job_parms:
             self.add_job_parameters_to_existing(*job_parms)
@@ -229,20 +798,27 @@ class Job(ewrap.EntryWrapper):
         except pvmex.Error as exc:
             LOG.exception(exc)
             raise pvmex.JobRequestFailed(operation_name=self.op, error=exc)
-        timed_out = self._monitor_job(
-            timeout=timeout, sensitive=sensitive, synchronous=synchronous)
-        if timed_out:
-            try:
-                self.cancel_job()
-            except pvmex.JobRequestFailed as e:
-                LOG.warning(six.text_type(e))
-            exc = pvmex.JobRequestTimedOut(
-                operation_name=self.op, seconds=timeout)
-            LOG.error(exc.args[0])
-            raise exc
-        if not synchronous:
-            # _monitor_job spawned a subthread that will delete_job when done.
-            return
+
+    def _cancel_timed_out(self, timeout):
+        """Cancel a Job which did not complete within the timeout.
+
+        :param timeout: The timeout (seconds) which was exceeded.
+        :raise JobRequestTimedOut: always.
+        """
+        try:
+            self.cancel_job()
+        except pvmex.JobRequestFailed as e:
+            LOG.warning(six.text_type(e))
+        exc = pvmex.JobRequestTimedOut(
+            operation_name=self.op, seconds=timeout)
+        LOG.error(exc.args[0])
+        raise exc
+
+    def _finish(self):
+        """Delete a completed Job and check its outcome.
+
+        :raise JobRequestFailed: if the job did not complete successfully.
+        """
         self.delete_job()
         if self.job_status != JobStatus.COMPLETED_OK:
             exc = pvmex.JobRequestFailed(
@@ -251,38 +827,28 @@ class Job(ewrap.EntryWrapper):
             raise exc
 
     def poll_while_status(self, statuses, timeout, sensitive):
-        """Poll the Job as long as its status is in the specified list.
+        """Wait on the Job as long as its status is in the specified list.
+
+        The Job is tracked by the Session's JobMonitor, which refreshes it on
+        events and/or polls it with backoff.
 
         :param statuses: Iterable of JobStatus enum values.  This method
-                         continues to poll the Job as long as its status is
+                         continues to wait on the Job as long as its status is
                          in the specified list, or until the timeout is
                          reached (whichever comes first).
         :param timeout: Maximum number of seconds to keep checking job status.
-                        If zero, poll indefinitely.
+                        If zero, wait indefinitely.
         :param sensitive: If True, mask the Job payload in the logs.
         :return: timed_out: True if the timeout was reached before the Job
                             left the specified set of states.
         """
-        start_time = time.time()
-        iteration_count = 1
-        while self.job_status in statuses:
-            elapsed_time = time.time() - start_time
-            if timeout:
-                # wait up to timeout seconds
-                if elapsed_time > timeout:
-                    return True
-            # Log a warning every 5 minutes
-            if not iteration_count % 300:
-                msg = _("Job %(job_id)s monitoring for %(time)i seconds.")
-                LOG.warning(msg, {'job_id': self.job_id, 'time': elapsed_time})
-            time.sleep(1)
-            self.entry = self.adapter.read_job(
-                self.job_id, sensitive=sensitive).entry
-            iteration_count += 1
-        return False
+        if self.job_status not in statuses:
+            return False
+        return JobMonitor.get(self.adapter).wait(self, statuses, timeout,
+                                                 sensitive)
 
     def _monitor_job(self, timeout=CONF.pypowervm_job_request_timeout,
-                     sensitive=False, synchronous=True):
+                     sensitive=False, synchronous=True, on_done=None):
         """Polls a job.
 
         Waits on a job until it is no longer running.  If a timeout is given,
@@ -297,8 +863,9 @@ class Job(ewrap.EntryWrapper):
                             still time out (if the Job hasn't started within
                             the requested timeout.)  If synchronous=True, the
                             caller must delete the Job (self.delete_job()); if
-                            False, this method spawns a subthread that deletes
-                            it when it finishes.
+                            False, the JobMonitor deletes it when it finishes.
+        :param on_done: Optional callable with no arguments, invoked when the
+                        JobMonitor deletes an asynchronous Job.
         :returns timed_out: boolean True if timed out waiting for job
                             completion
         """
@@ -311,14 +878,17 @@ class Job(ewrap.EntryWrapper):
         if self.poll_while_status([JobStatus.NOT_ACTIVE], timeout, sensitive):
             return True
 
-        PollAndDeleteThread(self, sensitive).start()
+        JobMonitor.get(self.adapter).watch(
+            self, [JobStatus.RUNNING], sensitive=sensitive,
+            callback=functools.partial(_delete_in_background,
+                                       on_done=on_done))
         return False
 
     def cancel_job(self, sensitive=False):
         """Cancels and deletes incomplete/running jobs.
 
-        This method spawns a thread to monitor the job being cancelled
-        and delete it.
+        The Session's JobMonitor waits for the job to terminate, and deletes
+        it.
 
         :param sensitive: If True, payload will be hidden in the logs
         """
@@ -332,7 +902,11 @@ class Job(ewrap.EntryWrapper):
                                 suffix_type='cancel')
         except pvmex.Error as exc:
             LOG.exception(exc)
-        CancelJobThread(self, sensitive).start()
+        JobMonitor.get(self.adapter).watch(
+            self, [JobStatus.RUNNING, JobStatus.NOT_ACTIVE],
+            sensitive=sensitive,
+            callback=functools.partial(_delete_in_background,
+                                       log_failure=False))
 
     def delete_job(self):
         """Cleans this Job off of the REST server, if it is completed.
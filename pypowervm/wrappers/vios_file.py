@@ -134,6 +134,11 @@ class File(ewrap.EntryWrapper):
     def _enum_type(self, et):
         self.set_parm_value(_FILE_ENUM_TYPE, et)
 
+    @property
+    def sha_chksum(self):
+        """The SHA256 checksum the file was created with, if any."""
+        return self._get_val_str(_FILE_CHKSUM)
+
     def _chksum(self, sha):
         self.set_parm_value(_FILE_CHKSUM, sha)
 
@@ -0,0 +1,73 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of FeedTask.execute: TaskFlow engines vs. the native executor.
+
+The FeedTasks run trivial Subtasks and a post-exec against the LPAR and VIOS
+test fixtures, with GET, update and locking mocked out, so the cost measured
+is that of the executor itself.
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/feed_task.py [iterations]
+"""
+
+import sys
+import timeit
+
+from taskflow import task as tf_task
+
+import pypowervm.tests.test_fixtures as fx
+from pypowervm.tests.test_utils import pvmhttp
+import pypowervm.utils.transaction as tx
+import pypowervm.wrappers.logical_partition as lpar
+import pypowervm.wrappers.virtual_io_server as vios
+
+FEEDS = (('lpar.txt', lpar.LPAR), ('fake_vios_feed.txt', vios.VIOS))
+
+
+def _feed_task(feed, native):
+    ftsk = tx.FeedTask('bench', feed, native=native)
+    ftsk.add_functor_subtask(lambda wrapper: wrapper.uuid, provides='uuid')
+    # One Subtask flags an update, so the (mocked) update is timed too.
+    ftsk.add_functor_subtask(lambda wrapper: True)
+    ftsk.add_post_execute(tf_task.FunctorTask(
+        lambda wrapper_task_rets: len(wrapper_task_rets), provides='count'))
+    return ftsk
+
+
+def _time(feed, native, number):
+    return min(timeit.repeat(lambda: _feed_task(feed, native).execute(),
+                             number=number, repeat=3)) / number
+
+
+def main(number=20):
+    feeds = [(fname, klass.wrap(pvmhttp.load_pvm_resp(fname).get_response()))
+             for fname, klass in FEEDS]
+    # Mock the update and locking, as the unit tests do.  (The FeedTasks are
+    # given their feeds, so there are no GETs.)
+    fx.FeedTaskFx(feeds[0][1]).setUp()
+
+    for fname, feed in feeds:
+        slow = _time(feed, False, number)
+        fast = _time(feed, True, number)
+        print('%s (%d wrappers)' % (fname, len(feed)))
+        print('  taskflow:  %8.3f ms/execute' % (slow * 1000))
+        print('  native:    %8.3f ms/execute' % (fast * 1000))
+        print('  speedup:   %8.2fx' % (slow / fast))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
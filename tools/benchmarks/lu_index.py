@@ -0,0 +1,132 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of SSP LU removal: list scans vs. the LUIndex.
+
+Builds a synthetic Tier feed of Image LUs, each with the same number of Disk
+LU linked clones, and times the removal (as by rm_tier_storage) of a fraction
+of the clones - including all the clones of some images, so those images are
+removed too - through the LUIndex and through the previous behavior (scanning
+the feed for each LU removed and each backing image checked).  The latter is
+quadratic: at the default 10000 LUs it takes several minutes.
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/lu_index.py [num_lus [num_images]]
+"""
+
+import logging
+import sys
+import time
+
+from pypowervm.tasks import storage
+from pypowervm.wrappers import storage as stor
+
+
+def _image_lu_for_clone(lus, clone_lu):
+    if clone_lu.cloned_from_udid is None:
+        return None
+    image_udid = clone_lu.cloned_from_udid[2:]
+    for lu in lus:
+        if lu.lu_type == stor.LUType.IMAGE and lu.udid[2:] == image_udid:
+            return lu
+    return None
+
+
+def _image_lu_in_use(lus, image_lu):
+    image_udid = image_lu.udid[2:]
+    for lu in lus:
+        if lu.lu_type != stor.LUType.DISK or lu.cloned_from_udid is None:
+            continue
+        if lu.cloned_from_udid[2:] == image_udid:
+            return True
+    return False
+
+
+def _rm_dev_by_udid(dev, devlist):
+    matches = [realdev for realdev in devlist if realdev.udid == dev.udid]
+    if not matches:
+        return None
+    devlist.remove(matches[0])
+    return matches[0]
+
+
+def _legacy_rm_lus(all_lus, lus_to_rm):
+    """_rm_lus as it was: scanning all_lus for each LU."""
+    changes = []
+    backing_images = set()
+    for lu in lus_to_rm:
+        if lu.lu_type == stor.LUType.DISK:
+            backing_images.add(_image_lu_for_clone(all_lus, lu))
+        removed = _rm_dev_by_udid(lu, all_lus)
+        if removed:
+            changes.append(removed)
+    for back_img in backing_images:
+        if back_img is None or _image_lu_in_use(all_lus, back_img):
+            continue
+        removed = _rm_dev_by_udid(back_img, all_lus)
+        if removed:
+            changes.append(removed)
+    return changes
+
+
+def _lu(name, udid, typ, cloned_from=None):
+    lu = stor.LUEnt.bld(None, name, 1, typ=typ)
+    lu._udid(udid)
+    if cloned_from is not None:
+        lu._cloned_from_udid(cloned_from)
+    return lu
+
+
+def tier(num_lus, num_images):
+    """(LUEnt feed, clones to remove) of a synthetic Tier."""
+    per_image = num_lus // num_images - 1
+    lus, to_rm = [], []
+    for img in range(num_images):
+        udid = '%032x' % img
+        lus.append(_lu('image%d' % img, '29' + udid, stor.LUType.IMAGE))
+        for num in range(per_image):
+            clone = _lu('disk%d_%d' % (img, num), '27%016x%016x' % (img, num),
+                        stor.LUType.DISK, cloned_from='19' + udid)
+            lus.append(clone)
+            # All the clones of every tenth image; a fifth of the others'.
+            if img % 10 == 0 or num % 5 == 0:
+                to_rm.append(clone)
+    return lus, to_rm
+
+
+def _time(func, lus, to_rm):
+    lus = list(lus)
+    start = time.time()
+    removed = func(lus, to_rm)
+    return time.time() - start, sorted(lu.udid for lu in removed), len(lus)
+
+
+def main(num_lus=10000, num_images=100):
+    # The legacy code didn't log; don't let the new code's logging count.
+    logging.disable(logging.INFO)
+    lus, to_rm = tier(num_lus, num_images)
+    fast, indexed, left = _time(storage._rm_lus, lus, to_rm)
+    slow, legacy, legacy_left = _time(_legacy_rm_lus, lus, to_rm)
+    assert (indexed, left) == (legacy, legacy_left)
+    print('%7s %7s %8s %12s %12s %9s' % ('LUs', 'images', 'removed',
+                                         'scan ms', 'index ms', 'speedup'))
+    print('%7d %7d %8d %12.1f %12.1f %8.1fx' % (
+        len(lus), num_images, len(indexed), slow * 1000, fast * 1000,
+        slow / fast))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,101 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of vm_metrics' VIOS storage correlation: scan vs. index.
+
+Times vm_metrics on synthetic hosts of increasing size, with the VIOS storage
+adapters looked up through the ViosStorageIndex and through the previous
+behavior (scanning every VIOS adapter for each client adapter).
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/pcm_correlation.py [max_lpars [vioses]]
+"""
+
+import sys
+import timeit
+
+import mock
+import pcm_data
+
+from pypowervm.tasks.monitor import lpar as lpar_mon
+from pypowervm.tasks.monitor import util as mon_util
+
+
+class _LegacyIndex(object):
+    """The ViosStorageIndex interface, by scanning, as LparStorage used to."""
+
+    def __init__(self, vios_metrics):
+        self.vios_metrics = vios_metrics
+
+    def find_vstor_adpt(self, phyp_vadpt):
+        for vios_ltm in self.vios_metrics:
+            if vios_ltm.sample.id != phyp_vadpt.vios_id:
+                continue
+            raw_stor = vios_ltm.sample.storage
+            if raw_stor is None or raw_stor.virt_adpts is None:
+                break
+            slot_str = "-C%d" % phyp_vadpt.vios_slot
+            for vadpt in raw_stor.virt_adpts:
+                if vadpt.physical_location.endswith(slot_str):
+                    return vadpt
+            break
+        return None
+
+    def find_vfc_adpt(self, phyp_vfc_adpt):
+        for vios_ltm in self.vios_metrics:
+            if vios_ltm.sample.id != phyp_vfc_adpt.vios_id:
+                continue
+            raw_stor = vios_ltm.sample.storage
+            if raw_stor is None or raw_stor.fc_adpts is None:
+                return None
+            for pfc_adpt in raw_stor.fc_adpts:
+                for vfc_adpt in pfc_adpt.ports or []:
+                    for wwpn in phyp_vfc_adpt.wwpn_pair:
+                        if wwpn == vfc_adpt.wwpn:
+                            return vfc_adpt
+        return None
+
+
+def _adapters(metrics):
+    """{LPAR UUID: [names of its VIOS storage adapters]}."""
+    return {uuid: [adpt.name for adpt in
+                   metric.storage.virt_adpts + metric.storage.vfc_adpts]
+            for uuid, metric in metrics.items()}
+
+
+def _time(host, number):
+    return min(timeit.repeat(lambda: mon_util.vm_metrics(*host),
+                             number=number, repeat=3)) / number
+
+
+def main(max_lpars=1000, num_vioses=4, number=3):
+    print('%6s %7s %12s %12s %9s' % ('LPARs', 'VIOSes', 'scan ms',
+                                     'index ms', 'speedup'))
+    num_lpars = 125
+    while num_lpars <= max_lpars:
+        host = pcm_data.host(num_lpars, num_vioses)
+        fast = _time(host, number)
+        indexed = _adapters(mon_util.vm_metrics(*host))
+        with mock.patch.object(lpar_mon, 'ViosStorageIndex', _LegacyIndex):
+            slow = _time(host, number)
+            assert indexed == _adapters(mon_util.vm_metrics(*host))
+        print('%6d %7d %12.3f %12.3f %8.2fx' % (
+            num_lpars, num_vioses, slow * 1000, fast * 1000, slow / fast))
+        num_lpars *= 2
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
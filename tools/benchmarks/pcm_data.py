@@ -0,0 +1,160 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Synthetic PCM samples of a large host, for the metrics benchmarks.
+
+Each LPAR has one client network adapter, one virtual SCSI adapter and one
+virtual FC adapter, spread round-robin across the VIOSes.  Counters grow with
+the sample number, so consecutive samples yield nonzero rates.
+"""
+
+import datetime
+import json
+
+from pypowervm.wrappers.pcm import lpar as pcm_lpar
+from pypowervm.wrappers.pcm import phyp as pcm_phyp
+from pypowervm.wrappers.pcm import vios as pcm_vios
+
+_START = datetime.datetime(2026, 1, 1)
+_INTERVAL = 30
+_INFO = {'version': '1.0.0', 'metricType': 'Raw', 'monitoringType': 'LTM',
+         'mtms': '8247-22L*2125D4A', 'name': 'bench'}
+
+
+def _uuid(lpar):
+    return '%08X-0000-4000-8000-%012X' % (lpar, lpar)
+
+
+def _wwpn(lpar):
+    return 'c05076%010x' % (lpar * 2)
+
+
+def _time_stamp(sample):
+    return (_START + datetime.timedelta(seconds=sample * _INTERVAL)).strftime(
+        '%Y-%m-%dT%H:%M:%S+0000')
+
+
+def _placement(lpar, num_vioses):
+    """(VIOS ID, server slot) hosting the storage of an LPAR."""
+    return lpar % num_vioses + 1, 100 + lpar // num_vioses
+
+
+def _io(count, sample):
+    return {'numOfReads': count * sample * 10,
+            'numOfWrites': count * sample * 5,
+            'readBytes': count * sample * 40960,
+            'writeBytes': count * sample * 20480}
+
+
+def _proc(sample, util):
+    return {'poolId': 0, 'mode': 'uncap', 'maxVirtualProcessors': 2,
+            'maxProcUnits': 0.5, 'weight': 128,
+            'entitledProcCycles': sample * 10 ** 9,
+            'utilizedCappedProcCycles': sample * util * 10 ** 8,
+            'utilizedUnCappedProcCycles': sample * 10 ** 7,
+            'idleProcCycles': 0, 'donatedProcCycles': 0,
+            'timeSpentWaitingForDispatch': 0, 'totalInstructions': 0,
+            'totalInstructionsExecutionTime': 0}
+
+
+def phyp_json(num_lpars, num_vioses, sample=1):
+    vioses = [{'id': vid, 'uuid': _uuid(10 ** 6 + vid), 'name': 'vios%d' % vid,
+               'state': 'running', 'affinityScore': 100,
+               'processor': _proc(sample, 5)}
+              for vid in range(1, num_vioses + 1)]
+    lpars = []
+    for i in range(num_lpars):
+        vios_id, slot = _placement(i, num_vioses)
+        lpars.append({
+            'id': i + 10, 'uuid': _uuid(i), 'type': 'aixlinux',
+            'name': 'lpar%d' % i, 'state': 'running', 'affinityScore': 100,
+            'memory': {'logicalMem': 4096, 'backedPhysicalMem': 4096},
+            'processor': _proc(sample, i % 10),
+            'network': {'virtualEthernetAdapters': [{
+                'vlanId': 1, 'vswitchId': 0,
+                'physicalLocation': 'U8247.22L.2125D4A-V%d-C2' % (i + 10),
+                'isPortVLANID': True, 'receivedPackets': sample * 100,
+                'sentPackets': sample * 50, 'droppedPackets': 0,
+                'sentBytes': sample * 5000, 'receivedBytes': sample * 10000}]},
+            'storage': {
+                'genericVirtualAdapters': [{
+                    'physicalLocation': 'U8247.22L.2125D4A-V%d-C3' % (i + 10),
+                    'viosId': vios_id, 'viosAdapterSlotId': slot}],
+                'virtualFiberChannelAdapters': [{
+                    'physicalLocation': 'U8247.22L.2125D4A-V%d-C4' % (i + 10),
+                    'viosId': vios_id,
+                    'wwpnPair': [_wwpn(i), _wwpn(i)[:-1] + '1']}]}})
+    return json.dumps({'systemUtil': {'utilInfo': _INFO, 'utilSample': {
+        'timeStamp': _time_stamp(sample), 'status': 0,
+        'timeBasedCycles': sample * 10 ** 10, 'sharedProcessorPool': [],
+        'lparsUtil': lpars, 'viosUtil': vioses}}})
+
+
+def vios_json(vios_id, num_lpars, num_vioses, sample=1):
+    lpars = [i for i in range(num_lpars)
+             if _placement(i, num_vioses)[0] == vios_id]
+    vadpts, vfcs = [], []
+    for i in lpars:
+        slot = _placement(i, num_vioses)[1]
+        vadpt = {'id': 'vhost%d' % slot, 'type': 'virtual',
+                 'physicalLocation': 'U8247.22L.2125D4A-V%d-C%d' % (vios_id,
+                                                                    slot)}
+        vadpt.update(_io(1, sample))
+        vadpts.append(vadpt)
+        vfc = {'id': 'vfc%d' % slot, 'wwpn': _wwpn(i), 'runningSpeed': 8,
+               'physicalLocation': 'U78CB.001.WZS007Y-P1-C3-T%d' % slot}
+        vfc.update(_io(2, sample))
+        vfcs.append(vfc)
+    fcs = []
+    # The virtual FC ports are spread across four physical ports.
+    for port in range(4):
+        fc = {'id': 'fcs%d' % port, 'wwpn': '21000024ff6491%02x' % port,
+              'runningSpeed': 8, 'ports': vfcs[port::4],
+              'physicalLocation': 'U78CB.001.WZS007Y-P1-C3-T%d' % (port + 1)}
+        fc.update(_io(len(lpars), sample))
+        fcs.append(fc)
+    return json.dumps({'systemUtil': {'utilInfo': _INFO, 'utilSample': {
+        'timeStamp': _time_stamp(sample), 'viosUtil': [{
+            'id': str(vios_id), 'name': 'vios%d' % vios_id,
+            'memory': {'utilizedMem': 2048},
+            'network': {'genericAdapters': [], 'sharedAdapters': []},
+            'storage': {'fiberChannelAdapters': fcs,
+                        'genericPhysicalAdapters': [],
+                        'genericVirtualAdapters': vadpts,
+                        'sharedStoragePools': []}}]}}})
+
+
+def lpar_json(num_lpars, sample=1):
+    return json.dumps({'lparUtil': [{
+        'uuid': _uuid(i), 'id': i + 10, 'name': 'lpar%d' % i,
+        'timestamp': _time_stamp(sample),
+        'memory': {'pctRealMemAvbl': 50, 'totalPgSpSizeCount': 1024,
+                   'totalPgSpFreeCount': 512, 'vmActivePgCount': 256,
+                   'realMemSizeBytes': 4294967296, 'pctRealMemFree': 40,
+                   'vmPgInRate': i % 7, 'vmPgOutRate': i % 3,
+                   'vmPgSpInRate': 0, 'vmPgSpOutRate': 0}}
+        for i in range(num_lpars)]})
+
+
+def host(num_lpars, num_vioses, sample=1):
+    """The parsed PCM metrics of one sample of a synthetic host.
+
+    :return: (PhypInfo, [ViosInfo], LparInfo), as from latest_stats.
+    """
+    return (pcm_phyp.PhypInfo(phyp_json(num_lpars, num_vioses, sample)),
+            [pcm_vios.ViosInfo(vios_json(vid, num_lpars, num_vioses, sample))
+             for vid in range(1, num_vioses + 1)],
+            pcm_lpar.LparInfo(lpar_json(num_lpars, sample)))
@@ -0,0 +1,295 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks for the parse/wrap/serialize hot paths, using the test data.
+
+Each benchmark reports the best time per pass, throughput, and the peak
+Python heap allocated during a pass.  Results can be saved as JSON and
+compared against a previous run, so regressions and improvements are
+measurable.
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/suite.py [options] [benchmark ...]
+
+    -n, --number N     Passes per timing repetition (default 20).
+    -r, --repeat N     Timing repetitions; the best is reported (default 3).
+    --save FILE        Save the results as JSON.
+    --compare FILE     Compare against results previously saved as JSON.
+    --list             List the benchmarks and exit.
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import gc
+import json
+import platform
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    # Peak memory is not reported on python 2.
+    tracemalloc = None
+
+import pypowervm.adapter as adp
+import pypowervm.tests.test_fixtures as fx
+from pypowervm.tests.test_utils import pvmhttp
+import pypowervm.utils.wrappers as wutil
+import pypowervm.wrappers.cluster as clust
+import pypowervm.wrappers.entry_wrapper as ewrap
+import pypowervm.wrappers.logical_partition as lpar
+import pypowervm.wrappers.managed_system as ms
+import pypowervm.wrappers.network as net
+from pypowervm.wrappers.pcm import lpar as pcm_lpar
+from pypowervm.wrappers.pcm import phyp as pcm_phyp
+from pypowervm.wrappers.pcm import vios as pcm_vios
+import pypowervm.wrappers.storage as stor
+import pypowervm.wrappers.virtual_io_server as vios
+
+XML_FILES = (('fake_vios_feed.txt', vios.VIOS),
+             ('fake_vios_mappings.txt', vios.VIOS),
+             ('managedsystem.txt', ms.System),
+             ('lpar.txt', lpar.LPAR),
+             ('fake_network_bridge.txt', net.NetBridge),
+             ('cluster.txt', clust.Cluster),
+             ('ssp.txt', stor.SSP))
+PCM_FILES = (('phyp_pcm_data.txt', pcm_phyp.PhypInfo),
+             ('vios_pcm_data.txt', pcm_vios.ViosInfo),
+             ('lpar_pcm_data.txt', pcm_lpar.LparInfo))
+
+# Benchmark registry: {name: (setup, run, unit)}.  setup() returns the state
+# passed to run(state), which returns the number of units processed per pass.
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name, unit, setup):
+    def decorator(func):
+        BENCHMARKS[name] = (setup, func, unit)
+        return func
+    return decorator
+
+
+def _adapter():
+    """A mock Adapter with real traits, as used by the unit tests."""
+    fixture = fx.AdapterFx(traits=fx.LocalPVMTraits)
+    fixture.setUp()
+    return fixture.adpt
+
+
+def _xml_bodies():
+    return [pvmhttp.PVMFile(fname) for fname, _ in XML_FILES]
+
+
+def _responses(adpt):
+    return [(pvmhttp.load_pvm_resp(fname, adapter=adpt).get_response(), klass)
+            for fname, klass in XML_FILES]
+
+
+def _wrap(resp, klass):
+    wrapped = klass.wrap(resp)
+    return wrapped if isinstance(wrapped, list) else [wrapped]
+
+
+def _setup_wrappers():
+    adpt = _adapter()
+    return [wrp for resp, klass in _responses(adpt)
+            for wrp in _wrap(resp, klass)]
+
+
+def _property_names():
+    """{wrapper class: [property names]}, for all the wrapper classes."""
+    names = {}
+    for klass in wutil.wrapper_class_iter():
+        props = set()
+        for base in klass.__mro__:
+            props.update(
+                name for name, val in vars(base).items()
+                if isinstance(val, property) and not name.startswith('_'))
+        names[klass] = sorted(props)
+    return names
+
+
+def _touch(wrapper, names, depth):
+    """Read all the properties of a wrapper, and of the wrappers it returns."""
+    count = 0
+    for name in names.get(type(wrapper), ()):
+        try:
+            val = getattr(wrapper, name)
+        except Exception:
+            continue
+        count += 1
+        if depth and isinstance(val, ewrap.Wrapper):
+            count += _touch(val, names, depth - 1)
+        elif depth and isinstance(val, list):
+            for item in val:
+                if isinstance(item, ewrap.Wrapper):
+                    count += _touch(item, names, depth - 1)
+    return count
+
+
+@benchmark('unmarshal', 'bytes', _xml_bodies)
+def bench_unmarshal(pvmfiles):
+    size = 0
+    for pvmfile in pvmfiles:
+        resp = adp.Response(None, None, pvmfile.status, pvmfile.reason,
+                            pvmfile.headers, body=pvmfile.body)
+        resp._unmarshal_atom()
+        if resp.feed is not None:
+            # Entries are unmarshalled on first access
+            list(resp.feed.entries)
+        size += len(pvmfile.body)
+    return size
+
+
+def _setup_wrap():
+    return _adapter(), [(pvmhttp.PVMFile(fname), klass)
+                        for fname, klass in XML_FILES]
+
+
+@benchmark('wrap', 'entries', _setup_wrap)
+def bench_wrap(state):
+    # Fresh Responses each pass: a Response's Entries are only built once, so
+    # rewrapping the same ones would measure almost nothing.  This therefore
+    # includes the 'unmarshal' time.
+    adpt, pvmfiles = state
+    count = 0
+    for pvmfile, klass in pvmfiles:
+        resp = adp.Response(None, None, pvmfile.status, pvmfile.reason,
+                            pvmfile.headers, body=pvmfile.body)
+        resp.adapter = adpt
+        resp._unmarshal_atom()
+        count += len(_wrap(resp, klass))
+    return count
+
+
+@benchmark('properties', 'properties',
+           lambda: (_setup_wrappers(), _property_names()))
+def bench_properties(state):
+    wrappers, names = state
+    return sum(_touch(wrp, names, 1) for wrp in wrappers)
+
+
+@benchmark('toxmlstring', 'bytes', _setup_wrappers)
+def bench_toxmlstring(wrappers):
+    return sum(len(wrp.toxmlstring()) for wrp in wrappers)
+
+
+@benchmark('pcm_json', 'bytes',
+           lambda: [(pvmhttp.PVMFile(fname).body, klass)
+                    for fname, klass in PCM_FILES])
+def bench_pcm_json(bodies):
+    size = 0
+    for body, klass in bodies:
+        klass(body)
+        size += len(body)
+    return size
+
+
+def _peak_memory(run, state):
+    # Only the Python heap is traced; lxml's own (C) allocations are not.
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(state)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(name, number=20, repeat=3):
+    """Run one benchmark.
+
+    :return: Dict of results: seconds (per pass), units (per pass), unit,
+             throughput (units per second) and peak_bytes (None if not
+             measurable).
+    """
+    setup, run, unit = BENCHMARKS[name]
+    state = setup()
+    units = run(state)
+    best = min(timeit.repeat(lambda: run(state), number=number,
+                             repeat=repeat)) / number
+    return {'seconds': best, 'units': units, 'unit': unit,
+            'throughput': units / best if best else None,
+            'peak_bytes': _peak_memory(run, state)}
+
+
+def _fmt_bytes(num):
+    if num is None:
+        return '-'
+    for suffix in ('B', 'KiB', 'MiB'):
+        if num < 1024:
+            return '%.1f%s' % (num, suffix)
+        num /= 1024.0
+    return '%.1fGiB' % num
+
+
+def _report(results, baseline=None):
+    print('%-12s %10s %25s %12s %10s' % ('benchmark', 'ms/pass',
+                                         'throughput', 'peak mem',
+                                         'vs base'))
+    for name, res in results.items():
+        delta = ''
+        if baseline and name in baseline:
+            base = baseline[name]['seconds']
+            delta = '%+.1f%%' % ((res['seconds'] - base) / base * 100)
+        print('%-12s %10.3f %11.0f %-13s %12s %10s' % (
+            name, res['seconds'] * 1000, res['throughput'],
+            res['unit'] + '/s', _fmt_bytes(res['peak_bytes']), delta))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark')
+    parser.add_argument('-n', '--number', type=int, default=20)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--save')
+    parser.add_argument('--compare')
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+    names = args.benchmarks or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error('Unknown benchmark(s): %s' % ', '.join(sorted(unknown)))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)['results']
+
+    results = collections.OrderedDict(
+        (name, run_benchmark(name, number=args.number, repeat=args.repeat))
+        for name in names)
+    _report(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump({'python': platform.python_version(),
+                       'number': args.number, 'repeat': args.repeat,
+                       'results': results}, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
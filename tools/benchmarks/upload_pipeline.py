@@ -0,0 +1,98 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of image upload streaming: read-as-sent vs. UploadPipeline.
+
+Streams a temporary image file to a simulated network which accepts a fixed
+number of bytes per second.  The legacy path checksums the data in a separate
+pass over the file, then sends it through Session._chunkreader in 64KB reads.
+The pipeline path checksums the data (to verify it against sha_chksum) while it
+reads ahead of the network.
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/upload_pipeline.py [MiB [MiB/s]]
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from pypowervm import adapter
+from pypowervm.tasks import storage
+
+
+def _send(chunks, rate):
+    """Consume chunks as a network sending rate bytes/s would."""
+    sent = 0
+    start = time.time()
+    for chunk in chunks:
+        sent += len(chunk)
+        delay = start + float(sent) / rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+    return sent
+
+
+def _legacy(path, rate):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(65536), b''):
+            sha.update(chunk)
+    with open(path, 'rb') as fh:
+        _send(adapter.Session._chunkreader(fh, 65536), rate)
+    return sha.hexdigest()
+
+
+def _pipeline(path, rate):
+    pipe = storage.UploadPipeline()
+    with open(path, 'rb') as fh:
+        _send(pipe.stream(fh, total=os.path.getsize(path)), rate)
+    return pipe.sha256, pipe.stats()
+
+
+def _time(func, *args):
+    start = time.time()
+    ret = func(*args)
+    return time.time() - start, ret
+
+
+def main(mib=256, mib_per_sec=400):
+    rate = mib_per_sec * 1024 * 1024
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for _i in range(mib):
+                fh.write(os.urandom(1024 * 1024))
+        slow, legacy_sha = _time(_legacy, path, rate)
+        fast, (pipe_sha, stats) = _time(_pipeline, path, rate)
+        assert legacy_sha == pipe_sha
+        print('%d MiB at %d MiB/s' % (mib, mib_per_sec))
+        print('%-10s %8s %10s' % ('', 'seconds', 'MiB/s'))
+        for name, secs in (('legacy', slow), ('pipeline', fast)):
+            print('%-10s %8.2f %10.1f' % (name, secs, mib / secs))
+        print('pipeline: read %.2fs, network waited %.2fs for the source, '
+              'read-ahead waited %.2fs for the network' % (
+                  stats['read_time'], stats['source_wait'],
+                  stats['sink_wait']))
+        print('speedup: %.2fx' % (slow / fast))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,111 @@
+# Copyright 2026 IBM Corp.
+#
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Microbenchmark for Wrapper property access on the VIOS test fixtures.
+
+Compares the memoized path qualification and direct text lookup against the
+previous behavior (qualify on every access; wrap the found element).
+
+Usage (from the top of the source tree):
+    PYTHONPATH=. python tools/benchmarks/xpath.py [iterations]
+"""
+
+import re
+import sys
+import timeit
+
+from lxml import etree
+import mock
+
+import pypowervm.entities as ent
+from pypowervm.tasks import scsi_mapper as tsk_map
+from pypowervm.tests.test_utils import pvmhttp
+import pypowervm.wrappers.entry_wrapper as ewrap
+import pypowervm.wrappers.virtual_io_server as vios
+
+VIOS_FILES = ('fake_vios_feed.txt', 'fake_vios_feed_multi.txt',
+              'fake_vios_mappings.txt', 'vio_multi_vscsi_mapping.txt')
+
+
+def _legacy_qualifypath(path, ns):
+    if not ns:
+        return path
+    parts = path.split('/')
+    for i in range(len(parts)):
+        if parts[i] and not re.match(r'[\.\*\[\{]', parts[i]):
+            parts[i] = str(etree.QName(ns, parts[i]))
+    return '/'.join(parts)
+
+
+def _legacy_find_text(self, property_name):
+    found = self._find(property_name)
+    return ewrap._MISSING if found is None else found.text
+
+
+def _legacy_wrapelement(cls, element, adapter):
+    if element is None:
+        return None
+    e = cls('element', adapter)
+    e.element = element
+    return e
+
+
+def _workload(vwraps):
+    for vwrap in vwraps:
+        vwrap.name, vwrap.uuid, vwrap.id, vwrap.state
+        vwrap.is_mgmt_partition, vwrap.rmc_state
+        for smap in vwrap.scsi_mappings:
+            smap.client_lpar_href, smap.server_adapter.lpar_id
+            if smap.client_adapter is not None:
+                smap.client_adapter.lpar_id, smap.client_adapter.lpar_slot_num
+            if smap.backing_storage is not None:
+                smap.backing_storage.name
+        for fmap in vwrap.vfc_mappings:
+            fmap.client_lpar_href, fmap.server_adapter.map_port
+            if fmap.backing_port is not None:
+                fmap.backing_port.wwpn
+        tsk_map.find_maps(vwrap.scsi_mappings, client_lpar_id=2)
+
+
+def _time(vwraps, number):
+    return min(timeit.repeat(lambda: _workload(vwraps), number=number,
+                             repeat=3)) / number
+
+
+def main(number=50):
+    vwraps = []
+    for fname in VIOS_FILES:
+        wrapped = vios.VIOS.wrap(pvmhttp.load_pvm_resp(fname).get_response())
+        vwraps.extend(wrapped if isinstance(wrapped, list) else [wrapped])
+
+    fast = _time(vwraps, number)
+    with mock.patch.object(ent.Element, '_qualifypath',
+                           staticmethod(_legacy_qualifypath)), \
+            mock.patch.object(ent.Element, 'wrapelement',
+                              classmethod(_legacy_wrapelement)), \
+            mock.patch.object(ewrap.Wrapper, '_find_text',
+                              _legacy_find_text):
+        slow = _time(vwraps, number)
+
+    print('%d VIOS wrappers from %d fixtures' % (len(vwraps),
+                                                 len(VIOS_FILES)))
+    print('legacy:    %8.3f ms/pass' % (slow * 1000))
+    print('memoized:  %8.3f ms/pass' % (fast * 1000))
+    print('speedup:   %8.2fx' % (slow / fast))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])